@@ -8,9 +8,12 @@ from storage.database.financial_publish_date_reconciler import (
     normalize_financial_dates,
 )
 from storage.file_store.parquet_store import ParquetStore
+from storage.file_store.partition_lock import partition_locks
 from utils.logger import logger
 from utils.retry import retry
 
+TTM_CATEGORY = "financial/ttm"
+
 
 class TTMCalculator:
     """
@@ -31,21 +34,17 @@ class TTMCalculator:
     def __init__(self):
         self.store = ParquetStore()
         self.warehouse_dir = Path(WAREHOUSE_DIR)
+
+    @property
+    def conn(self):
+        """当前线程的 DuckDB 游标 (实例可跨线程共享)"""
         from storage.database.manager import db_manager
 
-        self.conn = db_manager.get_duckdb_conn()
+        return db_manager.get_duckdb_conn()
 
     def get_existing_report_dates(self) -> set:
-        """获取已计算 TTM 的 {symbol}_{report_date} 集合"""
-        category = "financial/ttm"
-        path = self.store.get_path(category)
-        if not any(Path(WAREHOUSE_DIR).glob(f"{category}/*/data.parquet")):
-            return set()
-
-        res = self.conn.execute(
-            f"SELECT symbol || '_' || report_date FROM read_parquet('{path}', hive_partitioning=1, union_by_name=1)"
-        ).fetchall()
-        return set([row[0] for row in res])
+        """获取已计算 TTM 的 {symbol}_{report_date} 集合 (读分区清单)"""
+        return self.store.manifest.get_report_date_keys(TTM_CATEGORY)
 
     def _normalize_pub_date(self, series: pd.Series) -> pd.Series:
         """归一化公告日期为 YYYYMMDD 格式"""
@@ -59,7 +58,17 @@ class TTMCalculator:
 
     @retry(max_retries=2, delay=1.0)
     def calculate_for_symbol(self, symbol: str):
-        """为单只股票计算 TTM 指标"""
+        """为单只股票计算 TTM 指标
+
+        来源分区的读取、计算与 TTM 写回在同一组分区锁内完成: 同一股票的重算可能由
+        多个同步环节并发触发, 读到统一前公告日期的重算不会在之后覆盖较新的结果。
+        """
+        lock_keys = {(category, symbol) for category, _ in self.INDICATORS.values()}
+        lock_keys.add((TTM_CATEGORY, symbol))
+        with partition_locks(self.warehouse_dir, lock_keys):
+            self._calculate_locked(symbol)
+
+    def _calculate_locked(self, symbol: str):
         logger.debug(f"开始计算 TTM: {symbol}")
 
         try:
@@ -207,7 +216,7 @@ class TTMCalculator:
             df_result.dropna(subset=calculated_ttm_cols, how="all", inplace=True)
 
             if not df_result.empty:
-                self.store.save_partition(df_result, "financial/ttm", symbol)
+                self.store.save_partition(df_result, TTM_CATEGORY, symbol)
                 logger.debug(f"TTM 计算完成并保存: {symbol} ({len(df_result)} 条记录)")
 
         except Exception as e:
@@ -5,7 +5,10 @@ import pandas as pd
 
 from analysis.factors.registry import get_factor_definition
 from backtest.config import BacktestConfig
+from storage.database.arrow_result import fetch_arrow_frame
 from storage.database.manager import DBManager
+from storage.database.valuation_sql import build_valuation_sql, get_required_views
+from utils.trade_date import get_trade_calendar
 
 
 @dataclass(frozen=True)
@@ -28,50 +31,46 @@ class BacktestDataAccess:
         lookback_days: int,
         indicator_fields: tuple[IndicatorField, ...] = (),
         kline_fields: tuple[str, ...] = (),
+        valuation_fields: tuple[str, ...] = (),
     ) -> pd.DataFrame:
         unknown_kline_fields = set(kline_fields) - self._KLINE_SIGNAL_COLUMNS
         if unknown_kline_fields:
             raise ValueError(
                 "不支持的行情信号字段: " + ", ".join(sorted(unknown_kline_fields))
             )
-        view_names = ["v_daily_valuation", "daily_kline"]
+        # 成交与复权收益始终需要原始/后复权收盘价; 其余估值字段按需关联,
+        # 纯价格因子不会触发股本、TTM 或净资产的 ASOF JOIN。
+        fields = tuple(dict.fromkeys(("raw_close", "close_hfq", *valuation_fields)))
+        view_names = list(get_required_views(fields))
         if indicator_fields:
             view_names.append("fin_indicator")
         self.db_manager.ensure_views(*view_names)
         conn = self.db_manager.get_duckdb_conn()
-        lookback_start = self._get_lookback_start(
-            conn, config.start_date, lookback_days
-        )
+        lookback_start = self._get_lookback_start(config.start_date, lookback_days)
         indicator_sql = self._build_indicator_join(indicator_fields)
-        kline_projection = self._build_kline_projection(kline_fields)
-        frame = conn.execute(
+        valuation_sql = build_valuation_sql(
+            fields,
+            kline_columns=("open", *kline_fields),
+            kline_filter="date BETWEEN ? AND ?",
+        )
+        # 日期类型与后复权开盘价均在 SQL 中完成, 结果以 Arrow 直接交付 (ArrowDtype)。
+        return fetch_arrow_frame(
+            conn,
             f"""
             {indicator_sql}
-            SELECT daily_data.*{self._build_indicator_projection(indicator_fields)}
-            FROM (
-                SELECT
-                    valuation.date,
-                    valuation.symbol,
-                    valuation.raw_close,
-                    valuation.close_hfq,
-                    valuation.pe_ttm,
-                    valuation.pb,
-                    kline.open
-                    {kline_projection}
-                FROM v_daily_valuation AS valuation
-                INNER JOIN daily_kline AS kline
-                    ON valuation.symbol = kline.symbol AND valuation.date = CAST(kline.date AS DATE)
-                WHERE valuation.date BETWEEN ? AND ?
-            ) AS daily_data
+            SELECT
+                CAST(daily_data.date AS TIMESTAMP) AS date,
+                daily_data.* EXCLUDE (date),
+                -- 后复权开盘价让开盘成交与收盘收益使用同一经济口径。
+                daily_data.open * daily_data.close_hfq / NULLIF(daily_data.raw_close, 0)
+                    AS open_hfq
+                {self._build_indicator_projection(indicator_fields)}
+            FROM ({valuation_sql}) AS daily_data
             {self._build_indicator_asof_join(indicator_fields)}
             ORDER BY daily_data.date, daily_data.symbol
             """,
             [lookback_start, config.end_date],
-        ).df()
-        frame["date"] = pd.to_datetime(frame["date"])
-        # 后复权开盘价让开盘成交与收盘收益使用同一经济口径。
-        frame["open_hfq"] = frame["open"] * frame["close_hfq"] / frame["raw_close"]
-        return frame
+        )
 
     def load_factor_data(
         self,
@@ -93,6 +92,7 @@ class BacktestDataAccess:
 
         indicator_fields: dict[str, IndicatorField] = {}
         kline_fields: set[str] = set()
+        valuation_fields: dict[str, None] = {}
         lookback_days = minimum_history_days
         parameter_map = factor_parameters or {}
         if not isinstance(parameter_map, Mapping):
@@ -114,55 +114,40 @@ class BacktestDataAccess:
                     )
                 elif field.source == "kline":
                     kline_fields.add(field.alias)
+                elif field.source == "valuation":
+                    valuation_fields[field.alias] = None
 
         return self.load_market_data(
             config,
             lookback_days,
             tuple(indicator_fields.values()),
             tuple(sorted(kline_fields)),
+            tuple(valuation_fields),
         )
 
     def load_benchmark_prices(self, config: BacktestConfig) -> pd.DataFrame:
         if not config.benchmark_symbol:
             return pd.DataFrame(columns=["date", "close_hfq"])
         self.db_manager.ensure_views("etf_kline")
-        frame = (
-            self.db_manager.get_duckdb_conn()
-            .execute(
-                """
-            SELECT CAST(date AS DATE) AS date, close * adj_factor AS close_hfq
+        return fetch_arrow_frame(
+            self.db_manager.get_duckdb_conn(),
+            """
+            SELECT CAST(date AS TIMESTAMP) AS date, close * adj_factor AS close_hfq
             FROM etf_kline
-            WHERE symbol = ? AND CAST(date AS DATE) BETWEEN ? AND ?
+            WHERE symbol = ? AND date BETWEEN ? AND ?
             ORDER BY date
             """,
-                [config.benchmark_symbol, config.start_date, config.end_date],
-            )
-            .df()
+            [config.benchmark_symbol, config.start_date, config.end_date],
         )
-        frame["date"] = pd.to_datetime(frame["date"])
-        return frame
 
     @staticmethod
-    def _get_lookback_start(conn, start_date, lookback_days: int):
+    def _get_lookback_start(start_date, lookback_days: int):
         if lookback_days <= 0:
             return start_date
-        row = conn.execute(
-            """
-            SELECT MIN(date)
-            FROM (
-                SELECT CAST(date AS DATE) AS date
-                FROM daily_kline
-                WHERE CAST(date AS DATE) < ?
-                GROUP BY date
-                ORDER BY date DESC
-                LIMIT ?
-            )
-            """,
-            [start_date, lookback_days],
-        ).fetchone()
-        if row is None or row[0] is None:
+        lookback_start = get_trade_calendar().shift(start_date, -lookback_days)
+        if lookback_start is None:
             raise ValueError(f"回测开始日前不足 {lookback_days} 个交易日")
-        return row[0]
+        return lookback_start
 
     @staticmethod
     def _build_indicator_join(indicator_fields: tuple[IndicatorField, ...]) -> str:
@@ -183,12 +168,7 @@ class BacktestDataAccess:
             WITH indicator_history AS (
                 SELECT
                     symbol,
-                    COALESCE(
-                        try_strptime(LEFT(CAST("数据可用日期" AS VARCHAR), 10), '%Y-%m-%d')::DATE,
-                        try_strptime(LEFT(CAST("数据可用日期" AS VARCHAR), 8), '%Y%m%d')::DATE,
-                        try_strptime(LEFT(CAST("公告日期" AS VARCHAR), 10), '%Y-%m-%d')::DATE,
-                        try_strptime(LEFT(CAST("公告日期" AS VARCHAR), 8), '%Y%m%d')::DATE
-                    ) AS pub_date,
+                    COALESCE("数据可用日期", "公告日期") AS pub_date,
                     {columns},
                     report_date,
                     {tie_breaker} AS record_tie_breaker
@@ -216,14 +196,6 @@ class BacktestDataAccess:
             + ", ".join(f"indicators.{field.alias}" for field in indicator_fields)
         )
 
-    @staticmethod
-    def _build_kline_projection(kline_fields: tuple[str, ...]) -> str:
-        if not kline_fields:
-            return ""
-        return ", " + ", ".join(
-            f'kline."{field}" AS "{field}"' for field in kline_fields
-        )
-
     @staticmethod
     def _build_indicator_asof_join(indicator_fields: tuple[IndicatorField, ...]) -> str:
         if not indicator_fields:
@@ -3,6 +3,22 @@ from dataclasses import dataclass
 import pandas as pd
 
 from backtest.config import BacktestConfig
+from utils.trade_date import TradeCalendar
+
+
+def _to_numpy_backed(frame: pd.DataFrame) -> pd.DataFrame:
+    """复制输入并把 ArrowDtype 数值列转换为 NumPy float64
+
+    数据访问层以 ArrowDtype 交付行情 (缺失值为 pd.NA); 撮合逻辑逐行读取价格,
+    统一为 NaN 语义后再构建价格映射。该复制替代原有的 ``prices.copy()``。
+    """
+    result = frame.copy()
+    for column, dtype in frame.dtypes.items():
+        if isinstance(dtype, pd.ArrowDtype) and pd.api.types.is_numeric_dtype(dtype):
+            result[column] = frame[column].to_numpy(
+                dtype="float64", na_value=float("nan")
+            )
+    return result
 
 
 @dataclass
@@ -26,7 +42,7 @@ class DailyBacktestEngine:
         if missing_columns:
             raise ValueError(f"行情数据缺少字段: {', '.join(sorted(missing_columns))}")
 
-        price_data = prices.copy()
+        price_data = _to_numpy_backed(prices)
         price_data["date"] = pd.to_datetime(price_data["date"])
         price_data = price_data[
             (price_data["date"].dt.date >= self.config.start_date)
@@ -138,12 +154,13 @@ class DailyBacktestEngine:
             return {}
         target_data = targets.copy()
         target_data["date"] = pd.to_datetime(target_data["date"])
+        trade_calendar = TradeCalendar(calendar)
         plans = {}
         for signal_date, group in target_data.groupby("date"):
-            following_dates = calendar[calendar > signal_date]
-            if following_dates.empty:
+            execution_date = trade_calendar.next_trade_date(signal_date)
+            if execution_date is None:
                 continue
-            plans[following_dates[0]] = (
+            plans[pd.Timestamp(execution_date)] = (
                 signal_date,
                 {
                     row.symbol: float(row.target_weight)
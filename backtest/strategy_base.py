@@ -5,6 +5,7 @@ import pandas as pd
 
 from backtest.config import BacktestConfig
 from backtest.data_access import BacktestDataAccess
+from utils.trade_date import TradeCalendar
 
 TARGET_COLUMNS = ("date", "symbol", "score", "rank", "target_weight")
 
@@ -63,10 +64,8 @@ def validate_target_weights(targets: pd.DataFrame) -> pd.DataFrame:
 
 
 def get_month_end_dates(dates: pd.Series) -> pd.DatetimeIndex:
-    unique_dates = pd.DatetimeIndex(
-        pd.to_datetime(dates.drop_duplicates()).sort_values()
-    )
-    return unique_dates.to_series().groupby(unique_dates.to_period("M")).max().values
+    month_ends = TradeCalendar(dates.drop_duplicates()).month_ends()
+    return pd.DatetimeIndex(month_ends.astype("datetime64[ns]"))
 
 
 def select_equal_weight_targets(
@@ -10,6 +10,9 @@ DATA_DIR.mkdir(parents=True, exist_ok=True)
 # 数据库路径
 SQLITE_DB_PATH = DATA_DIR / "metadata.db"
 
+# 全市场清单接口的响应缓存目录 (见 utils/response_cache.py, 可随时整体删除)
+RESPONSE_CACHE_DIR = DATA_DIR / "cache" / "responses"
+
 # Parquet 数据仓路径
 WAREHOUSE_DIR = DATA_DIR / "warehouse"
 WAREHOUSE_DIR.mkdir(parents=True, exist_ok=True)
@@ -30,3 +33,6 @@ MAX_RETRIES = 3
 SYNC_ALL_MAX_RETRIES = 3
 # 重试间隔秒数
 SYNC_ALL_RETRY_INTERVAL_SECONDS = 60
+
+# 同步环节逐股抓取的线程池大小 (各数据源的限速与并发上限见 utils/fetch_scheduler.py)
+SYNC_FETCH_WORKERS = 6
@@ -5,9 +5,9 @@ import akshare as ak
 import pandas as pd
 import requests
 
-from storage.database.manager import db_manager
 from storage.file_store.parquet_store import ParquetStore
 from utils.logger import logger
+from utils.response_cache import ENDPOINT_ETF_LIST, cached_frame
 from utils.retry import retry
 
 
@@ -22,7 +22,7 @@ class ETFListCollector:
         """
         try:
             logger.info("正在从东财获取ETF基金列表...")
-            df = ak.fund_exchange_rank_em()
+            df = cached_frame(ENDPOINT_ETF_LIST, "exchange", ak.fund_exchange_rank_em)
 
             if df.empty:
                 logger.warning("ETF列表接口返回数据为空")
@@ -121,23 +121,12 @@ class ETFKlineCollector:
             return f"SH{code}"
 
     def _get_local_max_date(self, symbol: str) -> str:
-        """获取本地已存储的最新日期"""
+        """获取本地已存储的最新日期 (读分区清单, 含未合并的增量文件)"""
         try:
-            path = (
-                self.store.base_dir / "etf_kline" / f"symbol={symbol}" / "data.parquet"
-            )
-            if not path.exists():
+            max_date = self.store.manifest.get_max_date("etf_kline", symbol)
+            if max_date is None:
                 return "19900101"
-
-            conn = db_manager.get_duckdb_conn()
-            res = conn.execute(
-                f"SELECT MAX(date) FROM read_parquet('{path}')"
-            ).fetchone()
-            if res and res[0]:
-                if isinstance(res[0], datetime):
-                    return res[0].strftime("%Y%m%d")
-                return str(res[0]).replace("-", "")
-            return "19900101"
+            return max_date.strftime("%Y%m%d")
         except Exception:
             return "19900101"
 
@@ -291,19 +280,9 @@ class ETFKlineCollector:
             raise e
 
     def _save_incremental(self, df_new: pd.DataFrame, symbol: str):
-        """增量合并并保存"""
-        path = self.store.base_dir / "etf_kline" / f"symbol={symbol}" / "data.parquet"
-
-        if path.exists():
-            df_old = pd.read_parquet(path)
-            df_combined = pd.concat([df_old, df_new], ignore_index=True)
-            df_combined.drop_duplicates(subset=["date"], keep="last", inplace=True)
-            df_combined.sort_values("date", inplace=True)
-        else:
-            df_combined = df_new
-
-        self.store.save_partition(df_combined, "etf_kline", symbol)
-        logger.debug(f"ETF K线保存成功: {symbol} ({len(df_combined)} 条记录)")
+        """追加新增行情 (增量文件, 不重写历史; 同日期以最新写入为准)"""
+        self.store.append_partition(df_new, "etf_kline", symbol)
+        logger.debug(f"ETF K线保存成功: {symbol} (新增 {len(df_new)} 条记录)")
 
 
 if __name__ == "__main__":
@@ -7,6 +7,7 @@ import pandas as pd
 from storage.database.indicator_store import IndicatorStore
 from utils.logger import logger
 from utils.requests_protection import SinaBlockedError
+from utils.response_cache import ENDPOINT_DISCLOSURE_PLANS, cached_frame
 from utils.retry import retry
 
 # 新浪源确证无数据的 (code, stat_type) 白名单:
@@ -101,11 +102,15 @@ class FinancialCollector:
             raise e
 
     @retry(max_retries=2, delay=2.0)
-    def collect_indicators(self, symbol: str, market_symbol: str = None):
+    def collect_indicators(
+        self, symbol: str, market_symbol: str = None, skip_unchanged: bool = True
+    ):
         """
         抓取并存储财务指标 (东财源)。
         :param symbol: 纯数字代码 (如 600004)
         :param market_symbol: 带后缀代码 (支持 sz300274 或 300274.SZ)
+        :param skip_unchanged: 内容与已存分区一致时跳过写入 (见 IndicatorStore)
+        :return: 公告日期统一的修改行数; 接口为空或内容未变化时为 None
         """
         from utils.financial import MarketLabel, get_market_label
 
@@ -181,12 +186,23 @@ class FinancialCollector:
             df["symbol"] = symbol
 
             # 5. 入库
-            return self.indicator_store.save_indicators(df)
+            return self.indicator_store.save_indicators(
+                df, skip_unchanged=skip_unchanged
+            )
 
         except Exception as e:
             # Re-raise 让 @retry 装饰器捕捉并重试
             raise e
 
+    @staticmethod
+    def _fetch_disclosure_plans(sym: str, date: str) -> pd.DataFrame:
+        # akshare 该接口内部用 tqdm 逐页抓取 (约 500 行/页), 日志先行说明,
+        # 避免用户看到无文字描述的裸进度条时产生困惑
+        logger.info(
+            f"正在获取 {date} {sym} 披露计划 (东财分页接口, 进度条为翻页进度)..."
+        )
+        return ak.stock_yysj_em(symbol=sym, date=date)
+
     def get_disclosure_plans(self, date: str) -> pd.DataFrame:
         """
         获取指定报告期的全市场披露计划 (包含沪深京)。
@@ -197,12 +213,12 @@ class FinancialCollector:
         # 组合查询：沪深A股 + 京市A股
         for sym in ["沪深A股", "京市A股"]:
             try:
-                # akshare 该接口内部用 tqdm 逐页抓取 (约 500 行/页), 日志先行说明,
-                # 避免用户看到无文字描述的裸进度条时产生困惑
-                logger.info(
-                    f"正在获取 {date} {sym} 披露计划 (东财分页接口, 进度条为翻页进度)..."
+                # 指标与报表环节各调用一遍, 定时重试时再次调用, 日内复用缓存
+                df = cached_frame(
+                    ENDPOINT_DISCLOSURE_PLANS,
+                    f"{date}_{sym}",
+                    lambda sym=sym: self._fetch_disclosure_plans(sym, date),
                 )
-                df = ak.stock_yysj_em(symbol=sym, date=date)
                 if not df.empty:
                     all_plans.append(df)
             except Exception:
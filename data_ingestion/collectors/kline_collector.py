@@ -1,5 +1,5 @@
 import random
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, time, timedelta
 
 import akshare as ak
 import pandas as pd
@@ -17,7 +17,23 @@ from utils.financial import MarketLabel, get_market_label, to_sina_symbol
 from utils.logger import logger
 from utils.requests_protection import SinaBlockedError
 from utils.retry import retry
-from utils.trade_date import get_latest_trade_date
+from utils.trade_date import get_latest_trade_date, get_trade_calendar
+
+# 新浪 A 股行情列表 (stock_zh_a_spot) 列名 → 日线字段
+SPOT_COLUMNS = {
+    "代码": "symbol",
+    "今开": "open",
+    "最高": "high",
+    "最低": "low",
+    "最新价": "close",
+    "成交量": "volume",
+    "成交额": "amount",
+    "昨收": "prev_close",
+}
+# 快照昨收与本地最后收盘价的容差, 超出视为除权除息 (复权因子变化, 需逐股重抓)
+SPOT_PREV_CLOSE_TOLERANCE = 0.005
+# 交易日该时刻之后至收盘 (15:30) 前, 快照是盘中数据, 不能当作日线
+SPOT_SESSION_START = time(9, 0)
 
 
 class DailyKlineCollector:
@@ -40,29 +56,12 @@ class DailyKlineCollector:
         return row is not None and row[0] == 0
 
     def _get_local_max_date(self, symbol: str) -> str:
-        """获取本地已存储的最新日期"""
+        """获取本地已存储的最新日期 (读分区清单, 含未合并的增量文件)"""
         try:
-            conn = db_manager.get_duckdb_conn()
-            # 尝试从视图中查询，如果视图未建立或表为空则返回远古日期
-            # 注意: daily_kline 视图可能尚未在 DBManager 中定义，这里直接读文件
-            path = (
-                self.store.base_dir
-                / "daily_kline"
-                / f"symbol={symbol}"
-                / "data.parquet"
-            )
-            if not path.exists():
+            max_date = self.store.manifest.get_max_date("daily_kline", symbol)
+            if max_date is None:
                 return "19900101"
-
-            res = conn.execute(
-                f"SELECT MAX(date) FROM read_parquet('{path}')"
-            ).fetchone()
-            if res and res[0]:
-                # DuckDB 返回 date 类型或 ISO 字符串
-                if isinstance(res[0], datetime):
-                    return res[0].strftime("%Y%m%d")
-                return str(res[0]).replace("-", "")
-            return "19900101"
+            return max_date.strftime("%Y%m%d")
         except Exception:
             return "19900101"
 
@@ -117,48 +116,34 @@ class DailyKlineCollector:
         """从新浪财经抓取行情 (新逻辑)"""
         sina_symbol = to_sina_symbol(symbol)
 
-        # 补丁: 新浪接口对 UA 敏感，akshare 内部请求可能缺失 UA 导致断开连接
-        from unittest.mock import patch
-
-        import requests
-
-        original_get = requests.get
-
-        def patched_get(*args, **kwargs):
-            if "headers" not in kwargs or not kwargs["headers"]:
-                kwargs["headers"] = {
-                    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/144.0.0.0 Safari/537.36"
-                }
-            return original_get(*args, **kwargs)
-
-        with patch("requests.get", side_effect=patched_get):
-            try:
-                # 1. 抓取不复权数据
-                df_raw = ak.stock_zh_a_daily(
-                    symbol=sina_symbol,
-                    start_date=start_date,
-                    end_date=end_date,
-                    adjust="",
-                )
-                if df_raw.empty:
-                    return pd.DataFrame()
-
-                # 2. 抓取后复权数据
-                df_hfq = ak.stock_zh_a_daily(
-                    symbol=sina_symbol,
-                    start_date=start_date,
-                    end_date=end_date,
-                    adjust="hfq",
-                )
-            except SinaBlockedError:
-                # IP 风控: 立即传播止损, 不得降级 CDR (同域接口, 降级等于再发一次被风控请求)
-                raise
-            except Exception as e:
-                logger.warning(
-                    f"{symbol} akshare 新浪解析失败 ({type(e).__name__}), "
-                    f"切换 CDR 专用接口"
-                )
-                return self._fetch_cdr_sina(sina_symbol, start_date, end_date)
+        # 新浪接口对 UA 敏感: akshare 内部请求缺失的 UA 由请求保护层统一注入
+        # (install_requests_protection), 并经按主机复用的连接池发出
+        try:
+            # 1. 抓取不复权数据
+            df_raw = ak.stock_zh_a_daily(
+                symbol=sina_symbol,
+                start_date=start_date,
+                end_date=end_date,
+                adjust="",
+            )
+            if df_raw.empty:
+                return pd.DataFrame()
+
+            # 2. 抓取后复权数据
+            df_hfq = ak.stock_zh_a_daily(
+                symbol=sina_symbol,
+                start_date=start_date,
+                end_date=end_date,
+                adjust="hfq",
+            )
+        except SinaBlockedError:
+            # IP 风控: 立即传播止损, 不得降级 CDR (同域接口, 降级等于再发一次被风控请求)
+            raise
+        except Exception as e:
+            logger.warning(
+                f"{symbol} akshare 新浪解析失败 ({type(e).__name__}), 切换 CDR 专用接口"
+            )
+            return self._fetch_cdr_sina(sina_symbol, start_date, end_date)
 
         # 3. 标准化处理
         # 新浪接口列名已经是英文: date, open, high, low, close, volume, amount, ...
@@ -221,12 +206,11 @@ class DailyKlineCollector:
                 if hasattr(last_date, "strftime")
                 else str(last_date).replace("-", "")
             )
-            conn = db_manager.get_sqlite_conn()
-            conn.execute(
-                "UPDATE stocks SET last_trade_date = ? WHERE symbol = ?",
-                (last_date_str, symbol),
-            )
-            conn.commit()
+            with db_manager.sqlite_transaction() as conn:
+                conn.execute(
+                    "UPDATE stocks SET last_trade_date = ? WHERE symbol = ?",
+                    (last_date_str, symbol),
+                )
             record_sync_success(DATASET_KLINE, symbol, date.today())
             logger.info(f"{symbol} 退市股 K线全量重建完成: {len(df)} 条")
             return True
@@ -300,7 +284,7 @@ class DailyKlineCollector:
             ]
             df_final = df_merge[final_cols].copy()
 
-            # 5. 存储 (增量合并逻辑)
+            # 5. 存储 (追加为增量文件)
             self._save_incremental(df_final, symbol)
             return True
 
@@ -309,21 +293,116 @@ class DailyKlineCollector:
             logger.warning(f"行情保存失败: {symbol}，active_source:{active_source}")
             raise e
 
-    def _save_incremental(self, df_new: pd.DataFrame, symbol: str):
-        """增量合并并保存"""
-        path = self.store.base_dir / "daily_kline" / f"symbol={symbol}" / "data.parquet"
-
-        if path.exists():
-            df_old = pd.read_parquet(path)
-            # 简单追加并去重
-            df_combined = pd.concat([df_old, df_new], ignore_index=True)
-            df_combined.drop_duplicates(subset=["date"], keep="last", inplace=True)
-            df_combined.sort_values("date", inplace=True)
-        else:
-            df_combined = df_new
+    def fetch_market_snapshot(self) -> pd.DataFrame:
+        """全市场最新行情快照 (新浪 A 股行情列表, 一次分页拉取全部股票)
+
+        :return: symbol, open, high, low, close, volume (手), amount, prev_close
+        """
+        df = ak.stock_zh_a_spot()
+        if df.empty:
+            return pd.DataFrame()
+        df = df[list(SPOT_COLUMNS)].rename(columns=SPOT_COLUMNS)
+        # 代码带交易所前缀 (sh600519 / bj830799)
+        df["symbol"] = df["symbol"].astype(str).str[-6:]
+        df["volume"] = df["volume"] / 100.0
+        return df
+
+    def _load_last_bars(self, trade_date: date) -> pd.DataFrame:
+        """本地指定交易日的收盘价与复权因子 (全市场一次视图查询)"""
+        db_manager.ensure_views("daily_kline")
+        return (
+            db_manager.get_duckdb_conn()
+            .execute(
+                "SELECT symbol, close, adj_factor FROM daily_kline WHERE date = ?",
+                [trade_date],
+            )
+            .df()
+        )
+
+    def append_latest_bars(self, symbols) -> set[str]:
+        """用全市场快照为日线恰好落后一个交易日的股票批量追加最新一根 K 线
+
+        快照只在代表最近交易日收盘时使用 (交易日 09:00~15:30 之间不用)。以下股票
+        不在此处理, 仍走逐股抓取: 快照昨收与本地收盘价不符 (除权除息, 复权因子需
+        重算)、本地无数据或落后多个交易日 (新股、缺口)、快照中缺失。
 
-        self.store.save_partition(df_combined, "daily_kline", symbol)
-        logger.debug(f"行情保存成功: {symbol} ({len(df_combined)} 条记录)")
+        追加的 K 线沿用本地最后一根的复权因子; 快照成交量为 0 视为停牌, 与逐股
+        抓取为空时一样记录当日已尝试。
+
+        :return: 已处理 (追加或确认停牌) 的股票代码
+        """
+        now = datetime.now()
+        latest = get_latest_trade_date(now)
+        today = now.date()
+        if (
+            latest != today
+            and get_trade_calendar().is_trade_date(today)
+            and now.time() >= SPOT_SESSION_START
+        ):
+            logger.info("交易时段内快照为盘中数据, 日线全部逐股同步")
+            return set()
+
+        prev_date = get_trade_calendar().shift(latest, -1)
+        if prev_date is None:
+            return set()
+        stats = self.store.manifest.get_partition_stats("daily_kline")
+        candidates = {
+            s
+            for s in symbols
+            if (stats.get(s) or {}).get("max_date") == prev_date.isoformat()
+        }
+        if not candidates:
+            return set()
+
+        last_bars = self._load_last_bars(prev_date).set_index("symbol")
+        snapshot = self.fetch_market_snapshot()
+        if snapshot.empty:
+            logger.warning("全市场行情快照为空, 日线全部逐股同步")
+            return set()
+        snapshot = snapshot[snapshot["symbol"].isin(candidates)]
+        snapshot = snapshot.join(last_bars, on="symbol", rsuffix="_local")
+
+        handled: set[str] = set()
+        appended = suspended = 0
+        for row in snapshot.itertuples(index=False):
+            if pd.isna(row.close_local) or pd.isna(row.adj_factor):
+                continue
+            if abs(row.prev_close - row.close_local) > SPOT_PREV_CLOSE_TOLERANCE:
+                continue
+            if not row.volume or not row.open:
+                record_sync_success(DATASET_KLINE_DAILY, row.symbol, date.today())
+                handled.add(row.symbol)
+                suspended += 1
+                continue
+            bar = pd.DataFrame(
+                [
+                    {
+                        "date": latest,
+                        "open": row.open,
+                        "high": row.high,
+                        "low": row.low,
+                        "close": row.close,
+                        "volume": row.volume,
+                        "amount": row.amount,
+                        "adj_factor": row.adj_factor,
+                        "symbol": row.symbol,
+                    }
+                ]
+            )
+            self._save_incremental(bar, row.symbol)
+            handled.add(row.symbol)
+            appended += 1
+
+        logger.info(
+            f"全市场快照追加 {latest} 日线 {appended} 只, 停牌 {suspended} 只, "
+            f"其余 {len(symbols) - len(handled)} 只逐股同步"
+        )
+        return handled
+
+    def _save_incremental(self, df_new: pd.DataFrame, symbol: str):
+        """追加新增行情 (增量文件, 不重写历史; 同日期以最新写入为准)"""
+        self.store.append_partition(df_new, "daily_kline", symbol)
+        logger.debug(f"行情保存成功: {symbol} (新增 {len(df_new)} 条记录)")
 
 
 if __name__ == "__main__":
@@ -5,7 +5,6 @@ import pandas as pd
 import requests
 from bs4 import BeautifulSoup
 
-from storage.database.manager import db_manager
 from storage.database.sync_status import (
     DATASET_SHARE_CAPITAL,
     record_sync_success,
@@ -29,26 +28,12 @@ class ShareCollector:
         }
 
     def _get_local_max_date(self, symbol: str) -> str:
-        """获取本地已存储的最新变动日期"""
+        """获取本地已存储的最新变动日期 (读分区清单, 含未合并的增量文件)"""
         try:
-            conn = db_manager.get_duckdb_conn()
-            path = (
-                self.store.base_dir
-                / "share_capital"
-                / f"symbol={symbol}"
-                / "data.parquet"
-            )
-            if not path.exists():
+            max_date = self.store.manifest.get_max_date("share_capital", symbol)
+            if max_date is None:
                 return "1990-01-01"
-
-            res = conn.execute(
-                f"SELECT MAX(change_date) FROM read_parquet('{path}')"
-            ).fetchone()
-            if res and res[0]:
-                if isinstance(res[0], (datetime, pd.Timestamp)):
-                    return res[0].strftime("%Y-%m-%d")
-                return str(res[0])
-            return "1990-01-01"
+            return max_date.strftime("%Y-%m-%d")
         except Exception:
             return "1990-01-01"
 
@@ -154,39 +139,23 @@ class ShareCollector:
         record_sync_success(DATASET_SHARE_CAPITAL, symbol, date.today())
 
     def _save_incremental(self, df_new: pd.DataFrame, symbol: str):
-        """增量合并并保存"""
-        path = (
-            self.store.base_dir / "share_capital" / f"symbol={symbol}" / "data.parquet"
-        )
-
-        if path.exists():
-            df_old = pd.read_parquet(path)
-            # 确保类型一致
-            df_old["change_date"] = pd.to_datetime(df_old["change_date"]).dt.date
-
-            df_combined = pd.concat([df_old, df_new], ignore_index=True)
-            df_combined.drop_duplicates(
-                subset=["change_date"], keep="last", inplace=True
-            )
-            df_combined.sort_values("change_date", inplace=True)
-        else:
-            df_combined = df_new
-
+        """追加新增股本变动 (增量文件, 不重写历史; 同变动日以最新写入为准)"""
+        df_new = df_new.copy()
         # 强制转换为 int64，避免 float64 污染
         try:
-            df_combined["total_shares"] = (
-                df_combined["total_shares"].astype(float).round().astype("int64")
+            df_new["total_shares"] = (
+                df_new["total_shares"].astype(float).round().astype("int64")
             )
         except Exception as e:
             logger.warning(f"转换 {symbol} 股本为 int64 失败: {e}，尝试强制转换")
-            df_combined["total_shares"] = (
-                pd.to_numeric(df_combined["total_shares"], errors="coerce")
+            df_new["total_shares"] = (
+                pd.to_numeric(df_new["total_shares"], errors="coerce")
                 .fillna(0)
                 .astype("int64")
             )
 
-        self.store.save_partition(df_combined, "share_capital", symbol)
-        logger.debug(f"股本变动保存成功: {symbol} ({len(df_combined)} 条记录)")
+        self.store.append_partition(df_new, "share_capital", symbol)
+        logger.debug(f"股本变动保存成功: {symbol} (新增 {len(df_new)} 条记录)")
 
 
 if __name__ == "__main__":
@@ -4,6 +4,7 @@ import akshare as stock
 import pandas as pd
 
 from utils.logger import logger
+from utils.response_cache import ENDPOINT_STOCK_LIST, cached_frame
 
 
 class StockListCollector:
@@ -17,7 +18,9 @@ class StockListCollector:
         """
         try:
             logger.info("正在从 AkShare 获取基础股票列表 (code, name)...")
-            df = stock.stock_info_a_code_name()
+            df = cached_frame(
+                ENDPOINT_STOCK_LIST, "a_share", stock.stock_info_a_code_name
+            )
 
             if df.empty:
                 logger.warning("接口返回数据为空")
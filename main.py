@@ -1,9 +1,13 @@
 import argparse
 import random
 import sys
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import datetime
+from functools import wraps
 from pathlib import Path
 
 import pandas as pd
@@ -23,9 +27,39 @@ from storage.database.manager import db_manager
 from storage.database.official_disclosure_date_resolver import (
     OfficialDisclosureDateResolver,
 )
+from storage.database.sync_status import (
+    DATASET_FINANCIAL_DATE_RECONCILIATION_PENDING,
+    DATASET_FINANCIAL_INCOMPLETE,
+    DATASET_FINANCIAL_OFFICIAL_PENDING,
+    DATASET_FINANCIAL_TTM_PENDING,
+    DATASET_KLINE,
+    DATASET_KLINE_DAILY,
+    DATASET_SHARE_CAPITAL,
+    DATASET_STOCK_METADATA,
+    sync_status_cache,
+)
+from storage.database.sync_tasks import SyncTaskQueue
+from utils.fetch_scheduler import (
+    SOURCE_EASTMONEY,
+    SOURCE_SINA,
+    FetchScheduler,
+    TaskOutcome,
+)
 from utils.financial import get_consecutive_reports
 from utils.logger import logger
 from utils.requests_protection import SinaBlockedError
+from utils.stage_graph import Stage, run_stage_graph
+
+# 逐股任务消耗的令牌数 (约等于发出的请求数), 供抓取调度器限速
+# 日线: 不复权 + 后复权两次 stock_zh_a_daily, 每次含行情与成交额两个请求
+KLINE_REQUEST_COST = 4
+# 日线全市场快照: 新浪 A 股行情列表分页拉取 (约 60~70 页)
+KLINE_SNAPSHOT_REQUEST_COST = 70
+SHARE_REQUEST_COST = 1
+# 新浪财报接口风控更严, 每张报表按 2 个令牌计
+FINANCIAL_STATEMENT_REQUEST_COST = 2
+# 报表抓取领先入库计算的股票数上限 (抓取/计算流水线的积压上限)
+FINANCIAL_PIPELINE_BACKLOG = 8
 
 # --- 辅助函数 ---
 
@@ -99,46 +133,48 @@ def sync_stock_list():
     incoming = set(df["symbol"].tolist())
     old_symbols = set(existing_map.keys())
 
-    # 1. 新上市: 插入
-    new_symbols = incoming - old_symbols
-    if new_symbols:
-        df_new = df[df["symbol"].isin(new_symbols)]
-        df_new.to_sql("stocks", conn, if_exists="append", index=False)
-        logger.info(f"新增 {len(df_new)} 只股票: {', '.join(new_symbols)}")
-
-    # 2. 两边都有: 更新名称; 若曾被标记退市则恢复
-    common = incoming & old_symbols
-    restored = 0
-    for symbol in common:
-        row = df[df["symbol"] == symbol].iloc[0]
-        old_name, old_active = existing_map[symbol]
-        if row["name"] != old_name or old_active == 0:
+    # 差量写入持共享写锁整体提交, 不与并发环节的批次交错
+    with db_manager.sqlite_lock:
+        # 1. 新上市: 插入
+        new_symbols = incoming - old_symbols
+        if new_symbols:
+            df_new = df[df["symbol"].isin(new_symbols)]
+            df_new.to_sql("stocks", conn, if_exists="append", index=False)
+            logger.info(f"新增 {len(df_new)} 只股票: {', '.join(new_symbols)}")
+
+        # 2. 两边都有: 更新名称; 若曾被标记退市则恢复
+        common = incoming & old_symbols
+        restored = 0
+        for symbol in common:
+            row = df[df["symbol"] == symbol].iloc[0]
+            old_name, old_active = existing_map[symbol]
+            if row["name"] != old_name or old_active == 0:
+                cursor.execute(
+                    "UPDATE stocks SET name = ?, is_active = 1, last_trade_date = NULL,"
+                    " updated_at = CURRENT_TIMESTAMP WHERE symbol = ?",
+                    (row["name"], symbol),
+                )
+                if old_active == 0:
+                    restored += 1
+        if restored:
+            logger.info(f"恢复 {restored} 只曾被标记退市的股票")
+
+        # 3. 库中有、新列表无: 标记退市 + 回填 last_trade_date
+        gone = old_symbols - incoming
+        delisted = 0
+        for symbol in gone:
+            old_name, old_active = existing_map[symbol]
+            if old_active == 0:
+                continue
             cursor.execute(
-                "UPDATE stocks SET name = ?, is_active = 1, last_trade_date = NULL,"
-                " updated_at = CURRENT_TIMESTAMP WHERE symbol = ?",
-                (row["name"], symbol),
+                "UPDATE stocks SET is_active = 0, updated_at = CURRENT_TIMESTAMP"
+                " WHERE symbol = ?",
+                (symbol,),
             )
-            if old_active == 0:
-                restored += 1
-    if restored:
-        logger.info(f"恢复 {restored} 只曾被标记退市的股票")
-
-    # 3. 库中有、新列表无: 标记退市 + 回填 last_trade_date
-    gone = old_symbols - incoming
-    delisted = 0
-    for symbol in gone:
-        old_name, old_active = existing_map[symbol]
-        if old_active == 0:
-            continue
-        cursor.execute(
-            "UPDATE stocks SET is_active = 0, updated_at = CURRENT_TIMESTAMP"
-            " WHERE symbol = ?",
-            (symbol,),
-        )
-        logger.info(f"标记退市: {symbol} {old_name}")
-        delisted += 1
+            logger.info(f"标记退市: {symbol} {old_name}")
+            delisted += 1
 
-    conn.commit()
+        conn.commit()
     total = cursor.execute("SELECT COUNT(*) FROM stocks").fetchone()[0]
     inactive_total = cursor.execute(
         "SELECT COUNT(*) FROM stocks WHERE is_active = 0"
@@ -163,12 +199,14 @@ def merge_delisted_stocks() -> bool:
     """
     import akshare as ak
 
+    from utils.response_cache import ENDPOINT_DELISTED_STOCKS, cached_frame
+
     conn = db_manager.get_sqlite_conn()
     existing_codes = {r[0] for r in conn.execute("SELECT code FROM stocks").fetchall()}
 
     try:
-        sh = ak.stock_info_sh_delist()
-        sz = ak.stock_info_sz_delist()
+        sh = cached_frame(ENDPOINT_DELISTED_STOCKS, "sh", ak.stock_info_sh_delist)
+        sz = cached_frame(ENDPOINT_DELISTED_STOCKS, "sz", ak.stock_info_sz_delist)
     except Exception as e:
         logger.warning(f"退市股清单接口获取失败, 跳过合并: {e}")
         return False
@@ -191,20 +229,21 @@ def merge_delisted_stocks() -> bool:
     if sz is not None and not sz.empty:
         candidates += _candidates(sz, "证券代码", "证券简称", "终止上市日期")
 
-    # 按 code 去重 (沪深清单可能有重叠代码)
-    seen = set()
-    merged = 0
-    for code, symbol, name, last_date in candidates:
-        if code in seen:
-            continue
-        seen.add(code)
-        conn.execute(
-            "INSERT INTO stocks (symbol, code, name, is_active, last_trade_date, updated_at)"
-            " VALUES (?, ?, ?, 0, ?, CURRENT_TIMESTAMP)",
-            (symbol, code, name, last_date),
-        )
-        merged += 1
-    conn.commit()
+    with db_manager.sqlite_lock:
+        # 按 code 去重 (沪深清单可能有重叠代码)
+        seen = set()
+        merged = 0
+        for code, symbol, name, last_date in candidates:
+            if code in seen:
+                continue
+            seen.add(code)
+            conn.execute(
+                "INSERT INTO stocks (symbol, code, name, is_active, last_trade_date, updated_at)"
+                " VALUES (?, ?, ?, 0, ?, CURRENT_TIMESTAMP)",
+                (symbol, code, name, last_date),
+            )
+            merged += 1
+        conn.commit()
     if merged:
         logger.info(f"合并退市股清单: 新增 {merged} 只退市股 (is_active=0)")
     return True
@@ -241,6 +280,18 @@ def _sync_industries_via_xueqiu(conn):
     updated = 0
     failed = 0
     no_data = 0
+    batch = []
+
+    def write_batch():
+        # 持共享写锁整批提交, 不与并发环节的批次交错
+        with db_manager.sqlite_transaction() as write_conn:
+            write_conn.executemany(
+                "UPDATE stocks SET industry = ?, updated_at = CURRENT_TIMESTAMP"
+                " WHERE symbol = ?",
+                batch,
+            )
+        batch.clear()
+
     with ThreadPoolExecutor(max_workers=max_workers) as pool:
         futures = [pool.submit(fetch_industry, s, c) for s, c in pending]
         for future in tqdm(as_completed(futures), total=len(futures), desc="补全行业"):
@@ -252,21 +303,32 @@ def _sync_industries_via_xueqiu(conn):
             if not industry:
                 no_data += 1
                 continue
-            cursor.execute(
-                "UPDATE stocks SET industry = ?, updated_at = CURRENT_TIMESTAMP"
-                " WHERE symbol = ?",
-                (industry, symbol),
-            )
+            batch.append((industry, symbol))
             updated += 1
-            if updated % commit_every == 0:
-                conn.commit()
-    conn.commit()
+            if len(batch) >= commit_every:
+                write_batch()
+    write_batch()
     logger.info(
         f"行业补全完成: 更新 {updated} 只, 失败 {failed} 只, 无资料 {no_data} 只"
     )
     return len(pending), failed
 
 
+def _cached_sync_status(*datasets: str) -> Callable:
+    """环节内的同步状态读写经由共享缓存: 一次批量加载, 攒批提交"""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with sync_status_cache(*datasets):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@_cached_sync_status(DATASET_STOCK_METADATA)
 def sync_stock_metadata(run_industry=True, run_list_info=True):
     """补全股票元数据 (行业、上市日期等)
 
@@ -340,6 +402,24 @@ def sync_stock_metadata(run_industry=True, run_list_info=True):
         updated = 0
         failed = 0
         no_data = 0
+        # (UPDATE 参数, 元数据是否完整): 整批写入后才记录同步成功
+        batch = []
+
+        def write_batch():
+            # 持共享写锁整批提交, 不与并发环节的批次交错
+            with db_manager.sqlite_transaction() as write_conn:
+                write_conn.executemany(
+                    "UPDATE stocks SET area = ?, list_date = ?,"
+                    " industry = COALESCE(industry, ?),"
+                    " updated_at = CURRENT_TIMESTAMP WHERE symbol = ?",
+                    [params for params, _ in batch],
+                )
+            today = datetime.now().date()
+            for params, metadata_complete in batch:
+                if metadata_complete:
+                    record_sync_success(DATASET_STOCK_METADATA, params[-1], today)
+            batch.clear()
+
         with ThreadPoolExecutor(max_workers=max_workers) as pool:
             futures = [pool.submit(fetch_detail, s, c) for s, c in pending]
             for future in tqdm(
@@ -373,29 +453,15 @@ def sync_stock_metadata(run_industry=True, run_list_info=True):
                 metadata_complete = bool(area and list_date)
                 if not metadata_complete:
                     no_data += 1
-                cursor.execute(
-                    "UPDATE stocks SET area = ?, list_date = ?,"
-                    " industry = COALESCE(industry, ?), updated_at = CURRENT_TIMESTAMP"
-                    " WHERE symbol = ?",
-                    (
-                        area,
-                        list_date,
-                        industry,
-                        symbol,
-                    ),
-                )
-                if metadata_complete:
-                    record_sync_success(
-                        DATASET_STOCK_METADATA, symbol, datetime.now().date()
-                    )
-                else:
+                if not metadata_complete:
                     logger.warning(
                         f"{symbol} 个股详情仍缺少地域或上市日期, 下次同步继续补全"
                     )
+                batch.append(((area, list_date, industry, symbol), metadata_complete))
                 updated += 1
-                if updated % commit_every == 0:
-                    conn.commit()
-        conn.commit()
+                if len(batch) >= commit_every:
+                    write_batch()
+        write_batch()
         logger.info(
             f"个股详情补全完成: 更新 {updated} 只, 失败 {failed} 只, 无资料 {no_data} 只"
         )
@@ -447,14 +513,168 @@ def _calculate_ttm_and_update_status(calculator, symbol: str) -> None:
         raise
 
 
-def sync_financial_statements(symbol=None, force_all=False):
+class _LazyTTMCalculator:
+    """按需构造 TTMCalculator (只构造一次, 可被并发任务共享)"""
+
+    def __init__(self):
+        self._calculator = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._calculator is None:
+                from analysis.processors.ttm_calculator import TTMCalculator
+
+                self._calculator = TTMCalculator()
+            return self._calculator
+
+
+class _TTMFollowUps:
+    """报表写入后逐股排队重算 TTM (单线程), 与仍在进行的抓取环节重叠执行"""
+
+    def __init__(self):
+        self._calculator = _LazyTTMCalculator()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ttm")
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def submit(self, symbol: str) -> None:
+        with self._lock:
+            if symbol not in self._futures:
+                self._futures[symbol] = self._pool.submit(self._run, symbol)
+
+    def _run(self, symbol: str) -> None:
+        _calculate_ttm_and_update_status(self._calculator.get(), symbol)
+
+    def drain(self) -> tuple[int, int]:
+        """等待已排队的重算完成, 返回 (processed, failed)"""
+        self._pool.shutdown(wait=True)
+        failed = 0
+        for symbol, future in self._futures.items():
+            error = future.exception()
+            if error is not None:
+                logger.error(f"{symbol} TTM 计算失败", exc_info=error)
+                failed += 1
+        return len(self._futures), failed
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+class _ComputeStage:
+    """抓取/计算流水线的计算端: 单线程按提交顺序处理抓取结果
+
+    抓取端提交后立即返回, 网络等待与入库计算重叠; 未处理的积压达到 ``backlog``
+    时提交阻塞, 抓取不会无限领先计算。传入 ``prepare_batch`` 时, 计算线程处理
+    每一项前先把尚未准备的全部积压项整批交给它 (如多只股票的写入合并为一次组提交),
+    逐项结果由其自行保存供 ``func`` 取用, 它不应抛出异常。
+    """
+
+    def __init__(
+        self,
+        func: Callable,
+        backlog: int,
+        name: str,
+        prepare_batch: Callable[[list], None] | None = None,
+    ):
+        self._func = func
+        self._prepare_batch = prepare_batch
+        self._slots = threading.BoundedSemaphore(backlog)
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self._submitted: list[tuple[object, Future]] = []
+        self._unprepared: list = []
+        self._lock = threading.Lock()
+
+    def submit(self, item) -> None:
+        self._slots.acquire()
+        with self._lock:
+            self._unprepared.append(item)
+            self._submitted.append((item, self._pool.submit(self._run, item)))
+
+    def _run(self, item):
+        try:
+            if self._prepare_batch is not None:
+                # 单线程按提交顺序执行: 当前项要么已随更早的批次准备过,
+                # 要么位于未准备积压的队首
+                with self._lock:
+                    batch, self._unprepared = self._unprepared, []
+                if batch:
+                    self._prepare_batch(batch)
+            return self._func(item)
+        finally:
+            self._slots.release()
+
+    def results(self) -> list[TaskOutcome]:
+        """等待全部提交项处理完成, 按提交顺序返回结果"""
+        self._pool.shutdown(wait=True)
+        outcomes = []
+        for item, future in self._submitted:
+            error = future.exception()
+            outcomes.append(
+                TaskOutcome(item, error=error)
+                if error is not None
+                else TaskOutcome(item, result=future.result())
+            )
+        return outcomes
+
+
+@contextmanager
+def _stage_scheduler(scheduler: FetchScheduler | None):
+    """环节使用调用方共享的调度器, 未传入时独立创建并在环节结束后关闭"""
+    if scheduler is not None:
+        yield scheduler
+        return
+    with FetchScheduler() as own_scheduler:
+        yield own_scheduler
+
+
+def _task_queue(stage, task_batch, symbol, force_all) -> SyncTaskQueue | None:
+    """增量模式且指定了批次时使用任务队列 (单股/强制全量是一次性的显式请求)"""
+    if task_batch is None or symbol or force_all:
+        return None
+    return SyncTaskQueue(stage, task_batch)
+
+
+def _task_symbol(task) -> str:
+    return task[0]
+
+
+def _resume_stock_tasks(task_queue: SyncTaskQueue, all_stocks) -> list:
+    """全市场逐股环节: 候选为全部股票, 续跑时只保留未完成的股票"""
+    codes = set(task_queue.resume_or_discover(lambda: [s[0] for s in all_stocks]))
+    return [s for s in all_stocks if s[0] in codes]
+
+
+@_cached_sync_status(
+    DATASET_FINANCIAL_INCOMPLETE,
+    DATASET_FINANCIAL_OFFICIAL_PENDING,
+    DATASET_FINANCIAL_TTM_PENDING,
+    DATASET_FINANCIAL_DATE_RECONCILIATION_PENDING,
+)
+def sync_financial_statements(
+    symbol=None,
+    force_all=False,
+    scheduler=None,
+    on_statements_saved=None,
+    task_batch=None,
+):
     """同步财务三大报表
 
+    抓取与计算分两级流水线: 抓取调度器的新浪任务只抓取三张报表, 交给单线程计算端
+    完成入库、公告日期统一、官方日期核验与 TTM 重算, 网络等待与计算重叠。计算端把
+    积压的多只股票整批入库, 公告日期统一合并为一次组提交 (每批一条提交日志)。
+
     返回 (processed, failed): failed 为单股同步异常数 (网络/解析/存储错误,
     重试耗尽后计入); SinaBlockedError 不在此计数, 直接向上传播由调用方判定中止。
+
+    :param on_statements_saved: 单股报表写入成功且本环节未就地重算 TTM 时回调
+        (参数为股票代码), sync-all 用它在报表落盘后立即排队重算该股 TTM。
+    :param task_batch: 任务队列批次 (增量模式下续跑该批次未完成的任务, 见
+        ``storage/database/sync_tasks.py``)
     """
     from data_ingestion.collectors.financial_collector import _SINA_NO_DATA_OVERRIDES
     from storage.database.sync_status import (
+        DATASET_FINANCIAL_DATE_RECONCILIATION_PENDING,
         DATASET_FINANCIAL_INCOMPLETE,
         DATASET_FINANCIAL_OFFICIAL_PENDING,
         DATASET_FINANCIAL_TTM_PENDING,
@@ -468,6 +688,7 @@ def sync_financial_statements(symbol=None, force_all=False):
     all_stocks = get_all_stocks()
     all_codes = [s[0] for s in all_stocks]
     target_codes = set()
+    task_queue = _task_queue("financial", task_batch, symbol, force_all)
 
     if symbol:
         target_codes = {symbol}
@@ -475,30 +696,48 @@ def sync_financial_statements(symbol=None, force_all=False):
         logger.info("强制全量模式：扫描所有活跃股...")
         target_codes = set(all_codes)
     else:
-        report_dates = get_target_report_dates()
-        existing = store.get_existing_report_dates()
-        for r_date in report_dates:
-            df = collector.get_disclosure_plans(r_date)
-            if not df.empty:
-                df["actual_date"] = pd.to_datetime(df["actual_date"], errors="coerce")
-                for code in df[df["actual_date"].notna()]["code"]:
-                    if f"{code}_{r_date}" not in existing:
-                        target_codes.add(code)
-        # 孤儿补全排除已确认财务不完整 (确证缺表) 的股票, 避免每轮重复补全
-        target_codes.update(
-            c
-            for c in get_orphan_codes("financial", all_codes)
-            if get_last_sync_date(DATASET_FINANCIAL_INCOMPLETE, c) is None
-        )
-        target_codes.update(
-            c
-            for c in all_codes
-            if get_last_sync_date(DATASET_FINANCIAL_OFFICIAL_PENDING, c) is not None
-        )
-        target_codes.update(
-            c
-            for c in all_codes
-            if get_last_sync_date(DATASET_FINANCIAL_TTM_PENDING, c) is not None
+
+        def discover_codes():
+            codes = set()
+            report_dates = get_target_report_dates()
+            existing = store.get_existing_report_dates()
+            for r_date in report_dates:
+                df = collector.get_disclosure_plans(r_date)
+                if not df.empty:
+                    df["actual_date"] = pd.to_datetime(
+                        df["actual_date"], errors="coerce"
+                    )
+                    for code in df[df["actual_date"].notna()]["code"]:
+                        if f"{code}_{r_date}" not in existing:
+                            codes.add(code)
+            # 孤儿补全排除已确认财务不完整 (确证缺表) 的股票, 避免每轮重复补全
+            codes.update(
+                c
+                for c in get_orphan_codes("financial", all_codes)
+                if get_last_sync_date(DATASET_FINANCIAL_INCOMPLETE, c) is None
+            )
+            codes.update(
+                c
+                for c in all_codes
+                if get_last_sync_date(DATASET_FINANCIAL_OFFICIAL_PENDING, c) is not None
+            )
+            codes.update(
+                c
+                for c in all_codes
+                if get_last_sync_date(DATASET_FINANCIAL_TTM_PENDING, c) is not None
+            )
+            codes.update(
+                c
+                for c in all_codes
+                if get_last_sync_date(DATASET_FINANCIAL_DATE_RECONCILIATION_PENDING, c)
+                is not None
+            )
+            return codes
+
+        target_codes = set(
+            task_queue.resume_or_discover(discover_codes)
+            if task_queue
+            else discover_codes()
         )
 
     if not target_codes:
@@ -507,31 +746,93 @@ def sync_financial_statements(symbol=None, force_all=False):
 
     symbol_name_map = {s[0]: s[1] for s in all_stocks}
     pbar = tqdm(list(target_codes), desc="报表同步")
-    failed = 0
     official_date_resolver = OfficialDisclosureDateResolver()
-    ttm_recalculator = None
-    for code in pbar:
-        name = symbol_name_map.get(code, "")
-        pbar.set_description(f"报表同步: {code} {name}")
+    ttm_recalculator = _LazyTTMCalculator()
+    stat_map = {
+        "balance": "fin_balance_sheet",
+        "profit": "fin_income_statement",
+        "cashflow": "fin_cashflow_statement",
+    }
+
+    def record_incomplete_marker(code):
+        # 该股存在确证缺表的报表类型 → 记录标记, 孤儿补全不再选中
+        if any((code, st) in _SINA_NO_DATA_OVERRIDES for st in stat_map):
+            record_sync_success(
+                DATASET_FINANCIAL_INCOMPLETE, code, datetime.now().date()
+            )
+            logger.info(f"{code} 已确认财务数据不完整, 记录标记")
+
+    # 整批准备的逐股结果: 公告日期统一的修改行数 (未写入任何报表为 None) 或入库异常
+    prepared: dict[str, dict | None | Exception] = {}
+
+    def prepare_batch(items):
+        """计算阶段 (整批): 报表入库后对写入过的股票统一一次公告日期"""
+        saved_codes = []
+        for code, frames, fetch_error in items:
+            if fetch_error is not None:
+                continue
+            # 上次公告日期统一未完成的股票不跳过未变化的内容, 写入后重新统一
+            reconciliation_pending = (
+                get_last_sync_date(DATASET_FINANCIAL_DATE_RECONCILIATION_PENDING, code)
+                is not None
+            )
+            try:
+                prepared[code] = None
+                for table_name, df in frames.items():
+                    # None: 合并后内容与已存分区一致, 未写入也无需重算 TTM
+                    if (
+                        not df.empty
+                        and store.save_statement(
+                            df,
+                            table_name,
+                            skip_unchanged=not reconciliation_pending,
+                            reconcile=False,
+                        )
+                        is not None
+                    ):
+                        prepared[code] = {}
+            except Exception as e:
+                prepared[code] = e
+                continue
+            if prepared[code] is not None:
+                saved_codes.append(code)
+        if not saved_codes:
+            return
+        # 统一前先记录待办标记: 统一失败或进程在写入后中断时, 下一轮不再因内容
+        # 未变化跳过写入, 仍会重新统一
+        for code in saved_codes:
+            record_sync_success(
+                DATASET_FINANCIAL_DATE_RECONCILIATION_PENDING,
+                code,
+                datetime.now().date(),
+            )
+        # 每次统一都读写四类分区, 整批合并为一次组提交
+        try:
+            prepared.update(store.reconcile_publish_dates(saved_codes))
+        except Exception as e:
+            prepared.update(dict.fromkeys(saved_codes, e))
+            return
+        for code in saved_codes:
+            clear_sync_status(DATASET_FINANCIAL_DATE_RECONCILIATION_PENDING, code)
+
+    def process_symbol(item):
+        """计算阶段: 公告日期核验、TTM 重算与状态记录 (入库与统一见 prepare_batch)
+
+        返回是否仍有未确认的官方披露日期 (计入失败); 抓取阶段与入库的异常在此按
+        原语义记录待办状态后重新抛出。
+        """
+        code, _, fetch_error = item
         ttm_recalculation_required = (
             get_last_sync_date(DATASET_FINANCIAL_TTM_PENDING, code) is not None
         )
-        source_date_changes: dict[str, int] = {}
         try:
-            stat_map = {
-                "balance": "fin_balance_sheet",
-                "profit": "fin_income_statement",
-                "cashflow": "fin_cashflow_statement",
-            }
-            for st, table_name in stat_map.items():
-                df = collector.fetch_statement(code, st)
-                if not df.empty:
-                    reconciliation_changes = store.save_statement(df, table_name) or {}
-                    for source_name, changed_count in reconciliation_changes.items():
-                        source_date_changes[source_name] = (
-                            source_date_changes.get(source_name, 0) + changed_count
-                        )
-                time.sleep(random.uniform(3.0, 6.0))
+            if fetch_error is not None:
+                raise fetch_error
+            source_date_changes = prepared.pop(code)
+            if isinstance(source_date_changes, Exception):
+                raise source_date_changes
+            statements_saved = source_date_changes is not None
+            source_date_changes = source_date_changes or {}
 
             verification = verify_overdue_financial_publish_dates_for_symbol(
                 code,
@@ -541,26 +842,23 @@ def sync_financial_statements(symbol=None, force_all=False):
                 source_date_changes or verification.changed_rows
             )
             if ttm_recalculation_required:
-                if ttm_recalculator is None:
-                    from analysis.processors.ttm_calculator import TTMCalculator
-
-                    ttm_recalculator = TTMCalculator()
-                _calculate_ttm_and_update_status(ttm_recalculator, code)
+                _calculate_ttm_and_update_status(ttm_recalculator.get(), code)
                 logger.info("%s 公告日期修正后已重算 TTM", code)
-            if verification.unresolved_report_dates:
+            elif statements_saved and on_statements_saved is not None:
+                on_statements_saved(code)
+            unresolved = bool(verification.unresolved_report_dates)
+            if unresolved:
                 record_sync_success(
                     DATASET_FINANCIAL_OFFICIAL_PENDING,
                     code,
                     datetime.now().date(),
                 )
-                failed += 1
             else:
                 clear_sync_status(DATASET_FINANCIAL_OFFICIAL_PENDING, code)
         except SinaBlockedError as e:
             logger.error(f"新浪接口 IP 风控，中止报表同步: {e}")
             raise
         except Exception:
-            failed += 1
             if ttm_recalculation_required:
                 _record_ttm_pending(code)
             record_sync_success(
@@ -569,17 +867,59 @@ def sync_financial_statements(symbol=None, force_all=False):
                 datetime.now().date(),
             )
             logger.exception(f"{code} 报表同步失败")
-        # 该股存在确证缺表的报表类型 → 记录标记, 孤儿补全不再选中
-        if any((code, st) in _SINA_NO_DATA_OVERRIDES for st in stat_map):
-            record_sync_success(
-                DATASET_FINANCIAL_INCOMPLETE, code, datetime.now().date()
+            record_incomplete_marker(code)
+            raise
+        record_incomplete_marker(code)
+        return unresolved
+
+    compute = _ComputeStage(
+        task_queue.track(
+            process_symbol,
+            key=lambda item: item[0],
+            succeeded=lambda unresolved: not unresolved,
+        )
+        if task_queue
+        else process_symbol,
+        backlog=FINANCIAL_PIPELINE_BACKLOG,
+        name="financial-compute",
+        prepare_batch=prepare_batch,
+    )
+
+    def fetch_symbol(code):
+        """抓取阶段: 抓取三张报表后交给计算阶段, 新浪名额随即释放给下一只股票"""
+        pbar.set_description(f"报表同步: {code} {symbol_name_map.get(code, '')}")
+        try:
+            frames = {
+                table_name: collector.fetch_statement(code, st)
+                for st, table_name in stat_map.items()
+            }
+        except Exception as e:
+            compute.submit((code, None, e))
+            raise
+        compute.submit((code, frames, None))
+
+    try:
+        with _stage_scheduler(scheduler) as stage_scheduler:
+            stage_scheduler.run(
+                SOURCE_SINA,
+                pbar,
+                fetch_symbol,
+                cost=len(stat_map) * FINANCIAL_STATEMENT_REQUEST_COST,
             )
-            logger.info(f"{code} 已确认财务数据不完整, 记录标记")
+    finally:
+        # 熔断时也等待已抓取的股票处理完, 其待办状态照常记录
+        outcomes = compute.results()
+    failed = sum(outcome.error is not None or outcome.result for outcome in outcomes)
 
     return len(target_codes), failed
 
 
-def sync_financial_indicators(symbol=None, force_all=False):
+@_cached_sync_status(
+    DATASET_FINANCIAL_TTM_PENDING, DATASET_FINANCIAL_DATE_RECONCILIATION_PENDING
+)
+def sync_financial_indicators(
+    symbol=None, force_all=False, scheduler=None, task_batch=None
+):
     """同步东财财务指标
 
     返回 (processed, failed): failed 为单股同步异常数 (网络/解析/存储错误)。
@@ -596,34 +936,47 @@ def sync_financial_indicators(symbol=None, force_all=False):
     collector = FinancialCollector()
     all_stocks = get_all_stocks()
     target_tasks = []
+    task_queue = _task_queue("indicators", task_batch, symbol, force_all)
 
     if symbol:
         target_tasks = [s for s in all_stocks if s[0] == symbol]
     elif force_all:
         target_tasks = all_stocks
     else:
-        # ... 保持现有增量逻辑 ...
-        report_dates = get_target_report_dates()
-        existing = store.get_existing_report_dates()
-        target_codes = set()
-        for r_date in report_dates:
-            df = collector.get_disclosure_plans(r_date)
-            if not df.empty:
-                df["actual_date"] = pd.to_datetime(df["actual_date"], errors="coerce")
-                for code in df[df["actual_date"].notna()]["code"]:
-                    if f"{code}_{r_date}" not in existing:
-                        target_codes.add(code)
-        target_codes.update(get_orphan_codes("indicators", [s[0] for s in all_stocks]))
-        target_codes.update(
-            s[0]
-            for s in all_stocks
-            if get_last_sync_date(DATASET_FINANCIAL_TTM_PENDING, s[0]) is not None
-        )
-        target_codes.update(
-            s[0]
-            for s in all_stocks
-            if get_last_sync_date(DATASET_FINANCIAL_DATE_RECONCILIATION_PENDING, s[0])
-            is not None
+
+        def discover_codes():
+            report_dates = get_target_report_dates()
+            existing = store.get_existing_report_dates()
+            codes = set()
+            for r_date in report_dates:
+                df = collector.get_disclosure_plans(r_date)
+                if not df.empty:
+                    df["actual_date"] = pd.to_datetime(
+                        df["actual_date"], errors="coerce"
+                    )
+                    for code in df[df["actual_date"].notna()]["code"]:
+                        if f"{code}_{r_date}" not in existing:
+                            codes.add(code)
+            codes.update(get_orphan_codes("indicators", [s[0] for s in all_stocks]))
+            codes.update(
+                s[0]
+                for s in all_stocks
+                if get_last_sync_date(DATASET_FINANCIAL_TTM_PENDING, s[0]) is not None
+            )
+            codes.update(
+                s[0]
+                for s in all_stocks
+                if get_last_sync_date(
+                    DATASET_FINANCIAL_DATE_RECONCILIATION_PENDING, s[0]
+                )
+                is not None
+            )
+            return codes
+
+        target_codes = set(
+            task_queue.resume_or_discover(discover_codes)
+            if task_queue
+            else discover_codes()
         )
         target_tasks = [s for s in all_stocks if s[0] in target_codes]
 
@@ -634,9 +987,10 @@ def sync_financial_indicators(symbol=None, force_all=False):
     pbar = tqdm(target_tasks, desc="指标同步")
     from utils.financial import get_market_label
 
-    failed = 0
-    ttm_recalculator = None
-    for code, name in pbar:
+    ttm_recalculator = _LazyTTMCalculator()
+
+    def sync_symbol(task):
+        code, name = task
         pbar.set_description(f"指标同步: {code} {name}")
         ttm_recalculation_required = (
             get_last_sync_date(DATASET_FINANCIAL_TTM_PENDING, code) is not None
@@ -645,29 +999,42 @@ def sync_financial_indicators(symbol=None, force_all=False):
             # 东财接口需要带后缀的代码 (如 600519.SH)
             label = get_market_label(code).value
             fmt_symbol = f"{code}.{label}"
-            reconciliation_result = collector.collect_indicators(code, fmt_symbol)
+            # 上次公告日期统一失败的股票不跳过未变化的内容, 写入后重新统一
+            reconciliation_pending = (
+                get_last_sync_date(DATASET_FINANCIAL_DATE_RECONCILIATION_PENDING, code)
+                is not None
+            )
+            reconciliation_result = collector.collect_indicators(
+                code, fmt_symbol, skip_unchanged=not reconciliation_pending
+            )
             if reconciliation_result is not None:
                 clear_sync_status(DATASET_FINANCIAL_DATE_RECONCILIATION_PENDING, code)
             reconciliation_changes = reconciliation_result or {}
             if reconciliation_changes or ttm_recalculation_required:
-                if ttm_recalculator is None:
-                    from analysis.processors.ttm_calculator import TTMCalculator
-
-                    ttm_recalculator = TTMCalculator()
-                _calculate_ttm_and_update_status(ttm_recalculator, code)
-            time.sleep(random.uniform(0.5, 1.0))
+                _calculate_ttm_and_update_status(ttm_recalculator.get(), code)
         except Exception:
-            failed += 1
             record_sync_success(
                 DATASET_FINANCIAL_DATE_RECONCILIATION_PENDING,
                 code,
                 datetime.now().date(),
             )
             logger.exception(f"{code} 指标同步失败")
+            raise
+
+    with _stage_scheduler(scheduler) as stage_scheduler:
+        outcomes = stage_scheduler.run(
+            SOURCE_EASTMONEY,
+            pbar,
+            task_queue.track(sync_symbol, key=_task_symbol)
+            if task_queue
+            else sync_symbol,
+        )
+    failed = sum(outcome.error is not None for outcome in outcomes)
 
     return len(target_tasks), failed
 
 
+@_cached_sync_status(DATASET_FINANCIAL_TTM_PENDING)
 def calculate_ttm_metrics(symbol=None, force_all=False):
     """
     计算滚动十二个月 (TTM) 财务指标。
@@ -722,11 +1089,11 @@ def calculate_ttm_metrics(symbol=None, force_all=False):
     else:
         logger.info("智能增量模式：正在进行数据完整性自检...")
         if "fin_ttm" not in available_views:
-            query = "SELECT symbol, MAX(report_date) FROM fin_income_statement GROUP BY symbol"
+            query = "SELECT symbol, strftime(MAX(report_date), '%Y%m%d') FROM fin_income_statement GROUP BY symbol"
             candidates = duckdb_conn.execute(query).fetchall()
         else:
             sql = """
-                SELECT src.symbol, src.max_src 
+                SELECT src.symbol, strftime(src.max_src, '%Y%m%d')
                 FROM (SELECT symbol, MAX(report_date) as max_src FROM fin_income_statement GROUP BY symbol) src
                 LEFT JOIN (SELECT symbol, MAX(report_date) as max_ttm FROM fin_ttm GROUP BY symbol) ttm
                   ON src.symbol = ttm.symbol
@@ -750,7 +1117,10 @@ def calculate_ttm_metrics(symbol=None, force_all=False):
             selected_symbols.add(code)
             continue
         required_reports = get_consecutive_reports(max_date, 5)
-        check_sql = f"SELECT COUNT(DISTINCT report_date) FROM fin_income_statement WHERE symbol = '{code}' AND report_date IN {tuple(required_reports)}"
+        report_literals = ", ".join(
+            f"DATE '{r[:4]}-{r[4:6]}-{r[6:]}'" for r in required_reports
+        )
+        check_sql = f"SELECT COUNT(DISTINCT report_date) FROM fin_income_statement WHERE symbol = '{code}' AND report_date IN ({report_literals})"
         count = duckdb_conn.execute(check_sql).fetchone()[0]
         if count == 5:
             target_symbols.append(code)
@@ -782,7 +1152,10 @@ def calculate_ttm_metrics(symbol=None, force_all=False):
     return len(target_symbols), failed
 
 
-def sync_share_capital(symbol=None, force_all=False, start_date=None):
+@_cached_sync_status(DATASET_SHARE_CAPITAL)
+def sync_share_capital(
+    symbol=None, force_all=False, start_date=None, scheduler=None, task_batch=None
+):
     """同步股本变动记录
 
     返回 (processed, failed): failed 为单股同步异常数 (重试耗尽后计入)。
@@ -797,6 +1170,9 @@ def sync_share_capital(symbol=None, force_all=False, start_date=None):
     collector = ShareCollector()
     all_stocks = get_all_stocks()
     target_tasks = [s for s in all_stocks if s[0] == symbol] if symbol else all_stocks
+    task_queue = _task_queue("share", task_batch, symbol, force_all)
+    if task_queue:
+        target_tasks = _resume_stock_tasks(task_queue, all_stocks)
 
     if force_all and not start_date:
         start_date = "19900101"
@@ -806,10 +1182,11 @@ def sync_share_capital(symbol=None, force_all=False, start_date=None):
     logger.info(
         f"开始同步 {len(target_tasks)} 只股票的股本变动 (基准日期: {latest_trade_date})..."
     )
-    skipped = 0
-    failed = 0
     pbar = tqdm(target_tasks, desc="股本同步")
-    for code, name in pbar:
+
+    def sync_symbol(task):
+        """同步单股股本; 返回是否实际发出了请求"""
+        code, name = task
         pbar.set_description(f"股本同步: {code} {name}")
         # 单股/强制模式绕过"当日已同步"检查, 默认模式跳过今日已同步股票
         if (
@@ -817,17 +1194,28 @@ def sync_share_capital(symbol=None, force_all=False, start_date=None):
             and not force_all
             and is_synced_today(DATASET_SHARE_CAPITAL, code)
         ):
-            skipped += 1
-            continue
+            return False
         try:
             collector.collect_share_capital(code, start_date=start_date)
         except SinaBlockedError:
-            # 新浪 IP 风控: 重试无意义, 立即中止整个流水线 (由调用方判定 BLOCKED)
+            # 新浪 IP 风控: 重试无意义, 熔断中止整个流水线 (由调用方判定 BLOCKED)
             raise
         except Exception:
-            failed += 1
             logger.error(f"{code} {name} 股本同步最终失败 (已重试)")
-        time.sleep(random.uniform(1, 1.5))
+            raise
+        return True
+
+    with _stage_scheduler(scheduler) as stage_scheduler:
+        outcomes = stage_scheduler.run(
+            SOURCE_SINA,
+            pbar,
+            task_queue.track(sync_symbol, key=_task_symbol)
+            if task_queue
+            else sync_symbol,
+            cost=lambda fetched: SHARE_REQUEST_COST if fetched else 0,
+        )
+    failed = sum(outcome.error is not None for outcome in outcomes)
+    skipped = sum(outcome.error is None and not outcome.result for outcome in outcomes)
 
     logger.info(
         f"股本同步完成: 共 {len(target_tasks)} 只, 本次同步 {len(target_tasks) - skipped - failed} 只, "
@@ -836,8 +1224,15 @@ def sync_share_capital(symbol=None, force_all=False, start_date=None):
     return len(target_tasks), failed
 
 
-def sync_daily_kline(symbol=None, force_all=False, start_date=None):
-    """同步日线行情数据 (新浪源, 串行 + 保守节奏)
+@_cached_sync_status(DATASET_KLINE, DATASET_KLINE_DAILY)
+def sync_daily_kline(
+    symbol=None, force_all=False, start_date=None, scheduler=None, task_batch=None
+):
+    """同步日线行情数据 (新浪源, 经抓取调度器限速)
+
+    增量模式 (非单股、非强制全量、未指定起始日) 先用一次全市场行情快照为落后一个
+    交易日的股票批量追加最新一根 K 线 (见 ``DailyKlineCollector.append_latest_bars``),
+    除权除息、新股、缺口等剩余股票再逐股抓取。
 
     返回 (processed, failed): failed 为单股同步异常数 (重试耗尽后计入)。
     """
@@ -847,6 +1242,9 @@ def sync_daily_kline(symbol=None, force_all=False, start_date=None):
     collector = DailyKlineCollector()
     all_stocks = get_all_stocks()
     target_tasks = [s for s in all_stocks if s[0] == symbol] if symbol else all_stocks
+    task_queue = _task_queue("kline", task_batch, symbol, force_all)
+    if task_queue:
+        target_tasks = _resume_stock_tasks(task_queue, all_stocks)
 
     if force_all and not start_date:
         start_date = "19900101"
@@ -856,30 +1254,64 @@ def sync_daily_kline(symbol=None, force_all=False, start_date=None):
     logger.info(
         f"开始同步 {len(target_tasks)} 只股票的日线行情 (基准日期: {latest_date})..."
     )
-    skipped = 0
-    failed = 0
-    pbar = tqdm(target_tasks, desc="K线同步")
-    for code, name in pbar:
+
+    def append_from_snapshot(codes):
+        try:
+            return collector.append_latest_bars(codes)
+        except SinaBlockedError:
+            raise
+        except Exception:
+            logger.warning("全市场快照追加日线失败, 改为全部逐股同步", exc_info=True)
+            return set()
+
+    appended: set[str] = set()
+
+    def sync_symbol(task):
+        """同步单股日线; 返回是否实际抓取了数据"""
+        code, name = task
         pbar.set_description(f"K线同步: {code} {name}")
         try:
-            synced = collector.collect_kline(
+            return collector.collect_kline(
                 code, start_date=start_date, end_date=latest_date
             )
-            if synced:
-                time.sleep(random.uniform(2.0, 4.0))
-            else:
-                skipped += 1
         except SinaBlockedError:
-            # 新浪 IP 风控: 重试无意义, 立即中止整个流水线 (由调用方判定 BLOCKED)
+            # 新浪 IP 风控: 重试无意义, 熔断中止整个流水线 (由调用方判定 BLOCKED)
             raise
         except Exception:
-            failed += 1
             logger.error(f"{code} {name} K线同步最终失败 (已重试)")
+            raise
+
+    with _stage_scheduler(scheduler) as stage_scheduler:
+        # 增量模式先用一次全市场快照批量追加最新一根 K 线, 剩余股票再逐股抓取
+        if not symbol and not force_all and not start_date and target_tasks:
+            (snapshot,) = stage_scheduler.run(
+                SOURCE_SINA,
+                [[code for code, _ in target_tasks]],
+                append_from_snapshot,
+                cost=lambda handled: KLINE_SNAPSHOT_REQUEST_COST if handled else 0,
+            )
+            appended = snapshot.result or set()
+            if appended:
+                if task_queue:
+                    task_queue.mark_done(appended)
+                target_tasks = [t for t in target_tasks if t[0] not in appended]
+        pbar = tqdm(target_tasks, desc="K线同步")
+        outcomes = stage_scheduler.run(
+            SOURCE_SINA,
+            pbar,
+            task_queue.track(sync_symbol, key=_task_symbol)
+            if task_queue
+            else sync_symbol,
+            cost=lambda synced: KLINE_REQUEST_COST if synced else 0,
+        )
+    failed = sum(outcome.error is not None for outcome in outcomes)
+    skipped = sum(outcome.error is None and not outcome.result for outcome in outcomes)
     logger.info(
-        f"K线同步完成 (本次同步 {len(target_tasks) - skipped - failed} 只, "
+        f"K线同步完成 (快照追加 {len(appended)} 只, "
+        f"逐股同步 {len(target_tasks) - skipped - failed} 只, "
         f"跳过 {skipped} 只已为最新, 失败 {failed} 只)"
     )
-    return len(target_tasks), failed
+    return len(target_tasks) + len(appended), failed
 
 
 def sync_etf_list():
@@ -890,11 +1322,11 @@ def sync_etf_list():
     df = collector.fetch_all_etfs()
     if df.empty:
         return
-    conn = db_manager.get_sqlite_conn()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM etfs")
-    df.to_sql("etfs", conn, if_exists="append", index=False)
-    conn.commit()
+    with db_manager.sqlite_lock:
+        conn = db_manager.get_sqlite_conn()
+        conn.execute("DELETE FROM etfs")
+        df.to_sql("etfs", conn, if_exists="append", index=False)
+        conn.commit()
     logger.info(f"成功同步 {len(df)} 条记录到 etfs 表")
 
 
@@ -933,37 +1365,109 @@ def sync_etf_kline(symbol=None, force_all=False, start_date=None):
         time.sleep(random.uniform(0.5, 1.0))
 
 
-def sync_all_data_flow(symbol=None, force_all=False) -> str:
+def sync_all_data_flow(symbol=None, force_all=False, task_batch=None) -> str:
     """执行全量数据同步流水线 (含名单/元数据; 单股模式跳过名单与元数据)
 
+    各环节按依赖图调度, 互不依赖的分支并行 (逐股抓取共享同一个按数据源限速的
+    调度器, 新浪与东财环节可以重叠):
+
+    - stocks → metadata; indicators / financial 只依赖 stocks
+    - share / kline 依赖 stocks 与 metadata (元数据环节内部并发使用 V8)
+    - 单股报表写入后立即排队重算该股 TTM; ttm 环节在 indicators 与 financial
+      完成后汇总这些结果, 再补算指标修正日期留下的待重算股票
+
+    ``task_batch`` (定时调度传入数据日) 启用逐股任务队列: 同一批次内重试时各环节
+    跳过候选发现, 只续跑未完成的任务 (见 ``storage/database/sync_tasks.py``)。
+
     返回三态:
     - SYNC_ALL_SUCCESS: 全部 7 环节失败计数均为 0
     - SYNC_ALL_RETRYABLE: 存在环节失败 (可整体重试, 增量机制自动跳过已完成部分)
     - SYNC_ALL_BLOCKED: 新浪 IP 风控中止 (重试无意义, 需等待解封)
     """
     logger.info(">>> 开始执行一键数据同步流水线 <<<")
-    stage_stats: dict[str, tuple[int, int]] = {}
-    try:
-        if not symbol:
+    ttm_follow_ups = _TTMFollowUps()
+
+    with FetchScheduler() as scheduler:
+
+        def run_ttm():
+            queued, queued_failed = ttm_follow_ups.drain()
+            processed, failed = calculate_ttm_metrics(
+                symbol=symbol, force_all=force_all
+            )
+            return processed + queued, failed + queued_failed
+
+        stages = [
+            Stage("stocks", sync_stock_list),
+            Stage("metadata", sync_stock_metadata, ("stocks",)),
+            Stage(
+                "indicators",
+                lambda: sync_financial_indicators(
+                    symbol=symbol,
+                    force_all=force_all,
+                    scheduler=scheduler,
+                    task_batch=task_batch,
+                ),
+                ("stocks",),
+            ),
+            Stage(
+                "financial",
+                lambda: sync_financial_statements(
+                    symbol=symbol,
+                    force_all=force_all,
+                    scheduler=scheduler,
+                    # 全量模式由 ttm 环节统一重算, 不逐股排队
+                    on_statements_saved=None if force_all else ttm_follow_ups.submit,
+                    task_batch=task_batch,
+                ),
+                ("stocks",),
+            ),
+            Stage("ttm", run_ttm, ("indicators", "financial")),
+            Stage(
+                "share",
+                lambda: sync_share_capital(
+                    symbol=symbol,
+                    force_all=force_all,
+                    scheduler=scheduler,
+                    task_batch=task_batch,
+                ),
+                ("stocks", "metadata"),
+            ),
+            Stage(
+                "kline",
+                lambda: sync_daily_kline(
+                    symbol=symbol,
+                    force_all=force_all,
+                    scheduler=scheduler,
+                    task_batch=task_batch,
+                ),
+                ("stocks", "metadata"),
+            ),
+        ]
+        if symbol:
             # 名单与元数据是全市场操作, 单股模式跳过
-            stage_stats["stocks"] = sync_stock_list()
-            stage_stats["metadata"] = sync_stock_metadata()
-        # 先同步指标，因为指标表（东财源）的公告日期和更新日期更准确，用于后续修复三张表
-        stage_stats["indicators"] = sync_financial_indicators(
-            symbol=symbol, force_all=force_all
-        )
-        stage_stats["financial"] = sync_financial_statements(
-            symbol=symbol, force_all=force_all
-        )
-        stage_stats["ttm"] = calculate_ttm_metrics(symbol=symbol, force_all=force_all)
-        stage_stats["share"] = sync_share_capital(symbol=symbol, force_all=force_all)
-        stage_stats["kline"] = sync_daily_kline(symbol=symbol, force_all=force_all)
-    except SinaBlockedError as e:
-        logger.error(f">>> 新浪接口 IP 风控，数据同步流水线中止 (已同步数据保留): {e}")
-        logger.error(
-            ">>> 请等待 5~60 分钟封禁解除后重试 (增量同步会自动跳过已完成部分) <<<"
-        )
-        return SYNC_ALL_BLOCKED
+            skipped = {"stocks", "metadata"}
+            stages = [
+                Stage(
+                    stage.name,
+                    stage.run,
+                    tuple(dep for dep in stage.depends_on if dep not in skipped),
+                )
+                for stage in stages
+                if stage.name not in skipped
+            ]
+
+        try:
+            stage_stats = run_stage_graph(stages, on_error=scheduler.breaker.trip)
+        except SinaBlockedError as e:
+            logger.error(
+                f">>> 新浪接口 IP 风控，数据同步流水线中止 (已同步数据保留): {e}"
+            )
+            logger.error(
+                ">>> 请等待 5~60 分钟封禁解除后重试 (增量同步会自动跳过已完成部分) <<<"
+            )
+            return SYNC_ALL_BLOCKED
+        finally:
+            ttm_follow_ups.close()
 
     total_failed = 0
     for name, (processed, failed) in stage_stats.items():
@@ -978,6 +1482,19 @@ def sync_all_data_flow(symbol=None, force_all=False) -> str:
     return SYNC_ALL_SUCCESS
 
 
+def publish_warehouse_snapshot() -> int | None:
+    """发布数据仓库快照 (sync-all 成功后调用); 失败只记录日志, 不影响同步结果"""
+    from storage.database.warehouse_snapshot import publish_snapshot
+
+    try:
+        return publish_snapshot()
+    except OSError:
+        logger.exception(
+            "数据仓库快照发布失败 (文件系统需支持硬链接), 读者继续使用上一代"
+        )
+        return None
+
+
 def export_duckdb_views(output_path: str):
     """导出 DuckDB 视图的 SQL 定义"""
     sql = db_manager.generate_full_sql()
@@ -1004,6 +1521,90 @@ def rebuild_view_schemas(dataset: str = None):
         logger.info("全部 schema 缓存重建完成")
 
 
+def compact_warehouse(dataset: str = None, row_group_size: int = None):
+    """按年份分桶压实数据集 (增量: 只重写变化股票涉及的年份桶)"""
+    from storage.database.warehouse_compaction import (
+        DATASET_DATE_COLUMNS,
+        DEFAULT_ROW_GROUP_SIZE,
+    )
+    from storage.database.warehouse_compaction import (
+        compact_warehouse as compact_datasets,
+    )
+
+    if dataset and dataset not in DATASET_DATE_COLUMNS:
+        logger.error(f"未知数据集: {dataset} (可选: {', '.join(DATASET_DATE_COLUMNS)})")
+        return
+    results = compact_datasets(
+        [dataset] if dataset else None,
+        row_group_size=row_group_size or DEFAULT_ROW_GROUP_SIZE,
+    )
+    for name, buckets in results.items():
+        logger.info(
+            f"{name}: 重写 {buckets} 个年份桶" if buckets else f"{name}: 无增量"
+        )
+
+
+def ensure_warehouse_dates_migrated():
+    """启动检查: 数据仓库未记录日期列迁移完成标记时自动迁移
+
+    schema 缓存把财务日期列声明为 DATE, 旧版本写入的字符串日期分区未经迁移时视图
+    读取会失败; 标记存在时只读一个小文件。
+    """
+    from storage.database.warehouse_date_migration import is_date_migration_done
+
+    if is_date_migration_done():
+        return
+    logger.warning(
+        "数据仓库未记录日期列 DATE 迁移完成, 自动执行 migrate-warehouse-dates"
+    )
+    migrate_warehouse_dates()
+
+
+def migrate_warehouse_dates():
+    """一次性将财务数据集的日期列迁移为 DATE 类型并重建受影响的 schema 缓存"""
+    from storage.database.schema_builder import rebuild_dataset
+    from storage.database.warehouse_date_migration import (
+        migrate_warehouse_dates as migrate_dates,
+    )
+
+    migrated = migrate_dates()
+    if not migrated:
+        logger.info("日期列均已是 DATE 类型，无需迁移")
+        return
+    for dataset in migrated:
+        rebuild_dataset(dataset)
+    logger.info(
+        "日期列迁移完成: "
+        + ", ".join(f"{dataset} {count} 个分区" for dataset, count in migrated.items())
+    )
+
+
+def check_warehouse_integrity(
+    dataset: str = None, output: str = None, workers: int = None
+) -> bool:
+    """巡检数据仓库完整性并写出 JSON 报告, 返回是否没有错误级问题"""
+    from storage.database.schema_builder import DATASET_PATTERNS
+    from storage.database.warehouse_check import (
+        REPORT_FILE,
+        check_warehouse,
+        write_report,
+    )
+
+    if dataset and dataset not in DATASET_PATTERNS:
+        logger.error(f"未知数据集: {dataset} (可选: {', '.join(DATASET_PATTERNS)})")
+        return False
+    report = check_warehouse([dataset] if dataset else None, workers=workers)
+    path = write_report(report, output or REPORT_FILE)
+    for name, result in report["datasets"].items():
+        logger.info(f"{name}: {result['files']} 个分片, {len(result['issues'])} 条问题")
+    summary = report["summary"]
+    logger.info(
+        f"数据仓库巡检完成 ({summary['elapsed_seconds']}s): "
+        f"{summary['errors']} 个错误, {summary['warnings']} 个警告, 报告: {path}"
+    )
+    return summary["errors"] == 0
+
+
 def run_backtest(backtest_config_path: str):
     """按 TOML 配置运行已注册策略并输出可复现的研究产物。"""
     from backtest.config import load_backtest_config
@@ -1017,12 +1618,14 @@ def run_backtest(backtest_config_path: str):
     strategy = get_backtest_strategy(config.strategy_name)
     parameters = strategy.validate_parameters(config.strategy_parameters)
     config = config.with_resolved_strategy(strategy.metadata.version, parameters)
-    data_access = BacktestDataAccess(db_manager)
-    signal_data = strategy.load_signal_data(data_access, config, parameters)
-    targets = validate_target_weights(
-        strategy.build_targets(signal_data, config, parameters)
-    )
-    benchmark_prices = data_access.load_benchmark_prices(config)
+    # 回测读取最新快照, 与并发运行的 sync-all 互不干扰
+    with db_manager.use_snapshot() as snapshot_db:
+        data_access = BacktestDataAccess(snapshot_db)
+        signal_data = strategy.load_signal_data(data_access, config, parameters)
+        targets = validate_target_weights(
+            strategy.build_targets(signal_data, config, parameters)
+        )
+        benchmark_prices = data_access.load_benchmark_prices(config)
     result = DailyBacktestEngine(config).run(signal_data, targets, benchmark_prices)
     output_dir = write_backtest_result(config, result.daily_nav, targets, result.trades)
     logger.info(f"回测完成，结果目录: {output_dir}")
@@ -1039,6 +1642,11 @@ def list_registered_backtest_strategies():
 
 # --- CLI 定义 ---
 
+# 不读写数据仓库的命令, 启动时不做日期列迁移检查 (迁移命令自身除外)
+WAREHOUSE_FREE_COMMANDS = frozenset(
+    {None, "show-views", "list-backtest-strategies", "migrate-warehouse-dates"}
+)
+
 
 def main():
     from utils.requests_protection import install_requests_protection
@@ -1134,17 +1742,55 @@ def main():
     )
     rs_p.add_argument("--dataset", "-d", type=str, help="仅重建指定数据集")
 
-    # 15. run-backtest
+    # 15. migrate-warehouse-dates
+    subparsers.add_parser(
+        "migrate-warehouse-dates",
+        help="一次性将财务数据的日期列迁移为 DATE 类型 (可重复执行)",
+    )
+
+    # 16. compact-warehouse
+    compact_p = subparsers.add_parser(
+        "compact-warehouse", help="按年份分桶压实数据集, 加速横截面查询 (增量执行)"
+    )
+    compact_p.add_argument("--dataset", "-d", type=str, help="仅压实指定数据集")
+    compact_p.add_argument(
+        "--row-group-size", type=int, help="压实文件的行组行数 (默认: 122880)"
+    )
+
+    # 17. publish-snapshot
+    subparsers.add_parser(
+        "publish-snapshot",
+        help="发布数据仓库只读快照 (sync-all 成功后自动执行; 需无同步在运行)",
+    )
+
+    # 18. check-warehouse
+    check_p = subparsers.add_parser(
+        "check-warehouse",
+        help="并行巡检数据仓库完整性 (重复/乱序日期、交易日缺口、复权因子、残留文件、schema 漂移)",
+    )
+    check_p.add_argument("--dataset", "-d", type=str, help="仅检查指定数据集")
+    check_p.add_argument(
+        "--output",
+        "-o",
+        type=str,
+        help="JSON 报告路径 (默认: logs/warehouse_check.json)",
+    )
+    check_p.add_argument("--workers", type=int, help="并行线程数 (默认: CPU 核数)")
+
+    # 19. run-backtest
     backtest_p = subparsers.add_parser("run-backtest", help="运行日频股票策略回测")
     backtest_p.add_argument(
         "--backtest-config", required=True, help="回测 TOML 配置文件路径"
     )
 
-    # 16. list-backtest-strategies
+    # 20. list-backtest-strategies
     subparsers.add_parser("list-backtest-strategies", help="列出已注册的日频回测策略")
 
     args = parser.parse_args()
 
+    if args.command not in WAREHOUSE_FREE_COMMANDS:
+        ensure_warehouse_dates_migrated()
+
     if args.command == "sync-stocks":
         sync_stock_list()
     elif args.command == "sync-metadata":
@@ -1183,6 +1829,7 @@ def main():
         elif status == SYNC_ALL_RETRYABLE:
             logger.warning("sync-all 存在环节失败, 可稍后重跑 (增量同步会自动补缺)")
             sys.exit(1)
+        publish_warehouse_snapshot()
     elif args.command == "export-views":
         export_duckdb_views(args.output)
     elif args.command == "show-views":
@@ -1200,6 +1847,17 @@ def main():
         logger.info(f"✅ 成功导出研报至: {out}")
     elif args.command == "rebuild-schemas":
         rebuild_view_schemas(dataset=args.dataset)
+    elif args.command == "compact-warehouse":
+        compact_warehouse(dataset=args.dataset, row_group_size=args.row_group_size)
+    elif args.command == "migrate-warehouse-dates":
+        migrate_warehouse_dates()
+    elif args.command == "publish-snapshot":
+        publish_warehouse_snapshot()
+    elif args.command == "check-warehouse":
+        if not check_warehouse_integrity(
+            dataset=args.dataset, output=args.output, workers=args.workers
+        ):
+            sys.exit(1)
     elif args.command == "run-backtest":
         run_backtest(backtest_config_path=args.backtest_config)
     elif args.command == "list-backtest-strategies":
@@ -1209,9 +1867,12 @@ def main():
 
 
 if __name__ == "__main__":
+    from utils.requests_protection import log_http_pool_stats
+
     try:
         main()
     except Exception:
         logger.exception("主程序执行异常退出")
     finally:
+        log_http_pool_stats()
         db_manager.close_all()
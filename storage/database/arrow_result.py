@@ -0,0 +1,34 @@
+"""DuckDB 查询结果的 Arrow 原生传递
+
+查询结果以 Arrow 表跨越 DuckDB -> Python 边界: 转换为 pandas 时以 ``ArrowDtype``
+直接包装 Arrow 缓冲区, 不再经过 ``.df()`` 的逐列 NumPy 物化; 集合类结果直接从
+Arrow 列构建, 不再为每行生成 Python 元组。日期类型与派生列应在 SQL 中完成,
+Python 侧只负责接收。
+"""
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+def fetch_arrow_table(conn, sql: str, params: list | None = None) -> pa.Table:
+    """执行查询并以 Arrow 表返回完整结果"""
+    return conn.execute(sql, params or []).to_arrow_table()
+
+
+def fetch_arrow_frame(conn, sql: str, params: list | None = None) -> pd.DataFrame:
+    """执行查询并返回 ArrowDtype 支撑的 DataFrame (零拷贝包装 Arrow 缓冲区)"""
+    return arrow_to_frame(fetch_arrow_table(conn, sql, params))
+
+
+def fetch_value_set(conn, sql: str, params: list | None = None) -> set:
+    """执行单列查询并返回去重后的值集合"""
+    table = fetch_arrow_table(conn, sql, params)
+    if table.num_columns != 1:
+        raise ValueError(f"集合查询必须只返回一列, 实际 {table.num_columns} 列")
+    return set(pc.unique(table.column(0)).to_pylist())
+
+
+def arrow_to_frame(table: pa.Table) -> pd.DataFrame:
+    """Arrow 表 -> ArrowDtype DataFrame"""
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
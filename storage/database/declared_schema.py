@@ -0,0 +1,94 @@
+"""数据集的声明式 Arrow schema 与写入前的批量类型转换。
+
+财务报表与指标的写入端约定: 元数据列为字符串 (空值写为空串), 日期列为 DATE,
+其余指标列为数值。列类型以视图 schema 缓存 (``views/schemas/<dataset>.json``) 为准,
+缓存中未登记的新列按上述约定推断。转换结果直接是 Arrow 表, 由
+``ParquetStore.save_partition`` 以 ``pyarrow.parquet`` 写出, 不再逐列经过 pandas。
+"""
+
+from __future__ import annotations
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from storage.database.schema_builder import load_schema
+from storage.file_store.date_columns import get_date_columns, to_date32
+
+# schema 缓存中的 DuckDB 类型 -> Arrow 类型 (仅数值类型参与指标列声明)
+DUCKDB_NUMERIC_TYPES = {
+    "DOUBLE": pa.float64(),
+    "FLOAT": pa.float32(),
+    "BIGINT": pa.int64(),
+    "INTEGER": pa.int32(),
+}
+
+# 元数据列中视为空值的文本
+NULL_TEXTS = pa.array(["nan", "None", "NaT", "<NA>", "nan "])
+
+
+def get_declared_types(dataset: str) -> dict[str, pa.DataType]:
+    """schema 缓存中数值列的 Arrow 类型 (缓存缺失时为空)"""
+    columns = load_schema(dataset) or {}
+    return {
+        name: DUCKDB_NUMERIC_TYPES[dtype]
+        for name, dtype in columns.items()
+        if dtype in DUCKDB_NUMERIC_TYPES
+    }
+
+
+def _text_array(series: pd.Series) -> pa.Array:
+    try:
+        array = pa.array(series, type=pa.string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        array = pa.array(series.astype(str), type=pa.string())
+    array = pc.if_else(pc.is_in(array, value_set=NULL_TEXTS), "", array)
+    return pc.fill_null(array, "")
+
+
+def to_declared_table(
+    df: pd.DataFrame, dataset: str, category: str, text_columns: set[str]
+) -> pa.Table:
+    """按声明 schema 将 DataFrame 转为 Arrow 表 (不含 symbol 列)
+
+    数值 dtype 的指标列整体一次 ``cast`` 到声明类型; 仅 object/字符串 dtype 的指标列
+    需要逐列 ``pd.to_numeric(errors="coerce")`` 把无法解析的文本置空。
+    """
+    declared = get_declared_types(dataset)
+    date_columns = set(get_date_columns(category))
+    columns = [column for column in df.columns if column != "symbol"]
+
+    metric_columns = [
+        column
+        for column in columns
+        if column not in text_columns and column not in date_columns
+    ]
+    dtypes = df.dtypes
+    textual = [
+        column
+        for column in metric_columns
+        if not pd.api.types.is_numeric_dtype(dtypes[column])
+    ]
+    metric_frame = df[metric_columns]
+    if textual:
+        coerced = {
+            column: pd.to_numeric(df[column], errors="coerce").astype(float)
+            for column in textual
+        }
+        metric_frame = metric_frame.assign(**coerced)
+    metric_table = pa.Table.from_pandas(metric_frame, preserve_index=False)
+    metric_table = metric_table.cast(
+        pa.schema(
+            (column, declared.get(column, pa.float64())) for column in metric_columns
+        )
+    )
+
+    arrays = []
+    for column in columns:
+        if column in date_columns:
+            arrays.append(pa.array(to_date32(df[column])))
+        elif column not in text_columns:
+            arrays.append(metric_table.column(column))
+        else:
+            arrays.append(_text_array(df[column]))
+    return pa.Table.from_arrays(arrays, names=columns)
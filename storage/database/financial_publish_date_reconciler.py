@@ -2,13 +2,15 @@
 
 from __future__ import annotations
 
-from collections.abc import Mapping
+from collections.abc import Iterable, Mapping
 from pathlib import Path
 
 import pandas as pd
 
 from config.settings import WAREHOUSE_DIR
-from storage.file_store.atomic_partition_store import save_partitions_atomically
+from storage.file_store.atomic_partition_store import PartitionCommitGroup
+from storage.file_store.date_columns import date_columns_to_keys, to_date_keys
+from storage.file_store.partition_lock import partition_locks
 from utils.logger import logger
 
 PUBLISH_DATE_COLUMN = "公告日期"
@@ -25,11 +27,7 @@ FINANCIAL_SOURCE_CATEGORIES = {
 
 def normalize_financial_dates(series: pd.Series) -> pd.Series:
     """将报告期或公告日期标准化为 YYYYMMDD 字符串。"""
-    text = series.astype("string").str.strip()
-    digits = text.str.replace(r"\D", "", regex=True)
-    normalized = digits.where(digits.str.len() >= 8).str[:8]
-    valid_dates = pd.to_datetime(normalized, format="%Y%m%d", errors="coerce")
-    return normalized.where(valid_dates.notna())
+    return to_date_keys(series)
 
 
 def _max_date_series(left: pd.Series, right: pd.Series) -> pd.Series:
@@ -124,8 +122,48 @@ def reconcile_financial_publish_dates_for_symbol(
     symbol: str,
     warehouse_dir: str | Path | None = None,
 ) -> dict[str, int]:
-    """覆盖指定股票四类财务数据的公告日期。"""
+    """覆盖指定股票四类财务数据的公告日期。
+
+    四类分区的读取与回写在同一组分区锁内完成, 其他进程不会在两者之间写入。
+    """
+    return reconcile_financial_publish_dates([symbol], warehouse_dir)[symbol]
+
+
+def reconcile_financial_publish_dates(
+    symbols: Iterable[str],
+    warehouse_dir: str | Path | None = None,
+) -> dict[str, dict[str, int]]:
+    """批量覆盖多只股票四类财务数据的公告日期, 返回 {股票: 各来源修改行数}
+
+    全部股票的改写合并为一次组提交 (一条提交日志, 每个目录只 fsync 一次)。涉及的
+    分区锁按固定顺序一次取得, 持有到组提交完成, 读取与回写之间不会有其他写入。
+    """
     base_dir = Path(warehouse_dir) if warehouse_dir is not None else Path(WAREHOUSE_DIR)
+    symbols = list(dict.fromkeys(symbols))
+    lock_keys = [
+        (category, symbol)
+        for symbol in symbols
+        for category in FINANCIAL_SOURCE_CATEGORIES.values()
+    ]
+    results: dict[str, dict[str, int]] = {}
+    with partition_locks(base_dir, lock_keys):
+        with PartitionCommitGroup(base_dir, max_partitions=None) as group:
+            for symbol in symbols:
+                results[symbol] = _reconcile_symbol_locked(symbol, base_dir, group)
+
+    for symbol, changed_rows in results.items():
+        if changed_rows:
+            logger.info(
+                "已统一 %s 的财务公告日期: %s",
+                symbol,
+                ", ".join(f"{name}={count}" for name, count in changed_rows.items()),
+            )
+    return results
+
+
+def _reconcile_symbol_locked(
+    symbol: str, base_dir: Path, group: PartitionCommitGroup
+) -> dict[str, int]:
     source_frames: dict[str, pd.DataFrame] = {}
     source_paths: dict[str, Path] = {}
 
@@ -143,7 +181,6 @@ def reconcile_financial_publish_dates_for_symbol(
 
     changed_rows: dict[str, int] = {}
 
-    pending_writes: list[tuple[pd.DataFrame, str, str]] = []
     for source_name, frame in source_frames.items():
         if (
             REPORT_DATE_COLUMN not in frame
@@ -181,24 +218,23 @@ def reconcile_financial_publish_dates_for_symbol(
         # 作为“首次披露日期”口径并覆盖四张表；不保留来源间的原始日期差异。
         # 数据可用日期是四源日期的最大值，只用于 TTM/ASOF 的安全生效边界，
         # 不代表任一来源的原始字段。
-        frame_to_save = frame.copy()
+        # 落盘的日期列为 DATE 类型, 先转回字符串键再覆盖, 写入时统一转换
+        frame_to_save = date_columns_to_keys(
+            frame, FINANCIAL_SOURCE_CATEGORIES[source_name]
+        )
         frame_to_save.loc[has_canonical_date, PUBLISH_DATE_COLUMN] = canonical_for_rows[
             has_canonical_date
         ].astype(str)
         frame_to_save.loc[has_available_date, DATA_AVAILABLE_DATE_COLUMN] = (
             available_for_rows[has_available_date].astype(str)
         )
-        pending_writes.append(
-            (frame_to_save, FINANCIAL_SOURCE_CATEGORIES[source_name], symbol)
+        # 只改写日期列, 沿用源数据的内容哈希: 次日抓到相同报表时仍可跳过重写
+        group.add(
+            frame_to_save,
+            FINANCIAL_SOURCE_CATEGORIES[source_name],
+            symbol,
+            preserve_content_hash=True,
         )
         changed_rows[source_name] = changed_count
 
-    save_partitions_atomically(base_dir, pending_writes)
-
-    if changed_rows:
-        logger.info(
-            "已统一 %s 的财务公告日期: %s",
-            symbol,
-            ", ".join(f"{name}={count}" for name, count in changed_rows.items()),
-        )
     return changed_rows
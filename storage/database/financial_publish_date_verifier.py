@@ -29,6 +29,7 @@ from storage.database.official_disclosure_date_resolver import (
     parse_date_value,
 )
 from storage.file_store.atomic_partition_store import save_partitions_atomically
+from storage.file_store.date_columns import date_columns_to_keys
 from utils.logger import logger
 
 
@@ -172,7 +173,9 @@ def apply_official_publish_dates(
             continue
 
         # 官方核验只覆盖公告日期；原始字段及其数值不保留为额外副本。
-        frame_to_save = frame.copy()
+        frame_to_save = date_columns_to_keys(
+            frame, FINANCIAL_SOURCE_CATEGORIES[source_name]
+        )
         frame_to_save.loc[has_official_date, PUBLISH_DATE_COLUMN] = official_for_rows[
             has_official_date
         ].astype(str)
@@ -1,15 +1,34 @@
 from pathlib import Path
 
 import pandas as pd
+import pyarrow as pa
 
 from config.settings import WAREHOUSE_DIR
+from storage.database.declared_schema import to_declared_table
 from storage.database.financial_publish_date_reconciler import (
+    DATA_AVAILABLE_DATE_COLUMN,
+    reconcile_financial_publish_dates,
     reconcile_financial_publish_dates_for_symbol,
 )
 from storage.database.manager import db_manager
+from storage.file_store.date_columns import date_columns_to_keys
 from storage.file_store.parquet_store import ParquetStore
+from storage.file_store.partition_lock import partition_lock
 from utils.logger import logger
 
+# 非财务数值列 (元数据列), 落盘为字符串
+FINANCIAL_META_COLUMNS = {
+    "symbol",
+    "report_date",
+    "公告日期",
+    "数据可用日期",
+    "更新日期",
+    "数据源",
+    "是否审计",
+    "币种",
+    "类型",
+}
+
 
 class FinancialStore:
     """
@@ -17,8 +36,12 @@ class FinancialStore:
     支持非阻塞并发读写。
     """
 
+    @property
+    def conn(self):
+        """当前线程的 DuckDB 游标 (实例可跨线程共享)"""
+        return db_manager.get_duckdb_conn()
+
     def __init__(self):
-        self.conn = db_manager.get_duckdb_conn()
         self.parquet_store = ParquetStore()
         # 表名到目录的映射
         self.table_map = {
@@ -27,9 +50,20 @@ class FinancialStore:
             "fin_cashflow_statement": "financial_statements/type=cashflow",
         }
 
-    def save_statement(self, df: pd.DataFrame, table_name: str):
+    def save_statement(
+        self,
+        df: pd.DataFrame,
+        table_name: str,
+        skip_unchanged: bool = True,
+        reconcile: bool = True,
+    ):
         """
-        保存报表数据到 Parquet。
+        保存报表数据到 Parquet, 返回公告日期统一的修改行数。
+
+        :param skip_unchanged: 合并后内容与已存分区一致时跳过写入与公告日期统一,
+            此时返回 None
+        :param reconcile: 写入后立即统一公告日期; 为 False 时写入后返回 {}, 由调用方
+            在报表全部写入后调用一次 ``reconcile_publish_dates`` (可跨股票批量)
         """
         if df.empty:
             return {}
@@ -41,99 +75,89 @@ class FinancialStore:
 
             symbol = df["symbol"].iloc[0]
 
-            # 读取该股票已有的数据（如果存在），进行合并去重
-            # 这样可以处理增量更新/覆盖逻辑
-            target_file = (
-                Path(WAREHOUSE_DIR) / category / f"symbol={symbol}" / "data.parquet"
-            )
-            if target_file.exists():
-                existing_df = pd.read_parquet(target_file)
-                # 合并并按 symbol/report_date 去重
-                # 注意：existing_df 可能没有 symbol 列，因为我们存的时候删掉了，但在读取时如果是通过 duckdb 会有。
-                # 直接用 pandas 读，需要补回 symbol 列或按 report_date 合并
-                combined_df = pd.concat(
-                    [existing_df, df.drop(columns=["symbol"], errors="ignore")],
-                    ignore_index=True,
+            # 读取-合并-写回在分区锁内完成, 多个同步进程并发写入同一股票时不会丢失更新
+            with partition_lock(self.parquet_store.base_dir, category, symbol):
+                # 读取该股票已有的数据（如果存在），进行合并去重
+                # 这样可以处理增量更新/覆盖逻辑
+                target_file = (
+                    Path(WAREHOUSE_DIR) / category / f"symbol={symbol}" / "data.parquet"
                 )
-                # 以 report_date 为准去重，保留最新的
-                df = combined_df.drop_duplicates(
-                    subset=["report_date"], keep="last"
-                ).copy()
-
-            # 重新补上 symbol 供存储逻辑识别（虽然存储时会再删掉，但为了逻辑统一）
-            df["symbol"] = symbol
-
-            # --- 强制数值化清洗 ---
-            df = self._coerce_numeric(df)
-
-            self.parquet_store.save_partition(df, category, symbol)
+                if target_file.exists():
+                    existing_df = date_columns_to_keys(
+                        pd.read_parquet(target_file), category
+                    )
+                    # 合并并按 symbol/report_date 去重
+                    # 注意：existing_df 可能没有 symbol 列，因为我们存的时候删掉了，但在读取时如果是通过 duckdb 会有。
+                    # 直接用 pandas 读，需要补回 symbol 列或按 report_date 合并
+                    new_df = date_columns_to_keys(
+                        df.drop(columns=["symbol"], errors="ignore"), category
+                    )
+                    combined_df = pd.concat(
+                        [existing_df, new_df],
+                        ignore_index=True,
+                    )
+                    # 以 report_date 为准去重，保留最新的
+                    df = combined_df.drop_duplicates(
+                        subset=["report_date"], keep="last"
+                    ).copy()
+
+                # 重新补上 symbol 供存储逻辑识别（虽然存储时会再删掉，但为了逻辑统一）
+                df["symbol"] = symbol
+
+                # 按声明 schema 一次性转换后直接以 Arrow 表写出
+                table = self._to_arrow_table(df, table_name)
+
+                # 数据可用日期由公告日期统一回填, 不参与内容比较
+                written = self.parquet_store.save_partition_if_changed(
+                    table,
+                    category,
+                    symbol,
+                    force=not skip_unchanged,
+                    hash_exclude=(DATA_AVAILABLE_DATE_COLUMN,),
+                )
+            if not written:
+                logger.debug(f"{symbol} {table_name} 内容未变化, 跳过写入")
+                return None
+            if not reconcile:
+                return {}
             return reconcile_financial_publish_dates_for_symbol(symbol)
 
         except Exception:
             logger.exception(f"存储 {table_name} 失败")
             raise
 
-    def _coerce_numeric(self, df: pd.DataFrame) -> pd.DataFrame:
-        """强制将财务指标列转为数值型，解决 mixed types 导致的 Parquet 写入失败"""
-        # 非财务数值列黑名单 (元数据列)
-        meta_cols = {
-            "symbol",
-            "report_date",
-            "公告日期",
-            "数据可用日期",
-            "更新日期",
-            "数据源",
-            "是否审计",
-            "币种",
-            "类型",
-        }
-
-        df = df.copy()
-        for col in df.columns:
-            if col in meta_cols:
-                # 转换为字符串，并将空值替换为空字符串，避免 Pandas 存为 object/NaN 导致的混乱
-                df[col] = (
-                    df[col]
-                    .astype(str)
-                    .replace(["nan", "None", "NaT", "<NA>", "nan "], "")
-                )
-            else:
-                # 所有的财务指标列，强制转换为数值型 (float64)
-                # errors='coerce' 会将无法转换的(如空字符串)转为 NaN
-                df[col] = pd.to_numeric(df[col], errors="coerce")
+    def reconcile_publish_dates(self, symbols: list[str]) -> dict[str, dict[str, int]]:
+        """批量统一多只股票四类财务数据的公告日期 (一次组提交), 返回各股各来源的修改行数"""
+        return reconcile_financial_publish_dates(symbols)
 
-        return df
+    def _to_arrow_table(self, df: pd.DataFrame, table_name: str) -> pa.Table:
+        """按声明 schema 批量转换为 Arrow 表：元数据列为字符串, 日期列为 DATE, 其余为数值"""
+        return to_declared_table(
+            df, table_name, self.table_map[table_name], FINANCIAL_META_COLUMNS
+        )
 
     def get_existing_report_dates(self) -> set:
-        """获取三张表都存在的 {symbol}_{report_date} 交集"""
+        """获取三张表都存在的 {symbol}_{report_date} 交集 (读分区清单)"""
+        manifest = self.parquet_store.manifest
         sets = []
         for table_name, category in self.table_map.items():
-            path = self.parquet_store.get_path(category)
-            if not any(Path(WAREHOUSE_DIR).glob(f"{category}/*/data.parquet")):
+            keys = manifest.get_report_date_keys(category)
+            if not keys:
                 return set()
-
-            # 使用 DuckDB 扫描 Parquet 极其高效
-            res = self.conn.execute(
-                f"SELECT symbol || '_' || report_date FROM read_parquet('{path}', hive_partitioning=1, union_by_name=1)"
-            ).fetchall()
-            sets.append(set([row[0] for row in res]))
+            sets.append(keys)
 
         return set.intersection(*sets) if sets else set()
 
     def get_stocks_without_financials(self, all_codes: list) -> list:
-        """从全量列表中筛选出财务报表不完整的股票"""
+        """从全量列表中筛选出财务报表不完整的股票 (读分区清单)"""
+        manifest = self.parquet_store.manifest
         incomplete_codes = set()
 
         for table_name, category in self.table_map.items():
-            path = self.parquet_store.get_path(category)
-            if not any(Path(WAREHOUSE_DIR).glob(f"{category}/*/data.parquet")):
+            existing_codes_set = manifest.get_symbols(category)
+            if not existing_codes_set:
                 return all_codes
 
-            existing_codes = self.conn.execute(
-                f"SELECT DISTINCT symbol FROM read_parquet('{path}', hive_partitioning=1, union_by_name=1)"
-            ).fetchall()
-            existing_codes_set = set([row[0] for row in existing_codes])
-
             for c in all_codes:
                 if c not in existing_codes_set:
                     incomplete_codes.add(c)
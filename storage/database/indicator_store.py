@@ -1,71 +1,70 @@
 from pathlib import Path
 
 import pandas as pd
+import pyarrow as pa
 
 from config.settings import WAREHOUSE_DIR
+from storage.database.declared_schema import to_declared_table
 from storage.database.financial_publish_date_reconciler import (
+    DATA_AVAILABLE_DATE_COLUMN,
     reconcile_financial_publish_dates_for_symbol,
 )
 from storage.database.manager import db_manager
+from storage.file_store.date_columns import date_columns_to_keys
 from storage.file_store.parquet_store import ParquetStore
+from storage.file_store.partition_lock import partition_lock
 from utils.logger import logger
 
+# 元数据列 (需保持为字符串)
+INDICATOR_META_COLUMNS = {
+    "report_date",
+    "证券代码",
+    "股票代码",
+    "股票简称",
+    "机构代码",
+    "机构类型",
+    "报告类型",
+    "报告期名称",
+    "证券类型代码",
+    "公告日期",
+    "数据可用日期",
+    "更新日期",
+    "币种",
+    "其他_REPORT_YEAR",
+    "symbol",
+}
+
 
 class IndicatorStore:
     """
     财务指标存储器 (Analysis Layer)：已升级为基于 Parquet 数据湖的存储模式。
     """
 
+    @property
+    def conn(self):
+        """当前线程的 DuckDB 游标 (实例可跨线程共享)"""
+        return db_manager.get_duckdb_conn()
+
     def __init__(self):
-        self.conn = db_manager.get_duckdb_conn()
         self.parquet_store = ParquetStore()
         self.category = "indicators"
 
-    def _enforce_schema(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _to_arrow_table(self, df: pd.DataFrame) -> pa.Table:
         """
-        强制 Schema 一致性：
-        1. 元数据列强制为 VARCHAR (str)
+        强制 Schema 一致性 (按声明 schema 批量转换为 Arrow 表)：
+        1. 元数据列强制为 VARCHAR (str), 其中日期列落盘为 DATE
         2. 指标列强制为 DOUBLE (float64)
         """
-        if df.empty:
-            return df
-
-        # 定义元数据列 (需保持为字符串)
-        meta_cols = {
-            "report_date",
-            "证券代码",
-            "股票代码",
-            "股票简称",
-            "机构代码",
-            "机构类型",
-            "报告类型",
-            "报告期名称",
-            "证券类型代码",
-            "公告日期",
-            "数据可用日期",
-            "更新日期",
-            "币种",
-            "其他_REPORT_YEAR",
-            "symbol",
-        }
-
-        df = df.copy()
-        for col in df.columns:
-            if col in meta_cols:
-                # 转换为字符串，并将空值替换为空字符串，避免 Pandas 存为 object/NaN 导致的混乱
-                df[col] = (
-                    df[col].astype(str).replace(["nan", "None", "NaT", "<NA>"], "")
-                )
-            else:
-                # 所有的财务指标列，强制转换为数值型 (float64)
-                # errors='coerce' 会将无法转换的(如空字符串)转为 NaN
-                df[col] = pd.to_numeric(df[col], errors="coerce").astype(float)
-
-        return df
+        return to_declared_table(
+            df, "fin_indicator", self.category, INDICATOR_META_COLUMNS
+        )
 
-    def save_indicators(self, df: pd.DataFrame):
+    def save_indicators(self, df: pd.DataFrame, skip_unchanged: bool = True):
         """
-        保存指标数据到 Parquet。
+        保存指标数据到 Parquet, 返回公告日期统一的修改行数。
+
+        :param skip_unchanged: 合并后内容与已存分区一致时跳过写入与公告日期统一,
+            此时返回 None
         """
         if df.empty:
             return {}
@@ -73,30 +72,47 @@ class IndicatorStore:
         try:
             symbol = df["symbol"].iloc[0]
 
-            # 处理增量合并
-            target_file = (
-                Path(WAREHOUSE_DIR)
-                / self.category
-                / f"symbol={symbol}"
-                / "data.parquet"
-            )
-            if target_file.exists():
-                existing_df = pd.read_parquet(target_file)
-                # 合并并去重，以 report_date 为准
-                combined_df = pd.concat(
-                    [existing_df, df.drop(columns=["symbol"], errors="ignore")],
-                    ignore_index=True,
+            # 读取-合并-写回在分区锁内完成, 多个同步进程并发写入同一股票时不会丢失更新
+            with partition_lock(self.parquet_store.base_dir, self.category, symbol):
+                # 处理增量合并
+                target_file = (
+                    Path(WAREHOUSE_DIR)
+                    / self.category
+                    / f"symbol={symbol}"
+                    / "data.parquet"
                 )
-                df = combined_df.drop_duplicates(
-                    subset=["report_date"], keep="last"
-                ).copy()
-
-            df["symbol"] = symbol
-
-            # 【核心修复】写入前强制执行 Schema 一致性
-            df = self._enforce_schema(df)
-
-            self.parquet_store.save_partition(df, self.category, symbol)
+                if target_file.exists():
+                    existing_df = date_columns_to_keys(
+                        pd.read_parquet(target_file), self.category
+                    )
+                    # 合并并去重，以 report_date 为准
+                    new_df = date_columns_to_keys(
+                        df.drop(columns=["symbol"], errors="ignore"), self.category
+                    )
+                    combined_df = pd.concat(
+                        [existing_df, new_df],
+                        ignore_index=True,
+                    )
+                    df = combined_df.drop_duplicates(
+                        subset=["report_date"], keep="last"
+                    ).copy()
+
+                df["symbol"] = symbol
+
+                # 写入前强制执行 Schema 一致性, 直接以 Arrow 表写出
+                table = self._to_arrow_table(df)
+
+                # 数据可用日期由公告日期统一回填, 不参与内容比较
+                written = self.parquet_store.save_partition_if_changed(
+                    table,
+                    self.category,
+                    symbol,
+                    force=not skip_unchanged,
+                    hash_exclude=(DATA_AVAILABLE_DATE_COLUMN,),
+                )
+            if not written:
+                logger.debug(f"{symbol} 指标内容未变化, 跳过写入")
+                return None
             reconciliation_changes = reconcile_financial_publish_dates_for_symbol(
                 symbol
             )
@@ -108,37 +124,17 @@ class IndicatorStore:
             raise
 
     def get_existing_report_dates(self) -> set:
-        """获取数据库中已有的 {symbol}_{report_date} 集合"""
-        path = self.parquet_store.get_path(self.category)
-        if not any(Path(WAREHOUSE_DIR).glob(f"{self.category}/*/data.parquet")):
-            return set()
-
-        res = self.conn.execute(
-            f"SELECT symbol || '_' || report_date FROM read_parquet('{path}', hive_partitioning=1, union_by_name=1)"
-        ).fetchall()
-        return set([row[0] for row in res])
+        """获取数据库中已有的 {symbol}_{report_date} 集合 (读分区清单)"""
+        return self.parquet_store.manifest.get_report_date_keys(self.category)
 
     def get_stocks_without_indicators(self, all_codes: list) -> list:
-        """从全量列表中筛选出在数据库中完全没有任何指标记录的股票"""
-        path = self.parquet_store.get_path(self.category)
-        if not any(Path(WAREHOUSE_DIR).glob(f"{self.category}/*/data.parquet")):
+        """从全量列表中筛选出在数据库中完全没有任何指标记录的股票 (读分区清单)"""
+        existing_symbols_set = self.parquet_store.manifest.get_symbols(self.category)
+        if not existing_symbols_set:
             return all_codes
 
-        existing_symbols = self.conn.execute(
-            f"SELECT DISTINCT symbol FROM read_parquet('{path}', hive_partitioning=1, union_by_name=1)"
-        ).fetchall()
-        existing_symbols_set = set([row[0] for row in existing_symbols])
-
         return [c for c in all_codes if c not in existing_symbols_set]
 
     def get_existing_dates(self, symbol: str) -> set:
-        """获取某只股票已有的报告期列表"""
-        target_file = (
-            Path(WAREHOUSE_DIR) / self.category / f"symbol={symbol}" / "data.parquet"
-        )
-        if not target_file.exists():
-            return set()
-
-        # 对于单股，直接用 pandas 读更快
-        df = pd.read_parquet(target_file)
-        return set(df["report_date"].tolist())
+        """获取某只股票已有的报告期列表 (读分区清单)"""
+        return self.parquet_store.manifest.get_report_dates(self.category, symbol)
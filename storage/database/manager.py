@@ -1,4 +1,7 @@
 import sqlite3
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 
@@ -18,14 +21,26 @@ class DBManager:
 
     def __init__(self):
         self.sqlite_path = SQLITE_DB_PATH
-        self.warehouse_dir = Path(WAREHOUSE_DIR)
-
         self._sqlite_conn: sqlite3.Connection | None = None
-        self._duckdb_conn: duckdb.DuckDBPyConnection | None = None
+        self._init_duckdb(Path(WAREHOUSE_DIR))
+        # 并发的同步环节共享同一个 SQLite 连接: 不持锁的 commit 会把其它环节
+        # 写了一半的批次一并提交, 因此全部写入与提交经由该锁串行
+        self.sqlite_lock = threading.RLock()
 
         # 初始化表结构
         self.initialize_schema()
 
+    def _init_duckdb(self, warehouse_dir: Path):
+        self.warehouse_dir = warehouse_dir
+        self._duckdb_conn: duckdb.DuckDBPyConnection | None = None
+        # 每个线程持有一个独立游标, 共享同一个内存数据库实例 (含已注册视图);
+        # 按线程登记以便关闭, 已退出线程的游标在派生新游标时关闭并移除
+        self._duckdb_local = threading.local()
+        self._duckdb_cursors: dict[threading.Thread, duckdb.DuckDBPyConnection] = {}
+        self._duckdb_lock = threading.RLock()
+        # 已注册视图的建视图 SQL, 据此判断视图是否过期
+        self._view_sql: dict[str, str] = {}
+
     def initialize_schema(self):
         """初始化 SQLite 元数据表结构"""
         conn = self.get_sqlite_conn()
@@ -62,6 +77,26 @@ class DBManager:
                 PRIMARY KEY (dataset, symbol)
             )
         """)
+        # 逐股任务队列 (见 storage/database/sync_tasks.py)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sync_tasks (
+                stage TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                batch TEXT NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (stage, symbol)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sync_task_batches (
+                stage TEXT PRIMARY KEY,
+                batch TEXT NOT NULL,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
         # 存量表迁移: 老库无 last_trade_date 列时补充
         columns = [
             row[1] for row in conn.execute("PRAGMA table_info(stocks)").fetchall()
@@ -79,19 +114,47 @@ class DBManager:
             )
             # 启用外键约束
             self._sqlite_conn.execute("PRAGMA foreign_keys = ON;")
+            # WAL: 提交只追加日志不改写主库页, 批量提交同步状态时读写互不阻塞
+            self._sqlite_conn.execute("PRAGMA journal_mode = WAL;")
         return self._sqlite_conn
 
+    @contextmanager
+    def sqlite_transaction(self) -> Iterator[sqlite3.Connection]:
+        """持写锁在共享 SQLite 连接上执行一个事务 (正常退出提交, 异常回滚)"""
+        with self.sqlite_lock:
+            conn = self.get_sqlite_conn()
+            with conn:
+                yield conn
+
     def get_duckdb_conn(self) -> duckdb.DuckDBPyConnection:
-        """获取 DuckDB 连接 (作为瞬态计算引擎)。
+        """获取当前线程的 DuckDB 游标 (作为瞬态计算引擎)。
+
+        所有线程共享同一个内存数据库实例, 每个线程首次调用时通过 ``cursor()``
+        派生独立游标并在线程内复用, 因此可在多线程中并发查询; 视图注册在共享
+        catalog 中, 对全部游标可见。调用方不应跨线程传递返回的游标。
 
         视图采用按需注册 (Lazy View Loading)：
         默认不注册任何视图，调用方通过 ensure_views() 声明所需视图，
         避免一次性加载全部视图导致的分片元数据扫描内存暴涨。
         """
-        if self._duckdb_conn is None:
-            # 使用内存模式
-            self._duckdb_conn = duckdb.connect(":memory:")
-        return self._duckdb_conn
+        local = self._duckdb_local
+        root = self._duckdb_conn
+        if root is None or getattr(local, "root", None) is not root:
+            with self._duckdb_lock:
+                if self._duckdb_conn is None:
+                    # 使用内存模式
+                    self._duckdb_conn = duckdb.connect(":memory:")
+                root = self._duckdb_conn
+                self._prune_dead_cursors_locked()
+                local.cursor = root.cursor()
+                local.root = root
+                self._duckdb_cursors[threading.current_thread()] = local.cursor
+        return local.cursor
+
+    def _prune_dead_cursors_locked(self):
+        dead = [thread for thread in self._duckdb_cursors if not thread.is_alive()]
+        for thread in dead:
+            self._duckdb_cursors.pop(thread).close()
 
     def _get_view_loader(self) -> ViewLoader:
         views_dir = Path(__file__).parent / "views"
@@ -100,12 +163,16 @@ class DBManager:
         return loader
 
     def ensure_views(self, *view_names: str):
-        """按需注册指定视图（含其依赖），已注册的视图自动跳过。
+        """按需注册指定视图（含其依赖），已注册且未过期的视图自动跳过。
 
-        使用 DAG 拓扑排序保证依赖视图先于依赖者创建。
+        使用 DAG 拓扑排序保证依赖视图先于依赖者创建；并发调用串行化，
+        视图在共享数据库中只注册一次。已注册的视图每次重新生成 SQL, 与注册时不同
+        (压实副本的增量股票集合或 schema 缓存已变化) 时重新注册。
         """
-        from utils.logger import logger
+        with self._duckdb_lock:
+            self._ensure_views_locked(view_names)
 
+    def _ensure_views_locked(self, view_names: tuple[str, ...]):
         conn = self.get_duckdb_conn()
         loader = self._get_view_loader()
 
@@ -125,8 +192,15 @@ class DBManager:
                         needed.add(dep)
                         changed = True
 
+        view_sql = {
+            n: instances[n].get_sql(str(self.warehouse_dir))
+            for n in needed
+            if n in loader.view_classes
+        }
         to_create = [
-            n for n in needed if n in loader.view_classes and n not in registered
+            n
+            for n, sql in view_sql.items()
+            if n not in registered or self._view_sql.get(n) != sql
         ]
         if not to_create:
             return
@@ -144,18 +218,46 @@ class DBManager:
         except Exception as e:
             raise ValueError(f"视图依赖图循环引用: {e}")
 
-        created = []
+        created, refreshed = [], []
         for name in order:
             if name not in to_create:
                 continue
             try:
-                cls = loader.view_classes[name]
-                conn.execute(cls().get_sql(str(self.warehouse_dir)))
-                created.append(name)
+                conn.execute(view_sql[name])
             except Exception:
                 logger.exception(f"按需加载视图失败 {name}")
+                continue
+            self._view_sql[name] = view_sql[name]
+            (refreshed if name in registered else created).append(name)
         if created:
             logger.info(f"按需加载视图: {', '.join(created)}")
+        if refreshed:
+            logger.info(f"视图数据源已变化, 重新注册: {', '.join(refreshed)}")
+
+    @contextmanager
+    def use_snapshot(self) -> Iterator["DBManager"]:
+        """钉住数据仓库最新快照, 返回只读该快照的独立查询入口。
+
+        快照由 sync-all 成功后发布, 返回的入口持有自己的 DuckDB 内存库, 视图按快照
+        目录注册, 上下文内的全部查询读取同一截面, 不受并发同步写入影响; 全局单例的
+        数据仓库根目录与已注册视图保持不变。尚未发布过快照时返回全局单例本身
+        (读取实时数据仓库)。
+        """
+        from .warehouse_snapshot import pin_snapshot
+
+        snapshot = pin_snapshot(self.warehouse_dir)
+        if snapshot is None:
+            logger.warning("尚未发布数据仓库快照, 直接读取实时数据仓库")
+            yield self
+            return
+
+        reader = SnapshotDBManager(snapshot)
+        logger.info(f"已钉住数据仓库快照: 第 {snapshot.generation} 代")
+        try:
+            yield reader
+        finally:
+            reader.close_all()
+            snapshot.release()
 
     def init_warehouse_views(self, conn: duckdb.DuckDBPyConnection):
         """扫描并注册全部视图（全量模式，仅在明确需要时调用）"""
@@ -167,6 +269,7 @@ class DBManager:
             try:
                 sql = view.get_sql(str(self.warehouse_dir))
                 conn.execute(sql)
+                self._view_sql[view.name] = sql
             except Exception:
                 logger.exception(f"加载视图失败 {view.name}")
         logger.info(f"成功加载 {len(sorted_views)} 个视图")
@@ -215,9 +318,29 @@ class DBManager:
         if self._sqlite_conn:
             self._sqlite_conn.close()
             self._sqlite_conn = None
-        if self._duckdb_conn:
-            self._duckdb_conn.close()
-            self._duckdb_conn = None
+        with self._duckdb_lock:
+            for cursor in self._duckdb_cursors.values():
+                cursor.close()
+            self._duckdb_cursors.clear()
+            self._view_sql.clear()
+            if self._duckdb_conn:
+                self._duckdb_conn.close()
+                self._duckdb_conn = None
+
+
+class SnapshotDBManager(DBManager):
+    """钉住的数据仓库快照上的查询入口 (由 ``DBManager.use_snapshot`` 创建)
+
+    持有独立的 DuckDB 内存库, 视图只读快照目录; 不提供 SQLite 元数据连接。
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self._sqlite_conn = None
+        self._init_duckdb(snapshot.path)
+
+    def get_sqlite_conn(self) -> sqlite3.Connection:
+        raise RuntimeError("快照查询入口不提供 SQLite 连接, 元数据请使用 db_manager")
 
 
 # 创建全局单例
@@ -1,4 +1,7 @@
 import json
+import os
+import threading
+import uuid
 from datetime import datetime
 from pathlib import Path
 
@@ -21,6 +24,8 @@ DATASET_PATTERNS = {
 
 SCHEMA_DIR = Path(__file__).parent / "views" / "schemas"
 
+_extend_lock = threading.Lock()
+
 # 类型加宽优先级: 取值越高越宽
 _TYPE_RANK = {"VARCHAR": 0, "INTEGER": 1, "BIGINT": 2, "FLOAT": 3, "DOUBLE": 4}
 
@@ -30,21 +35,23 @@ def _wider_type(t1: str, t2: str) -> str:
     return t1 if _TYPE_RANK.get(t1, 5) >= _TYPE_RANK.get(t2, 5) else t2
 
 
-def build_schema(pattern: str) -> dict[str, str]:
+def build_schema(pattern: str | list[str]) -> dict[str, str]:
     """
     扫描数据集全部分片，聚合列名+类型的并集。
     同名不同型取更宽类型。使用 parquet_schema 单次 SQL 完成，无需逐文件打开。
+    pattern 为相对 warehouse 的 glob，或绝对路径列表 (增量重建时为各指纹的代表文件)。
     """
     conn = duckdb.connect(":memory:")
-    full_pattern = f"{WAREHOUSE_DIR}/{pattern}"
+    source = pattern if isinstance(pattern, list) else f"{WAREHOUSE_DIR}/{pattern}"
+    # 压实副本自带 symbol 列, 逐股分片的 symbol 由视图从路径解析, 不进入 schema
     rows = conn.execute(
         """
         SELECT name, duckdb_type, count(DISTINCT file_name) as nfiles
         FROM parquet_schema(?)
-        WHERE name NOT IN ('schema_id', 'file_row_number') AND num_children IS NULL
+        WHERE name NOT IN ('schema_id', 'file_row_number', 'symbol') AND num_children IS NULL
         GROUP BY name, duckdb_type
         """,
-        [full_pattern],
+        [source],
     ).fetchall()
     conn.close()
 
@@ -63,33 +70,100 @@ def build_schema(pattern: str) -> dict[str, str]:
     return types
 
 
-def save_schema(dataset: str, schema: dict[str, str]):
-    """写入 schema 缓存 JSON"""
+def _dataset_category(dataset: str) -> str:
+    pattern = DATASET_PATTERNS.get(dataset)
+    if pattern is None:
+        raise ValueError(f"未知数据集: {dataset}")
+    return pattern.removesuffix("/*/*.parquet")
+
+
+def _merge_fingerprints(fingerprints: dict[str, dict[str, str]]) -> dict[str, str]:
+    """合并各 schema 指纹的列类型, 同名不同型取更宽类型"""
+    types: dict[str, str] = {}
+    for columns in fingerprints.values():
+        for name, dtype in columns.items():
+            types[name] = _wider_type(types[name], dtype) if name in types else dtype
+    return types
+
+
+def build_schema_incremental(
+    dataset: str, cached_fingerprints: dict[str, dict[str, str]] | None = None
+) -> tuple[dict[str, str], dict[str, dict[str, str]]]:
+    """
+    基于分区清单增量聚合 schema, 返回 (列类型, {schema 指纹: 列类型})。
+
+    清单逐文件记录 mtime/size 与 schema 指纹, 刷新时只重新读取变化文件的 footer;
+    缓存中已有的指纹直接复用, 新指纹各取一个代表文件读取列类型。
+    """
+    from storage.file_store.partition_manifest import get_manifest
+
+    category = _dataset_category(dataset)
+    manifest = get_manifest(WAREHOUSE_DIR)
+    manifest.refresh(category)
+    cached_fingerprints = cached_fingerprints or {}
+    fingerprints = {}
+    for schema_hash, path in manifest.get_schema_files(category).items():
+        if schema_hash in cached_fingerprints:
+            fingerprints[schema_hash] = cached_fingerprints[schema_hash]
+        else:
+            fingerprints[schema_hash] = build_schema([str(path)])
+    types = _merge_fingerprints(fingerprints)
+    if not types:
+        raise ValueError(f"数据集无可用 schema: {DATASET_PATTERNS[dataset]}")
+    return types, fingerprints
+
+
+def save_schema(
+    dataset: str,
+    schema: dict[str, str],
+    fingerprints: dict[str, dict[str, str]] | None = None,
+):
+    """写入 schema 缓存 JSON (临时文件 + 原子替换)"""
     SCHEMA_DIR.mkdir(parents=True, exist_ok=True)
     payload = {
-        "version": 1,
+        "version": 2,
         "built_at": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
         "column_count": len(schema),
         "columns": schema,
+        "fingerprints": fingerprints or {},
     }
     path = SCHEMA_DIR / f"{dataset}.json"
-    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+    temp_path.write_text(
+        json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
+    )
+    os.replace(temp_path, path)
     logger.info(f"schema 缓存已写入: {path} ({len(schema)} 列)")
 
 
-def load_schema(dataset: str) -> dict[str, str] | None:
-    """读取 schema 缓存；缺失/损坏返回 None"""
+def _load_payload(dataset: str) -> dict | None:
     path = SCHEMA_DIR / f"{dataset}.json"
     if not path.exists():
         return None
     try:
         payload = json.loads(path.read_text(encoding="utf-8"))
-        cols = payload.get("columns")
-        if not isinstance(cols, dict) or not cols:
-            return None
-        return cols
     except (json.JSONDecodeError, OSError):
         return None
+    if not isinstance(payload, dict):
+        return None
+    return payload
+
+
+def load_schema(dataset: str) -> dict[str, str] | None:
+    """读取 schema 缓存；缺失/损坏返回 None"""
+    payload = _load_payload(dataset)
+    if payload is None:
+        return None
+    cols = payload.get("columns")
+    if not isinstance(cols, dict) or not cols:
+        return None
+    return cols
+
+
+def _load_fingerprints(dataset: str) -> dict[str, dict[str, str]]:
+    payload = _load_payload(dataset) or {}
+    fingerprints = payload.get("fingerprints")
+    return fingerprints if isinstance(fingerprints, dict) else {}
 
 
 def ensure_schema(dataset: str) -> dict[str, str]:
@@ -100,22 +174,59 @@ def ensure_schema(dataset: str) -> dict[str, str]:
     cached = load_schema(dataset)
     if cached is not None:
         return cached
-    pattern = DATASET_PATTERNS.get(dataset)
-    if pattern is None:
-        raise ValueError(f"未知数据集: {dataset}")
+    _dataset_category(dataset)
     logger.warning(f"schema 缓存缺失，自动重建: {dataset}")
-    schema = build_schema(pattern)
-    save_schema(dataset, schema)
+    schema, fingerprints = build_schema_incremental(dataset)
+    save_schema(dataset, schema, fingerprints)
     return schema
 
 
 def rebuild_dataset(dataset: str):
-    """重建单个数据集的 schema 缓存"""
-    pattern = DATASET_PATTERNS.get(dataset)
-    if pattern is None:
-        raise ValueError(f"未知数据集: {dataset}")
-    schema = build_schema(pattern)
-    save_schema(dataset, schema)
+    """重建单个数据集的 schema 缓存 (只读取 mtime/size 变化文件的 footer)"""
+    _dataset_category(dataset)
+    schema, fingerprints = build_schema_incremental(
+        dataset, _load_fingerprints(dataset)
+    )
+    save_schema(dataset, schema, fingerprints)
+
+
+def extend_schema(
+    warehouse_dir: str | Path, category: str, fingerprints: dict[str, Path]
+) -> bool:
+    """
+    分区写入后就地扩展 schema 缓存, 返回缓存是否变化。
+
+    只处理缓存中未登记的 schema 指纹 (每个指纹读取一个 footer); 缓存缺失时留给
+    ensure_schema 按需重建。仅作用于视图所用的数据仓库。
+    """
+    if Path(warehouse_dir).resolve() != Path(WAREHOUSE_DIR).resolve():
+        return False
+    dataset = next(
+        (
+            name
+            for name, pattern in DATASET_PATTERNS.items()
+            if pattern.removesuffix("/*/*.parquet") == category
+        ),
+        None,
+    )
+    if dataset is None:
+        return False
+    with _extend_lock:
+        payload = _load_payload(dataset)
+        if payload is None or not isinstance(payload.get("columns"), dict):
+            return False
+        known = _load_fingerprints(dataset)
+        pending = {h: p for h, p in fingerprints.items() if h not in known}
+        if not pending:
+            return False
+        for schema_hash, path in pending.items():
+            known[schema_hash] = build_schema([str(path)])
+        columns = _merge_fingerprints({"_cached": payload["columns"], **known})
+        save_schema(dataset, columns, known)
+        added = sorted(set(columns) - set(payload["columns"]))
+        if added:
+            logger.info(f"schema 缓存新增列: {dataset} {', '.join(added)}")
+        return True
 
 
 def rebuild_all():
@@ -1,3 +1,6 @@
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
 from datetime import date
 
 from storage.database.manager import db_manager
@@ -15,44 +18,189 @@ DATASET_SYNC_ALL = "sync_all"
 # sync-all 全流程记录为单条记录, symbol 固定占位符
 SYMBOL_SYNC_ALL = "ALL"
 
+# 待办标记: 记录"仍有未完成工作", 丢失后无法从数据本身推断, 必须立即落盘。
+# 其余记录 (同步成功水位、待办标记的清除) 丢失只会导致重跑, 可以批量提交。
+WRITE_THROUGH_DATASETS = frozenset(
+    {
+        DATASET_FINANCIAL_OFFICIAL_PENDING,
+        DATASET_FINANCIAL_TTM_PENDING,
+        DATASET_FINANCIAL_DATE_RECONCILIATION_PENDING,
+    }
+)
+# 缓存中累计的待写记录达到该条数即提交一次事务
+FLUSH_BATCH_SIZE = 200
+
+_UPSERT_SQL = """
+    INSERT INTO sync_status (dataset, symbol, last_sync_date, updated_at)
+    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT (dataset, symbol) DO UPDATE SET
+        last_sync_date = excluded.last_sync_date,
+        updated_at = CURRENT_TIMESTAMP
+"""
+_DELETE_SQL = "DELETE FROM sync_status WHERE dataset = ? AND symbol = ?"
+
+
+def _parse_date(value) -> date | None:
+    return date.fromisoformat(value) if value else None
+
+
+class SyncStatusCache:
+    """同步状态的内存缓存: 按数据集一次性批量加载, 写入攒批后单事务提交
+
+    崩溃安全与逐行提交一致: 调用方只在数据落盘后才记录成功, 因此未提交的
+    成功记录丢失只会让对应股票在下次运行时重新同步; 待办标记
+    (``WRITE_THROUGH_DATASETS``) 的新增会连同此前累积的记录立即提交。
+    """
+
+    def __init__(
+        self, datasets: tuple[str, ...] = (), batch_size: int = FLUSH_BATCH_SIZE
+    ):
+        self.batch_size = batch_size
+        self._rows: dict[tuple[str, str], date | None] = {}
+        self._loaded: set[str] = set()
+        self._pending: list[tuple[str, tuple]] = []
+        self._lock = threading.RLock()
+        self.preload(*datasets)
+
+    def preload(self, *datasets: str) -> None:
+        """一次查询加载尚未缓存的数据集的全部记录"""
+        with self._lock:
+            missing = [dataset for dataset in datasets if dataset not in self._loaded]
+            if not missing:
+                return
+            placeholders = ", ".join("?" for _ in missing)
+            conn = db_manager.get_sqlite_conn()
+            with db_manager.sqlite_lock:
+                rows = conn.execute(
+                    "SELECT dataset, symbol, last_sync_date FROM sync_status"
+                    f" WHERE dataset IN ({placeholders})",
+                    missing,
+                ).fetchall()
+            for dataset, symbol, last_sync_date in rows:
+                self._rows[(dataset, symbol)] = _parse_date(last_sync_date)
+            self._loaded.update(missing)
+
+    def get_last_sync_date(self, dataset: str, symbol: str) -> date | None:
+        with self._lock:
+            self.preload(dataset)
+            return self._rows.get((dataset, symbol))
+
+    def record_sync_success(self, dataset: str, symbol: str, sync_date: date) -> None:
+        with self._lock:
+            self._rows[(dataset, symbol)] = sync_date
+            self._pending.append(
+                (_UPSERT_SQL, (dataset, symbol, sync_date.isoformat()))
+            )
+            if (
+                dataset in WRITE_THROUGH_DATASETS
+                or len(self._pending) >= self.batch_size
+            ):
+                self.flush()
+
+    def clear_sync_status(self, dataset: str, symbol: str) -> None:
+        with self._lock:
+            self._rows[(dataset, symbol)] = None
+            self._pending.append((_DELETE_SQL, (dataset, symbol)))
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def defer_write(self, sql: str, params: tuple) -> None:
+        """附带写入 (如任务队列状态) 与同步状态记录攒入同一批次提交"""
+        with self._lock:
+            self._pending.append((sql, params))
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self) -> None:
+        """按写入顺序在单个事务中提交累积的记录"""
+        with self._lock:
+            if not self._pending:
+                return
+            with db_manager.sqlite_transaction() as conn:
+                for sql, params in self._pending:
+                    conn.execute(sql, params)
+            logger.debug(f"同步状态批量提交 {len(self._pending)} 条")
+            self._pending.clear()
+
+
+_active_cache: SyncStatusCache | None = None
+_active_users = 0
+_active_lock = threading.Lock()
+
+
+@contextmanager
+def sync_status_cache(*datasets: str) -> Iterator[SyncStatusCache]:
+    """在上下文内让模块级读写函数经由共享的 ``SyncStatusCache``
+
+    可重入且跨线程共享: 并行运行的同步环节各自进入时复用同一个缓存 (并预加载
+    各自的数据集), 最后一个退出者提交剩余记录并卸载缓存。上下文异常退出时同样
+    提交, 已记录的成功均对应已落盘的数据。
+    """
+    global _active_cache, _active_users
+    with _active_lock:
+        if _active_cache is None:
+            _active_cache = SyncStatusCache()
+        cache = _active_cache
+        _active_users += 1
+    try:
+        cache.preload(*datasets)
+        yield cache
+    finally:
+        with _active_lock:
+            _active_users -= 1
+            if _active_users == 0:
+                _active_cache = None
+                # 卸载前已取到缓存引用的写入方此后逐条提交, 不再滞留
+                cache.batch_size = 1
+        cache.flush()
+
 
 def record_sync_success(dataset: str, symbol: str, sync_date: date) -> None:
     """记录数据集在指定日期的同步成功 (UPSERT, 幂等)"""
-    conn = db_manager.get_sqlite_conn()
-    conn.execute(
-        """
-        INSERT INTO sync_status (dataset, symbol, last_sync_date, updated_at)
-        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-        ON CONFLICT (dataset, symbol) DO UPDATE SET
-            last_sync_date = excluded.last_sync_date,
-            updated_at = CURRENT_TIMESTAMP
-        """,
-        (dataset, symbol, sync_date.isoformat()),
-    )
-    conn.commit()
+    cache = _active_cache
+    if cache is not None:
+        cache.record_sync_success(dataset, symbol, sync_date)
+    else:
+        with db_manager.sqlite_transaction() as conn:
+            conn.execute(_UPSERT_SQL, (dataset, symbol, sync_date.isoformat()))
     logger.debug(f"记录同步成功: {dataset}/{symbol} @ {sync_date}")
 
 
 def clear_sync_status(dataset: str, symbol: str) -> None:
     """删除指定数据集和股票的同步状态记录。"""
-    conn = db_manager.get_sqlite_conn()
-    conn.execute(
-        "DELETE FROM sync_status WHERE dataset = ? AND symbol = ?",
-        (dataset, symbol),
-    )
-    conn.commit()
+    cache = _active_cache
+    if cache is not None:
+        cache.clear_sync_status(dataset, symbol)
+        return
+    with db_manager.sqlite_transaction() as conn:
+        conn.execute(_DELETE_SQL, (dataset, symbol))
+
+
+def defer_sync_write(sql: str, params: tuple) -> None:
+    """随同步状态批次提交一条附带写入; 无活动缓存时立即提交
+
+    仅用于丢失后只会导致重跑的记录, 与同步成功水位的崩溃语义一致。
+    """
+    cache = _active_cache
+    if cache is not None:
+        cache.defer_write(sql, params)
+        return
+    with db_manager.sqlite_transaction() as conn:
+        conn.execute(sql, params)
 
 
 def get_last_sync_date(dataset: str, symbol: str) -> date | None:
     """查询数据集最近一次同步成功日期, 无记录返回 None"""
+    cache = _active_cache
+    if cache is not None:
+        return cache.get_last_sync_date(dataset, symbol)
     conn = db_manager.get_sqlite_conn()
-    row = conn.execute(
-        "SELECT last_sync_date FROM sync_status WHERE dataset = ? AND symbol = ?",
-        (dataset, symbol),
-    ).fetchone()
-    if row is None or not row[0]:
-        return None
-    return date.fromisoformat(row[0])
+    with db_manager.sqlite_lock:
+        row = conn.execute(
+            "SELECT last_sync_date FROM sync_status WHERE dataset = ? AND symbol = ?",
+            (dataset, symbol),
+        ).fetchone()
+    return _parse_date(row[0]) if row is not None else None
 
 
 def is_synced_today(dataset: str, symbol: str, today: date | None = None) -> bool:
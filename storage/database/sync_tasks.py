@@ -0,0 +1,146 @@
+"""同步环节的逐股任务队列 (SQLite 持久化)
+
+定时 sync-all 未全部成功时整体重试, 过去每次重跑都要重新发现候选股 (分页拉取
+四个报告期的披露计划、孤儿扫描、逐股增量检查)。任务队列把每个环节发现的逐股
+任务连同状态与尝试次数写入 ``sync_tasks`` 表:
+
+- 同一批次 (定时调度的数据日) 内重试: 跳过候选发现, 直接续跑未完成的任务;
+  已全部完成的环节不再执行。
+- 新批次 (次日运行): 重新发现候选, 并入上一批次遗留的未完成任务 (保留尝试次数)。
+
+任务状态: pending (待执行) → done / failed / blocked (新浪 IP 风控), 进入终态时
+尝试次数 +1。"执行中"不落盘: 终态随同步状态缓存攒批提交 (见
+``defer_sync_write``), 进程崩溃时尚未提交的任务仍为 pending/failed/blocked,
+续跑时重新执行, 与同步成功水位丢失只导致重跑的语义一致。
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+from functools import wraps
+from typing import Any
+
+from storage.database.manager import db_manager
+from storage.database.sync_status import defer_sync_write
+from utils.logger import logger
+from utils.requests_protection import SinaBlockedError
+
+STATE_PENDING = "pending"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+STATE_BLOCKED = "blocked"
+
+# 任务失败信息只保留前若干字符, 供排查
+ERROR_MESSAGE_LIMIT = 500
+
+
+class SyncTaskQueue:
+    """单个同步环节在某个批次内的逐股任务队列"""
+
+    def __init__(self, stage: str, batch: str):
+        self.stage = stage
+        self.batch = batch
+
+    def _remaining(self, conn) -> list[str]:
+        rows = conn.execute(
+            "SELECT symbol FROM sync_tasks WHERE stage = ? AND state != ?"
+            " ORDER BY symbol",
+            (self.stage, STATE_DONE),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def resume_or_discover(self, discover: Callable[[], Iterable[str]]) -> list[str]:
+        """返回本批次待执行的股票代码
+
+        本批次已发现过候选时直接返回未完成任务; 否则调用 ``discover`` 发现候选,
+        并入上一批次遗留的未完成任务后整体替换为本批次的待执行任务。
+        """
+        conn = db_manager.get_sqlite_conn()
+        with db_manager.sqlite_lock:
+            row = conn.execute(
+                "SELECT batch FROM sync_task_batches WHERE stage = ?", (self.stage,)
+            ).fetchone()
+            if row is not None and row[0] == self.batch:
+                remaining = self._remaining(conn)
+                logger.info(
+                    f"{self.stage} 环节续跑批次 {self.batch}: 剩余 {len(remaining)} 项任务"
+                )
+                return remaining
+            leftovers = self._remaining(conn)
+
+        symbols = set(discover()) | set(leftovers)
+        with db_manager.sqlite_transaction() as conn:
+            conn.execute(
+                "DELETE FROM sync_tasks WHERE stage = ? AND state = ?",
+                (self.stage, STATE_DONE),
+            )
+            conn.execute(
+                "UPDATE sync_tasks SET state = ?, batch = ? WHERE stage = ?",
+                (STATE_PENDING, self.batch, self.stage),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO sync_tasks (stage, symbol, batch, state)"
+                " VALUES (?, ?, ?, ?)",
+                [(self.stage, s, self.batch, STATE_PENDING) for s in symbols],
+            )
+            conn.execute(
+                """
+                INSERT INTO sync_task_batches (stage, batch, updated_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (stage) DO UPDATE SET
+                    batch = excluded.batch,
+                    updated_at = CURRENT_TIMESTAMP
+                """,
+                (self.stage, self.batch),
+            )
+        if leftovers:
+            logger.info(f"{self.stage} 环节并入上一批次遗留任务 {len(leftovers)} 项")
+        return sorted(symbols)
+
+    def _finish(self, symbol: str, state: str, error: str | None = None) -> None:
+        defer_sync_write(
+            "UPDATE sync_tasks SET state = ?, attempts = attempts + 1,"
+            " last_error = ?, updated_at = CURRENT_TIMESTAMP"
+            " WHERE stage = ? AND symbol = ?",
+            (state, error, self.stage, symbol),
+        )
+
+    def mark_done(self, symbols: Iterable[str]) -> None:
+        """批量标记任务完成 (环节以批量方式处理的股票)"""
+        with db_manager.sqlite_transaction() as conn:
+            conn.executemany(
+                "UPDATE sync_tasks SET state = ?, updated_at = CURRENT_TIMESTAMP"
+                " WHERE stage = ? AND symbol = ?",
+                [(STATE_DONE, self.stage, s) for s in symbols],
+            )
+
+    def track(
+        self,
+        func: Callable[[Any], Any],
+        key: Callable[[Any], str] = str,
+        succeeded: Callable[[Any], bool] | None = None,
+    ) -> Callable[[Any], Any]:
+        """包装逐股任务函数, 执行结束后记录任务终态
+
+        :param key: 从任务参数取股票代码
+        :param succeeded: 根据返回值判定任务是否完成 (默认不抛异常即完成)
+        """
+
+        @wraps(func)
+        def wrapper(item):
+            symbol = key(item)
+            try:
+                result = func(item)
+            except SinaBlockedError as e:
+                self._finish(symbol, STATE_BLOCKED, str(e)[:ERROR_MESSAGE_LIMIT])
+                raise
+            except Exception as e:
+                self._finish(symbol, STATE_FAILED, str(e)[:ERROR_MESSAGE_LIMIT])
+                raise
+            if succeeded is None or succeeded(result):
+                self._finish(symbol, STATE_DONE)
+            else:
+                self._finish(symbol, STATE_FAILED)
+            return result
+
+        return wrapper
@@ -0,0 +1,199 @@
+"""日线估值 SQL 生成
+
+``v_daily_valuation`` 视图与回测数据访问共用同一套 CTE 与 ASOF JOIN 片段:
+视图输出全部估值字段, ``BacktestDataAccess`` 按因子输入只生成所需的关联,
+未被请求的 TTM / 净资产 / 股本历史不参与扫描与 ASOF JOIN。
+"""
+
+from collections.abc import Iterable
+
+# 历史来源 -> 所依赖的视图; 顺序即 ASOF JOIN 顺序
+VALUATION_SOURCE_VIEWS = {
+    "capital": "share_capital",
+    "ttm": "fin_ttm",
+    "assets": "fin_balance_sheet",
+}
+
+# 估值字段 -> (SQL 表达式, 所需历史来源)
+_FIELD_DEFINITIONS = {
+    "raw_close": ("k.close", ()),
+    "close_hfq": ("(k.close * k.adj_factor)", ()),
+    "total_shares": ("s.total_shares", ("capital",)),
+    "market_cap": ("(k.close * s.total_shares)", ("capital",)),
+    "pe_ttm": (
+        "(k.close * s.total_shares) / NULLIF(t.net_profit_ttm, 0)",
+        ("capital", "ttm"),
+    ),
+    "pe_deduct_ttm": (
+        "(k.close * s.total_shares) / NULLIF(t.deduct_net_profit_ttm, 0)",
+        ("capital", "ttm"),
+    ),
+    "pb": (
+        "(k.close * s.total_shares) / NULLIF(a.net_assets, 0)",
+        ("capital", "assets"),
+    ),
+    "ps_ttm": (
+        "(k.close * s.total_shares) / NULLIF(t.revenue_ttm, 0)",
+        ("capital", "ttm"),
+    ),
+    "pcf_ttm": (
+        "(k.close * s.total_shares) / NULLIF(t.ocf_ttm, 0)",
+        ("capital", "ttm"),
+    ),
+}
+
+VALUATION_FIELDS = tuple(_FIELD_DEFINITIONS)
+
+_SOURCE_CTES = {
+    "capital": """
+            -- 2. 准备股本历史
+            capital_hist AS (
+                SELECT symbol, change_date, total_shares
+                FROM share_capital
+            )""",
+    "ttm": """
+            -- 3. 准备财务 TTM 历史
+            ttm_source AS (
+                SELECT
+                    symbol,
+                    pub_date,
+                    report_date,
+                    net_profit_ttm,
+                    deduct_net_profit_ttm,
+                    revenue_ttm,
+                    ocf_ttm,
+                    md5(concat_ws(
+                        '|',
+                        COALESCE(CAST(report_date AS VARCHAR), '<NULL>'),
+                        COALESCE(CAST(net_profit_ttm AS VARCHAR), '<NULL>'),
+                        COALESCE(CAST(deduct_net_profit_ttm AS VARCHAR), '<NULL>'),
+                        COALESCE(CAST(revenue_ttm AS VARCHAR), '<NULL>'),
+                        COALESCE(CAST(ocf_ttm AS VARCHAR), '<NULL>')
+                    )) AS record_tie_breaker
+                FROM fin_ttm
+            ),
+            ttm_hist AS (
+                SELECT symbol, pub_date, net_profit_ttm, deduct_net_profit_ttm, revenue_ttm, ocf_ttm
+                FROM ttm_source
+                QUALIFY ROW_NUMBER() OVER (
+                    PARTITION BY symbol, pub_date
+                    ORDER BY report_date DESC, record_tie_breaker DESC
+                ) = 1
+            )""",
+    "assets": """
+            -- 4. 准备净资产历史
+            assets_source AS (
+                SELECT
+                    symbol,
+                    COALESCE(数据可用日期, 公告日期) as pub_date,
+                    report_date,
+                    "归属于母公司股东权益合计" as net_assets,
+                    md5(concat_ws(
+                        '|',
+                        COALESCE(CAST(report_date AS VARCHAR), '<NULL>'),
+                        COALESCE(CAST("归属于母公司股东权益合计" AS VARCHAR), '<NULL>')
+                    )) AS record_tie_breaker
+                FROM fin_balance_sheet
+            ),
+            assets_hist AS (
+                SELECT
+                    symbol,
+                    pub_date,
+                    report_date,
+                    net_assets
+                FROM assets_source
+                QUALIFY ROW_NUMBER() OVER (
+                    PARTITION BY symbol, pub_date
+                    ORDER BY report_date DESC, record_tie_breaker DESC
+                ) = 1
+            )""",
+}
+
+_SOURCE_JOINS = {
+    "capital": """
+            ASOF JOIN capital_hist s
+                ON k.symbol = s.symbol AND k.date >= s.change_date""",
+    "ttm": """
+            ASOF JOIN ttm_hist t
+                ON k.symbol = t.symbol AND k.date >= t.pub_date""",
+    "assets": """
+            ASOF JOIN assets_hist a
+                ON k.symbol = a.symbol AND k.date >= a.pub_date""",
+}
+
+
+def _validate_fields(fields: Iterable[str]) -> tuple[str, ...]:
+    requested = tuple(dict.fromkeys(fields))
+    unknown = set(requested) - set(_FIELD_DEFINITIONS)
+    if unknown:
+        raise ValueError("不支持的估值字段: " + ", ".join(sorted(unknown)))
+    return requested
+
+
+def get_required_sources(fields: Iterable[str]) -> tuple[str, ...]:
+    """返回字段集合所需的历史来源 (按 ASOF JOIN 顺序)"""
+    needed = {
+        source
+        for field in _validate_fields(fields)
+        for source in _FIELD_DEFINITIONS[field][1]
+    }
+    return tuple(source for source in VALUATION_SOURCE_VIEWS if source in needed)
+
+
+def get_required_views(fields: Iterable[str]) -> tuple[str, ...]:
+    """返回字段集合所需注册的视图"""
+    return (
+        "daily_kline",
+        *(VALUATION_SOURCE_VIEWS[s] for s in get_required_sources(fields)),
+    )
+
+
+def build_valuation_sql(
+    fields: Iterable[str] = VALUATION_FIELDS,
+    kline_columns: Iterable[str] = (),
+    kline_filter: str | None = None,
+) -> str:
+    """生成按字段裁剪的日线估值查询
+
+    Args:
+        fields: 需要输出的估值字段, 仅关联这些字段依赖的历史来源。
+        kline_columns: 额外透传的 daily_kline 原始列 (如 open, volume)。
+        kline_filter: 作用于基础行情 CTE 的过滤条件 (可含 ? 占位符),
+            列 ``date`` 为 DATE 类型。
+    """
+    requested = _validate_fields(fields)
+    sources = get_required_sources(requested)
+    extra_columns = list(dict.fromkeys(kline_columns))
+
+    base_columns = ", ".join(
+        ["symbol", "date", "close", "adj_factor"]
+        + [f'"{column}"' for column in extra_columns]
+    )
+    base_filter = f"\n                WHERE {kline_filter}" if kline_filter else ""
+    ctes = [
+        f"""
+            -- 1. 准备基础行情
+            base_kline AS (
+                SELECT * FROM (
+                    SELECT {base_columns}
+                    FROM daily_kline
+                ){base_filter}
+            )"""
+    ]
+    ctes.extend(_SOURCE_CTES[source] for source in sources)
+
+    projections = ["k.date", "k.symbol"]
+    projections.extend(
+        f"{_FIELD_DEFINITIONS[field][0]} AS {field}" for field in requested
+    )
+    projections.extend(f'k."{column}" AS "{column}"' for column in extra_columns)
+    select_list = ",\n                ".join(projections)
+    joins = "".join(_SOURCE_JOINS[source] for source in sources)
+
+    return f"""
+            WITH{",".join(ctes)}
+
+            SELECT
+                {select_list}
+            FROM base_kline k{joins}
+        """
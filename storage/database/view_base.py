@@ -1,14 +1,23 @@
 from abc import ABC, abstractmethod
 
-from .schema_builder import ensure_schema
+from storage.file_store.parquet_store import DELTA_KEY_COLUMNS, DELTA_PREFIX
+from utils.logger import logger
 
+from .schema_builder import DATASET_PATTERNS, ensure_schema
+from .warehouse_compaction import get_compacted_dir, get_dataset_delta
 
-def build_schema_map_expr(dataset: str) -> str:
+# 增量股票占比超过该阈值时, 压实副本收益有限, 直接读取全部逐股分片
+COMPACTION_DELTA_RATIO_LIMIT = 0.5
+
+
+def build_schema_map_expr(
+    dataset: str, extra_columns: dict[str, str] | None = None
+) -> str:
     """
     根据 schema 缓存生成 read_parquet 的 schema MAP 表达式。
     缓存缺失时自动重建。
     """
-    schema: dict[str, str] = ensure_schema(dataset)
+    schema: dict[str, str] = {**ensure_schema(dataset), **(extra_columns or {})}
     parts = [
         f"'{name}': {{'name': '{name}', 'type': '{dtype}', 'default_value': NULL}}"
         for name, dtype in sorted(schema.items())
@@ -20,6 +29,90 @@ def build_schema_map_expr(dataset: str) -> str:
     )
 
 
+def _sql_list(values) -> str:
+    return "[" + ", ".join("'" + str(v).replace("'", "''") + "'" for v in values) + "]"
+
+
+def build_per_symbol_sql(dataset: str, source: str, schema_expr: str) -> str:
+    """
+    生成逐股分片的查询体。
+
+    支持追加模式的数据集 (见 ``DELTA_KEY_COLUMNS``) 的分区目录下可能存在增量文件:
+    增量行覆盖 data.parquet 中的同键行, 多个增量文件间以文件名 (写入时间戳) 最新者为准。
+    两路读取按 filename 过滤, 无增量时反连接的构建侧为空, 开销只在扫描文件列表。
+    """
+    read_sql = rf"""SELECT *, regexp_extract(filename, 'symbol=(\d+)', 1) AS symbol
+            FROM read_parquet({source}, filename=true, schema={schema_expr})"""
+    category = DATASET_PATTERNS[dataset].removesuffix("/*/*.parquet")
+    key_columns = DELTA_KEY_COLUMNS.get(category)
+    if not key_columns:
+        return f"""
+            {read_sql}"""
+
+    delta_filter = f"filename LIKE '%/{DELTA_PREFIX}%'"
+    join_keys = " AND ".join(
+        f'base."{column}" = delta."{column}"' for column in ("symbol", *key_columns)
+    )
+    partition_keys = ", ".join(f'"{column}"' for column in ("symbol", *key_columns))
+    return f"""
+            SELECT base.* FROM (
+            {read_sql}
+            WHERE NOT {delta_filter}) AS base
+            ANTI JOIN (
+            {read_sql}
+            WHERE {delta_filter}) AS delta
+            ON {join_keys}
+            UNION ALL BY NAME
+            {read_sql}
+            WHERE {delta_filter}
+            QUALIFY row_number() OVER (PARTITION BY {partition_keys} ORDER BY filename DESC) = 1"""
+
+
+def build_dataset_source_sql(dataset: str, warehouse_dir: str) -> str:
+    """
+    生成基础数据集视图的查询体 (含 symbol 列)。
+
+    未压实时读取全部逐股分片; 已压实时读取按年分桶的压实副本, 排除压实后又写入的
+    股票, 这些股票改从逐股分片读取。年份桶与增量股票的分区文件以 glob 引用, 查询时
+    展开: 后台合并删除增量文件、重新压实替换年份桶都不会使视图引用失效。增量股票
+    集合在生成时确定, 变化后由 ``DBManager.ensure_views`` 重新注册视图。
+    """
+    schema_expr = build_schema_map_expr(dataset)
+    per_symbol_sql = build_per_symbol_sql(
+        dataset, f"'{warehouse_dir}/{DATASET_PATTERNS[dataset]}'", schema_expr
+    )
+
+    delta = get_dataset_delta(dataset, warehouse_dir)
+    if (
+        not delta.compacted
+        or not delta.bucket_files
+        or delta.delta_symbol_count > COMPACTION_DELTA_RATIO_LIMIT * delta.symbol_count
+    ):
+        return per_symbol_sql
+
+    compacted_schema = build_schema_map_expr(dataset, {"symbol": "VARCHAR"})
+    bucket_glob = _sql_list(
+        [get_compacted_dir(dataset, warehouse_dir) / "year=*" / "data.parquet"]
+    )
+    compacted_sql = f"""
+            SELECT * EXCLUDE (symbol), symbol
+            FROM read_parquet({bucket_glob}, filename=true, hive_partitioning=false, schema={compacted_schema})"""
+    if delta.excluded_symbols:
+        compacted_sql += f"\n            WHERE symbol NOT IN (SELECT unnest({_sql_list(delta.excluded_symbols)}))"
+    if not delta.delta_files:
+        return compacted_sql
+    logger.debug(f"{dataset} 视图读取 {delta.delta_symbol_count} 个逐股增量分区")
+    delta_sql = build_per_symbol_sql(
+        dataset,
+        _sql_list(path / "*.parquet" for path in delta.delta_partitions),
+        schema_expr,
+    )
+    return f"""
+            SELECT * FROM ({compacted_sql})
+            UNION ALL BY NAME
+            SELECT * FROM ({delta_sql})"""
+
+
 class DuckDBView(ABC):
     """
     DuckDB 视图定义基类。
@@ -1,11 +1,9 @@
-from storage.database.view_base import DuckDBView, build_schema_map_expr
+from storage.database.view_base import DuckDBView, build_dataset_source_sql
 
 
 class BalanceSheetView(DuckDBView):
     name = "fin_balance_sheet"
 
     def get_sql(self, warehouse_dir: str) -> str:
-        schema_expr = build_schema_map_expr(self.name)
-        return rf"""CREATE OR REPLACE VIEW {self.name} AS
-            SELECT *, regexp_extract(filename, 'symbol=(\d+)', 1) AS symbol
-            FROM read_parquet('{warehouse_dir}/financial_statements/type=balance/*/*.parquet', filename=true, schema={schema_expr})"""
+        source_sql = build_dataset_source_sql(self.name, warehouse_dir)
+        return f"""CREATE OR REPLACE VIEW {self.name} AS{source_sql}"""
@@ -0,0 +1,495 @@
+"""数据仓库完整性巡检
+
+对全部数据集做一次整体体检, 产出按 (数据集, 股票) 归类的机器可读报告:
+
+- 文件级 (线程池逐个分区目录): 残留的 ``.tmp_*`` / ``.backup_*`` 临时文件、footer
+  无法读取的分片; 数据仓库级: 写入进程已退出但未前滚的提交日志。
+- schema 漂移 (``parquet_schema`` 单次聚合): 分片中出现缓存未登记的列, 或列类型比
+  缓存更宽 (视图按缓存类型读取会截断或报错)。
+- 日期列 (DuckDB 聚合, 每个数据集一条查询): 单个分片内的空日期、重复日期与非升序行。
+- 行情序列 (按视图的查询体读取合并增量后的有效数据): 相对交易
+  日历的缺口与非交易日行, ``adj_factor`` 非正、下降或异常跳升。
+
+各数据集在线程池中并行检查, 每个数据集使用独立的 DuckDB 连接; 全部检查只读数据仓库,
+不在 Python 中逐股加载 DataFrame。停牌会造成合法的交易日缺口, 因此缺口只作为警告。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+
+import duckdb
+import pyarrow.parquet as pq
+
+from config.settings import LOG_DIR, WAREHOUSE_DIR
+from storage.file_store.atomic_partition_store import JOURNAL_DIR
+
+from .schema_builder import DATASET_PATTERNS, _wider_type, load_schema
+from .view_base import _sql_list, build_per_symbol_sql, build_schema_map_expr
+from .warehouse_compaction import DATASET_DATE_COLUMNS
+
+REPORT_FILE = LOG_DIR / "warehouse_check.json"
+CALENDAR_FILE = Path("metadata") / "trade_calendar.parquet"
+
+TEMP_FILE_PREFIXES = (".tmp_", ".backup_")
+# 最近修改的临时文件可能属于正在进行的写入, 不视为残留
+STALE_TEMP_SECONDS = 3600
+# 复权因子由四舍五入后的价格相除得到, 低价股相邻日存在千分之几的噪声
+ADJ_FACTOR_DROP_TOLERANCE = 0.02
+ADJ_FACTOR_JUMP_LIMIT = 5.0
+SAMPLE_LIMIT = 5
+
+SEVERITY_ERROR = "error"
+SEVERITY_WARNING = "warning"
+
+# 需要检查交易日连续性与复权因子的行情数据集
+SERIES_DATASETS = ("daily_kline", "etf_kline")
+
+
+@dataclass(frozen=True)
+class WarehouseIssue:
+    """一条巡检问题; symbol 为 None 表示数据集级问题"""
+
+    check: str
+    severity: str
+    symbol: str | None = None
+    count: int = 1
+    detail: str = ""
+
+
+def _base_dir(warehouse_dir: str | Path | None) -> Path:
+    return Path(warehouse_dir) if warehouse_dir is not None else Path(WAREHOUSE_DIR)
+
+
+def _category(dataset: str) -> str:
+    return DATASET_PATTERNS[dataset].removesuffix("/*/*.parquet")
+
+
+def _symbol_of(path: str | Path) -> str:
+    return Path(path).parent.name.removeprefix("symbol=")
+
+
+def _format_samples(values) -> str:
+    return ", ".join(str(value) for value in list(values)[:SAMPLE_LIMIT])
+
+
+def _scan_partition(partition_dir: Path) -> tuple[list[Path], list[WarehouseIssue]]:
+    """单个分区目录的文件级检查, 返回 (可读分片, 问题)"""
+    symbol = partition_dir.name.removeprefix("symbol=")
+    now = time.time()
+    files: list[Path] = []
+    leftovers: list[str] = []
+    unreadable: list[str] = []
+    try:
+        entries = list(os.scandir(partition_dir))
+    except FileNotFoundError:
+        return [], []
+    for entry in entries:
+        if entry.name.startswith(TEMP_FILE_PREFIXES):
+            try:
+                if now - entry.stat().st_mtime >= STALE_TEMP_SECONDS:
+                    leftovers.append(entry.name)
+            except FileNotFoundError:
+                pass
+            continue
+        if entry.name.startswith(".") or not entry.name.endswith(".parquet"):
+            continue
+        try:
+            pq.read_metadata(entry.path)
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            unreadable.append(f"{entry.name} ({e})")
+            continue
+        files.append(Path(entry.path))
+
+    issues = []
+    if leftovers:
+        issues.append(
+            WarehouseIssue(
+                "leftover_temp_files",
+                SEVERITY_WARNING,
+                symbol,
+                len(leftovers),
+                _format_samples(sorted(leftovers)),
+            )
+        )
+    if unreadable:
+        issues.append(
+            WarehouseIssue(
+                "unreadable_file",
+                SEVERITY_ERROR,
+                symbol,
+                len(unreadable),
+                _format_samples(sorted(unreadable)),
+            )
+        )
+    return sorted(files), issues
+
+
+def _check_schema(
+    conn: duckdb.DuckDBPyConnection, dataset: str, files: list[Path]
+) -> list[WarehouseIssue]:
+    """逐分片比较列类型与 schema 缓存"""
+    cached = load_schema(dataset)
+    if cached is None:
+        return [
+            WarehouseIssue(
+                "schema_cache_missing",
+                SEVERITY_ERROR,
+                detail="schema 缓存缺失, 执行 rebuild-schemas 重建",
+            )
+        ]
+    rows = conn.execute(
+        """
+        SELECT DISTINCT file_name, name, upper(coalesce(duckdb_type, 'VARCHAR'))
+        FROM parquet_schema(?)
+        WHERE name NOT IN ('schema_id', 'file_row_number', 'symbol')
+          AND num_children IS NULL
+        """,
+        [[str(path) for path in files]],
+    ).fetchall()
+    drift: dict[str, set[str]] = {}
+    for file_name, name, dtype in rows:
+        expected = cached.get(name)
+        if expected is None:
+            drift.setdefault(_symbol_of(file_name), set()).add(f"{name}: 缓存未登记")
+        elif _wider_type(expected, dtype) != expected:
+            drift.setdefault(_symbol_of(file_name), set()).add(
+                f"{name}: {dtype} (缓存 {expected})"
+            )
+    return [
+        WarehouseIssue(
+            "schema_drift",
+            SEVERITY_ERROR,
+            symbol,
+            len(columns),
+            _format_samples(sorted(columns)),
+        )
+        for symbol, columns in sorted(drift.items())
+    ]
+
+
+def _check_file_dates(
+    conn: duckdb.DuckDBPyConnection, dataset: str, files: list[Path]
+) -> list[WarehouseIssue]:
+    """单个分片内的空日期、重复日期与非升序行"""
+    column = DATASET_DATE_COLUMNS[dataset]
+    rows = conn.execute(
+        f"""
+        WITH rows AS (
+            SELECT filename, "{column}" AS d,
+                   lag("{column}") OVER (
+                       PARTITION BY filename ORDER BY file_row_number
+                   ) AS prev
+            FROM read_parquet(
+                ?, filename=true, file_row_number=true, union_by_name=true
+            )
+        ), duplicates AS (
+            SELECT filename, list(d ORDER BY d) AS samples
+            FROM (
+                SELECT filename, d FROM rows
+                WHERE d IS NOT NULL
+                GROUP BY filename, d
+                HAVING count(*) > 1
+            )
+            GROUP BY filename
+        ), per_file AS (
+            SELECT filename,
+                   count(*) FILTER (WHERE d IS NULL) AS null_dates,
+                   count(d) - count(DISTINCT d) AS duplicate_dates,
+                   count(*) FILTER (WHERE d < prev) AS unsorted_dates
+            FROM rows
+            GROUP BY filename
+        )
+        SELECT per_file.*, duplicates.samples
+        FROM per_file LEFT JOIN duplicates USING (filename)
+        WHERE null_dates > 0 OR duplicate_dates > 0 OR unsorted_dates > 0
+        ORDER BY filename
+        """,
+        [[str(path) for path in files]],
+    ).fetchall()
+    issues = []
+    for filename, null_dates, duplicates, unsorted, samples in rows:
+        symbol = _symbol_of(filename)
+        name = Path(filename).name
+        if null_dates:
+            issues.append(
+                WarehouseIssue("null_dates", SEVERITY_ERROR, symbol, null_dates, name)
+            )
+        if duplicates:
+            issues.append(
+                WarehouseIssue(
+                    "duplicate_dates",
+                    SEVERITY_ERROR,
+                    symbol,
+                    duplicates,
+                    f"{name}: {_format_samples(samples or [])}",
+                )
+            )
+        if unsorted:
+            issues.append(
+                WarehouseIssue(
+                    "unsorted_dates", SEVERITY_WARNING, symbol, unsorted, name
+                )
+            )
+    return issues
+
+
+def _register_series_view(
+    conn: duckdb.DuckDBPyConnection, dataset: str, files: list[Path]
+) -> None:
+    """按视图的逐股分片查询体 (增量覆盖去重) 注册同名视图, 只读取已确认可读的分片
+
+    视图的 glob 会匹配残留临时文件与损坏分片, 因此这里改用显式文件列表。
+    """
+    schema_expr = build_schema_map_expr(dataset)
+    source_sql = build_per_symbol_sql(
+        dataset, _sql_list(str(path) for path in files), schema_expr
+    )
+    conn.execute(f"CREATE OR REPLACE VIEW {dataset} AS{source_sql}")
+
+
+def _check_adj_factor(
+    conn: duckdb.DuckDBPyConnection, dataset: str
+) -> list[WarehouseIssue]:
+    """复权因子非正、下降或异常跳升 (送转、分红只会让后复权因子上升)"""
+    rows = conn.execute(
+        f"""
+        WITH s AS (
+            SELECT symbol, date, adj_factor,
+                   lag(adj_factor) OVER (PARTITION BY symbol ORDER BY date) AS prev
+            FROM {dataset}
+            WHERE date IS NOT NULL
+        ), flagged AS (
+            SELECT *,
+                   adj_factor IS NULL OR adj_factor <= 0 AS invalid,
+                   adj_factor < prev * (1 - ?) OR adj_factor > prev * ? AS broken
+            FROM s
+        )
+        SELECT symbol,
+               count(*) FILTER (WHERE invalid) AS invalid_count,
+               count(*) FILTER (WHERE broken AND NOT invalid) AS broken_count,
+               list(date ORDER BY date) FILTER (WHERE invalid) AS invalid_dates,
+               list(date ORDER BY date) FILTER (WHERE broken AND NOT invalid)
+                   AS broken_dates
+        FROM flagged
+        GROUP BY symbol
+        HAVING invalid_count > 0 OR broken_count > 0
+        ORDER BY symbol
+        """,
+        [ADJ_FACTOR_DROP_TOLERANCE, ADJ_FACTOR_JUMP_LIMIT],
+    ).fetchall()
+    issues = []
+    for symbol, invalid, broken, invalid_dates, broken_dates in rows:
+        if invalid:
+            issues.append(
+                WarehouseIssue(
+                    "adj_factor_invalid",
+                    SEVERITY_ERROR,
+                    symbol,
+                    invalid,
+                    _format_samples(invalid_dates),
+                )
+            )
+        if broken:
+            issues.append(
+                WarehouseIssue(
+                    "adj_factor_discontinuity",
+                    SEVERITY_WARNING,
+                    symbol,
+                    broken,
+                    _format_samples(broken_dates),
+                )
+            )
+    return issues
+
+
+def _check_calendar(
+    conn: duckdb.DuckDBPyConnection, dataset: str, calendar_path: Path
+) -> list[WarehouseIssue]:
+    """相对交易日历的缺口 (停牌也会产生, 仅警告) 与非交易日行"""
+    if not calendar_path.exists():
+        return [
+            WarehouseIssue(
+                "trade_calendar_missing",
+                SEVERITY_WARNING,
+                detail=f"交易日历缓存不存在, 跳过缺口检查: {calendar_path}",
+            )
+        ]
+    conn.execute(
+        """
+        CREATE OR REPLACE TEMP TABLE trade_calendar AS
+        SELECT d, row_number() OVER (ORDER BY d) AS idx
+        FROM (SELECT DISTINCT CAST(trade_date AS DATE) AS d FROM read_parquet(?))
+        WHERE d IS NOT NULL
+        """,
+        [str(calendar_path)],
+    )
+    rows = conn.execute(
+        f"""
+        WITH bounds AS (
+            SELECT min(d) AS first_day, max(d) AS last_day FROM trade_calendar
+        ), k AS (
+            SELECT DISTINCT symbol, date FROM {dataset}, bounds
+            WHERE date BETWEEN first_day AND last_day
+        ), span AS (
+            SELECT k.symbol, min(k.date) AS lo, max(k.date) AS hi,
+                   count(c.d) AS present,
+                   count(*) FILTER (WHERE c.d IS NULL) AS non_trade,
+                   list(k.date ORDER BY k.date) FILTER (WHERE c.d IS NULL)
+                       AS non_trade_dates
+            FROM k LEFT JOIN trade_calendar c ON k.date = c.d
+            GROUP BY k.symbol
+        ), first_idx AS (
+            SELECT span.symbol, c.idx FROM span
+            ASOF JOIN trade_calendar c ON span.lo <= c.d
+        ), last_idx AS (
+            SELECT span.symbol, c.idx FROM span
+            ASOF JOIN trade_calendar c ON span.hi >= c.d
+        )
+        SELECT span.symbol, span.lo, span.hi,
+               last_idx.idx - first_idx.idx + 1 - span.present AS missing,
+               span.non_trade, span.non_trade_dates
+        FROM span
+        JOIN first_idx USING (symbol)
+        JOIN last_idx USING (symbol)
+        WHERE missing > 0 OR span.non_trade > 0
+        ORDER BY span.symbol
+        """
+    ).fetchall()
+    issues = []
+    for symbol, lo, hi, missing, non_trade, non_trade_dates in rows:
+        if missing:
+            issues.append(
+                WarehouseIssue(
+                    "missing_trade_days",
+                    SEVERITY_WARNING,
+                    symbol,
+                    missing,
+                    f"{lo} ~ {hi}",
+                )
+            )
+        if non_trade:
+            issues.append(
+                WarehouseIssue(
+                    "non_trade_dates",
+                    SEVERITY_ERROR,
+                    symbol,
+                    non_trade,
+                    _format_samples(non_trade_dates),
+                )
+            )
+    return issues
+
+
+def check_dataset(
+    dataset: str,
+    warehouse_dir: str | Path | None = None,
+    file_pool: ThreadPoolExecutor | None = None,
+) -> dict:
+    """检查单个数据集, 返回 {files, symbols, issues}"""
+    base_dir = _base_dir(warehouse_dir)
+    partition_dirs = sorted(base_dir.glob(f"{_category(dataset)}/symbol=*"))
+    if file_pool is None:
+        results = [_scan_partition(path) for path in partition_dirs]
+    else:
+        results = list(file_pool.map(_scan_partition, partition_dirs))
+    files = [path for partition_files, _ in results for path in partition_files]
+    issues = [issue for _, partition_issues in results for issue in partition_issues]
+
+    if files:
+        conn = duckdb.connect(":memory:")
+        try:
+            issues += _check_schema(conn, dataset, files)
+            issues += _check_file_dates(conn, dataset, files)
+            # schema 缓存缺失时已报告, 不在巡检中触发重建
+            if dataset in SERIES_DATASETS and load_schema(dataset) is not None:
+                _register_series_view(conn, dataset, files)
+                issues += _check_adj_factor(conn, dataset)
+                issues += _check_calendar(conn, dataset, base_dir / CALENDAR_FILE)
+        finally:
+            conn.close()
+    return {
+        "files": len(files),
+        "symbols": len({path.parent for path in files}),
+        "issues": [asdict(issue) for issue in issues],
+    }
+
+
+def _check_journals(base_dir: Path) -> list[WarehouseIssue]:
+    """写入进程已退出却仍残留的分区提交日志 (下次写入时才会前滚)"""
+    from storage.file_store.atomic_partition_store import _journal_abandoned
+
+    stale = [
+        path.name
+        for path in sorted((base_dir / JOURNAL_DIR).glob("commit-*.json"))
+        if _journal_abandoned(path)
+    ]
+    if not stale:
+        return []
+    return [
+        WarehouseIssue(
+            "pending_journal", SEVERITY_ERROR, None, len(stale), _format_samples(stale)
+        )
+    ]
+
+
+def check_warehouse(
+    datasets: list[str] | None = None,
+    warehouse_dir: str | Path | None = None,
+    workers: int | None = None,
+) -> dict:
+    """并行检查数据集, 返回巡检报告"""
+    base_dir = _base_dir(warehouse_dir)
+    datasets = list(datasets or DATASET_PATTERNS)
+    workers = workers or os.cpu_count() or 4
+    started = time.perf_counter()
+
+    with (
+        ThreadPoolExecutor(max_workers=workers) as file_pool,
+        ThreadPoolExecutor(max_workers=min(workers, len(datasets))) as dataset_pool,
+    ):
+        futures = {
+            dataset: dataset_pool.submit(check_dataset, dataset, base_dir, file_pool)
+            for dataset in datasets
+        }
+        results = {dataset: future.result() for dataset, future in futures.items()}
+
+    warehouse_issues = [asdict(issue) for issue in _check_journals(base_dir)]
+    all_issues = warehouse_issues + [
+        issue for result in results.values() for issue in result["issues"]
+    ]
+    return {
+        "generated_at": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+        "warehouse": str(base_dir),
+        "summary": {
+            "datasets": len(results),
+            "files": sum(result["files"] for result in results.values()),
+            "errors": sum(i["severity"] == SEVERITY_ERROR for i in all_issues),
+            "warnings": sum(i["severity"] == SEVERITY_WARNING for i in all_issues),
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+        },
+        "issues": warehouse_issues,
+        "datasets": results,
+    }
+
+
+def write_report(report: dict, path: str | Path = REPORT_FILE) -> Path:
+    """写入 JSON 报告 (临时文件 + 原子替换)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+    temp_path.write_text(
+        json.dumps(report, ensure_ascii=False, indent=2, default=str) + "\n",
+        encoding="utf-8",
+    )
+    os.replace(temp_path, path)
+    return path
@@ -0,0 +1,332 @@
+"""数据集的按年分桶压实副本
+
+每个数据集以 ``<类别>/symbol=XXXXXX/data.parquet`` 逐股存储, 横截面查询需打开数千个
+小文件并逐个解析 footer。压实副本将同一数据集按年份合并为多股票文件::
+
+    compacted/<dataset>/year=YYYY/data.parquet   # 按 (symbol, 日期) 排序, 行组大小固定
+    compacted/<dataset>/_state.json              # 各股票分片压实时的 (mtime_ns, size, 年份)
+
+逐股分片仍是唯一的写入目标: 写入后文件的 mtime/size 与状态不一致, 或分区目录下
+存在追加模式的增量文件 (``delta-*.parquet``), 该股票即成为"增量", 视图改为从逐股
+分片读取它, 压实副本中的旧行被排除。再次执行压实时先把增量文件合并进 data.parquet,
+再只重写增量股票涉及的年份桶。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+import duckdb
+
+from config.settings import WAREHOUSE_DIR
+from storage.file_store.parquet_store import (
+    DELTA_KEY_COLUMNS,
+    DELTA_PREFIX,
+    ParquetStore,
+)
+from utils.logger import logger
+
+COMPACTED_DIR = "compacted"
+STATE_FILE = "_state.json"
+DEFAULT_ROW_GROUP_SIZE = 122_880
+
+# 数据集 -> 分桶年份所依据的日期列
+DATASET_DATE_COLUMNS = {
+    "daily_kline": "date",
+    "etf_kline": "date",
+    "share_capital": "change_date",
+    "fin_ttm": "report_date",
+    "fin_balance_sheet": "report_date",
+    "fin_income_statement": "report_date",
+    "fin_cashflow_statement": "report_date",
+    "fin_indicator": "report_date",
+}
+
+
+@dataclass(frozen=True)
+class SymbolFile:
+    """逐股分片的文件状态"""
+
+    path: Path
+    mtime_ns: int
+    size: int
+    # 追加模式下尚未合并的增量文件
+    deltas: tuple[Path, ...] = ()
+
+
+@dataclass
+class DatasetDelta:
+    """视图读取计划: 压实副本 + 逐股增量分片"""
+
+    compacted: bool
+    symbol_count: int = 0
+    bucket_files: list[Path] = field(default_factory=list)
+    excluded_symbols: list[str] = field(default_factory=list)
+    delta_files: list[Path] = field(default_factory=list)
+
+    @property
+    def delta_partitions(self) -> list[Path]:
+        """增量股票的分区目录"""
+        return sorted({path.parent for path in self.delta_files})
+
+    @property
+    def delta_symbol_count(self) -> int:
+        return len(self.delta_partitions)
+
+
+def _category(dataset: str) -> str:
+    from storage.database.schema_builder import DATASET_PATTERNS
+
+    pattern = DATASET_PATTERNS.get(dataset)
+    if pattern is None or dataset not in DATASET_DATE_COLUMNS:
+        raise ValueError(f"未知数据集: {dataset}")
+    return pattern.removesuffix("/*/*.parquet")
+
+
+def get_compacted_dir(dataset: str, warehouse_dir: str | Path | None = None) -> Path:
+    base_dir = Path(warehouse_dir) if warehouse_dir is not None else Path(WAREHOUSE_DIR)
+    return base_dir / COMPACTED_DIR / dataset
+
+
+def load_compaction_state(
+    dataset: str, warehouse_dir: str | Path | None = None
+) -> dict | None:
+    """读取压实状态; 未压实或状态损坏返回 None"""
+    path = get_compacted_dir(dataset, warehouse_dir) / STATE_FILE
+    if not path.exists():
+        return None
+    try:
+        state = json.loads(path.read_text(encoding="utf-8"))
+    except (json.JSONDecodeError, OSError):
+        logger.warning(f"压实状态损坏, 视为未压实: {path}")
+        return None
+    if not isinstance(state.get("symbols"), dict):
+        return None
+    return state
+
+
+def _save_state(dataset: str, warehouse_dir: Path, state: dict) -> None:
+    path = get_compacted_dir(dataset, warehouse_dir) / STATE_FILE
+    temp_path = path.with_name(f".{STATE_FILE}.{uuid.uuid4().hex}")
+    temp_path.write_text(
+        json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+    os.replace(temp_path, path)
+
+
+def scan_symbol_files(
+    dataset: str, warehouse_dir: str | Path | None = None
+) -> dict[str, SymbolFile]:
+    """列出数据集全部逐股分片 (逐层 glob, 不递归扫描)"""
+    base_dir = Path(warehouse_dir) if warehouse_dir is not None else Path(WAREHOUSE_DIR)
+    category = _category(dataset)
+    deltas: dict[Path, list[Path]] = {}
+    if category in DELTA_KEY_COLUMNS:
+        for path in sorted(
+            base_dir.glob(f"{category}/symbol=*/{DELTA_PREFIX}*.parquet")
+        ):
+            deltas.setdefault(path.parent, []).append(path)
+    files = {}
+    for path in base_dir.glob(f"{category}/symbol=*/data.parquet"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        symbol = path.parent.name.removeprefix("symbol=")
+        files[symbol] = SymbolFile(
+            path,
+            stat.st_mtime_ns,
+            stat.st_size,
+            tuple(deltas.get(path.parent, ())),
+        )
+    return files
+
+
+def _is_unchanged(entry: dict | None, current: SymbolFile | None) -> bool:
+    return (
+        entry is not None
+        and current is not None
+        and not current.deltas
+        and entry.get("mtime_ns") == current.mtime_ns
+        and entry.get("size") == current.size
+    )
+
+
+def get_dataset_delta(
+    dataset: str, warehouse_dir: str | Path | None = None
+) -> DatasetDelta:
+    """比较逐股分片与压实状态, 给出视图应读取的文件集合"""
+    state = load_compaction_state(dataset, warehouse_dir)
+    if state is None:
+        return DatasetDelta(compacted=False)
+
+    compacted_dir = get_compacted_dir(dataset, warehouse_dir)
+    current = scan_symbol_files(dataset, warehouse_dir)
+    compacted_symbols = state["symbols"]
+    excluded = sorted(
+        symbol
+        for symbol, entry in compacted_symbols.items()
+        if not _is_unchanged(entry, current.get(symbol))
+    )
+    delta_files = [
+        path
+        for symbol in sorted(current)
+        if not _is_unchanged(compacted_symbols.get(symbol), current[symbol])
+        for path in (current[symbol].path, *current[symbol].deltas)
+    ]
+    return DatasetDelta(
+        compacted=True,
+        symbol_count=len(current),
+        bucket_files=sorted(compacted_dir.glob("year=*/data.parquet")),
+        excluded_symbols=excluded,
+        delta_files=delta_files,
+    )
+
+
+def _sql_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def compact_dataset(
+    dataset: str,
+    warehouse_dir: str | Path | None = None,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+) -> int:
+    """增量压实单个数据集, 返回重写的年份桶数量
+
+    只有分片状态变化 (新增/修改/删除) 的股票参与重写, 其余股票的行直接沿用旧桶。
+    分片状态在读取前记录, 压实期间再次写入的股票会在下次压实时继续作为增量。
+    """
+    base_dir = Path(warehouse_dir) if warehouse_dir is not None else Path(WAREHOUSE_DIR)
+    category = _category(dataset)
+    if category in DELTA_KEY_COLUMNS:
+        ParquetStore(base_dir).merge_category_deltas(category)
+    date_column = DATASET_DATE_COLUMNS[dataset]
+    compacted_dir = get_compacted_dir(dataset, base_dir)
+    state = load_compaction_state(dataset, base_dir) or {"symbols": {}}
+    compacted_symbols: dict[str, dict] = state["symbols"]
+    current = scan_symbol_files(dataset, base_dir)
+
+    # 合并后仍带增量文件的股票 (合并期间又有追加) 留给视图按增量读取
+    changed = sorted(
+        symbol
+        for symbol, info in current.items()
+        if not info.deltas and not _is_unchanged(compacted_symbols.get(symbol), info)
+    )
+    removed = sorted(set(compacted_symbols) - set(current))
+    if not changed and not removed:
+        return 0
+
+    dirty = changed + removed
+    affected_years = {
+        year
+        for symbol in dirty
+        for year in compacted_symbols.get(symbol, {}).get("years", [])
+    }
+    compacted_dir.mkdir(parents=True, exist_ok=True)
+    spill_dir = compacted_dir / f".spill_{uuid.uuid4().hex}"
+    conn = duckdb.connect(":memory:")
+    try:
+        conn.execute(f"SET temp_directory = {_sql_literal(str(spill_dir))}")
+        new_years: dict[str, list[int]] = {}
+        if changed:
+            conn.execute(
+                rf"""
+                CREATE TABLE delta AS
+                SELECT
+                    * EXCLUDE (filename),
+                    regexp_extract(filename, 'symbol=(\d+)', 1) AS symbol,
+                    COALESCE(year(CAST("{date_column}" AS DATE)), 0) AS _year
+                FROM read_parquet(?, filename=true, union_by_name=true, hive_partitioning=false)
+                """,
+                [[str(current[symbol].path) for symbol in changed]],
+            )
+            for symbol, years in conn.execute(
+                "SELECT symbol, list(DISTINCT _year ORDER BY _year) FROM delta GROUP BY symbol"
+            ).fetchall():
+                new_years[symbol] = [int(year) for year in years]
+            affected_years.update(
+                year for years in new_years.values() for year in years
+            )
+
+        for year in sorted(affected_years):
+            bucket_path = compacted_dir / f"year={year}" / "data.parquet"
+            parts, params = [], []
+            if bucket_path.exists():
+                parts.append(
+                    "SELECT * FROM read_parquet(?, hive_partitioning=false) "
+                    "WHERE symbol NOT IN (SELECT unnest(?::VARCHAR[]))"
+                )
+                params.extend([str(bucket_path), dirty])
+            if changed:
+                parts.append("SELECT * EXCLUDE (_year) FROM delta WHERE _year = ?")
+                params.append(year)
+            if not parts:
+                continue
+            conn.execute(
+                "CREATE OR REPLACE TABLE bucket AS "
+                + " UNION ALL BY NAME ".join(parts),
+                params,
+            )
+            if conn.execute("SELECT COUNT(*) FROM bucket").fetchone()[0] == 0:
+                bucket_path.unlink(missing_ok=True)
+                continue
+            bucket_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = bucket_path.with_name(f".tmp_{uuid.uuid4().hex}.parquet")
+            try:
+                conn.execute(
+                    f"""
+                    COPY (SELECT * FROM bucket ORDER BY symbol, "{date_column}")
+                    TO {_sql_literal(str(temp_path))}
+                    (FORMAT parquet, COMPRESSION snappy, ROW_GROUP_SIZE {int(row_group_size)})
+                    """
+                )
+                os.replace(temp_path, bucket_path)
+            finally:
+                temp_path.unlink(missing_ok=True)
+    finally:
+        conn.close()
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+    # 先替换年份桶再写状态: 中途失败时旧状态把这些股票视为增量, 视图仍读逐股分片
+    for symbol in removed:
+        compacted_symbols.pop(symbol, None)
+    for symbol in changed:
+        info = current[symbol]
+        compacted_symbols[symbol] = {
+            "mtime_ns": info.mtime_ns,
+            "size": info.size,
+            "years": new_years.get(symbol, []),
+        }
+    state.update(
+        {
+            "version": 1,
+            "built_at": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+            "date_column": date_column,
+            "row_group_size": int(row_group_size),
+            "symbols": compacted_symbols,
+        }
+    )
+    _save_state(dataset, base_dir, state)
+    logger.info(
+        f"压实完成: {dataset} 增量 {len(dirty)} 只, 重写 {len(affected_years)} 个年份桶"
+    )
+    return len(affected_years)
+
+
+def compact_warehouse(
+    datasets: list[str] | None = None,
+    warehouse_dir: str | Path | None = None,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+) -> dict[str, int]:
+    """压实全部 (或指定) 数据集, 返回 {数据集: 重写的年份桶数量}"""
+    results = {}
+    for dataset in datasets or list(DATASET_DATE_COLUMNS):
+        results[dataset] = compact_dataset(dataset, warehouse_dir, row_group_size)
+    return results
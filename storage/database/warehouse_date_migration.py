@@ -0,0 +1,132 @@
+"""财务数据集日期列的一次性类型迁移。
+
+历史分区的 ``report_date`` / ``公告日期`` / ``数据可用日期`` / ``pub_date`` 以
+``YYYYMMDD`` 或 ``YYYY-MM-DD`` 字符串存储。迁移逐分区读取 Parquet footer,
+仅重写仍含非 DATE 日期列的分区, 可重复执行; 写入以组提交批量原子替换。
+迁移完成后在数据仓库根目录写入完成标记, 启动检查只读该标记, 不逐分区读取 footer。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config.settings import WAREHOUSE_DIR
+from storage.database.schema_builder import DATASET_PATTERNS
+from storage.file_store.atomic_partition_store import (
+    PartitionCommitGroup,
+    save_partitions_atomically,
+)
+from storage.file_store.date_columns import coerce_date_columns, get_date_columns
+from utils.logger import logger
+
+# 迁移完成标记 (数据仓库根目录); 日期列口径再次变更时递增版本号, 旧标记随即失效
+MIGRATION_MARKER_FILE = "_date_migration.json"
+DATE_MIGRATION_VERSION = 1
+
+
+def is_date_migration_done(warehouse_dir: str | Path | None = None) -> bool:
+    """数据仓库是否已记录当前版本的日期列迁移完成标记 (只读一个小文件)"""
+    base_dir = Path(warehouse_dir) if warehouse_dir is not None else Path(WAREHOUSE_DIR)
+    try:
+        marker = json.loads(
+            (base_dir / MIGRATION_MARKER_FILE).read_text(encoding="utf-8")
+        )
+    except (OSError, ValueError):
+        return False
+    return isinstance(marker, dict) and marker.get("version") == DATE_MIGRATION_VERSION
+
+
+def _write_migration_marker(base_dir: Path) -> None:
+    base_dir.mkdir(parents=True, exist_ok=True)
+    marker_path = base_dir / MIGRATION_MARKER_FILE
+    temp_path = marker_path.with_name(f".{marker_path.name}.{os.getpid()}.tmp")
+    temp_path.write_text(
+        json.dumps(
+            {
+                "version": DATE_MIGRATION_VERSION,
+                "migrated_at": datetime.now().isoformat(timespec="seconds"),
+            }
+        ),
+        encoding="utf-8",
+    )
+    os.replace(temp_path, marker_path)
+
+
+def _migration_targets() -> dict[str, str]:
+    """数据集 -> 类别路径, 仅包含登记了日期列的数据集"""
+    targets = {}
+    for dataset, pattern in DATASET_PATTERNS.items():
+        category = pattern.removesuffix("/*/*.parquet")
+        if get_date_columns(category):
+            targets[dataset] = category
+    return targets
+
+
+def needs_date_migration(path: Path, category: str) -> bool:
+    """分区中存在尚未以 DATE 存储的日期列时返回 True (只读 footer)"""
+    schema = pq.read_schema(path)
+    return any(
+        schema.field(column).type != pa.date32()
+        for column in get_date_columns(category)
+        if column in schema.names
+    )
+
+
+def migrate_partition_dates(
+    path: Path,
+    category: str,
+    base_dir: Path,
+    group: PartitionCommitGroup | None = None,
+) -> int:
+    """重写单个分区 (传入 group 时加入组提交), 返回无法解析而置空的日期值个数"""
+    df = pd.read_parquet(path)
+    coerced = coerce_date_columns(df, category)
+    dropped = 0
+    for column in get_date_columns(category):
+        if column not in df.columns:
+            continue
+        original = df[column].astype("string").str.strip()
+        had_value = original.notna() & (original != "")
+        dropped += int((had_value & coerced[column].isna()).sum())
+    symbol = path.parent.name.removeprefix("symbol=")
+    if group is not None:
+        group.add(coerced, category, symbol)
+    else:
+        save_partitions_atomically(base_dir, [(coerced, category, symbol)])
+    return dropped
+
+
+def migrate_warehouse_dates(
+    warehouse_dir: str | Path | None = None,
+) -> dict[str, int]:
+    """迁移全部财务数据集的日期列, 返回 {数据集: 重写的分区数}
+
+    分区按 ``<类别>/symbol=*/data.parquet`` 逐层定位, 不递归扫描数据目录;
+    重写以组提交进行, 每批分区只写一条提交日志、每个目录只 fsync 一次。全部
+    数据集迁移完成后写入完成标记 (见 ``is_date_migration_done``)。
+    """
+    base_dir = Path(warehouse_dir) if warehouse_dir is not None else Path(WAREHOUSE_DIR)
+    migrated: dict[str, int] = {}
+    for dataset, category in _migration_targets().items():
+        rewritten = 0
+        dropped = 0
+        with PartitionCommitGroup(base_dir) as group:
+            for path in sorted(base_dir.glob(f"{category}/symbol=*/data.parquet")):
+                if not needs_date_migration(path, category):
+                    continue
+                dropped += migrate_partition_dates(path, category, base_dir, group)
+                rewritten += 1
+        if rewritten:
+            migrated[dataset] = rewritten
+            logger.info(f"日期列迁移完成: {dataset} 重写 {rewritten} 个分区")
+        if dropped:
+            logger.warning(f"{dataset} 有 {dropped} 个日期值无法解析, 已置为空值")
+    _write_migration_marker(base_dir)
+    return migrated
@@ -0,0 +1,243 @@
+"""数据仓库的只读快照 (按代编号)
+
+sync-all 运行期间分区被逐个替换, 长时间运行的研究查询或回测若直接读取数据仓库,
+前后几次查询会看到新旧混杂的分区。快照把某一时刻的数据仓库固定下来::
+
+    _snapshots/CURRENT                  # 最新已发布的代号
+    _snapshots/gen-000042/              # 第 42 代: 与数据仓库同构的硬链接目录
+        daily_kline/symbol=000001/data.parquet
+        compacted/daily_kline/year=2024/data.parquet
+        _snapshot.json                  # 代号、创建时间、文件数
+        _pins/<pid>-<随机串>            # 读者持有的引用
+
+写入方约定分区文件只整体替换 (临时文件 + ``os.replace``) 或删除, 从不原地修改, 因此
+硬链接指向的旧 inode 在快照存续期间保持不变, 快照不复制数据。sync-all 全部成功后
+发布新一代 (此时没有写入在进行, 快照即一致的截面); 读者钉住 ``CURRENT`` 指向的一代
+并在其上注册视图, 整个会话读取同一截面, 读取过程不需要任何锁。发布新一代时回收
+既非 ``CURRENT``、也无存活读者引用的旧代。读者在引用存续期间持有引用文件的
+``flock`` (发布方同样持有构建目录的 ``flock``), 进程退出时由内核释放; 存活与否
+按能否取得该锁判断, 不依赖 pid, 重启或容器内 pid 复用不会使遗留引用永不回收。
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import shutil
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from config.settings import WAREHOUSE_DIR
+from storage.file_store.parquet_store import wait_for_delta_merges
+from utils.logger import logger
+
+from .schema_builder import DATASET_PATTERNS
+from .warehouse_compaction import COMPACTED_DIR, STATE_FILE
+
+SNAPSHOT_DIR = "_snapshots"
+CURRENT_FILE = "CURRENT"
+MARKER_FILE = "_snapshot.json"
+PINS_DIR = "_pins"
+GENERATION_PREFIX = "gen-"
+
+# 快照包含的文件 (逐层 glob, 不递归扫描)
+SNAPSHOT_PATTERNS = (
+    *DATASET_PATTERNS.values(),
+    f"{COMPACTED_DIR}/*/year=*/data.parquet",
+    f"{COMPACTED_DIR}/*/{STATE_FILE}",
+)
+
+
+@dataclass(frozen=True)
+class WarehouseSnapshot:
+    """读者钉住的一代快照; ``path`` 可直接作为视图的数据仓库根目录"""
+
+    generation: int
+    path: Path
+    pin_path: Path
+    # 持有引用文件 flock 的文件描述符
+    pin_fd: int
+
+    def release(self) -> None:
+        self.pin_path.unlink(missing_ok=True)
+        os.close(self.pin_fd)
+
+
+def _base_dir(warehouse_dir: str | Path | None) -> Path:
+    return Path(warehouse_dir) if warehouse_dir is not None else Path(WAREHOUSE_DIR)
+
+
+def _generation_dir(root: Path, generation: int) -> Path:
+    return root / f"{GENERATION_PREFIX}{generation:06d}"
+
+
+def _held_by_live_process(path: Path) -> bool:
+    """路径上的 flock 是否仍被持有 (含本进程经其他文件描述符持有的锁)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return False
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+    return False
+
+
+def _has_live_pins(generation_dir: Path) -> bool:
+    return any(
+        _held_by_live_process(pin) for pin in (generation_dir / PINS_DIR).glob("*")
+    )
+
+
+def _is_published(generation_dir: Path) -> bool:
+    return (generation_dir / MARKER_FILE).exists()
+
+
+def get_current_generation(warehouse_dir: str | Path | None = None) -> int | None:
+    """最新已发布的代号; 从未发布时返回 None"""
+    path = _base_dir(warehouse_dir) / SNAPSHOT_DIR / CURRENT_FILE
+    try:
+        return int(path.read_text(encoding="utf-8").strip())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _list_generations(root: Path) -> list[int]:
+    generations = []
+    for path in root.glob(f"{GENERATION_PREFIX}*"):
+        suffix = path.name.removeprefix(GENERATION_PREFIX)
+        if suffix.isdigit():
+            generations.append(int(suffix))
+    return sorted(generations)
+
+
+def publish_snapshot(warehouse_dir: str | Path | None = None) -> int:
+    """以硬链接发布数据仓库的新一代快照, 返回代号
+
+    调用方需保证发布期间没有写入 (sync-all 结束后调用); 后台增量合并先等待完成。
+    """
+    base_dir = _base_dir(warehouse_dir)
+    root = base_dir / SNAPSHOT_DIR
+    root.mkdir(parents=True, exist_ok=True)
+    wait_for_delta_merges()
+
+    generation = max([0, *_list_generations(root)]) + 1
+    building_dir = root / f".building-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    building_dir.mkdir()
+    # 构建期间持有目录锁, 并发的回收方据此区分进行中与异常中止的发布
+    building_fd = os.open(building_dir, os.O_RDONLY)
+    fcntl.flock(building_fd, fcntl.LOCK_EX)
+    file_count = 0
+    try:
+        for pattern in SNAPSHOT_PATTERNS:
+            for source in base_dir.glob(pattern):
+                target = building_dir / source.relative_to(base_dir)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    os.link(source, target)
+                except FileNotFoundError:
+                    continue
+                file_count += 1
+        (building_dir / PINS_DIR).mkdir(parents=True, exist_ok=True)
+        (building_dir / MARKER_FILE).write_text(
+            json.dumps(
+                {
+                    "generation": generation,
+                    "created_at": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+                    "file_count": file_count,
+                },
+                ensure_ascii=False,
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+        os.rename(building_dir, _generation_dir(root, generation))
+    except Exception:
+        shutil.rmtree(building_dir, ignore_errors=True)
+        raise
+    finally:
+        os.close(building_fd)
+
+    current_path = root / CURRENT_FILE
+    temp_path = root / f".{CURRENT_FILE}.{uuid.uuid4().hex}"
+    temp_path.write_text(f"{generation}\n", encoding="utf-8")
+    os.replace(temp_path, current_path)
+    logger.info(f"数据仓库快照已发布: 第 {generation} 代 ({file_count} 个文件)")
+    collect_snapshots(base_dir)
+    return generation
+
+
+def pin_snapshot(
+    warehouse_dir: str | Path | None = None, max_attempts: int = 3
+) -> WarehouseSnapshot | None:
+    """钉住最新一代快照; 从未发布时返回 None
+
+    引用文件在代目录内创建并加锁后再确认代目录仍然有效, 与并发回收竞争失败时重试。
+    引用文件经由打开的 ``_pins`` 目录句柄创建与撤销: 回收方把代目录改名后句柄仍
+    指向原目录, 撤销不会落空而在回收站中留下引用 (回收方见到存活引用会把代目录
+    放回, 残留引用将使该代永不回收)。
+    """
+    root = _base_dir(warehouse_dir) / SNAPSHOT_DIR
+    for _ in range(max_attempts):
+        generation = get_current_generation(warehouse_dir)
+        if generation is None:
+            return None
+        generation_dir = _generation_dir(root, generation)
+        pin_name = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        try:
+            pins_fd = os.open(generation_dir / PINS_DIR, os.O_RDONLY)
+        except FileNotFoundError:
+            continue
+        try:
+            pin_fd = os.open(
+                pin_name, os.O_CREAT | os.O_EXCL | os.O_RDWR, dir_fd=pins_fd
+            )
+            # 先加锁再确认代目录: 确认通过时回收方的复查必然看到存活引用
+            fcntl.flock(pin_fd, fcntl.LOCK_EX)
+            if _is_published(generation_dir):
+                pin_path = generation_dir / PINS_DIR / pin_name
+                return WarehouseSnapshot(generation, generation_dir, pin_path, pin_fd)
+            try:
+                os.unlink(pin_name, dir_fd=pins_fd)
+            except FileNotFoundError:
+                # 回收方已删除整个代目录
+                pass
+            os.close(pin_fd)
+        finally:
+            os.close(pins_fd)
+    raise RuntimeError("钉住数据仓库快照失败: 快照正在被并发发布或回收")
+
+
+def collect_snapshots(warehouse_dir: str | Path | None = None) -> int:
+    """回收既非当前代、也无存活读者引用的快照, 返回回收的代数"""
+    root = _base_dir(warehouse_dir) / SNAPSHOT_DIR
+    current = get_current_generation(warehouse_dir)
+    # 异常中止的发布与回收留下的临时目录
+    for path in root.glob(".building-*"):
+        if not _held_by_live_process(path):
+            shutil.rmtree(path, ignore_errors=True)
+    for path in root.glob(".trash-*"):
+        shutil.rmtree(path, ignore_errors=True)
+
+    collected = 0
+    for generation in _list_generations(root):
+        generation_dir = _generation_dir(root, generation)
+        if generation == current or _has_live_pins(generation_dir):
+            continue
+        trash_dir = root / f".trash-{generation_dir.name}-{uuid.uuid4().hex[:8]}"
+        os.rename(generation_dir, trash_dir)
+        # 检查与改名之间有读者钉住时原样放回
+        if _has_live_pins(trash_dir):
+            os.rename(trash_dir, generation_dir)
+            continue
+        shutil.rmtree(trash_dir, ignore_errors=True)
+        collected += 1
+    if collected:
+        logger.info(f"已回收 {collected} 代数据仓库快照")
+    return collected
@@ -1,7 +1,16 @@
-"""支持多 Parquet 分区事务式替换的存储辅助函数。"""
+"""支持多 Parquet 分区事务式替换的存储辅助函数。
+
+提交分三步: 全部临时文件写入并 fsync; 在 ``<warehouse>/_journal/`` 写入一条意图日志
+(目标/临时/备份文件) 并 fsync; 依次替换后对涉及的目录各 fsync 一次, 最后删除日志。
+写入方在提交期间持有日志文件的 ``flock``, 进程退出 (含崩溃) 时由内核释放; 进程在
+替换中途崩溃时, 残留的日志由 ``recover_partition_journals`` 前滚完成提交。
+``PartitionCommitGroup`` 把多只股票的分区合并为一个批次, 整批只写一条日志。
+"""
 
 from __future__ import annotations
 
+import fcntl
+import json
 import os
 import uuid
 from collections.abc import Sequence
@@ -10,6 +19,9 @@ from pathlib import Path
 
 import pandas as pd
 
+from storage.file_store.parquet_layout import read_content_hash, write_partition_file
+from storage.file_store.partition_lock import partition_locks
+from storage.file_store.partition_manifest import get_manifest
 from utils.logger import logger
 
 
@@ -17,11 +29,15 @@ from utils.logger import logger
 class _PreparedPartition:
     """一个待提交的 Parquet 分区及其回滚状态。"""
 
+    category: str
+    symbol: str
     target_path: Path
     temp_path: Path
     partition_dir: Path
     backup_path: Path | None = None
     committed: bool = False
+    # 提交时若目标已存在, 先改名为该备份文件以便回滚
+    planned_backup: Path | None = None
 
 
 def _validate_partition_path(base_dir: Path, category: str, symbol: str) -> Path:
@@ -43,15 +59,11 @@ def _validate_partition_path(base_dir: Path, category: str, symbol: str) -> Path
     return partition_dir
 
 
-def _write_temp_partition(df: pd.DataFrame, temp_path: Path) -> None:
-    columns = [column for column in df.columns if column != "symbol"]
+def _write_temp_partition(
+    df: pd.DataFrame, category: str, temp_path: Path, content_hash: str | None = None
+) -> None:
     with temp_path.open("wb") as file:
-        df[columns].to_parquet(
-            file,
-            engine="pyarrow",
-            compression="snappy",
-            index=False,
-        )
+        write_partition_file(df, category, file, content_hash=content_hash)
         file.flush()
         os.fsync(file.fileno())
 
@@ -67,25 +79,220 @@ def _fsync_directory(path: Path) -> None:
         os.close(directory_fd)
 
 
-def save_partitions_atomically(
-    base_dir: str | Path,
-    partitions: Sequence[tuple[pd.DataFrame, str, str]],
-) -> None:
-    """将多个 symbol 分区作为一个可回滚批次写入。
+JOURNAL_DIR = "_journal"
+DEFAULT_GROUP_SIZE = 512
 
-    所有临时文件先完整写入并 fsync，正式文件全部替换成功后才删除备份。
-    任一替换或目录 fsync 失败都会恢复已经替换的分区，避免四源日期只写入部分表。
+
+def _journal_dir(warehouse_dir: Path) -> Path:
+    return warehouse_dir / JOURNAL_DIR
+
+
+def _write_journal(
+    warehouse_dir: Path, prepared: list[_PreparedPartition]
+) -> tuple[Path, int]:
+    """写入一条持久化的意图日志, 此后的替换在崩溃后可前滚
+
+    返回日志路径与持有其 ``flock`` 的文件描述符; 调用方在删除日志后关闭描述符。
+    日志先以临时名写完并加锁再改名, 恢复方看到的日志总是完整且已加锁的。
+    """
+    journal_dir = _journal_dir(warehouse_dir)
+    journal_dir.mkdir(parents=True, exist_ok=True)
+    name = uuid.uuid4().hex
+    temp_path = journal_dir / f".pending-{name}.json"
+    journal_path = journal_dir / f"commit-{name}.json"
+    record = {
+        "entries": [
+            {
+                "category": item.category,
+                "symbol": item.symbol,
+                "target": str(item.target_path.relative_to(warehouse_dir)),
+                "temp": str(item.temp_path.relative_to(warehouse_dir)),
+                "backup": str(item.planned_backup.relative_to(warehouse_dir)),
+            }
+            for item in prepared
+        ],
+    }
+    fd = os.open(temp_path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        os.write(fd, json.dumps(record, ensure_ascii=False).encode("utf-8"))
+        os.fsync(fd)
+        os.replace(temp_path, journal_path)
+        _fsync_directory(journal_dir)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        journal_path.unlink(missing_ok=True)
+        os.close(fd)
+        raise
+    return journal_path, fd
+
+
+def _fsync_directories(warehouse_dir: Path, partition_dirs: list[Path]) -> None:
+    """分区目录及其上级目录 (直到数据仓库根目录) 每个只 fsync 一次"""
+    directories: dict[Path, None] = {}
+    for partition_dir in partition_dirs:
+        directories[partition_dir] = None
+        directories[partition_dir.parent] = None
+        directories[partition_dir.parent.parent] = None
+    directories[warehouse_dir] = None
+    for directory in directories:
+        _fsync_directory(directory)
+
+
+def _lock_abandoned_journal(journal_path: Path) -> int | None:
+    """对写入方已退出的日志加锁, 返回持锁的文件描述符; 写入方仍持锁或日志已删除返回 None"""
+    try:
+        fd = os.open(journal_path, os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+def _journal_abandoned(journal_path: Path) -> bool:
+    """日志仍存在且写入方已不再持有其锁"""
+    fd = _lock_abandoned_journal(journal_path)
+    if fd is None:
+        return False
+    os.close(fd)
+    return True
+
+
+def recover_partition_journals(base_dir: str | Path) -> int:
+    """前滚崩溃遗留的提交日志, 返回恢复的日志数
+
+    日志写入前全部临时文件均已落盘, 因此仍存在的临时文件直接替换到目标位置。
+    写入方仍持有 ``flock`` 的日志 (本进程其他线程或其他存活进程的提交) 跳过;
+    判断不依赖 pid, 重启或容器内 pid 复用不会把崩溃遗留的日志误判为仍在提交。
+    无法解析的日志说明写日志时崩溃, 替换尚未开始, 直接删除。前滚期间持有日志的锁
+    与涉及分区的写锁; 多个进程同时恢复同一条日志时, 后取得锁者发现日志已删除即
+    跳过, 临时文件缺失视为已前滚。
     """
     warehouse_dir = Path(base_dir)
-    warehouse_dir.mkdir(parents=True, exist_ok=True)
-    prepared: list[_PreparedPartition] = []
-    seen_targets: set[Path] = set()
+    journal_dir = _journal_dir(warehouse_dir)
+    if not journal_dir.is_dir():
+        return 0
+
+    recovered = 0
+    for journal_path in sorted(journal_dir.glob("commit-*.json")):
+        fd = _lock_abandoned_journal(journal_path)
+        if fd is None:
+            continue
+        try:
+            if _recover_journal(warehouse_dir, journal_path, fd):
+                recovered += 1
+        finally:
+            os.close(fd)
+    return recovered
+
 
+def _recover_journal(warehouse_dir: Path, journal_path: Path, fd: int) -> bool:
     try:
-        for df, category, symbol in partitions:
-            if df.empty:
-                continue
-            partition_dir = _validate_partition_path(warehouse_dir, category, symbol)
+        with os.fdopen(os.dup(fd), encoding="utf-8") as file:
+            entries = json.load(file)["entries"]
+    except (OSError, ValueError, KeyError, TypeError):
+        logger.warning("Parquet 提交日志不完整，提交未开始，删除: %s", journal_path)
+        journal_path.unlink(missing_ok=True)
+        return False
+
+    with partition_locks(
+        warehouse_dir, [(entry["category"], entry["symbol"]) for entry in entries]
+    ):
+        if not journal_path.exists():
+            return False
+        partition_dirs = []
+        for entry in entries:
+            target_path = warehouse_dir / entry["target"]
+            try:
+                os.replace(warehouse_dir / entry["temp"], target_path)
+            except FileNotFoundError:
+                pass
+            (warehouse_dir / entry["backup"]).unlink(missing_ok=True)
+            partition_dirs.append(target_path.parent)
+        _fsync_directories(warehouse_dir, partition_dirs)
+        journal_path.unlink(missing_ok=True)
+        _record_manifest(
+            warehouse_dir,
+            [
+                (
+                    entry["category"],
+                    entry["symbol"],
+                    warehouse_dir / entry["target"],
+                )
+                for entry in entries
+                if (warehouse_dir / entry["target"]).exists()
+            ],
+        )
+    logger.warning(
+        "已前滚崩溃遗留的 Parquet 提交日志: %s (%d 个分区)",
+        journal_path.name,
+        len(entries),
+    )
+    return True
+
+
+def _record_manifest(warehouse_dir: Path, written: list[tuple[str, str, Path]]) -> None:
+    if written:
+        get_manifest(warehouse_dir).record_partitions(written)
+
+
+class PartitionCommitGroup:
+    """组提交: 累积多只股票的分区写入, 整批以一条意图日志提交。
+
+    ``add`` 立即写入并 fsync 临时文件 (内存中不保留 DataFrame), 累积到
+    ``max_partitions`` 个分区时自动提交一批; ``with`` 块正常结束时提交剩余分区,
+    异常退出时丢弃未提交的临时文件。单批内的分区要么全部替换, 要么全部保持原样。
+
+        with PartitionCommitGroup(warehouse_dir) as group:
+            for symbol, df in frames.items():
+                group.add(df, "financial/ttm", symbol)
+    """
+
+    def __init__(
+        self, base_dir: str | Path, max_partitions: int | None = DEFAULT_GROUP_SIZE
+    ):
+        self.warehouse_dir = Path(base_dir)
+        self.max_partitions = max_partitions
+        self.committed_partitions = 0
+        self._prepared: list[_PreparedPartition] = []
+        self._seen_targets: set[Path] = set()
+        self.warehouse_dir.mkdir(parents=True, exist_ok=True)
+        recover_partition_journals(self.warehouse_dir)
+
+    def __enter__(self) -> PartitionCommitGroup:
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+
+    def add(
+        self,
+        df: pd.DataFrame,
+        category: str,
+        symbol: str,
+        preserve_content_hash: bool = False,
+    ) -> None:
+        """写入一个分区的临时文件, 同一批次内分区不得重复
+
+        :param preserve_content_hash: 沿用现有文件记录的内容哈希 (只改写派生列时,
+            源数据未变, 见 ``ParquetStore.save_partition_if_changed``)
+        """
+        if df.empty:
+            return
+        try:
+            partition_dir = _validate_partition_path(
+                self.warehouse_dir, category, symbol
+            )
             partition_dir.mkdir(parents=True, exist_ok=True)
             if partition_dir.is_symlink():
                 raise ValueError("Parquet 分区目录不得是符号链接")
@@ -93,58 +300,122 @@ def save_partitions_atomically(
             target_path = partition_dir / "data.parquet"
             if target_path.is_symlink():
                 raise ValueError("Parquet 数据文件不得是符号链接")
-            if target_path in seen_targets:
+            if target_path in self._seen_targets:
                 raise ValueError(f"同一批次包含重复 Parquet 分区: {category}/{symbol}")
-            seen_targets.add(target_path)
+            self._seen_targets.add(target_path)
 
+            content_hash = (
+                read_content_hash(target_path) if preserve_content_hash else None
+            )
             temp_path = partition_dir / f".tmp_{symbol}.{uuid.uuid4().hex}.parquet"
             try:
-                _write_temp_partition(df, temp_path)
+                _write_temp_partition(df, category, temp_path, content_hash)
             except Exception:
                 temp_path.unlink(missing_ok=True)
                 raise
-            prepared.append(
-                _PreparedPartition(
-                    target_path=target_path,
-                    temp_path=temp_path,
-                    partition_dir=partition_dir,
-                )
-            )
-
-        for item in prepared:
-            if item.target_path.exists():
-                item.backup_path = item.target_path.with_name(
+        except Exception:
+            self.discard()
+            raise
+        self._prepared.append(
+            _PreparedPartition(
+                category=category,
+                symbol=symbol,
+                target_path=target_path,
+                temp_path=temp_path,
+                partition_dir=partition_dir,
+                planned_backup=target_path.with_name(
                     f".backup_{uuid.uuid4().hex}.parquet"
-                )
-                os.replace(item.target_path, item.backup_path)
-            os.replace(item.temp_path, item.target_path)
-            item.committed = True
+                ),
+            )
+        )
+        if self.max_partitions and len(self._prepared) >= self.max_partitions:
+            self.commit()
 
-        for item in prepared:
-            _fsync_directory(item.partition_dir)
-            _fsync_directory(item.partition_dir.parent)
-            _fsync_directory(item.partition_dir.parent.parent)
-            _fsync_directory(warehouse_dir)
-    except Exception:
-        for item in reversed(prepared):
+    def discard(self) -> None:
+        """删除尚未提交的临时文件"""
+        for item in self._prepared:
             item.temp_path.unlink(missing_ok=True)
-            if item.backup_path is not None and item.backup_path.exists():
-                item.target_path.unlink(missing_ok=True)
-                os.replace(item.backup_path, item.target_path)
-            elif item.committed:
-                item.target_path.unlink(missing_ok=True)
-        raise
-    finally:
+        self._prepared = []
+        self._seen_targets = set()
+
+    def commit(self) -> int:
+        """提交已累积的分区, 返回本批分区数"""
+        prepared = self._prepared
+        self._prepared = []
+        self._seen_targets = set()
+        if not prepared:
+            return 0
+
+        warehouse_dir = self.warehouse_dir
+        # 替换期间持有全部分区的写锁 (调用方已持有的锁可重入)
+        with partition_locks(
+            warehouse_dir, [(item.category, item.symbol) for item in prepared]
+        ):
+            self._replace_prepared(prepared)
+
         for item in prepared:
-            item.temp_path.unlink(missing_ok=True)
+            if item.backup_path is not None:
+                try:
+                    item.backup_path.unlink(missing_ok=True)
+                except OSError as exc:
+                    logger.warning(
+                        "Parquet 旧分区备份清理失败，保留备份待后续处理: %s (%s)",
+                        item.backup_path,
+                        exc,
+                    )
+        self.committed_partitions += len(prepared)
+        return len(prepared)
 
-    for item in prepared:
-        if item.backup_path is not None:
-            try:
-                item.backup_path.unlink(missing_ok=True)
-            except OSError as exc:
-                logger.warning(
-                    "Parquet 旧分区备份清理失败，保留备份待后续处理: %s (%s)",
-                    item.backup_path,
-                    exc,
-                )
+    def _replace_prepared(self, prepared: list[_PreparedPartition]) -> None:
+        """在日志保护下替换正式文件, 失败时回滚已替换的分区"""
+        warehouse_dir = self.warehouse_dir
+        journal_path = journal_fd = None
+        try:
+            journal_path, journal_fd = _write_journal(warehouse_dir, prepared)
+            for item in prepared:
+                if item.target_path.exists():
+                    item.backup_path = item.planned_backup
+                    os.replace(item.target_path, item.backup_path)
+                os.replace(item.temp_path, item.target_path)
+                item.committed = True
+
+            _fsync_directories(warehouse_dir, [item.partition_dir for item in prepared])
+        except Exception:
+            # 先撤销日志, 回滚中途崩溃不会被前滚成半新半旧的批次
+            if journal_path is not None:
+                journal_path.unlink(missing_ok=True)
+                os.close(journal_fd)
+            for item in reversed(prepared):
+                item.temp_path.unlink(missing_ok=True)
+                if item.backup_path is not None and item.backup_path.exists():
+                    item.target_path.unlink(missing_ok=True)
+                    os.replace(item.backup_path, item.target_path)
+                elif item.committed:
+                    item.target_path.unlink(missing_ok=True)
+            raise
+        finally:
+            for item in prepared:
+                item.temp_path.unlink(missing_ok=True)
+
+        journal_path.unlink(missing_ok=True)
+        os.close(journal_fd)
+        _record_manifest(
+            warehouse_dir,
+            [(item.category, item.symbol, item.target_path) for item in prepared],
+        )
+
+
+def save_partitions_atomically(
+    base_dir: str | Path,
+    partitions: Sequence[tuple[pd.DataFrame, str, str]],
+    preserve_content_hash: bool = False,
+) -> None:
+    """将多个 symbol 分区作为一个可回滚批次写入。
+
+    所有临时文件先完整写入并 fsync，正式文件全部替换成功后才删除备份。
+    任一替换或目录 fsync 失败都会恢复已经替换的分区，避免四源日期只写入部分表。
+    """
+    group = PartitionCommitGroup(base_dir, max_partitions=None)
+    for df, category, symbol in partitions:
+        group.add(df, category, symbol, preserve_content_hash=preserve_content_hash)
+    group.commit()
@@ -0,0 +1,102 @@
+"""数据仓库日期列的类型约定。
+
+财务数据集的日期列统一以 Parquet ``date32`` (DuckDB ``DATE``) 落盘, 查询侧直接按
+日期比较与 ASOF 关联, 不再逐行解析 ``YYYYMMDD`` / ``YYYY-MM-DD`` 字符串。
+行情与股本数据的 ``date`` / ``change_date`` 由采集器以日期对象写入, 本身已是 DATE。
+内存中的对账与去重逻辑仍使用 ``YYYYMMDD`` 字符串作为键, 写入前由
+``coerce_date_columns`` 统一转换。
+"""
+
+from __future__ import annotations
+
+import pandas as pd
+import pyarrow as pa
+
+# 类别路径前缀 -> 日期列; 子类别 (如 financial_statements/type=income) 按前缀匹配
+DATE_COLUMNS = {
+    "financial_statements": ("report_date", "公告日期", "数据可用日期"),
+    "indicators": ("report_date", "公告日期", "数据可用日期"),
+    "financial/ttm": ("report_date", "pub_date"),
+}
+
+# 类别路径前缀 -> 主日期列 (分区内排序、清单日期范围所依据的列)
+PRIMARY_DATE_COLUMNS = {
+    "daily_kline": "date",
+    "etf_kline": "date",
+    "share_capital": "change_date",
+    "financial_statements": "report_date",
+    "indicators": "report_date",
+    "financial/ttm": "report_date",
+}
+
+DATE32_DTYPE = pd.ArrowDtype(pa.date32())
+
+
+def get_date_columns(category: str) -> tuple[str, ...]:
+    """返回类别路径对应的日期列 (未登记的类别返回空元组)"""
+    for prefix, columns in DATE_COLUMNS.items():
+        if category == prefix or category.startswith(prefix + "/"):
+            return columns
+    return ()
+
+
+def get_primary_date_column(category: str) -> str | None:
+    """返回类别路径对应的主日期列 (未登记的类别返回 None)"""
+    for prefix, column in PRIMARY_DATE_COLUMNS.items():
+        if category == prefix or category.startswith(prefix + "/"):
+            return column
+    return None
+
+
+def to_date_keys(series: pd.Series) -> pd.Series:
+    """将日期列标准化为 YYYYMMDD 字符串, 无法识别的值为缺失。
+
+    已是日期类型的列直接格式化; 字符串列兼容 ``YYYYMMDD``、``YYYY-MM-DD`` 及带时间后缀的写法。
+    """
+    if (
+        pd.api.types.is_datetime64_any_dtype(series.dtype)
+        or series.dtype == DATE32_DTYPE
+    ):
+        return pd.to_datetime(series).dt.strftime("%Y%m%d").astype("string")
+
+    text = series.astype("string").str.strip()
+    digits = text.str.replace(r"\D", "", regex=True)
+    normalized = digits.where(digits.str.len() >= 8).str[:8]
+    valid_dates = pd.to_datetime(normalized, format="%Y%m%d", errors="coerce")
+    return normalized.where(valid_dates.notna())
+
+
+def to_date32(series: pd.Series) -> pd.Series:
+    """将日期列转换为 Arrow ``date32`` 列, 无法识别的值为缺失"""
+    if series.dtype == DATE32_DTYPE:
+        return series
+    timestamps = pd.to_datetime(to_date_keys(series), format="%Y%m%d")
+    array = pa.array(timestamps, type=pa.timestamp("ns"), from_pandas=True)
+    return pd.Series(
+        pd.arrays.ArrowExtensionArray(array.cast(pa.date32())),
+        index=series.index,
+        name=series.name,
+    )
+
+
+def coerce_date_columns(df: pd.DataFrame, category: str) -> pd.DataFrame:
+    """返回日期列已转换为 ``date32`` 的副本 (无需转换时返回原对象)"""
+    columns = [column for column in get_date_columns(category) if column in df.columns]
+    pending = [column for column in columns if df[column].dtype != DATE32_DTYPE]
+    if not pending:
+        return df
+    df = df.copy()
+    for column in pending:
+        df[column] = to_date32(df[column])
+    return df
+
+
+def date_columns_to_keys(df: pd.DataFrame, category: str) -> pd.DataFrame:
+    """返回日期列已转换为 YYYYMMDD 字符串的副本, 供内存中的合并去重使用"""
+    columns = [column for column in get_date_columns(category) if column in df.columns]
+    if not columns:
+        return df
+    df = df.copy()
+    for column in columns:
+        df[column] = to_date_keys(df[column])
+    return df
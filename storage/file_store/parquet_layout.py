@@ -0,0 +1,110 @@
+"""逐股分区文件的物理布局。
+
+全部分区写入 (``ParquetStore`` 与原子批量替换) 统一经由 ``write_partition_file``:
+
+- 按类别主日期列升序排序 (同日期保持写入顺序, 增量文件内的"后写为准"语义不变);
+- 行组上限 ``PARTITION_ROW_GROUP_SIZE`` 行, 每个行组带 min/max 统计;
+- 写出 Parquet page index (列索引 + 偏移索引);
+- 可选在 schema 元数据中记录内容哈希 (``CONTENT_HASH_METADATA_KEY``), 供全量重写
+  类的写入路径判断数据是否变化。
+
+日期有序且行组有界后, ``WHERE date BETWEEN ? AND ?`` 这类短窗口查询可以依据行组
+统计跳过窗口外的行组, 只解码覆盖窗口的少数行组。
+"""
+
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+from typing import BinaryIO
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from storage.file_store.date_columns import (
+    coerce_date_columns,
+    get_primary_date_column,
+)
+
+# 约 16 年日线: 逐股文件本身很小, 行组过细时行组元数据与调度开销反而超过裁剪收益
+# (见 tools/benchmark_date_pruning.py); 财务类分区 (每股百余行) 仍为单行组
+PARTITION_ROW_GROUP_SIZE = 4096
+
+# 分区文件 schema 元数据中记录内容哈希的键
+CONTENT_HASH_METADATA_KEY = b"quantpylab.content_hash"
+
+
+def to_partition_table(data: pd.DataFrame | pa.Table, category: str) -> pa.Table:
+    """转换为落盘用的 Arrow 表: 去掉 symbol 列, 日期列为 DATE, 按主日期列排序"""
+    if isinstance(data, pa.Table):
+        table = data
+        if "symbol" in table.column_names:
+            table = table.drop_columns(["symbol"])
+    else:
+        columns = [column for column in data.columns if column != "symbol"]
+        table = pa.Table.from_pandas(
+            coerce_date_columns(data[columns], category), preserve_index=False
+        )
+
+    date_column = get_primary_date_column(category)
+    if date_column in table.column_names:
+        # 排序稳定, 同一日期的多行保持原有先后顺序
+        table = table.sort_by([(date_column, "ascending")])
+    return table
+
+
+def compute_content_hash(table: pa.Table, exclude_columns=()) -> str:
+    """落盘表的规范内容哈希
+
+    列按名称排序后, 对列名、类型与逐行哈希值做 SHA-256 摘要; 与列顺序、分块方式
+    和文件编码无关, 行顺序由 ``to_partition_table`` 的日期排序保证。
+
+    :param exclude_columns: 不参与哈希的派生列 (写入后由其他步骤回填)
+    """
+    columns = sorted(set(table.column_names) - set(exclude_columns))
+    digest = hashlib.sha256()
+    for name in columns:
+        digest.update(f"{name}:{table.schema.field(name).type}\n".encode())
+    frame = table.select(columns).to_pandas()
+    digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def read_content_hash(path: str | Path) -> str | None:
+    """读取分区文件记录的内容哈希 (只读 footer); 文件不存在或未记录时返回 None"""
+    try:
+        metadata = pq.read_schema(path).metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    value = metadata.get(CONTENT_HASH_METADATA_KEY)
+    return value.decode() if value else None
+
+
+def write_partition_file(
+    data: pd.DataFrame | pa.Table,
+    category: str,
+    destination: str | Path | BinaryIO,
+    row_group_size: int | None = None,
+    content_hash: str | None = None,
+) -> None:
+    """按统一布局写出一个分区文件 (行组大小默认 ``PARTITION_ROW_GROUP_SIZE``)
+
+    :param content_hash: 记录到 schema 元数据的内容哈希 (见 ``compute_content_hash``)
+    """
+    table = to_partition_table(data, category)
+    if content_hash:
+        table = table.replace_schema_metadata(
+            {
+                **(table.schema.metadata or {}),
+                CONTENT_HASH_METADATA_KEY: content_hash.encode(),
+            }
+        )
+    pq.write_table(
+        table,
+        destination,
+        compression="snappy",
+        row_group_size=row_group_size or PARTITION_ROW_GROUP_SIZE,
+        write_statistics=True,
+        write_page_index=True,
+    )
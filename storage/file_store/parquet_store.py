@@ -1,55 +1,257 @@
 import os
+import threading
+import time
+import uuid
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
 import pandas as pd
+import pyarrow as pa
 
 from config.settings import WAREHOUSE_DIR
+from storage.file_store.parquet_layout import (
+    compute_content_hash,
+    read_content_hash,
+    to_partition_table,
+    write_partition_file,
+)
+from storage.file_store.partition_lock import partition_lock
+from storage.file_store.partition_manifest import PartitionManifest, get_manifest
 from utils.logger import logger
 
+# 支持追加增量文件的类别 -> 去重主键 (同键以最新写入为准)
+DELTA_KEY_COLUMNS = {
+    "daily_kline": ("date",),
+    "etf_kline": ("date",),
+    "share_capital": ("change_date",),
+}
+DELTA_PREFIX = "delta-"
+# 单个分区的增量文件合计超过任一阈值时, 后台折叠进 data.parquet
+DELTA_MERGE_THRESHOLD_BYTES = 512 * 1024
+DELTA_MERGE_THRESHOLD_FILES = 20
+
+_merge_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="delta-merge")
+_pending_merges: dict[Path, Future] = {}
+_pending_merges_guard = threading.Lock()
+
+
+def wait_for_delta_merges() -> None:
+    """等待已提交的后台增量合并全部完成"""
+    with _pending_merges_guard:
+        futures = list(_pending_merges.values())
+    for future in futures:
+        future.result()
+
+
+def _combine_files(files: list[Path], category: str) -> pd.DataFrame:
+    """按文件顺序拼接, 同主键保留后写入的行"""
+    frames = [pd.read_parquet(path) for path in files]
+    if len(frames) == 1:
+        return frames[0]
+    df = pd.concat(frames, ignore_index=True)
+    key_columns = list(DELTA_KEY_COLUMNS.get(category, ()))
+    if key_columns:
+        df = df.drop_duplicates(subset=key_columns, keep="last")
+        df = df.sort_values(key_columns, ignore_index=True)
+    return df
+
 
 class ParquetStore:
     """
     Parquet 存储中心：负责数据的原子性写入与分片管理。
     支持 Hive-style 分区，确保并发读写不冲突。
+
+    行情与股本类别支持追加模式: 新增行写为分区目录下的 ``delta-<时间戳>-<随机串>.parquet``,
+    读取侧按主键以最新文件为准去重, 增量累积到阈值后由后台线程合并进 ``data.parquet``。
     """
 
-    def __init__(self):
-        self.base_dir = Path(WAREHOUSE_DIR)
+    def __init__(self, base_dir: str | Path | None = None):
+        self.base_dir = Path(base_dir) if base_dir is not None else Path(WAREHOUSE_DIR)
+
+    @property
+    def manifest(self) -> PartitionManifest:
+        """数据仓库的分区清单 (写入时同步维护)"""
+        return get_manifest(self.base_dir)
+
+    def _write_file(
+        self,
+        df: pd.DataFrame | pa.Table,
+        category: str,
+        target_path: Path,
+        symbol: str,
+        content_hash: str | None = None,
+    ):
+        temp_path = target_path.with_name(f".tmp_{uuid.uuid4().hex}.parquet")
+        try:
+            # 日期列统一落盘为 DATE, 按日期排序并限制行组大小, 写入临时文件后原子替换
+            # (symbol 已在目录名中, 不写入文件)
+            write_partition_file(df, category, temp_path, content_hash=content_hash)
+            os.replace(temp_path, target_path)
+
+        except Exception:
+            logger.exception(f"写入 Parquet 失败 [{symbol}]")
+            if temp_path.exists():
+                temp_path.unlink()
+            raise
 
-    def save_partition(self, df: pd.DataFrame, category: str, symbol: str):
+    def save_partition(
+        self,
+        df: pd.DataFrame | pa.Table,
+        category: str,
+        symbol: str,
+        content_hash: str | None = None,
+    ):
         """
-        原子性保存一个 symbol 的分区数据。
-        :param df: 数据 Dataframe
+        原子性保存一个 symbol 的分区数据 (全量覆盖, 同时清除已被覆盖的增量文件)。
+        :param df: 数据 Dataframe, 或已按声明 schema 转换的 Arrow 表
         :param category: 类别路径 (例如: 'financial_statements/type=balance')
         :param symbol: 股票代码
+        :param content_hash: 记录到文件元数据的内容哈希 (见 save_partition_if_changed)
         """
-        if df.empty:
+        if len(df) == 0:
             return
 
-        # 1. 准备目录 (Hive-style: category/symbol=XXXXXX/)
+        # Hive-style: category/symbol=XXXXXX/
         target_dir = self.base_dir / category / f"symbol={symbol}"
         target_dir.mkdir(parents=True, exist_ok=True)
 
-        target_path = target_dir / "data.parquet"
-        temp_path = target_dir / f".tmp_{symbol}.parquet"
+        with partition_lock(self.base_dir, category, symbol):
+            stale_deltas = self.list_deltas(category, symbol)
+            target_path = target_dir / "data.parquet"
+            self._write_file(df, category, target_path, symbol, content_hash)
+            for path in stale_deltas:
+                path.unlink(missing_ok=True)
+            self.manifest.record_files(category, symbol, [target_path], stale_deltas)
 
-        try:
-            # 如果 symbol 列在 DF 中，导出时排除它（因为它已在目录名中）
-            cols_to_save = [c for c in df.columns if c != "symbol"]
+    def save_partition_if_changed(
+        self,
+        df: pd.DataFrame | pa.Table,
+        category: str,
+        symbol: str,
+        force: bool = False,
+        hash_exclude: Iterable[str] = (),
+    ) -> bool:
+        """全量覆盖分区, 但内容与现有分区一致时跳过写入; 返回是否写入
+
+        比较落盘表的规范内容哈希与 ``data.parquet`` 元数据中记录的哈希; 分区存在
+        增量文件或现有文件未记录哈希 (旧文件、其他路径写入) 时照常写入。
+        :param force: 总是写入 (仍记录内容哈希)
+        :param hash_exclude: 不参与比较的派生列 (写入后由其他步骤回填, 合并后的新行
+            为空值, 参与比较会使内容永远"变化")
+        """
+        table = to_partition_table(df, category)
+        if table.num_rows == 0:
+            return False
+        digest = compute_content_hash(table, hash_exclude)
+        target_path = self.base_dir / category / f"symbol={symbol}" / "data.parquet"
+        with partition_lock(self.base_dir, category, symbol):
+            if (
+                not force
+                and not self.list_deltas(category, symbol)
+                and read_content_hash(target_path) == digest
+            ):
+                logger.debug(f"分区内容未变化, 跳过写入: {category}/{symbol}")
+                return False
+            self.save_partition(table, category, symbol, content_hash=digest)
+        return True
+
+    def list_deltas(self, category: str, symbol: str) -> list[Path]:
+        """分区下的增量文件, 按写入先后排序"""
+        partition_dir = self.base_dir / category / f"symbol={symbol}"
+        return sorted(partition_dir.glob(f"{DELTA_PREFIX}*.parquet"))
+
+    def list_partition_files(self, category: str, symbol: str) -> list[Path]:
+        """分区的全部数据文件: data.parquet (若存在) + 增量文件"""
+        base_path = self.base_dir / category / f"symbol={symbol}" / "data.parquet"
+        files = [base_path] if base_path.exists() else []
+        return files + self.list_deltas(category, symbol)
+
+    def append_partition(self, df: pd.DataFrame, category: str, symbol: str):
+        """
+        追加新增行为增量文件, 不读取、不重写历史数据。
+        分区尚无数据时直接全量写入 data.parquet。
+        """
+        if category not in DELTA_KEY_COLUMNS:
+            raise ValueError(f"类别不支持增量追加: {category}")
+        if df.empty:
+            return
+        # 持锁判断分区是否为空, 避免多个进程同时首写时互相覆盖
+        with partition_lock(self.base_dir, category, symbol):
+            if not self.list_partition_files(category, symbol):
+                self.save_partition(df, category, symbol)
+                return
 
-            # 2. 写入临时文件
-            df[cols_to_save].to_parquet(
-                temp_path, engine="pyarrow", compression="snappy", index=False
+            partition_dir = self.base_dir / category / f"symbol={symbol}"
+            delta_name = (
+                f"{DELTA_PREFIX}{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet"
             )
+            delta_path = partition_dir / delta_name
+            self._write_file(df, category, delta_path, symbol)
+            self.manifest.record_files(category, symbol, [delta_path])
 
-            # 3. 原子替换
-            os.replace(temp_path, target_path)
+        deltas = self.list_deltas(category, symbol)
+        delta_bytes = sum(path.stat().st_size for path in deltas if path.exists())
+        if (
+            len(deltas) >= DELTA_MERGE_THRESHOLD_FILES
+            or delta_bytes >= DELTA_MERGE_THRESHOLD_BYTES
+        ):
+            self._schedule_merge(category, symbol)
+
+    def _schedule_merge(self, category: str, symbol: str):
+        partition_dir = self.base_dir / category / f"symbol={symbol}"
+        with _pending_merges_guard:
+            pending = _pending_merges.get(partition_dir)
+            if pending is not None and not pending.done():
+                return
+            future = _merge_executor.submit(self._merge_in_background, category, symbol)
+            _pending_merges[partition_dir] = future
 
+    def _merge_in_background(self, category: str, symbol: str):
+        try:
+            self.merge_deltas(category, symbol)
         except Exception:
-            logger.exception(f"写入 Parquet 失败 [{symbol}]")
-            if temp_path.exists():
-                temp_path.unlink()
-            raise
+            # 合并失败不影响数据正确性, 增量文件保留, 下次追加时重试
+            logger.exception(f"增量文件合并失败 [{category}/{symbol}]")
+
+    def read_partition(self, category: str, symbol: str) -> pd.DataFrame:
+        """读取分区 (data.parquet + 增量文件), 同键以最新写入为准并按主键排序"""
+        files = self.list_partition_files(category, symbol)
+        if not files:
+            return pd.DataFrame()
+        return _combine_files(files, category)
+
+    def merge_deltas(self, category: str, symbol: str) -> int:
+        """将分区的增量文件合并进 data.parquet, 返回合并的增量文件数
+
+        只删除本次读到的增量文件, 合并期间新追加的文件保留到下一次合并。
+        """
+        partition_dir = self.base_dir / category / f"symbol={symbol}"
+        with partition_lock(self.base_dir, category, symbol):
+            deltas = self.list_deltas(category, symbol)
+            if not deltas:
+                return 0
+            base_path = partition_dir / "data.parquet"
+            files = [base_path, *deltas] if base_path.exists() else deltas
+            merged = _combine_files(files, category)
+            self._write_file(merged, category, base_path, symbol)
+            for path in deltas:
+                path.unlink(missing_ok=True)
+            self.manifest.record_files(category, symbol, [base_path], deltas)
+        logger.debug(f"增量文件已合并: {category}/{symbol} ({len(deltas)} 个)")
+        return len(deltas)
+
+    def merge_category_deltas(self, category: str) -> int:
+        """合并类别下全部分区的增量文件, 返回合并的增量文件总数"""
+        symbols = sorted(
+            {
+                path.parent.name.removeprefix("symbol=")
+                for path in self.base_dir.glob(
+                    f"{category}/symbol=*/{DELTA_PREFIX}*.parquet"
+                )
+            }
+        )
+        return sum(self.merge_deltas(category, symbol) for symbol in symbols)
 
     def get_path(self, category: str) -> str:
         """获取某个类别的通配符路径，用于 DuckDB 读取"""
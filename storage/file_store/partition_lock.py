@@ -0,0 +1,97 @@
+"""分区级写锁: 多个同步进程并发写入数据仓库时保护 "读取-合并-写回" 周期。
+
+锁以 (类别, 股票) 为键, 对应 ``<warehouse>/_locks/<类别>/symbol=XXXXXX.lock`` 上的
+``fcntl.flock`` 建议锁; 进程退出 (含崩溃) 时由内核自动释放。同一进程内先经线程级
+``RLock`` 串行化, 因此锁在同一线程内可重入 (例如存储器持锁读取合并后再调用
+``ParquetStore.save_partition``), 只有最外层获取时才真正加文件锁。
+
+需要同时持有多把锁时使用 ``partition_locks``, 它按固定顺序获取以避免死锁; 持有一把
+锁期间不应再去获取其他分区的锁。锁文件不删除 (删除正被加锁的文件会破坏互斥)。
+"""
+
+from __future__ import annotations
+
+import fcntl
+import os
+import threading
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+LOCK_DIR = "_locks"
+
+
+class _PartitionLock:
+    """线程可重入、跨进程互斥的分区锁"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd: int | None = None
+
+    def acquire(self) -> None:
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                except BaseException:
+                    os.close(fd)
+                    raise
+            except BaseException:
+                self._thread_lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fd, self._fd = self._fd, None
+            try:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+        self._thread_lock.release()
+
+
+_locks: dict[Path, _PartitionLock] = {}
+_locks_guard = threading.Lock()
+
+
+def get_lock_path(base_dir: str | Path, category: str, symbol: str) -> Path:
+    return Path(base_dir) / LOCK_DIR / category / f"symbol={symbol}.lock"
+
+
+def _get_lock(base_dir: str | Path, category: str, symbol: str) -> _PartitionLock:
+    path = get_lock_path(Path(base_dir).resolve(), category, symbol)
+    with _locks_guard:
+        lock = _locks.get(path)
+        if lock is None:
+            lock = _locks[path] = _PartitionLock(path)
+        return lock
+
+
+@contextmanager
+def partition_lock(base_dir: str | Path, category: str, symbol: str) -> Iterator[None]:
+    """持有单个分区的写锁"""
+    lock = _get_lock(base_dir, category, symbol)
+    lock.acquire()
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+@contextmanager
+def partition_locks(
+    base_dir: str | Path, keys: Iterable[tuple[str, str]]
+) -> Iterator[None]:
+    """按 (类别, 股票) 排序依次持有多个分区的写锁"""
+    with ExitStack() as stack:
+        for category, symbol in sorted(set(keys)):
+            stack.enter_context(partition_lock(base_dir, category, symbol))
+        yield
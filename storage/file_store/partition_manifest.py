@@ -0,0 +1,371 @@
+"""数据仓库分区清单 (manifest)。
+
+``<warehouse>/_manifest.sqlite`` 逐文件记录分区的元数据, 在每次分区写入后由存储层
+同步更新::
+
+    category / symbol / file     # 类别路径、股票代码、分区目录内的文件名
+    row_count                    # 行数 (取自 Parquet footer)
+    min_date / max_date          # 类别主日期列的范围 (ISO 日期)
+    max_report_date / report_dates   # 报告期 (YYYYMMDD), 仅含 report_date 列的类别
+    schema_hash / size / mtime_ns
+
+"已有哪些股票 / 报告期"、"本地最新日期" 这类元数据查询直接读清单, 不再扫描 Parquet
+数据。某类别首次查询时按 ``<类别>/symbol=*/*.parquet`` 逐层回填; 清单更新失败时
+该类别被标记为未索引, 下次查询重新回填。删除 ``_manifest.sqlite`` 即可整体重建。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+from datetime import date, datetime
+from pathlib import Path
+
+import pyarrow.parquet as pq
+
+from storage.file_store.date_columns import get_primary_date_column, to_date_keys
+from utils.logger import logger
+
+MANIFEST_FILE = "_manifest.sqlite"
+
+_manifests: dict[Path, PartitionManifest] = {}
+_manifests_guard = threading.Lock()
+
+
+def get_manifest(base_dir: str | Path) -> PartitionManifest:
+    """同一数据仓库共享一个清单实例"""
+    key = Path(base_dir).resolve()
+    with _manifests_guard:
+        manifest = _manifests.get(key)
+        if manifest is None:
+            manifest = _manifests[key] = PartitionManifest(key)
+        return manifest
+
+
+def _to_iso(value) -> str | None:
+    if value is None:
+        return None
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    digits = "".join(ch for ch in str(value) if ch.isdigit())[:8]
+    if len(digits) != 8:
+        return None
+    return f"{digits[:4]}-{digits[4:6]}-{digits[6:]}"
+
+
+def describe_file(path: Path, category: str) -> dict:
+    """读取单个 Parquet 文件的清单字段 (日期范围优先取 footer 统计信息)"""
+    parquet_file = pq.ParquetFile(path)
+    metadata = parquet_file.metadata
+    schema = parquet_file.schema_arrow
+    stat = path.stat()
+    entry = {
+        "row_count": metadata.num_rows,
+        "min_date": None,
+        "max_date": None,
+        "max_report_date": None,
+        "report_dates": None,
+        "schema_hash": hashlib.sha1(
+            schema.remove_metadata().to_string().encode("utf-8")
+        ).hexdigest()[:16],
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+    date_column = get_primary_date_column(category)
+    if date_column in schema.names:
+        column_index = schema.get_field_index(date_column)
+        minimums, maximums = [], []
+        for index in range(metadata.num_row_groups):
+            statistics = metadata.row_group(index).column(column_index).statistics
+            if statistics is None or not statistics.has_min_max:
+                minimums = maximums = None
+                break
+            minimums.append(_to_iso(statistics.min))
+            maximums.append(_to_iso(statistics.max))
+        if minimums is None:
+            values = parquet_file.read(columns=[date_column]).column(0).to_pylist()
+            minimums = maximums = [_to_iso(value) for value in values]
+        valid_min = [value for value in minimums if value]
+        valid_max = [value for value in maximums if value]
+        entry["min_date"] = min(valid_min) if valid_min else None
+        entry["max_date"] = max(valid_max) if valid_max else None
+
+    if "report_date" in schema.names:
+        report_dates = to_date_keys(
+            parquet_file.read(columns=["report_date"]).column(0).to_pandas()
+        )
+        keys = sorted(set(report_dates.dropna()))
+        entry["report_dates"] = ",".join(keys)
+        entry["max_report_date"] = keys[-1] if keys else None
+    return entry
+
+
+class PartitionManifest:
+    """分区清单: 写入时增量维护, 元数据查询只读 SQLite"""
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = Path(base_dir)
+        self.path = self.base_dir / MANIFEST_FILE
+        self._local = threading.local()
+        self._index_lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.base_dir.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode = WAL")
+            # 清单可由分区文件重建, 不必每次提交都 fsync
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS partition_files (
+                    category TEXT NOT NULL,
+                    symbol TEXT NOT NULL,
+                    file TEXT NOT NULL,
+                    row_count INTEGER NOT NULL,
+                    min_date TEXT,
+                    max_date TEXT,
+                    max_report_date TEXT,
+                    report_dates TEXT,
+                    schema_hash TEXT,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    PRIMARY KEY (category, symbol, file)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS indexed_categories (
+                    category TEXT PRIMARY KEY,
+                    indexed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    def _upsert(self, conn, category: str, symbol: str, path: Path) -> dict:
+        entry = describe_file(path, category)
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO partition_files VALUES
+            (:category, :symbol, :file, :row_count, :min_date, :max_date,
+             :max_report_date, :report_dates, :schema_hash, :size, :mtime_ns)
+            """,
+            {"category": category, "symbol": symbol, "file": path.name, **entry},
+        )
+        return entry
+
+    def record_files(
+        self,
+        category: str,
+        symbol: str,
+        written: list[Path] = (),
+        removed: list[Path] = (),
+    ) -> None:
+        """分区写入后更新清单; 失败时将类别标记为未索引, 等待下次查询回填"""
+        fingerprints = {}
+        try:
+            conn = self._conn()
+            with conn:
+                for path in written:
+                    entry = self._upsert(conn, category, symbol, path)
+                    fingerprints[entry["schema_hash"]] = path
+                for path in removed:
+                    conn.execute(
+                        "DELETE FROM partition_files WHERE category = ? AND symbol = ? AND file = ?",
+                        (category, symbol, path.name),
+                    )
+        except Exception:
+            logger.exception(f"分区清单更新失败, 标记待重建: {category}/{symbol}")
+            self.invalidate(category)
+            return
+        self._extend_schema_cache(category, fingerprints)
+
+    def record_partitions(self, written: list[tuple[str, str, Path]]) -> None:
+        """批量登记已写入的 (类别, 股票, 文件), 整批一个事务"""
+        fingerprints: dict[str, dict[str, Path]] = {}
+        try:
+            conn = self._conn()
+            with conn:
+                for category, symbol, path in written:
+                    entry = self._upsert(conn, category, symbol, path)
+                    fingerprints.setdefault(category, {})[entry["schema_hash"]] = path
+        except Exception:
+            logger.exception("分区清单批量更新失败, 标记待重建")
+            for category in {category for category, _, _ in written}:
+                self.invalidate(category)
+            return
+        for category, category_fingerprints in fingerprints.items():
+            self._extend_schema_cache(category, category_fingerprints)
+
+    def _extend_schema_cache(self, category: str, fingerprints: dict[str, Path]):
+        """写入带来未登记的 schema 指纹时就地扩展视图 schema 缓存, 无需全量重建"""
+        from storage.database.schema_builder import extend_schema
+
+        try:
+            extend_schema(self.base_dir, category, fingerprints)
+        except Exception:
+            logger.exception(f"schema 缓存扩展失败: {category}")
+
+    def invalidate(self, category: str) -> None:
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute(
+                    "DELETE FROM indexed_categories WHERE category = ?", (category,)
+                )
+        except sqlite3.Error:
+            logger.exception(f"分区清单失效标记失败: {category}")
+
+    def rebuild(self, category: str) -> int:
+        """按 ``<类别>/symbol=*/*.parquet`` 逐层回填类别的清单, 返回文件数"""
+        paths = sorted(self.base_dir.glob(f"{category}/symbol=*/*.parquet"))
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM partition_files WHERE category = ?", (category,))
+            for path in paths:
+                symbol = path.parent.name.removeprefix("symbol=")
+                try:
+                    self._upsert(conn, category, symbol, path)
+                except OSError:
+                    # 回填期间被合并删除的增量文件
+                    continue
+            conn.execute(
+                "INSERT OR REPLACE INTO indexed_categories (category) VALUES (?)",
+                (category,),
+            )
+        logger.info(f"分区清单回填完成: {category} ({len(paths)} 个文件)")
+        return len(paths)
+
+    def refresh(self, category: str) -> int:
+        """对比文件 mtime/size 与清单, 只重新读取变化文件的 footer, 返回变化的文件数"""
+        conn = self._ensure_indexed(category)
+        known = {
+            (symbol, file): (size, mtime_ns)
+            for symbol, file, size, mtime_ns in conn.execute(
+                "SELECT symbol, file, size, mtime_ns FROM partition_files WHERE category = ?",
+                (category,),
+            )
+        }
+        seen = set()
+        changed = 0
+        with conn:
+            for path in self.base_dir.glob(f"{category}/symbol=*/*.parquet"):
+                symbol = path.parent.name.removeprefix("symbol=")
+                key = (symbol, path.name)
+                try:
+                    stat = path.stat()
+                    seen.add(key)
+                    if known.get(key) == (stat.st_size, stat.st_mtime_ns):
+                        continue
+                    self._upsert(conn, category, symbol, path)
+                except OSError:
+                    continue
+                changed += 1
+            for symbol, file in known.keys() - seen:
+                conn.execute(
+                    "DELETE FROM partition_files WHERE category = ? AND symbol = ? AND file = ?",
+                    (category, symbol, file),
+                )
+                changed += 1
+        if changed:
+            logger.info(f"分区清单刷新: {category} 变化 {changed} 个文件")
+        return changed
+
+    def get_schema_files(self, category: str) -> dict[str, Path]:
+        """类别内每个 schema 指纹对应的一个代表文件"""
+        conn = self._ensure_indexed(category)
+        rows = conn.execute(
+            "SELECT schema_hash, symbol, file FROM partition_files WHERE category = ? GROUP BY schema_hash",
+            (category,),
+        ).fetchall()
+        return {
+            schema_hash: self.base_dir / category / f"symbol={symbol}" / file
+            for schema_hash, symbol, file in rows
+        }
+
+    def _ensure_indexed(self, category: str) -> sqlite3.Connection:
+        conn = self._conn()
+        indexed = conn.execute(
+            "SELECT 1 FROM indexed_categories WHERE category = ?", (category,)
+        ).fetchone()
+        if indexed is None:
+            with self._index_lock:
+                indexed = conn.execute(
+                    "SELECT 1 FROM indexed_categories WHERE category = ?", (category,)
+                ).fetchone()
+                if indexed is None:
+                    self.rebuild(category)
+        return conn
+
+    def get_symbols(self, category: str) -> set[str]:
+        """有数据的股票代码集合"""
+        conn = self._ensure_indexed(category)
+        rows = conn.execute(
+            "SELECT DISTINCT symbol FROM partition_files WHERE category = ? AND row_count > 0",
+            (category,),
+        ).fetchall()
+        return {row[0] for row in rows}
+
+    def get_report_date_keys(self, category: str) -> set[str]:
+        """``{symbol}_{YYYYMMDD}`` 报告期集合"""
+        conn = self._ensure_indexed(category)
+        rows = conn.execute(
+            "SELECT symbol, report_dates FROM partition_files WHERE category = ? AND report_dates != ''",
+            (category,),
+        ).fetchall()
+        return {
+            f"{symbol}_{report_date}"
+            for symbol, report_dates in rows
+            for report_date in report_dates.split(",")
+        }
+
+    def get_report_dates(self, category: str, symbol: str) -> set[str]:
+        """单只股票的 YYYYMMDD 报告期集合"""
+        conn = self._ensure_indexed(category)
+        rows = conn.execute(
+            "SELECT report_dates FROM partition_files WHERE category = ? AND symbol = ? AND report_dates != ''",
+            (category, symbol),
+        ).fetchall()
+        return {
+            report_date
+            for (report_dates,) in rows
+            for report_date in report_dates.split(",")
+        }
+
+    def get_max_date(self, category: str, symbol: str) -> date | None:
+        """单只股票主日期列的最大值 (含未合并的增量文件)"""
+        conn = self._ensure_indexed(category)
+        row = conn.execute(
+            "SELECT MAX(max_date) FROM partition_files WHERE category = ? AND symbol = ?",
+            (category, symbol),
+        ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return date.fromisoformat(row[0])
+
+    def get_partition_stats(self, category: str) -> dict[str, dict]:
+        """按股票汇总的清单 (行数为各文件之和, 未合并增量可能含重复键)"""
+        conn = self._ensure_indexed(category)
+        rows = conn.execute(
+            """
+            SELECT symbol, SUM(row_count), MIN(min_date), MAX(max_date),
+                   MAX(max_report_date), SUM(size), MAX(mtime_ns), COUNT(*)
+            FROM partition_files WHERE category = ? GROUP BY symbol
+            """,
+            (category,),
+        ).fetchall()
+        return {
+            row[0]: {
+                "row_count": row[1],
+                "min_date": row[2],
+                "max_date": row[3],
+                "max_report_date": row[4],
+                "size": row[5],
+                "mtime_ns": row[6],
+                "file_count": row[7],
+            }
+            for row in rows
+        }
@@ -0,0 +1,26 @@
+"""测试会话级隔离: 元数据库、日志、数据仓库与响应缓存指向临时目录
+
+``storage.database.manager`` 在导入时创建全局 ``db_manager`` (随即建表), 日志模块
+在导入时挂载文件 handler, 均读取 ``config.settings`` 中的路径。conftest 先于测试
+模块导入, 在此改写这些路径, 运行 pytest 不再触碰仓库内的 data/ 与 logs/。
+各测试文件仍按需以 monkeypatch 进一步隔离。
+"""
+
+import shutil
+import tempfile
+from pathlib import Path
+
+import config.settings as settings
+
+_session_dir = Path(tempfile.mkdtemp(prefix="quantpylab-tests-"))
+settings.DATA_DIR = _session_dir / "data"
+settings.SQLITE_DB_PATH = settings.DATA_DIR / "metadata.db"
+settings.RESPONSE_CACHE_DIR = settings.DATA_DIR / "cache" / "responses"
+settings.WAREHOUSE_DIR = settings.DATA_DIR / "warehouse"
+settings.WAREHOUSE_DIR.mkdir(parents=True, exist_ok=True)
+settings.LOG_DIR = _session_dir / "logs"
+settings.LOG_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_session_dir, ignore_errors=True)
@@ -1,12 +1,18 @@
 """测试多 Parquet 分区的事务式替换。"""
 
+import os
 from pathlib import Path
 
 import pandas as pd
 import pytest
 
 import storage.file_store.atomic_partition_store as atomic_store_mod
-from storage.file_store.atomic_partition_store import save_partitions_atomically
+from storage.file_store.atomic_partition_store import (
+    JOURNAL_DIR,
+    PartitionCommitGroup,
+    recover_partition_journals,
+    save_partitions_atomically,
+)
 
 
 def test_save_partitions_atomically_rolls_back_on_failure(tmp_path, monkeypatch):
@@ -82,7 +88,7 @@ def test_backup_cleanup_failure_keeps_committed_partition_and_backup(
 
 
 def test_temp_partition_is_removed_when_write_fails(tmp_path, monkeypatch):
-    def fail_write(df, temp_path):
+    def fail_write(df, category, temp_path, content_hash=None):
         temp_path.touch()
         raise OSError("模拟临时文件写入失败")
 
@@ -95,3 +101,96 @@ def test_temp_partition_is_removed_when_write_fails(tmp_path, monkeypatch):
         )
 
     assert not list(Path(tmp_path).rglob(".tmp_*.parquet"))
+
+
+def test_group_commit_journals_once_and_fsyncs_each_directory_once(
+    tmp_path, monkeypatch
+):
+    synced = []
+    original_fsync_directory = atomic_store_mod._fsync_directory
+
+    def record_fsync(path):
+        synced.append(Path(path))
+        original_fsync_directory(path)
+
+    monkeypatch.setattr(atomic_store_mod, "_fsync_directory", record_fsync)
+    journals = []
+    original_write_journal = atomic_store_mod._write_journal
+
+    def record_journal(warehouse_dir, prepared):
+        journals.append(len(prepared))
+        return original_write_journal(warehouse_dir, prepared)
+
+    monkeypatch.setattr(atomic_store_mod, "_write_journal", record_journal)
+
+    category = "financial_statements/type=income"
+    with PartitionCommitGroup(tmp_path) as group:
+        for symbol in ("000001", "000002", "000003"):
+            group.add(pd.DataFrame({"value": [1]}), category, symbol)
+
+    assert journals == [3]
+    directory_syncs = [path for path in synced if path.name != JOURNAL_DIR]
+    assert len(directory_syncs) == len(set(directory_syncs)) == 6
+    assert not list((tmp_path / JOURNAL_DIR).iterdir())
+    for symbol in ("000001", "000002", "000003"):
+        path = tmp_path / category / f"symbol={symbol}" / "data.parquet"
+        assert pd.read_parquet(path)["value"].tolist() == [1]
+
+
+def test_recovery_rolls_forward_interrupted_commit(tmp_path):
+    category = "financial/ttm"
+    save_partitions_atomically(
+        tmp_path, [(pd.DataFrame({"value": [1]}), category, "000001")]
+    )
+
+    group = PartitionCommitGroup(tmp_path)
+    group.add(pd.DataFrame({"value": [10]}), category, "000001")
+    group.add(pd.DataFrame({"value": [20]}), category, "000002")
+    prepared = group._prepared
+    journal_path, journal_fd = atomic_store_mod._write_journal(tmp_path, prepared)
+    # 模拟第一个分区改名为备份后进程崩溃: 写入方持有的日志锁随之释放
+    os.replace(prepared[0].target_path, prepared[0].planned_backup)
+    os.close(journal_fd)
+
+    assert recover_partition_journals(tmp_path) == 1
+
+    assert not journal_path.exists()
+    assert pd.read_parquet(prepared[0].target_path)["value"].tolist() == [10]
+    assert pd.read_parquet(prepared[1].target_path)["value"].tolist() == [20]
+    assert not list(Path(tmp_path).rglob(".tmp_*.parquet"))
+    assert not list(Path(tmp_path).rglob(".backup_*.parquet"))
+
+
+def test_recovery_treats_missing_temp_file_as_rolled_forward(tmp_path):
+    """另一进程已前滚部分分区 (临时文件已不存在) 时照常完成恢复"""
+    category = "financial/ttm"
+    group = PartitionCommitGroup(tmp_path)
+    group.add(pd.DataFrame({"value": [10]}), category, "000001")
+    group.add(pd.DataFrame({"value": [20]}), category, "000002")
+    prepared = group._prepared
+    _, journal_fd = atomic_store_mod._write_journal(tmp_path, prepared)
+    os.replace(prepared[0].temp_path, prepared[0].target_path)
+    os.close(journal_fd)
+
+    assert recover_partition_journals(tmp_path) == 1
+    assert recover_partition_journals(tmp_path) == 0
+    assert pd.read_parquet(prepared[0].target_path)["value"].tolist() == [10]
+    assert pd.read_parquet(prepared[1].target_path)["value"].tolist() == [20]
+
+
+def test_recovery_skips_journal_locked_by_live_writer(tmp_path):
+    """写入方仍持有日志锁 (提交进行中) 时跳过; 判断不依赖 pid, 本进程遗留的日志照常前滚"""
+    category = "financial/ttm"
+    group = PartitionCommitGroup(tmp_path)
+    group.add(pd.DataFrame({"value": [10]}), category, "000001")
+    prepared = group._prepared
+    journal_path, journal_fd = atomic_store_mod._write_journal(tmp_path, prepared)
+
+    assert recover_partition_journals(tmp_path) == 0
+    assert prepared[0].temp_path.exists()
+
+    # 日志内容与 pid 无关: 同一进程写入、锁已释放的日志即视为崩溃遗留
+    os.close(journal_fd)
+    assert recover_partition_journals(tmp_path) == 1
+    assert not journal_path.exists()
+    assert pd.read_parquet(prepared[0].target_path)["value"].tolist() == [10]
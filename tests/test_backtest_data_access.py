@@ -1,9 +1,11 @@
 from datetime import date
 
 import pandas as pd
+import pytest
 
 from backtest.config import BacktestConfig
 from backtest.data_access import BacktestDataAccess, IndicatorField
+from storage.database.valuation_sql import build_valuation_sql, get_required_views
 
 
 def _config():
@@ -20,12 +22,13 @@ def test_load_factor_data_collects_registered_input_requirements(monkeypatch):
     captured = {}
 
     def fake_load_market_data(
-        config, lookback_days, indicator_fields=(), kline_fields=()
+        config, lookback_days, indicator_fields=(), kline_fields=(), valuation_fields=()
     ):
         captured["config"] = config
         captured["lookback_days"] = lookback_days
         captured["indicator_fields"] = indicator_fields
         captured["kline_fields"] = kline_fields
+        captured["valuation_fields"] = valuation_fields
         return pd.DataFrame()
 
     monkeypatch.setattr(access, "load_market_data", fake_load_market_data)
@@ -44,6 +47,7 @@ def test_load_factor_data_collects_registered_input_requirements(monkeypatch):
     assert result.empty
     assert captured["lookback_days"] == 300
     assert captured["kline_fields"] == ()
+    assert captured["valuation_fields"] == ("close_hfq",)
     assert captured["indicator_fields"] == (
         IndicatorField("净资产收益率_加权", "roe_weighted"),
         IndicatorField("经营现金流/营业收入", "operating_cashflow_to_revenue"),
@@ -61,7 +65,102 @@ def test_load_factor_data_rejects_empty_factor_list():
         raise AssertionError("空因子列表应该被拒绝")
 
 
-def test_build_kline_projection_quotes_requested_columns():
-    projection = BacktestDataAccess._build_kline_projection(("volume", "amount"))
+def test_price_only_valuation_sql_skips_all_history_joins():
+    sql = build_valuation_sql(("raw_close", "close_hfq"), kline_columns=("volume",))
 
-    assert projection == ', kline."volume" AS "volume", kline."amount" AS "amount"'
+    assert get_required_views(("raw_close", "close_hfq")) == ("daily_kline",)
+    assert "ASOF JOIN" not in sql
+    assert 'k."volume" AS "volume"' in sql
+
+
+def test_valuation_sql_joins_only_sources_of_requested_fields():
+    pe_sql = build_valuation_sql(("pe_ttm",))
+    pb_sql = build_valuation_sql(("pb",))
+
+    assert "ttm_hist" in pe_sql and "assets_hist" not in pe_sql
+    assert "assets_hist" in pb_sql and "ttm_hist" not in pb_sql
+    assert get_required_views(("pb",)) == (
+        "daily_kline",
+        "share_capital",
+        "fin_balance_sheet",
+    )
+
+
+def test_valuation_sql_rejects_unknown_field():
+    with pytest.raises(ValueError, match="不支持的估值字段"):
+        build_valuation_sql(("dividend_yield",))
+
+
+class _FakeDBManager:
+    def __init__(self, conn):
+        self.conn = conn
+        self.ensured_views = []
+
+    def ensure_views(self, *names):
+        self.ensured_views.extend(names)
+
+    def get_duckdb_conn(self):
+        return self.conn
+
+
+def _valuation_conn():
+    import duckdb
+
+    conn = duckdb.connect(":memory:")
+    conn.execute(
+        """
+        CREATE TABLE daily_kline AS
+        SELECT * FROM (VALUES
+            (DATE '2024-01-02', '000001', 10.0, 2.0, 9.0, 100.0),
+            (DATE '2024-01-03', '000001', 11.0, 2.0, 10.0, 200.0),
+            (DATE '2024-01-03', '000002', 0.0, 1.0, 4.0, 300.0)
+        ) AS t(date, symbol, close, adj_factor, open, volume)
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE share_capital AS
+        SELECT * FROM (VALUES
+            (DATE '2023-01-01', '000001', 100.0),
+            (DATE '2023-01-01', '000002', 50.0)
+        ) AS t(change_date, symbol, total_shares)
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE fin_balance_sheet AS
+        SELECT * FROM (VALUES
+            ('000001', DATE '2023-03-31', DATE '2023-04-28', DATE '2023-04-28', 500.0)
+        ) AS t(symbol, report_date, 公告日期, 数据可用日期, 归属于母公司股东权益合计)
+        """
+    )
+    return conn
+
+
+def test_load_market_data_returns_arrow_backed_frame_with_sql_derivations():
+    db = _FakeDBManager(_valuation_conn())
+    access = BacktestDataAccess(db)
+
+    frame = access.load_market_data(_config(), 0, kline_fields=("volume",))
+
+    assert db.ensured_views == ["daily_kline"]
+    assert all(isinstance(dtype, pd.ArrowDtype) for dtype in frame.dtypes)
+    assert str(frame["date"].dtype) == "timestamp[us][pyarrow]"
+    assert frame["close_hfq"].tolist()[:2] == [20.0, 22.0]
+    assert frame["open_hfq"].tolist()[:2] == [18.0, 20.0]
+    # 除权价格缺失 (raw_close=0) 时不生成无穷大的后复权开盘价
+    assert pd.isna(frame["open_hfq"].iloc[2])
+    assert frame["volume"].tolist() == [100.0, 200.0, 300.0]
+    assert "pe_ttm" not in frame.columns
+
+
+def test_load_market_data_joins_balance_sheet_only_for_pb():
+    db = _FakeDBManager(_valuation_conn())
+    access = BacktestDataAccess(db)
+
+    frame = access.load_market_data(_config(), 0, valuation_fields=("pb",))
+
+    assert db.ensured_views == ["daily_kline", "share_capital", "fin_balance_sheet"]
+    # 000002 没有净资产历史, 与 v_daily_valuation 一致地被 ASOF JOIN 排除
+    assert frame["symbol"].tolist() == ["000001", "000001"]
+    assert frame["pb"].tolist() == [2.0, 2.2]
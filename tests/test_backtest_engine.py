@@ -196,3 +196,27 @@ def test_delisted_position_does_not_block_rebalance():
     ]
     assert len(buy_b) == 1
     assert buy_b.iloc[0]["date"] == pd.Timestamp("2024-01-04")
+
+
+def test_engine_accepts_arrow_backed_prices():
+    import pyarrow as pa
+
+    prices = pa.Table.from_pandas(_prices(), preserve_index=False).to_pandas(
+        types_mapper=pd.ArrowDtype
+    )
+    targets = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2024-01-02"]),
+            "symbol": ["000001"],
+            "score": [1.0],
+            "rank": [1],
+            "target_weight": [1.0],
+        }
+    )
+
+    arrow_result = DailyBacktestEngine(_config()).run(prices, targets)
+    numpy_result = DailyBacktestEngine(_config()).run(_prices(), targets)
+
+    assert arrow_result.daily_nav["nav"].tolist() == pytest.approx(
+        numpy_result.daily_nav["nav"].tolist()
+    )
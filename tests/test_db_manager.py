@@ -0,0 +1,138 @@
+"""单元测试: storage/database/manager.py DuckDB 线程游标 (不触真实数据库)"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import duckdb
+import pytest
+
+from storage.database import manager as manager_mod
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(manager_mod, "SQLITE_DB_PATH", tmp_path / "metadata.db")
+    instance = manager_mod.DBManager()
+    yield instance
+    instance.close_all()
+
+
+def _cursor_in_thread(manager):
+    result = {}
+
+    def worker():
+        result["cursor"] = manager.get_duckdb_conn()
+        result["again"] = manager.get_duckdb_conn()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    return result
+
+
+def test_same_thread_reuses_cursor_and_threads_get_their_own(manager):
+    main_cursor = manager.get_duckdb_conn()
+    assert manager.get_duckdb_conn() is main_cursor
+
+    result = _cursor_in_thread(manager)
+    assert result["cursor"] is result["again"]
+    assert result["cursor"] is not main_cursor
+
+
+def test_views_are_visible_to_all_thread_cursors(manager):
+    manager.get_duckdb_conn().execute(
+        "CREATE VIEW v_numbers AS SELECT * FROM range(10) t(i)"
+    )
+
+    def count():
+        conn = manager.get_duckdb_conn()
+        return conn.execute("SELECT COUNT(*) FROM v_numbers").fetchone()[0]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        assert list(pool.map(lambda _: count(), range(8))) == [10] * 8
+
+
+def test_concurrent_ensure_views_registers_once(manager, monkeypatch):
+    failures = []
+    monkeypatch.setattr(
+        manager_mod.logger, "exception", lambda message: failures.append(message)
+    )
+
+    class FakeView:
+        name = "v_fake"
+        dependencies = []
+
+        def get_sql(self, warehouse_dir):
+            # 非 OR REPLACE: 重复注册会报错
+            return "CREATE VIEW v_fake AS SELECT 1 AS x"
+
+    class FakeLoader:
+        view_classes = {"v_fake": FakeView}
+
+    monkeypatch.setattr(manager, "_get_view_loader", lambda: FakeLoader())
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda _: manager.ensure_views("v_fake"), range(8)))
+
+    assert failures == []
+    assert "v_fake" in manager.list_available_views()
+
+
+def test_ensure_views_reregisters_view_whose_sql_changed(manager, monkeypatch):
+    source = {"value": 1}
+
+    class FakeView:
+        name = "v_fake"
+        dependencies = []
+
+        def get_sql(self, warehouse_dir):
+            return f"CREATE OR REPLACE VIEW v_fake AS SELECT {source['value']} AS x"
+
+    class FakeLoader:
+        view_classes = {"v_fake": FakeView}
+
+    monkeypatch.setattr(manager, "_get_view_loader", lambda: FakeLoader())
+    conn = manager.get_duckdb_conn()
+    manager.ensure_views("v_fake")
+    assert conn.execute("SELECT x FROM v_fake").fetchone() == (1,)
+
+    source["value"] = 2
+    manager.ensure_views("v_fake")
+    assert conn.execute("SELECT x FROM v_fake").fetchone() == (2,)
+
+
+def test_close_all_resets_thread_cursors(manager):
+    old_cursor = manager.get_duckdb_conn()
+    manager.close_all()
+
+    new_cursor = manager.get_duckdb_conn()
+    assert new_cursor is not old_cursor
+    assert new_cursor.execute("SELECT 1").fetchone()[0] == 1
+
+
+def test_cursors_of_finished_threads_are_closed(manager):
+    """已退出线程的游标在派生新游标时关闭并移除, 不随线程数累积"""
+    finished = [_cursor_in_thread(manager)["cursor"] for _ in range(5)]
+
+    manager.get_duckdb_conn()
+    assert list(manager._duckdb_cursors) == [threading.current_thread()]
+    with pytest.raises(duckdb.ConnectionException):
+        finished[0].execute("SELECT 1")
+
+
+def test_use_snapshot_returns_separate_reader(manager, tmp_path):
+    """快照读取使用独立 DuckDB 内存库, 不改动单例的根目录与已注册视图"""
+    from storage.database.warehouse_snapshot import SNAPSHOT_DIR, publish_snapshot
+
+    warehouse = tmp_path / "warehouse"
+    warehouse.mkdir()
+    manager.warehouse_dir = warehouse
+    publish_snapshot(warehouse)
+    manager.get_duckdb_conn().execute("CREATE VIEW v_live AS SELECT 1 AS x")
+
+    with manager.use_snapshot() as reader:
+        assert reader is not manager
+        assert reader.warehouse_dir == warehouse / SNAPSHOT_DIR / "gen-000001"
+        assert "v_live" not in reader.list_available_views()
+        assert manager.warehouse_dir == warehouse
+        assert "v_live" in manager.list_available_views()
+    assert list((reader.warehouse_dir / "_pins").iterdir()) == []
@@ -0,0 +1,90 @@
+"""单元测试: storage/database/declared_schema.py 声明式 Arrow schema 批量转换"""
+
+from datetime import date
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import storage.database.declared_schema as declared_schema_mod
+import storage.file_store.parquet_store as parquet_store_mod
+from storage.database.declared_schema import get_declared_types, to_declared_table
+from storage.database.financial_store import FINANCIAL_META_COLUMNS
+from storage.file_store.parquet_store import ParquetStore
+
+CATEGORY = "financial_statements/type=income"
+
+
+@pytest.fixture(autouse=True)
+def income_schema(monkeypatch):
+    monkeypatch.setattr(
+        declared_schema_mod,
+        "load_schema",
+        lambda dataset: {
+            "report_date": "DATE",
+            "营业收入": "DOUBLE",
+            "员工人数": "BIGINT",
+            "数据源": "VARCHAR",
+        },
+    )
+
+
+def _frame():
+    return pd.DataFrame(
+        {
+            "symbol": ["000001", "000001"],
+            "report_date": ["20240331", "2023-12-31"],
+            "营业收入": ["1.5", "--"],
+            "员工人数": [10, 12],
+            "净利润": [1.0, None],
+            "数据源": ["sina", None],
+        }
+    )
+
+
+def test_declared_types_keep_numeric_columns_only():
+    assert get_declared_types("fin_income_statement") == {
+        "营业收入": pa.float64(),
+        "员工人数": pa.int64(),
+    }
+
+
+def test_converts_to_declared_arrow_schema():
+    table = to_declared_table(
+        _frame(), "fin_income_statement", CATEGORY, FINANCIAL_META_COLUMNS
+    )
+
+    assert table.schema == pa.schema(
+        [
+            ("report_date", pa.date32()),
+            ("营业收入", pa.float64()),
+            ("员工人数", pa.int64()),
+            ("净利润", pa.float64()),
+            ("数据源", pa.string()),
+        ]
+    )
+    assert table.column("report_date").to_pylist() == [
+        date(2024, 3, 31),
+        date(2023, 12, 31),
+    ]
+    # 无法解析的文本置空, 元数据列的空值写为空串
+    assert table.column("营业收入").to_pylist() == [1.5, None]
+    assert table.column("净利润").to_pylist() == [1.0, None]
+    assert table.column("数据源").to_pylist() == ["sina", ""]
+
+
+def test_parquet_store_writes_arrow_table(tmp_path, monkeypatch):
+    monkeypatch.setattr(parquet_store_mod, "WAREHOUSE_DIR", tmp_path)
+    table = to_declared_table(
+        _frame(), "fin_income_statement", CATEGORY, FINANCIAL_META_COLUMNS
+    )
+
+    ParquetStore().save_partition(table, CATEGORY, "000001")
+
+    path = tmp_path / CATEGORY / "symbol=000001" / "data.parquet"
+    assert pq.read_schema(path) == table.schema
+    assert ParquetStore().manifest.get_report_dates(CATEGORY, "000001") == {
+        "20240331",
+        "20231231",
+    }
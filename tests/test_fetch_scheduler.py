@@ -0,0 +1,78 @@
+"""单元测试: utils/fetch_scheduler.py 数据源限速、自适应退避与全局熔断 (不触网络)"""
+
+import threading
+
+import pytest
+
+from utils.fetch_scheduler import (
+    SOURCE_EASTMONEY,
+    SOURCE_SINA,
+    FetchScheduler,
+    SourceLimit,
+)
+from utils.requests_protection import SinaBlockedError
+
+FAST_LIMITS = {
+    SOURCE_SINA: SourceLimit(rate=1000.0, burst=1000.0, concurrency=1),
+    SOURCE_EASTMONEY: SourceLimit(rate=1000.0, burst=1000.0, concurrency=2),
+}
+
+
+def test_sina_block_trips_breaker_for_every_stage():
+    calls = []
+
+    def fetch(code):
+        calls.append(code)
+        if code == "000002":
+            raise SinaBlockedError("HTTP 456")
+        return True
+
+    with FetchScheduler(max_workers=2, limits=FAST_LIMITS) as scheduler:
+        with pytest.raises(SinaBlockedError):
+            scheduler.run(SOURCE_SINA, ["000001", "000002", "000003"], fetch)
+        # 熔断后其他数据源的环节也不再派发
+        with pytest.raises(SinaBlockedError):
+            scheduler.run(SOURCE_EASTMONEY, ["600519"], fetch)
+
+    assert calls == ["000001", "000002"]
+
+
+def test_failures_back_off_and_successes_recover():
+    def fetch(code):
+        if code.startswith("bad"):
+            raise RuntimeError("重试耗尽")
+        return code
+
+    with FetchScheduler(max_workers=1, limits=FAST_LIMITS) as scheduler:
+        outcomes = scheduler.run(SOURCE_EASTMONEY, ["bad1", "bad2"], fetch)
+        bucket = scheduler.get_bucket(SOURCE_EASTMONEY)
+        assert [type(o.error) for o in outcomes] == [RuntimeError, RuntimeError]
+        assert bucket.rate == pytest.approx(bucket.base_rate / 4)
+
+        outcomes = scheduler.run(SOURCE_EASTMONEY, [f"ok{i}" for i in range(20)], fetch)
+        assert [o.result for o in outcomes] == [f"ok{i}" for i in range(20)]
+        assert bucket.rate == bucket.base_rate
+
+
+def test_stages_on_different_sources_overlap():
+    sina_started = threading.Event()
+    release_sina = threading.Event()
+    eastmoney_done = []
+
+    def slow_sina(code):
+        sina_started.set()
+        assert release_sina.wait(5), "东财环节未能与新浪环节并行"
+        return code
+
+    with FetchScheduler(max_workers=3, limits=FAST_LIMITS) as scheduler:
+        sina_stage = threading.Thread(
+            target=scheduler.run, args=(SOURCE_SINA, ["000001"], slow_sina)
+        )
+        sina_stage.start()
+        assert sina_started.wait(5)
+        # 新浪任务阻塞期间, 东财任务照常完成
+        scheduler.run(SOURCE_EASTMONEY, ["600519", "000858"], eastmoney_done.append)
+        release_sina.set()
+        sina_stage.join(5)
+
+    assert sorted(eastmoney_done) == ["000858", "600519"]
@@ -42,26 +42,26 @@ def test_daily_valuation_view_executes_with_net_assets_alias():
         )
         conn.execute(
             "CREATE TABLE fin_ttm ("
-            "symbol VARCHAR, pub_date VARCHAR, report_date VARCHAR, "
+            "symbol VARCHAR, pub_date DATE, report_date DATE, "
             "net_profit_ttm DOUBLE, deduct_net_profit_ttm DOUBLE, "
             "revenue_ttm DOUBLE, ocf_ttm DOUBLE"
             ")"
         )
         conn.execute(
             "CREATE TABLE fin_balance_sheet ("
-            'symbol VARCHAR, "数据可用日期" VARCHAR, "公告日期" VARCHAR, '
-            'report_date VARCHAR, "归属于母公司股东权益合计" DOUBLE'
+            'symbol VARCHAR, "数据可用日期" DATE, "公告日期" DATE, '
+            'report_date DATE, "归属于母公司股东权益合计" DOUBLE'
             ")"
         )
         conn.execute("INSERT INTO daily_kline VALUES ('000001', '2024-11-16', 100, 1)")
         conn.execute("INSERT INTO share_capital VALUES ('000001', '2024-01-01', 10)")
         conn.execute(
             "INSERT INTO fin_ttm VALUES "
-            "('000001', '20241115', '20240930', 100, 100, 1000, 100)"
+            "('000001', '2024-11-15', '2024-09-30', 100, 100, 1000, 100)"
         )
         conn.execute(
             "INSERT INTO fin_balance_sheet VALUES "
-            "('000001', '20241115', '20241030', '20240930', 1000)"
+            "('000001', '2024-11-15', '2024-10-30', '2024-09-30', 1000)"
         )
 
         conn.execute(DailyValuationView().get_sql("/tmp/warehouse"))
@@ -86,15 +86,15 @@ def test_ttm_pub_date_flows_to_valuation_factor_asof():
         )
         conn.execute(
             "CREATE TABLE fin_ttm ("
-            "symbol VARCHAR, pub_date VARCHAR, report_date VARCHAR, "
+            "symbol VARCHAR, pub_date DATE, report_date DATE, "
             "net_profit_ttm DOUBLE, deduct_net_profit_ttm DOUBLE, "
             "revenue_ttm DOUBLE, ocf_ttm DOUBLE"
             ")"
         )
         conn.execute(
             "CREATE TABLE fin_balance_sheet ("
-            'symbol VARCHAR, "数据可用日期" VARCHAR, "公告日期" VARCHAR, '
-            'report_date VARCHAR, "归属于母公司股东权益合计" DOUBLE'
+            'symbol VARCHAR, "数据可用日期" DATE, "公告日期" DATE, '
+            'report_date DATE, "归属于母公司股东权益合计" DOUBLE'
             ")"
         )
         conn.executemany(
@@ -108,11 +108,11 @@ def test_ttm_pub_date_flows_to_valuation_factor_asof():
         conn.execute("INSERT INTO share_capital VALUES ('000001', '2024-01-01', 10)")
         conn.execute(
             "INSERT INTO fin_ttm VALUES "
-            "('000001', '20241030', '20240930', 100, 100, 1000, 100)"
+            "('000001', '2024-10-30', '2024-09-30', 100, 100, 1000, 100)"
         )
         conn.execute(
             "INSERT INTO fin_balance_sheet VALUES "
-            "('000001', '20241001', '20241001', '20240930', 1000)"
+            "('000001', '2024-10-01', '2024-10-01', '2024-09-30', 1000)"
         )
 
         conn.execute(DailyValuationView().get_sql("/tmp/warehouse"))
@@ -116,6 +116,12 @@ class TestNoDataOverride:
 class TestGetDisclosurePlans:
     """披露计划获取: 双市场聚合 + 调用前 INFO 日志说明 (为 akshare 内部分页进度条提供上下文)"""
 
+    @pytest.fixture(autouse=True)
+    def _isolate_cache(self, tmp_path, monkeypatch):
+        import utils.response_cache as response_cache_mod
+
+        monkeypatch.setattr(response_cache_mod, "RESPONSE_CACHE_DIR", tmp_path)
+
     def _fake_yysj(self, calls):
         def fake(symbol: str, date: str):
             calls.append((symbol, date))
@@ -3,6 +3,8 @@
 from pathlib import Path
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 import storage.database.financial_publish_date_reconciler as reconciler_mod
 import storage.database.financial_store as financial_store_mod
@@ -13,8 +15,10 @@ from storage.database.financial_publish_date_reconciler import (
     build_canonical_publish_date_map,
     build_data_available_date_map,
     normalize_financial_dates,
+    reconcile_financial_publish_dates,
     reconcile_financial_publish_dates_for_symbol,
 )
+from storage.file_store.date_columns import date_columns_to_keys
 
 SYMBOL = "000418"
 SOURCE_CATEGORIES = reconciler_mod.FINANCIAL_SOURCE_CATEGORIES
@@ -25,6 +29,7 @@ def _write_source(
     source_name: str,
     dates: list[str],
     values: list[object],
+    symbol: str = SYMBOL,
 ) -> None:
     frame = pd.DataFrame(
         {
@@ -34,7 +39,7 @@ def _write_source(
         }
     )
     path = (
-        warehouse / SOURCE_CATEGORIES[source_name] / f"symbol={SYMBOL}" / "data.parquet"
+        warehouse / SOURCE_CATEGORIES[source_name] / f"symbol={symbol}" / "data.parquet"
     )
     path.parent.mkdir(parents=True, exist_ok=True)
     frame.to_parquet(path, index=False)
@@ -120,12 +125,47 @@ def test_reconcile_overwrites_all_available_sources(tmp_path):
     expected_available = ["20161025", "20171025"]
     for source_name, category in SOURCE_CATEGORIES.items():
         path = tmp_path / category / f"symbol={SYMBOL}" / "data.parquet"
-        result = pd.read_parquet(path)
+        assert pq.read_schema(path).field("公告日期").type == pa.date32()
+        result = date_columns_to_keys(pd.read_parquet(path), category)
         assert result["公告日期"].tolist() == expected
         assert result[DATA_AVAILABLE_DATE_COLUMN].tolist() == expected_available
         assert result["value"].tolist() == [0, 1]
 
 
+def test_bulk_reconcile_commits_all_symbols_in_one_group(tmp_path, monkeypatch):
+    """多只股票的公告日期统一合并为一次组提交 (只写一条提交日志)"""
+    import storage.file_store.atomic_partition_store as atomic_store_mod
+
+    for symbol in (SYMBOL, "000001"):
+        _write_source(tmp_path, "balance", ["20150930"], ["20151027"], symbol)
+        _write_source(tmp_path, "income", ["20150930"], ["20161025"], symbol)
+    journals = []
+    write_journal = atomic_store_mod._write_journal
+    monkeypatch.setattr(
+        atomic_store_mod,
+        "_write_journal",
+        lambda base_dir, prepared: (
+            journals.append(len(prepared)) or write_journal(base_dir, prepared)
+        ),
+    )
+
+    changed = reconcile_financial_publish_dates([SYMBOL, "000001"], tmp_path)
+
+    assert changed == {
+        SYMBOL: {"balance": 1, "income": 1},
+        "000001": {"balance": 1, "income": 1},
+    }
+    assert journals == [4]
+    for symbol in (SYMBOL, "000001"):
+        path = (
+            tmp_path / SOURCE_CATEGORIES["income"] / f"symbol={symbol}" / "data.parquet"
+        )
+        result = date_columns_to_keys(
+            pd.read_parquet(path), SOURCE_CATEGORIES["income"]
+        )
+        assert result["公告日期"].tolist() == ["20151027"]
+
+
 def test_financial_store_triggers_date_reconciliation(tmp_path, monkeypatch):
     monkeypatch.setattr(financial_store_mod, "WAREHOUSE_DIR", tmp_path)
     monkeypatch.setattr(parquet_store_mod, "WAREHOUSE_DIR", tmp_path)
@@ -195,3 +235,33 @@ def test_indicator_store_triggers_date_reconciliation(tmp_path, monkeypatch):
 
     assert calls == [SYMBOL]
     assert changed == {"indicator": 1}
+
+
+def test_unchanged_statement_skips_write_and_reconciliation(tmp_path, monkeypatch):
+    """公告日期统一改写后保留内容哈希, 次日抓到相同报表时跳过写入与统一"""
+    monkeypatch.setattr(financial_store_mod, "WAREHOUSE_DIR", tmp_path)
+    monkeypatch.setattr(parquet_store_mod, "WAREHOUSE_DIR", tmp_path)
+    monkeypatch.setattr(reconciler_mod, "WAREHOUSE_DIR", tmp_path)
+    _write_source(tmp_path, "indicator", ["20150930"], ["20151020"])
+    statement = pd.DataFrame(
+        {
+            "symbol": [SYMBOL],
+            "report_date": ["20150930"],
+            "公告日期": ["20151027"],
+            "营业总收入": [100.0],
+        }
+    )
+    store = financial_store_mod.FinancialStore()
+
+    assert store.save_statement(statement, "fin_balance_sheet")["balance"] == 1
+    path = tmp_path / SOURCE_CATEGORIES["balance"] / f"symbol={SYMBOL}" / "data.parquet"
+    mtime = path.stat().st_mtime_ns
+
+    assert store.save_statement(statement, "fin_balance_sheet") is None
+    assert path.stat().st_mtime_ns == mtime
+    result = date_columns_to_keys(pd.read_parquet(path), SOURCE_CATEGORIES["balance"])
+    assert result["公告日期"].tolist() == ["20151020"]
+
+    # 跳过关闭时照常写入并统一
+    changed = store.save_statement(statement, "fin_balance_sheet", skip_unchanged=False)
+    assert changed == {"balance": 1}
@@ -6,6 +6,9 @@ from pathlib import Path
 import pandas as pd
 
 from storage.database import financial_publish_date_reconciler as reconciler_mod
+from storage.database.financial_publish_date_reconciler import (
+    normalize_financial_dates,
+)
 from storage.database.financial_publish_date_verifier import (
     OverduePublishDateVerification,
     apply_official_publish_dates,
@@ -84,7 +87,7 @@ def test_apply_official_date_updates_only_announcement_date(tmp_path):
         result = pd.read_parquet(
             tmp_path / category / f"symbol={SYMBOL}" / "data.parquet"
         )
-        assert result["公告日期"].tolist() == ["20241030"]
+        assert normalize_financial_dates(result["公告日期"]).tolist() == ["20241030"]
         assert result["业务数值"].tolist() == [10.0]
 
 
@@ -168,4 +171,4 @@ def test_verify_keeps_official_date_and_warns_when_still_overdue(tmp_path, caplo
     result_frame = pd.read_parquet(
         tmp_path / SOURCE_CATEGORIES["income"] / f"symbol={SYMBOL}" / "data.parquet"
     )
-    assert result_frame["公告日期"].tolist() == ["20241105"]
+    assert normalize_financial_dates(result_frame["公告日期"]).tolist() == ["20241105"]
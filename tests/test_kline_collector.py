@@ -28,6 +28,10 @@ def _isolate_env(tmp_path, monkeypatch):
     monkeypatch.setattr(ss.db_manager, "sqlite_path", sqlite_path)
     ss.db_manager._sqlite_conn = None
     ss.db_manager.initialize_schema()
+    # 每个测试使用新的 klc 解码上下文池, 避免复用其他测试的 Fake JS 上下文
+    import utils.sina_klc as sina_klc_mod
+
+    monkeypatch.setattr(sina_klc_mod, "_klc_decoders", sina_klc_mod.KlcDecoderPool())
     conn = ss.db_manager.get_sqlite_conn()
     conn.execute(
         "INSERT INTO stocks (symbol, code, name, is_active) VALUES ('600519', '600519', '贵州茅台', 1)"
@@ -422,3 +426,79 @@ def test_fetch_from_sina_normal_path_not_affected(monkeypatch):
     assert not result.empty
     assert fallback_called[0] is False
     assert "adj_factor" in result.columns
+
+
+# ──────────────────── 全市场快照追加 ────────────────────
+
+
+def test_append_latest_bars_from_market_snapshot(monkeypatch):
+    """快照只追加落后一个交易日且未除权的股票, 停牌记录当日已尝试, 其余留给逐股抓取"""
+    import data_ingestion.collectors.kline_collector as kline_mod
+    from utils.trade_date import TradeCalendar
+
+    collector = DailyKlineCollector()
+    calendar = TradeCalendar(["2026-08-05", "2026-08-06", "2026-08-07"])
+    monkeypatch.setattr(kline_mod, "get_trade_calendar", lambda: calendar)
+    monkeypatch.setattr(
+        kline_mod, "get_latest_trade_date", lambda ref=None: date(2026, 8, 7)
+    )
+    last_dates = {
+        "600519": "2026-08-06",
+        "000001": "2026-08-06",
+        "000002": "2026-08-06",
+        "000003": "2026-08-05",
+    }
+    for symbol, day in last_dates.items():
+        collector.store.save_partition(
+            pd.DataFrame(
+                {
+                    "date": [date.fromisoformat(day)],
+                    "open": [10.0],
+                    "high": [10.0],
+                    "low": [10.0],
+                    "close": [10.0],
+                    "volume": [100.0],
+                    "amount": [1000.0],
+                    "adj_factor": [2.5],
+                    "symbol": [symbol],
+                }
+            ),
+            "daily_kline",
+            symbol,
+        )
+    monkeypatch.setattr(
+        collector,
+        "_load_last_bars",
+        lambda day: pd.DataFrame(
+            {"symbol": ["600519", "000001", "000002"], "close": 10.0, "adj_factor": 2.5}
+        ),
+    )
+    monkeypatch.setattr(
+        kline_mod.ak,
+        "stock_zh_a_spot",
+        lambda: pd.DataFrame(
+            {
+                "代码": ["sh600519", "sz000001", "sz000002", "sz000003"],
+                "今开": [10.1, 9.0, 0.0, 10.0],
+                "最高": [10.5, 9.2, 0.0, 10.0],
+                "最低": [10.0, 8.9, 0.0, 10.0],
+                "最新价": [10.4, 9.1, 0.0, 10.0],
+                "成交量": [12_300, 5_000, 0, 100],
+                "成交额": [127_000.0, 45_500.0, 0.0, 1000.0],
+                # 000001 昨收与本地收盘价不符: 除权除息
+                "昨收": [10.0, 9.5, 10.0, 10.0],
+            }
+        ),
+    )
+
+    handled = collector.append_latest_bars(list(last_dates))
+
+    assert handled == {"600519", "000002"}
+    bars = collector.store.read_partition("daily_kline", "600519")
+    latest = bars.iloc[-1]
+    assert str(latest["date"])[:10] == "2026-08-07"
+    assert latest["close"] == 10.4
+    assert latest["volume"] == 123.0
+    assert latest["adj_factor"] == 2.5
+    assert is_synced_today(DATASET_KLINE_DAILY, "000002")
+    assert len(collector.store.read_partition("daily_kline", "000001")) == 1
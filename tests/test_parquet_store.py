@@ -1,10 +1,13 @@
 """单元测试: storage/file_store/parquet_store.py Parquet 原子写入与分片管理"""
 
+from datetime import date
+
 import pandas as pd
+import pyarrow.parquet as pq
 import pytest
 
 import storage.file_store.parquet_store as parquet_store_mod
-from storage.file_store.parquet_store import ParquetStore
+from storage.file_store.parquet_store import ParquetStore, wait_for_delta_merges
 
 
 @pytest.fixture
@@ -54,8 +57,125 @@ class TestSavePartition:
         leftovers = list((base / "daily_kline/symbol=000001").glob(".tmp_*"))
         assert leftovers == []
 
+    def test_sorted_by_date_with_bounded_row_groups(self, store, monkeypatch):
+        """按主日期列排序, 行组有界并带统计与 page index"""
+        monkeypatch.setattr(
+            "storage.file_store.parquet_layout.PARTITION_ROW_GROUP_SIZE", 2
+        )
+        s, base = store
+        days = [5, 1, 4, 2, 3]
+        df = pd.DataFrame({"date": [date(2024, 1, d) for d in days], "close": days})
+        s.save_partition(df, "daily_kline", "000001")
+
+        path = base / "daily_kline/symbol=000001/data.parquet"
+        assert pd.read_parquet(path)["close"].tolist() == [1, 2, 3, 4, 5]
+        metadata = pq.ParquetFile(path).metadata
+        assert metadata.num_row_groups == 3
+        column = metadata.row_group(1).column(0)
+        assert (column.statistics.min, column.statistics.max) == (
+            date(2024, 1, 3),
+            date(2024, 1, 4),
+        )
+        assert column.has_column_index and column.has_offset_index
+
+
+class TestSavePartitionIfChanged:
+    def test_skips_identical_content_regardless_of_column_order(self, store):
+        s, base = store
+        df = pd.DataFrame({"report_date": ["20240331", "20231231"], "v": [1.0, 2.0]})
+        path = base / "indicators/symbol=000001/data.parquet"
+
+        assert s.save_partition_if_changed(df, "indicators", "000001") is True
+        mtime = path.stat().st_mtime_ns
+        reordered = df[["v", "report_date"]].iloc[::-1]
+        assert s.save_partition_if_changed(reordered, "indicators", "000001") is False
+        assert path.stat().st_mtime_ns == mtime
+
+        changed = df.assign(v=[1.0, 3.0])
+        assert s.save_partition_if_changed(changed, "indicators", "000001") is True
+        assert pd.read_parquet(path)["v"].tolist() == [3.0, 1.0]
+
+    def test_force_and_unhashed_files_always_write(self, store):
+        s, _ = store
+        df = pd.DataFrame({"report_date": ["20240331"], "v": [1.0]})
+        # 未记录哈希的旧文件照常写入一次
+        s.save_partition(df, "indicators", "000001")
+        assert s.save_partition_if_changed(df, "indicators", "000001") is True
+        assert s.save_partition_if_changed(df, "indicators", "000001") is False
+        assert (
+            s.save_partition_if_changed(df, "indicators", "000001", force=True) is True
+        )
+
 
 class TestGetPath:
     def test_glob_pattern(self, store):
         s, base = store
         assert s.get_path("daily_kline") == str(base / "daily_kline/*/*.parquet")
+
+
+def _kline(days, close):
+    return pd.DataFrame(
+        {"date": [date(2024, 1, d) for d in days], "close": [close] * len(days)}
+    )
+
+
+class TestAppendPartition:
+    def test_first_append_writes_base_partition(self, store):
+        s, base = store
+        s.append_partition(_kline([2, 3], 1.0), "daily_kline", "000001")
+
+        assert (base / "daily_kline/symbol=000001/data.parquet").exists()
+        assert s.list_deltas("daily_kline", "000001") == []
+
+    def test_append_writes_delta_and_reads_last_write_wins(self, store):
+        s, base = store
+        s.append_partition(_kline([2, 3], 1.0), "daily_kline", "000001")
+        s.append_partition(_kline([3, 4], 2.0), "daily_kline", "000001")
+        s.append_partition(_kline([4], 3.0), "daily_kline", "000001")
+
+        assert len(s.list_deltas("daily_kline", "000001")) == 2
+        # 历史分区未被重写
+        base_rows = pd.read_parquet(base / "daily_kline/symbol=000001/data.parquet")
+        assert base_rows["close"].tolist() == [1.0, 1.0]
+        result = s.read_partition("daily_kline", "000001")
+        assert result["date"].tolist() == [date(2024, 1, d) for d in (2, 3, 4)]
+        assert result["close"].tolist() == [1.0, 2.0, 3.0]
+
+    def test_merge_folds_deltas_into_base(self, store):
+        s, base = store
+        s.append_partition(_kline([2], 1.0), "daily_kline", "000001")
+        s.append_partition(_kline([2, 3], 2.0), "daily_kline", "000001")
+
+        assert s.merge_deltas("daily_kline", "000001") == 1
+        assert s.list_deltas("daily_kline", "000001") == []
+        merged = pd.read_parquet(base / "daily_kline/symbol=000001/data.parquet")
+        assert merged["close"].tolist() == [2.0, 2.0]
+
+    def test_threshold_triggers_background_merge(self, store, monkeypatch):
+        s, base = store
+        monkeypatch.setattr(parquet_store_mod, "DELTA_MERGE_THRESHOLD_FILES", 2)
+        s.append_partition(_kline([2], 1.0), "daily_kline", "000001")
+        s.append_partition(_kline([3], 1.0), "daily_kline", "000001")
+        assert len(s.list_deltas("daily_kline", "000001")) == 1
+
+        s.append_partition(_kline([4], 1.0), "daily_kline", "000001")
+        wait_for_delta_merges()
+
+        assert s.list_deltas("daily_kline", "000001") == []
+        merged = pd.read_parquet(base / "daily_kline/symbol=000001/data.parquet")
+        assert len(merged) == 3
+
+    def test_full_save_discards_superseded_deltas(self, store):
+        s, _ = store
+        s.append_partition(_kline([2], 1.0), "daily_kline", "000001")
+        s.append_partition(_kline([3], 1.0), "daily_kline", "000001")
+
+        s.save_partition(_kline([2, 3, 4], 5.0), "daily_kline", "000001")
+
+        assert s.list_deltas("daily_kline", "000001") == []
+        assert s.read_partition("daily_kline", "000001")["close"].tolist() == [5.0] * 3
+
+    def test_rejects_category_without_key(self, store):
+        s, _ = store
+        with pytest.raises(ValueError):
+            s.append_partition(_kline([2], 1.0), "indicators", "000001")
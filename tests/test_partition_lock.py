@@ -0,0 +1,67 @@
+"""单元测试: storage/file_store/partition_lock.py 分区级跨进程写锁 (tmp 数据仓库隔离)"""
+
+import fcntl
+import multiprocessing
+import os
+
+import pytest
+
+from storage.file_store.partition_lock import (
+    get_lock_path,
+    partition_lock,
+    partition_locks,
+)
+
+CATEGORY = "financial_statements/type=income"
+
+
+def _increment(base_dir, counter_path, times):
+    for _ in range(times):
+        with partition_lock(base_dir, CATEGORY, "000001"):
+            value = int(counter_path.read_text())
+            # 放大读取与写回之间的窗口
+            os.sched_yield()
+            counter_path.write_text(str(value + 1))
+
+
+def _lock_is_held_elsewhere(path) -> bool:
+    fd = os.open(path, os.O_RDWR)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+    return False
+
+
+def test_lock_is_reentrant_and_held_on_file(tmp_path):
+    path = get_lock_path(tmp_path, CATEGORY, "000001")
+    with partition_lock(tmp_path, CATEGORY, "000001"):
+        with partition_locks(
+            tmp_path, [(CATEGORY, "000001"), ("indicators", "000001")]
+        ):
+            assert _lock_is_held_elsewhere(path)
+        # 内层退出后外层仍持有
+        assert _lock_is_held_elsewhere(path)
+    assert not _lock_is_held_elsewhere(path)
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="需要 fork"
+)
+def test_processes_do_not_lose_updates(tmp_path):
+    counter_path = tmp_path / "counter.txt"
+    counter_path.write_text("0")
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=_increment, args=(tmp_path, counter_path, 50))
+        for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+        assert worker.exitcode == 0
+
+    assert counter_path.read_text() == "200"
@@ -0,0 +1,103 @@
+"""单元测试: storage/file_store/partition_manifest.py 分区清单 (tmp 数据仓库隔离)"""
+
+import sqlite3
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import storage.file_store.parquet_store as parquet_store_mod
+from storage.file_store.atomic_partition_store import save_partitions_atomically
+from storage.file_store.parquet_store import ParquetStore
+from storage.file_store.partition_manifest import MANIFEST_FILE, get_manifest
+
+INCOME_CATEGORY = "financial_statements/type=income"
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(parquet_store_mod, "WAREHOUSE_DIR", tmp_path)
+    return ParquetStore()
+
+
+def _kline(days):
+    return pd.DataFrame(
+        {"date": [date(2024, 1, d) for d in days], "close": [1.0] * len(days)}
+    )
+
+
+def _manifest_rows(tmp_path, category):
+    conn = sqlite3.connect(tmp_path / MANIFEST_FILE)
+    try:
+        return conn.execute(
+            "SELECT symbol, file, row_count FROM partition_files WHERE category = ? ORDER BY symbol, file",
+            (category,),
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def test_writes_maintain_max_date_across_deltas(store, tmp_path):
+    manifest = store.manifest
+    assert manifest.get_max_date("daily_kline", "000001") is None
+
+    store.append_partition(_kline([2, 3]), "daily_kline", "000001")
+    store.append_partition(_kline([4]), "daily_kline", "000001")
+    assert manifest.get_max_date("daily_kline", "000001") == date(2024, 1, 4)
+    assert len(_manifest_rows(tmp_path, "daily_kline")) == 2
+
+    # 合并后增量文件的清单记录随之删除
+    store.merge_deltas("daily_kline", "000001")
+    assert _manifest_rows(tmp_path, "daily_kline") == [("000001", "data.parquet", 3)]
+    stats = manifest.get_partition_stats("daily_kline")["000001"]
+    assert (stats["min_date"], stats["max_date"]) == ("2024-01-02", "2024-01-04")
+
+
+def test_report_dates_from_store_and_atomic_writes(store, tmp_path):
+    store.save_partition(
+        pd.DataFrame({"report_date": ["20240331", "20231231"], "x": [1.0, 2.0]}),
+        INCOME_CATEGORY,
+        "000001",
+    )
+    save_partitions_atomically(
+        tmp_path,
+        [
+            (
+                pd.DataFrame({"report_date": ["20240630"], "x": [3.0]}),
+                INCOME_CATEGORY,
+                "000002",
+            )
+        ],
+    )
+
+    manifest = store.manifest
+    assert manifest.get_report_date_keys(INCOME_CATEGORY) == {
+        "000001_20240331",
+        "000001_20231231",
+        "000002_20240630",
+    }
+    assert manifest.get_report_dates(INCOME_CATEGORY, "000001") == {
+        "20240331",
+        "20231231",
+    }
+    assert manifest.get_symbols(INCOME_CATEGORY) == {"000001", "000002"}
+    assert (
+        manifest.get_partition_stats(INCOME_CATEGORY)["000001"]["max_report_date"]
+        == "20240331"
+    )
+
+
+def test_unindexed_category_is_backfilled_from_files(tmp_path):
+    path = tmp_path / "share_capital" / "symbol=000001" / "data.parquet"
+    path.parent.mkdir(parents=True)
+    pd.DataFrame(
+        {"change_date": [date(2020, 1, 1), date(2023, 5, 6)], "total_shares": [1, 2]}
+    ).to_parquet(path, index=False)
+
+    manifest = get_manifest(tmp_path)
+    assert manifest.get_max_date("share_capital", "000001") == date(2023, 5, 6)
+
+    # 清单更新失败后类别被标记为未索引, 下次查询重新回填
+    manifest.record_files("share_capital", "000002", [tmp_path / "missing.parquet"])
+    path.unlink()
+    assert manifest.get_symbols("share_capital") == set()
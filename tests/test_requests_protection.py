@@ -1,5 +1,7 @@
 """单元测试: utils/requests_protection.py 新浪请求保护层"""
 
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest import mock
 
 import pytest
@@ -152,3 +154,55 @@ class TestProtectionLayer:
         requests.get("https://quotes.sina.cn/cn/api/x")
         assert len(calls) == 1
         assert rp._installed is True
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Set-Cookie", "session=abc")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPooledSessions:
+    @pytest.fixture(autouse=True)
+    def _isolate_pool(self, monkeypatch):
+        import utils.requests_protection as rp
+
+        monkeypatch.setattr(rp, "_installed", False)
+        monkeypatch.setattr(rp, "_host_sessions", {})
+        monkeypatch.setattr(requests.api, "request", requests.api.request)
+        monkeypatch.setattr(
+            requests.sessions.Session, "request", requests.sessions.Session.request
+        )
+
+    def test_module_level_get_reuses_connection_per_host(self):
+        import utils.requests_protection as rp
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            install_requests_protection()
+            url = f"http://127.0.0.1:{server.server_port}/x"
+            for _ in range(3):
+                assert requests.get(url, timeout=5).json() == {"ok": True}
+            session = rp._host_sessions[f"http://127.0.0.1:{server.server_port}"]
+            # 与模块级 requests.get 一致, 不在请求之间保留 Cookie
+            assert len(session.cookies) == 0
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        stats = rp.get_http_pool_stats()
+        assert stats == {
+            f"http://127.0.0.1:{server.server_port}": {"requests": 3, "connections": 1}
+        }
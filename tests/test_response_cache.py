@@ -0,0 +1,85 @@
+"""单元测试: utils/response_cache.py 全市场清单接口的磁盘响应缓存 (tmp 目录隔离)"""
+
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import utils.response_cache as response_cache_mod
+from utils.response_cache import ENDPOINT_DISCLOSURE_PLANS, cached_frame
+
+
+@pytest.fixture(autouse=True)
+def _isolate_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(response_cache_mod, "RESPONSE_CACHE_DIR", tmp_path)
+
+
+def _counting_fetch(calls, frame):
+    def fetch():
+        calls.append(1)
+        return frame
+
+    return fetch
+
+
+def test_reuses_fresh_entry_and_refetches_after_ttl(tmp_path):
+    calls = []
+    frame = pd.DataFrame({"股票代码": ["000001"], "实际披露时间": ["2026-08-10"]})
+    fetch = _counting_fetch(calls, frame)
+
+    first = cached_frame(ENDPOINT_DISCLOSURE_PLANS, "20260630_沪深A股", fetch)
+    second = cached_frame(ENDPOINT_DISCLOSURE_PLANS, "20260630_沪深A股", fetch)
+    pd.testing.assert_frame_equal(first, second)
+    assert len(calls) == 1
+    # 不同参数互不复用
+    cached_frame(ENDPOINT_DISCLOSURE_PLANS, "20260630_京市A股", fetch)
+    assert len(calls) == 2
+
+    path = next((tmp_path / ENDPOINT_DISCLOSURE_PLANS).glob("20260630_沪深A股*"))
+    expired = time.time() - response_cache_mod.ENDPOINT_TTLS[ENDPOINT_DISCLOSURE_PLANS]
+    os.utime(path, (expired - 1, expired - 1))
+    cached_frame(ENDPOINT_DISCLOSURE_PLANS, "20260630_沪深A股", fetch)
+    assert len(calls) == 3
+
+
+def test_empty_and_failed_responses_are_not_cached():
+    calls = []
+    empty = _counting_fetch(calls, pd.DataFrame())
+    cached_frame(ENDPOINT_DISCLOSURE_PLANS, "20261231_沪深A股", empty)
+    cached_frame(ENDPOINT_DISCLOSURE_PLANS, "20261231_沪深A股", empty)
+    assert len(calls) == 2
+
+    def boom():
+        raise RuntimeError("接口异常")
+
+    with pytest.raises(RuntimeError):
+        cached_frame(ENDPOINT_DISCLOSURE_PLANS, "20260930_沪深A股", boom)
+    frame = pd.DataFrame({"股票代码": ["600519"]})
+    result = cached_frame(
+        ENDPOINT_DISCLOSURE_PLANS, "20260930_沪深A股", _counting_fetch(calls, frame)
+    )
+    pd.testing.assert_frame_equal(result, frame)
+
+
+def test_concurrent_callers_share_one_request():
+    calls = []
+    started = threading.Event()
+
+    def slow_fetch():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return pd.DataFrame({"code": ["000001"]})
+
+    def call():
+        cached_frame(ENDPOINT_DISCLOSURE_PLANS, "20260630_沪深A股", slow_fetch)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert started.is_set()
+    assert len(calls) == 1
@@ -21,6 +21,10 @@ def _isolate(monkeypatch):
     monkeypatch.setattr(sched, "get_last_sync_date", lambda d, s: None)
     monkeypatch.setattr(sched, "record_sync_success", lambda *a: None)
     monkeypatch.setattr(sched, "install_requests_protection", lambda: None)
+    monkeypatch.setattr(sched.sync_main, "publish_warehouse_snapshot", lambda: None)
+    monkeypatch.setattr(
+        sched.sync_main, "ensure_warehouse_dates_migrated", lambda: None
+    )
 
 
 def test_volume_missing_exits_without_sync(monkeypatch):
@@ -29,7 +33,7 @@ def test_volume_missing_exits_without_sync(monkeypatch):
     monkeypatch.setattr(
         sched.sync_main,
         "sync_all_data_flow",
-        lambda: called.append(1) or SYNC_ALL_SUCCESS,
+        lambda **kwargs: called.append(1) or SYNC_ALL_SUCCESS,
     )
     monkeypatch.setattr(sched, "record_sync_success", lambda *a: called.append(2))
     monkeypatch.setattr(sched, "install_requests_protection", lambda: called.append(3))
@@ -57,7 +61,7 @@ def test_sync_status_read_and_write_retry_after_transient_failure(monkeypatch):
     monkeypatch.setattr(
         sched.sync_main,
         "sync_all_data_flow",
-        lambda: SYNC_ALL_SUCCESS,
+        lambda **kwargs: SYNC_ALL_SUCCESS,
     )
 
     assert sched.run_sync_all_with_retry() == 0
@@ -71,7 +75,7 @@ def test_prev_day_not_trade_day_exits(monkeypatch):
     monkeypatch.setattr(
         sched.sync_main,
         "sync_all_data_flow",
-        lambda: flow_calls.append(1) or SYNC_ALL_SUCCESS,
+        lambda **kwargs: flow_calls.append(1) or SYNC_ALL_SUCCESS,
     )
     installed = []
     monkeypatch.setattr(
@@ -94,7 +98,7 @@ def test_trade_calendar_unavailable_is_failure(monkeypatch):
     monkeypatch.setattr(
         sched.sync_main,
         "sync_all_data_flow",
-        lambda: flow_calls.append(1) or SYNC_ALL_SUCCESS,
+        lambda **kwargs: flow_calls.append(1) or SYNC_ALL_SUCCESS,
     )
     assert sched.run_sync_all_with_retry() == 1
     assert flow_calls == []
@@ -106,7 +110,7 @@ def test_already_synced_prev_day_exits(monkeypatch):
     monkeypatch.setattr(
         sched.sync_main,
         "sync_all_data_flow",
-        lambda: flow_calls.append(1) or SYNC_ALL_SUCCESS,
+        lambda **kwargs: flow_calls.append(1) or SYNC_ALL_SUCCESS,
     )
     monkeypatch.setattr(sched, "record_sync_success", lambda *a: flow_calls.append(2))
     installed = []
@@ -126,7 +130,7 @@ def test_prev_day_synced_exits(monkeypatch):
     monkeypatch.setattr(
         sched.sync_main,
         "sync_all_data_flow",
-        lambda: flow_calls.append(1) or SYNC_ALL_SUCCESS,
+        lambda **kwargs: flow_calls.append(1) or SYNC_ALL_SUCCESS,
     )
     monkeypatch.setattr(sched, "record_sync_success", lambda *a: flow_calls.append(2))
     installed = []
@@ -149,7 +153,7 @@ def test_stale_sync_record_triggers_run(monkeypatch):
     monkeypatch.setattr(
         sched.sync_main,
         "sync_all_data_flow",
-        lambda: flow_calls.append(1) or SYNC_ALL_SUCCESS,
+        lambda **kwargs: flow_calls.append(1) or SYNC_ALL_SUCCESS,
     )
     installed = []
     monkeypatch.setattr(
@@ -237,7 +241,7 @@ def test_retryable_then_success_records_prev_day(monkeypatch):
     calls = []
 
     def fake_flow(*args, **kwargs):
-        calls.append(1)
+        calls.append(kwargs["task_batch"])
         return next(statuses)
 
     monkeypatch.setattr(sched.sync_main, "sync_all_data_flow", fake_flow)
@@ -246,7 +250,9 @@ def test_retryable_then_success_records_prev_day(monkeypatch):
         sched, "record_sync_success", lambda d, s, dt: recorded.append((d, s, dt))
     )
     assert sched.run_sync_all_with_retry() == 0
-    assert len(calls) == 2
+    # 重试沿用同一个任务队列批次 (数据日), 续跑未完成的任务
+    prev_day = (date.today() - sched.timedelta(days=1)).isoformat()
+    assert calls == [prev_day, prev_day]
     expected = (
         DATASET_SYNC_ALL,
         SYMBOL_SYNC_ALL,
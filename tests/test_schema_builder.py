@@ -1,16 +1,21 @@
 """单元测试: storage/database/schema_builder.py schema 缓存与类型加宽"""
 
 import json
+import os
 
+import pandas as pd
 import pytest
 
 import storage.database.schema_builder as schema_builder_mod
+import storage.file_store.parquet_store as parquet_store_mod
 from storage.database.schema_builder import (
     _wider_type,
     ensure_schema,
     load_schema,
+    rebuild_dataset,
     save_schema,
 )
+from storage.file_store.parquet_store import ParquetStore
 
 
 @pytest.fixture
@@ -80,8 +85,8 @@ class TestEnsureSchema:
     def test_rebuilds_when_cache_missing(self, isolated_schema_dir, monkeypatch):
         monkeypatch.setattr(
             schema_builder_mod,
-            "build_schema",
-            lambda pattern: {"x": "DOUBLE", "y": "VARCHAR"},
+            "build_schema_incremental",
+            lambda dataset: ({"x": "DOUBLE", "y": "VARCHAR"}, {}),
         )
         assert ensure_schema("fin_ttm") == {"x": "DOUBLE", "y": "VARCHAR"}
         assert load_schema("fin_ttm") == {"x": "DOUBLE", "y": "VARCHAR"}
@@ -106,3 +111,63 @@ class TestBuildSchemaMapExpr:
         assert expr.endswith(
             "::MAP(VARCHAR, STRUCT(name VARCHAR, type VARCHAR, default_value VARCHAR))"
         )
+
+
+class TestIncrementalRebuild:
+    @pytest.fixture
+    def warehouse(self, tmp_path, isolated_schema_dir, monkeypatch):
+        warehouse_dir = tmp_path / "warehouse"
+        monkeypatch.setattr(schema_builder_mod, "WAREHOUSE_DIR", str(warehouse_dir))
+        monkeypatch.setattr(parquet_store_mod, "WAREHOUSE_DIR", str(warehouse_dir))
+        return warehouse_dir
+
+    @staticmethod
+    def _count_footer_reads(monkeypatch):
+        reads = []
+        original = schema_builder_mod.build_schema
+
+        def counting(pattern):
+            reads.append(pattern)
+            return original(pattern)
+
+        monkeypatch.setattr(schema_builder_mod, "build_schema", counting)
+        return reads
+
+    def test_rebuild_reads_only_new_fingerprints(self, warehouse, monkeypatch):
+        for symbol in ("000001", "000002", "000003"):
+            path = warehouse / "financial/ttm" / f"symbol={symbol}" / "data.parquet"
+            path.parent.mkdir(parents=True)
+            pd.DataFrame({"a": [1.0]}).to_parquet(path, index=False)
+        reads = self._count_footer_reads(monkeypatch)
+
+        rebuild_dataset("fin_ttm")
+        # 三个文件同一指纹, 只读取一个代表文件
+        assert len(reads) == 1
+        assert load_schema("fin_ttm") == {"a": "DOUBLE"}
+
+        rebuild_dataset("fin_ttm")
+        assert len(reads) == 1
+
+        path = warehouse / "financial/ttm/symbol=000002/data.parquet"
+        pd.DataFrame({"a": [1.0], "b": [2]}).to_parquet(path, index=False)
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        rebuild_dataset("fin_ttm")
+        assert len(reads) == 2
+        assert load_schema("fin_ttm") == {"a": "DOUBLE", "b": "BIGINT"}
+
+    def test_store_write_extends_cache_inline(self, warehouse, monkeypatch):
+        store = ParquetStore()
+        store.save_partition(pd.DataFrame({"a": [1.0]}), "financial/ttm", "000001")
+        ensure_schema("fin_ttm")
+
+        def fail_if_called(dataset, cached_fingerprints=None):
+            raise AssertionError("新增列应就地扩展缓存, 不应全量重建")
+
+        monkeypatch.setattr(
+            schema_builder_mod, "build_schema_incremental", fail_if_called
+        )
+        store.save_partition(
+            pd.DataFrame({"a": [1.0], "c": ["x"]}), "financial/ttm", "000002"
+        )
+        assert load_schema("fin_ttm") == {"a": "DOUBLE", "c": "VARCHAR"}
@@ -2,7 +2,15 @@
 
 import pytest
 
-from utils.sina_klc import SinaKlcFetcher
+import utils.sina_klc as sina_klc_mod
+from utils.sina_klc import KlcDecoderPool, SinaKlcFetcher
+
+
+@pytest.fixture(autouse=True)
+def _fresh_decoder_pool(monkeypatch):
+    """每个测试使用新的解码上下文池, 避免复用其他测试的 Fake JS 上下文"""
+    monkeypatch.setattr(sina_klc_mod, "_klc_decoders", KlcDecoderPool())
+
 
 # ──────────────────── fetch_raw ────────────────────
 
@@ -82,6 +90,39 @@ def test_fetch_raw_empty_decodes_to_empty_list(monkeypatch):
     assert SinaKlcFetcher.fetch_raw("sh600519") == []
 
 
+def test_decoder_pool_reuses_warmed_context(monkeypatch):
+    """解码上下文只构造并 eval 一次解码脚本, 逐股复用; 解码异常的上下文被丢弃"""
+    import py_mini_racer
+
+    created = []
+
+    class FakeJS:
+        def __init__(self):
+            self.evals = 0
+            created.append(self)
+
+        def eval(self, code):
+            self.evals += 1
+
+        def call(self, fn_name, raw_str):
+            if raw_str == "BROKEN":
+                raise RuntimeError("JS 解码异常")
+            return [{"date": raw_str}]
+
+    monkeypatch.setattr(py_mini_racer, "MiniRacer", FakeJS)
+    pool = KlcDecoderPool(size=1)
+
+    assert pool.decode("A") == [{"date": "A"}]
+    assert pool.decode("B") == [{"date": "B"}]
+    assert len(created) == 1
+    assert created[0].evals == 1
+
+    with pytest.raises(RuntimeError):
+        pool.decode("BROKEN")
+    assert pool.decode("C") == [{"date": "C"}]
+    assert len(created) == 2
+
+
 # ──────────────────── fetch_hfq ────────────────────
 
 
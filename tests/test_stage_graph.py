@@ -0,0 +1,71 @@
+"""单元测试: utils/stage_graph.py 环节依赖图调度 (纯内存, 不触网络)"""
+
+import threading
+
+import pytest
+
+from utils.stage_graph import Stage, run_stage_graph
+
+
+def test_independent_branches_overlap_and_dependencies_wait():
+    slow_started = threading.Event()
+    release_slow = threading.Event()
+    order = []
+
+    def slow():
+        slow_started.set()
+        assert release_slow.wait(5), "独立分支未能并行启动"
+        order.append("slow")
+        return 1, 0
+
+    def fast():
+        assert slow_started.wait(5)
+        order.append("fast")
+        release_slow.set()
+        return 2, 0
+
+    def after():
+        order.append("after")
+        return 3, 1
+
+    results = run_stage_graph(
+        [
+            Stage("slow", slow),
+            Stage("fast", fast),
+            Stage("after", after, ("slow", "fast")),
+        ]
+    )
+
+    assert order == ["fast", "slow", "after"]
+    assert list(results.items()) == [
+        ("slow", (1, 0)),
+        ("fast", (2, 0)),
+        ("after", (3, 1)),
+    ]
+
+
+def test_error_stops_new_stages_and_is_reraised():
+    errors = []
+    called = []
+
+    def boom():
+        raise RuntimeError("环节异常")
+
+    with pytest.raises(RuntimeError, match="环节异常"):
+        run_stage_graph(
+            [
+                Stage("boom", boom),
+                Stage("downstream", lambda: called.append(1) or (0, 0), ("boom",)),
+            ],
+            on_error=errors.append,
+        )
+
+    assert called == []
+    assert [str(e) for e in errors] == ["环节异常"]
+
+
+def test_rejects_dependency_cycle():
+    with pytest.raises(ValueError, match="环"):
+        run_stage_graph(
+            [Stage("a", lambda: (0, 0), ("b",)), Stage("b", lambda: (0, 0), ("a",))]
+        )
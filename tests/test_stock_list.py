@@ -4,12 +4,14 @@ import pandas as pd
 import pytest
 
 import main as main_mod
+import utils.response_cache as response_cache_mod
 from data_ingestion.collectors.stock_list import StockListCollector
 from storage.database import manager as manager_mod
 
 
 @pytest.fixture(autouse=True)
 def _isolate_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(response_cache_mod, "RESPONSE_CACHE_DIR", tmp_path / "cache")
     sqlite_path = tmp_path / "test_metadata.db"
     monkeypatch.setattr(manager_mod, "SQLITE_DB_PATH", sqlite_path)
     monkeypatch.setattr(manager_mod.db_manager, "sqlite_path", sqlite_path)
@@ -1,6 +1,7 @@
 """单元测试: main.py sync_all_data_flow 三态判定 (mock 全部环节, 不触网络与数据库)"""
 
 import sys
+import threading
 
 import pytest
 
@@ -102,6 +103,7 @@ def test_cli_sync_all_blocked_exits_1(monkeypatch):
 
     monkeypatch.setattr(sys, "argv", ["main.py", "sync-all"])
     monkeypatch.setattr(rp_mod, "install_requests_protection", lambda: None)
+    monkeypatch.setattr(main_mod, "ensure_warehouse_dates_migrated", lambda: None)
     monkeypatch.setattr(main_mod, "sync_all_data_flow", lambda **kw: SYNC_ALL_BLOCKED)
     with pytest.raises(SystemExit) as exc:
         main_mod.main()
@@ -114,6 +116,7 @@ def test_cli_sync_all_retryable_exits_1(monkeypatch):
 
     monkeypatch.setattr(sys, "argv", ["main.py", "sync-all"])
     monkeypatch.setattr(rp_mod, "install_requests_protection", lambda: None)
+    monkeypatch.setattr(main_mod, "ensure_warehouse_dates_migrated", lambda: None)
     monkeypatch.setattr(main_mod, "sync_all_data_flow", lambda **kw: SYNC_ALL_RETRYABLE)
     with pytest.raises(SystemExit) as exc:
         main_mod.main()
@@ -126,6 +129,7 @@ def test_cli_sync_all_exception_exits_1(monkeypatch):
 
     monkeypatch.setattr(sys, "argv", ["main.py", "sync-all"])
     monkeypatch.setattr(rp_mod, "install_requests_protection", lambda: None)
+    monkeypatch.setattr(main_mod, "ensure_warehouse_dates_migrated", lambda: None)
     monkeypatch.setattr(
         main_mod,
         "sync_all_data_flow",
@@ -134,3 +138,30 @@ def test_cli_sync_all_exception_exits_1(monkeypatch):
     with pytest.raises(SystemExit) as exc:
         main_mod.main()
     assert exc.value.code == 1
+
+
+def test_kline_overlaps_financial_and_ttm_follow_ups_are_counted(monkeypatch):
+    """K线环节不等待东财/报表环节; 报表写入后排队的单股 TTM 计入 ttm 环节"""
+    _install_stages(monkeypatch, FULL_STAGES)
+    kline_done = threading.Event()
+    ttm_symbols = []
+
+    def financial(*args, on_statements_saved=None, **kwargs):
+        assert kline_done.wait(5), "K线环节未与报表环节并行"
+        on_statements_saved("600519")
+        return 5, 0
+
+    def kline(*args, **kwargs):
+        kline_done.set()
+        return 5000, 0
+
+    def recalculate(self, symbol):
+        ttm_symbols.append(symbol)
+        raise RuntimeError("TTM 失败")
+
+    monkeypatch.setattr(main_mod, "sync_financial_statements", financial)
+    monkeypatch.setattr(main_mod, "sync_daily_kline", kline)
+    monkeypatch.setattr(main_mod._TTMFollowUps, "_run", recalculate)
+
+    assert sync_all_data_flow() == SYNC_ALL_RETRYABLE
+    assert ttm_symbols == ["600519"]
@@ -57,9 +57,12 @@ def _mock_env(monkeypatch, orphans, fetch_result=None, save_result=None):
         def get_existing_report_dates(self):
             return set()
 
-        def save_statement(self, df, table_name):
+        def save_statement(self, df, table_name, skip_unchanged=True, reconcile=True):
             self.saved.append(table_name)
-            return save_result
+            return {}
+
+        def reconcile_publish_dates(self, symbols):
+            return {symbol: save_result or {} for symbol in symbols}
 
     monkeypatch.setattr(main_mod, "FinancialStore", FakeStore)
     return calls
@@ -331,7 +334,7 @@ def test_indicator_sync_retries_ttm_pending_symbol(monkeypatch):
             return set()
 
     class FakeFinancialCollector:
-        def collect_indicators(self, code, market_symbol):
+        def collect_indicators(self, code, market_symbol, skip_unchanged=True):
             indicator_calls.append((code, market_symbol))
             return {}
 
@@ -402,7 +405,7 @@ def test_indicator_date_reconciliation_failure_is_retryable(monkeypatch):
             return set()
 
     class FailingFinancialCollector:
-        def collect_indicators(self, code, market_symbol):
+        def collect_indicators(self, code, market_symbol, skip_unchanged=True):
             raise RuntimeError("日期协调失败")
 
     monkeypatch.setattr(main_mod, "IndicatorStore", FakeIndicatorStore)
@@ -417,7 +420,7 @@ def test_indicator_date_reconciliation_failure_is_retryable(monkeypatch):
     indicator_calls = []
 
     class SucceedingFinancialCollector:
-        def collect_indicators(self, code, market_symbol):
+        def collect_indicators(self, code, market_symbol, skip_unchanged=True):
             indicator_calls.append((code, market_symbol))
             return {}
 
@@ -429,3 +432,145 @@ def test_indicator_date_reconciliation_failure_is_retryable(monkeypatch):
         get_last_sync_date(DATASET_FINANCIAL_DATE_RECONCILIATION_PENDING, "000508")
         is None
     )
+
+
+def test_statement_date_reconciliation_failure_is_retryable(monkeypatch):
+    """报表公告日期统一失败后, 下一轮重新选中该股票且不跳过未变化的内容"""
+    _mock_env(
+        monkeypatch,
+        orphans=[],
+        fetch_result=pd.DataFrame(
+            {
+                "symbol": ["000508"],
+                "report_date": ["20240930"],
+                "公告日期": ["20241102"],
+            }
+        ),
+    )
+    monkeypatch.setattr(
+        main_mod,
+        "verify_overdue_financial_publish_dates_for_symbol",
+        lambda code, resolver: type(
+            "Verification", (), {"changed_rows": {}, "unresolved_report_dates": ()}
+        )(),
+    )
+    save_calls = []
+
+    class FlakyStore:
+        stored = False
+        reconcile_error = RuntimeError("日期统一失败")
+
+        def get_existing_report_dates(self):
+            return set()
+
+        def save_statement(self, df, table_name, skip_unchanged=True, reconcile=True):
+            save_calls.append(skip_unchanged)
+            # 首次写入后内容不再变化: 跳过未变化内容时不写入, 返回 None
+            skipped = skip_unchanged and FlakyStore.stored
+            FlakyStore.stored = True
+            return None if skipped else {}
+
+        def reconcile_publish_dates(self, symbols):
+            if FlakyStore.reconcile_error is not None:
+                raise FlakyStore.reconcile_error
+            return {symbol: {} for symbol in symbols}
+
+    monkeypatch.setattr(main_mod, "FinancialStore", FlakyStore)
+
+    assert main_mod.sync_financial_statements(symbol="000508") == (1, 1)
+    assert save_calls == [True, True, True]
+    assert (
+        get_last_sync_date(DATASET_FINANCIAL_DATE_RECONCILIATION_PENDING, "000508")
+        == date.today()
+    )
+
+    # 第二轮: 增量发现选中待统一的股票, 内容未变化也重新写入并统一
+    FlakyStore.reconcile_error = None
+    assert main_mod.sync_financial_statements() == (1, 0)
+    assert save_calls[3:] == [False, False, False]
+    assert (
+        get_last_sync_date(DATASET_FINANCIAL_DATE_RECONCILIATION_PENDING, "000508")
+        is None
+    )
+
+
+def test_statement_fetch_overlaps_previous_symbol_compute(monkeypatch):
+    """抓取/计算流水线: 前一只股票计算期间继续抓取下一只股票"""
+    import threading
+
+    from utils.fetch_scheduler import SOURCE_SINA, FetchScheduler, SourceLimit
+
+    _mock_env(monkeypatch, orphans=["000508", "000001"])
+    fetched = set()
+    both_fetched = threading.Event()
+
+    def fake_fetch(self, code, st):
+        fetched.add(code)
+        if len(fetched) == 2:
+            both_fetched.set()
+        return pd.DataFrame()
+
+    monkeypatch.setattr(main_mod.FinancialCollector, "fetch_statement", fake_fetch)
+    overlapped = []
+
+    def fake_verify(code, resolver):
+        overlapped.append(both_fetched.wait(5))
+        return type(
+            "Verification", (), {"changed_rows": {}, "unresolved_report_dates": ()}
+        )()
+
+    monkeypatch.setattr(
+        main_mod, "verify_overdue_financial_publish_dates_for_symbol", fake_verify
+    )
+    limits = {SOURCE_SINA: SourceLimit(rate=1000.0, burst=1000.0, concurrency=1)}
+    with FetchScheduler(limits=limits) as scheduler:
+        assert main_mod.sync_financial_statements(scheduler=scheduler) == (2, 0)
+
+    assert overlapped == [True, True]
+
+
+def test_statement_fetch_failure_records_pending_status(monkeypatch):
+    """抓取阶段失败仍由计算端按原语义记录待办状态并计入失败"""
+    _mock_env(monkeypatch, orphans=[])
+
+    def failing_fetch(self, code, st):
+        raise RuntimeError("模拟抓取失败")
+
+    monkeypatch.setattr(main_mod.FinancialCollector, "fetch_statement", failing_fetch)
+
+    assert main_mod.sync_financial_statements(symbol="000508") == (1, 1)
+    assert (
+        get_last_sync_date(DATASET_FINANCIAL_OFFICIAL_PENDING, "000508") == date.today()
+    )
+
+
+def test_compute_stage_prepares_backlog_as_one_batch():
+    """计算端处理前把尚未准备的全部积压项整批交给 prepare_batch"""
+    import threading
+
+    release = threading.Event()
+    first_prepared = threading.Event()
+    batches = []
+
+    def prepare(batch):
+        batches.append(batch)
+        first_prepared.set()
+
+    def process(item):
+        if item == 1:
+            release.wait(5)
+        return item * 10
+
+    compute = main_mod._ComputeStage(
+        process, backlog=4, name="test-compute", prepare_batch=prepare
+    )
+    compute.submit(1)
+    assert first_prepared.wait(5)
+    compute.submit(2)
+    compute.submit(3)
+    release.set()
+    outcomes = compute.results()
+
+    assert [outcome.result for outcome in outcomes] == [10, 20, 30]
+    # 第 1 项计算期间到达的 2、3 合并为一批
+    assert batches == [[1], [2, 3]]
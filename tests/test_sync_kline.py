@@ -1,6 +1,7 @@
 """单元测试: sync_daily_kline 增量跳过与限速节奏 (mock 采集器, 不触网络)"""
 
 import main as main_mod
+from utils.fetch_scheduler import SOURCE_LIMITS, SOURCE_SINA
 
 
 class _FakePbar:
@@ -21,7 +22,7 @@ class _FakeLatestTradeDate:
         return "20260807"
 
 
-def _mock_env(monkeypatch, stock_codes, collect_results):
+def _mock_env(monkeypatch, stock_codes, collect_results, snapshot_handled=()):
     """构造 sync_daily_kline 运行环境, 返回 (sleeps, fetch_calls)"""
     import data_ingestion.collectors.kline_collector as kc_mod
     import utils.trade_date as td_mod
@@ -30,6 +31,9 @@ def _mock_env(monkeypatch, stock_codes, collect_results):
     fetch_calls = []
 
     class FakeCollector:
+        def append_latest_bars(self, codes):
+            return set(snapshot_handled)
+
         def collect_kline(self, code, start_date=None, end_date=None):
             fetch_calls.append((code, start_date, end_date))
             return collect_results.get(code, False)
@@ -63,16 +67,20 @@ def test_up_to_date_stocks_skip_fetch_and_sleep(monkeypatch):
     assert sleeps == [], "已是最新的股票不应触发限速 sleep"
 
 
-def test_fetching_stocks_sleep_after_sync(monkeypatch):
-    """实际抓取 (返回 True) 的股票才 sleep, 且每次抓取后恰好一次"""
+def test_fetching_stocks_pace_following_dispatch(monkeypatch):
+    """实际抓取 (返回 True) 的股票消耗新浪令牌, 突发额度用尽后派发前等待"""
     sleeps, fetch_calls = _mock_env(
         monkeypatch,
-        stock_codes=["600519", "000001"],
-        collect_results={"600519": True, "000001": False},
+        stock_codes=["600519", "000001", "000002"],
+        collect_results={"600519": True, "000001": True, "000002": True},
     )
     main_mod.sync_daily_kline()
 
-    assert len(sleeps) == 1, f"仅实际抓取的股票应 sleep, 实际 sleep {len(sleeps)} 次"
+    limit = SOURCE_LIMITS[SOURCE_SINA]
+    # 前两只消耗 2 * KLINE_REQUEST_COST, 超出突发额度的部分需按速率补足
+    debt = 2 * main_mod.KLINE_REQUEST_COST - limit.burst
+    assert len(fetch_calls) == 3
+    assert sum(sleeps) >= debt / limit.rate * 0.9
 
 
 def test_failed_stock_does_not_sleep(monkeypatch):
@@ -110,3 +118,17 @@ def test_explicit_start_date_passed_through(monkeypatch):
 
     assert fetch_calls[0][1] == "20260101"
     assert fetch_calls[0][2] == "20260807"
+
+
+def test_snapshot_handled_stocks_skip_per_symbol_fetch(monkeypatch):
+    """全市场快照已追加的股票不再逐股抓取, 仍计入处理数"""
+    sleeps, fetch_calls = _mock_env(
+        monkeypatch,
+        stock_codes=["600519", "000001", "000002"],
+        collect_results={"000002": True},
+        snapshot_handled={"600519", "000001"},
+    )
+    processed, failed = main_mod.sync_daily_kline()
+
+    assert fetch_calls == [("000002", None, "20260807")]
+    assert (processed, failed) == (3, 0)
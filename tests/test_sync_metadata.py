@@ -67,6 +67,32 @@ def test_sync_industries_skips_failed(monkeypatch):
     assert rows["600519"] is None
 
 
+def test_sync_industries_waits_for_concurrent_writer(monkeypatch):
+    """共享连接上其它环节的事务未结束时, 行业写入等待写锁, 不会把对方半批提交"""
+    _fake_collector(monkeypatch, {"sh600519": "白酒"})
+    conn = manager_mod.db_manager.get_sqlite_conn()
+    worker = threading.Thread(target=main_mod._sync_industries_via_xueqiu, args=(conn,))
+    with pytest.raises(RuntimeError):
+        with manager_mod.db_manager.sqlite_transaction() as write_conn:
+            write_conn.execute(
+                "UPDATE stocks SET name = '临时' WHERE symbol = '000001'"
+            )
+            worker.start()
+            worker.join(timeout=0.5)
+            assert worker.is_alive()
+            raise RuntimeError("回滚")
+    worker.join()
+
+    rows = {
+        symbol: (name, industry)
+        for symbol, name, industry in conn.execute(
+            "SELECT symbol, name, industry FROM stocks"
+        ).fetchall()
+    }
+    assert rows["000001"] == ("平安银行", "银行")
+    assert rows["600519"][1] == "白酒"
+
+
 def test_sync_industries_counts_worker_exception(monkeypatch):
     class FakeDetailCollector:
         def fetch_from_xueqiu(self, symbol):
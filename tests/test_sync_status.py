@@ -7,11 +7,14 @@ import pytest
 
 import storage.database.sync_status as sync_status_mod
 from storage.database.sync_status import (
+    DATASET_FINANCIAL_TTM_PENDING,
     DATASET_SYNC_ALL,
     SYMBOL_SYNC_ALL,
+    clear_sync_status,
     get_last_sync_date,
     is_synced_today,
     record_sync_success,
+    sync_status_cache,
 )
 
 
@@ -87,3 +90,55 @@ def test_sync_all_roundtrip():
         f" WHERE dataset='{DATASET_SYNC_ALL}' AND symbol='{SYMBOL_SYNC_ALL}'"
     ).fetchone()
     assert rows[0] == 1
+
+
+def _stored_rows(dataset: str) -> dict:
+    conn = sync_status_mod.db_manager.get_sqlite_conn()
+    rows = conn.execute(
+        "SELECT symbol, last_sync_date FROM sync_status WHERE dataset = ?", (dataset,)
+    ).fetchall()
+    return dict(rows)
+
+
+def test_cache_batches_writes_and_flushes_on_exit(monkeypatch):
+    record_sync_success("kline", "000001", date(2026, 8, 7))
+    record_sync_success(DATASET_FINANCIAL_TTM_PENDING, "000001", date(2026, 8, 7))
+    conn = sync_status_mod.db_manager.get_sqlite_conn()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    with sync_status_cache("kline") as cache:
+        # 预加载后查询走内存
+        monkeypatch.setattr(sync_status_mod.db_manager, "get_sqlite_conn", lambda: None)
+        assert get_last_sync_date("kline", "000001") == date(2026, 8, 7)
+        assert is_synced_today("kline", "000002", today=date(2026, 8, 8)) is False
+        monkeypatch.undo()
+        monkeypatch.setattr(cache, "batch_size", 3)
+
+        record_sync_success("kline", "000002", date(2026, 8, 8))
+        clear_sync_status("kline", "000001")
+        assert get_last_sync_date("kline", "000001") is None
+        assert _stored_rows("kline") == {"000001": "2026-08-07"}
+
+        # 待办标记立即连同此前累积的记录一起落盘
+        clear_sync_status(DATASET_FINANCIAL_TTM_PENDING, "000001")
+        record_sync_success(DATASET_FINANCIAL_TTM_PENDING, "000002", date(2026, 8, 8))
+        assert _stored_rows("kline") == {"000002": "2026-08-08"}
+        assert _stored_rows(DATASET_FINANCIAL_TTM_PENDING) == {"000002": "2026-08-08"}
+
+        record_sync_success("kline", "000003", date(2026, 8, 8))
+        assert "000003" not in _stored_rows("kline")
+
+    assert _stored_rows("kline") == {"000002": "2026-08-08", "000003": "2026-08-08"}
+    assert sync_status_mod._active_cache is None
+
+
+def test_cache_flushes_completed_records_when_stage_raises():
+    with pytest.raises(RuntimeError):
+        with sync_status_cache("share_capital"):
+            record_sync_success("share_capital", "600519", date(2026, 8, 8))
+            assert _stored_rows("share_capital") == {}
+            raise RuntimeError("环节中断")
+    assert _stored_rows("share_capital") == {"600519": "2026-08-08"}
+    # 缓存卸载后恢复逐条提交
+    record_sync_success("share_capital", "000001", date(2026, 8, 8))
+    assert "000001" in _stored_rows("share_capital")
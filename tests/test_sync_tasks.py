@@ -0,0 +1,108 @@
+"""单元测试: storage/database/sync_tasks.py 逐股任务队列续跑 (独立 SQLite)"""
+
+import pytest
+
+import storage.database.sync_tasks as sync_tasks_mod
+from storage.database.sync_tasks import SyncTaskQueue
+from utils.requests_protection import SinaBlockedError
+
+
+@pytest.fixture(autouse=True)
+def _isolate_db(tmp_path, monkeypatch):
+    """每个测试使用独立的 SQLite 元数据库，避免污染真实 metadata.db"""
+    db_manager = sync_tasks_mod.db_manager
+    monkeypatch.setattr(db_manager, "sqlite_path", tmp_path / "test_metadata.db")
+    db_manager._sqlite_conn = None
+    db_manager.initialize_schema()
+    yield
+    db_manager._sqlite_conn = None
+
+
+def _tasks(stage: str) -> dict:
+    conn = sync_tasks_mod.db_manager.get_sqlite_conn()
+    rows = conn.execute(
+        "SELECT symbol, state, attempts, batch FROM sync_tasks WHERE stage = ?",
+        (stage,),
+    ).fetchall()
+    return {symbol: (state, attempts, batch) for symbol, state, attempts, batch in rows}
+
+
+def _run(queue, symbols, func):
+    tracked = queue.track(func, succeeded=lambda result: result is not False)
+    for symbol in symbols:
+        try:
+            tracked(symbol)
+        except SinaBlockedError:
+            break
+        except RuntimeError:
+            pass
+
+
+def test_retry_in_same_batch_resumes_without_discovery():
+    discoveries = []
+
+    def discover():
+        discoveries.append(1)
+        return ["000001", "000002", "000003", "000004"]
+
+    def fetch(symbol):
+        if symbol == "000002":
+            raise RuntimeError("重试耗尽")
+        if symbol == "000003":
+            return False  # 任务返回未完成
+        if symbol == "000004":
+            raise SinaBlockedError("HTTP 456")
+        return True
+
+    queue = SyncTaskQueue("financial", "2026-10-16")
+    symbols = queue.resume_or_discover(discover)
+    _run(queue, symbols, fetch)
+    assert _tasks("financial") == {
+        "000001": ("done", 1, "2026-10-16"),
+        "000002": ("failed", 1, "2026-10-16"),
+        "000003": ("failed", 1, "2026-10-16"),
+        "000004": ("blocked", 1, "2026-10-16"),
+    }
+
+    retry = SyncTaskQueue("financial", "2026-10-16")
+    assert retry.resume_or_discover(discover) == ["000002", "000003", "000004"]
+    assert len(discoveries) == 1
+    _run(retry, ["000002"], lambda symbol: True)
+    assert _tasks("financial")["000002"] == ("done", 2, "2026-10-16")
+
+
+def test_new_batch_merges_leftovers_and_drops_done_tasks():
+    queue = SyncTaskQueue("kline", "2026-10-15")
+    queue.resume_or_discover(lambda: ["000001", "000002"])
+    _run(queue, ["000001", "000002"], lambda s: s == "000001")
+
+    # 其他环节的任务互不影响
+    SyncTaskQueue("share", "2026-10-15").resume_or_discover(lambda: ["600519"])
+
+    next_day = SyncTaskQueue("kline", "2026-10-16")
+    assert next_day.resume_or_discover(lambda: ["000003"]) == ["000002", "000003"]
+    assert _tasks("kline") == {
+        "000002": ("pending", 1, "2026-10-16"),
+        "000003": ("pending", 0, "2026-10-16"),
+    }
+    assert _tasks("share") == {"600519": ("pending", 0, "2026-10-15")}
+
+
+def test_terminal_states_commit_with_sync_status_batch(tmp_path):
+    """缓存生效时任务终态随同步状态批次提交, 不逐股提交"""
+    import sqlite3
+
+    from storage.database.sync_status import sync_status_cache
+
+    queue = SyncTaskQueue("indicators", "2026-10-16")
+    queue.resume_or_discover(lambda: ["000001", "000002"])
+    reader = sqlite3.connect(tmp_path / "test_metadata.db")
+    committed = "SELECT state FROM sync_tasks WHERE stage = 'indicators'"
+    with sync_status_cache():
+        _run(queue, ["000001", "000002"], lambda symbol: symbol == "000001")
+        assert {row[0] for row in reader.execute(committed)} == {"pending"}
+    assert _tasks("indicators") == {
+        "000001": ("done", 1, "2026-10-16"),
+        "000002": ("failed", 1, "2026-10-16"),
+    }
+    reader.close()
@@ -2,14 +2,17 @@
 
 from datetime import date, datetime
 
+import numpy as np
 import pandas as pd
 import pytest
 
 import utils.trade_date as trade_date_mod
 from utils.trade_date import (
+    TradeCalendar,
     TradeCalendarUnavailableError,
     _get_all_trade_dates,
     get_latest_trade_date,
+    get_trade_calendar,
     is_trade_date,
 )
 
@@ -39,8 +42,10 @@ def _isolate_cache(tmp_path, monkeypatch):
     )
     monkeypatch.setattr(trade_date_mod, "date", _FakeToday)
     _get_all_trade_dates.cache_clear()
+    get_trade_calendar.cache_clear()
     yield
     _get_all_trade_dates.cache_clear()
+    get_trade_calendar.cache_clear()
 
 
 def _mock_ak_fetch(monkeypatch, trade_dates=None, raises=None):
@@ -188,3 +193,67 @@ class TestIsTradeDate:
         _mock_ak_fetch(monkeypatch, raises=RuntimeError("network down"))
         with pytest.raises(TradeCalendarUnavailableError):
             is_trade_date(date(2026, 8, 5))
+
+
+class TestTradeCalendar:
+    CALENDAR = TradeCalendar(
+        [
+            date(2026, 7, 30),
+            date(2026, 7, 31),
+            *MOCK_TRADE_DATES,
+            date(2026, 9, 1),
+        ]
+    )
+
+    def test_unsorted_duplicated_input_is_normalized(self):
+        calendar = TradeCalendar([date(2026, 8, 4), date(2026, 8, 3), date(2026, 8, 4)])
+        assert len(calendar) == 2
+        assert calendar.dates[0] == np.datetime64("2026-08-03")
+
+    def test_membership(self):
+        assert self.CALENDAR.is_trade_date(date(2026, 8, 3))
+        assert pd.Timestamp("2026-08-07") in self.CALENDAR
+        assert not self.CALENDAR.is_trade_date(date(2026, 8, 8))
+
+    def test_next_trade_date_skips_weekend_and_returns_none_at_end(self):
+        assert self.CALENDAR.next_trade_date(date(2026, 8, 7)) == date(2026, 9, 1)
+        assert self.CALENDAR.next_trade_date(date(2026, 8, 3)) == date(2026, 8, 4)
+        assert self.CALENDAR.next_trade_date(date(2026, 9, 1)) is None
+
+    def test_shift_counts_trade_days(self):
+        assert self.CALENDAR.shift(date(2026, 8, 3), 2) == date(2026, 8, 5)
+        assert self.CALENDAR.shift(date(2026, 8, 8), 1) == date(2026, 9, 1)
+        assert self.CALENDAR.shift(date(2026, 8, 3), -2) == date(2026, 7, 30)
+        assert self.CALENDAR.shift(date(2026, 8, 8), -1) == date(2026, 8, 7)
+        assert self.CALENDAR.shift(date(2026, 8, 5), 0) == date(2026, 8, 5)
+        assert self.CALENDAR.shift(date(2026, 8, 8), 0) is None
+        assert self.CALENDAR.shift(date(2026, 7, 30), -1) is None
+
+    def test_range_is_inclusive(self):
+        dates = self.CALENDAR.range(date(2026, 8, 1), date(2026, 8, 5))
+        assert list(dates.astype(object)) == MOCK_TRADE_DATES[:3]
+
+    def test_month_ends(self):
+        assert list(self.CALENDAR.month_ends().astype(object)) == [
+            date(2026, 7, 31),
+            date(2026, 8, 7),
+            date(2026, 9, 1),
+        ]
+
+    def test_next_trade_dates_vectorized(self):
+        result = self.CALENDAR.next_trade_dates([date(2026, 7, 31), date(2026, 9, 1)])
+        assert result[0] == np.datetime64("2026-08-03")
+        assert np.isnat(result[1])
+
+    def test_shared_calendar_loaded_once(self, monkeypatch):
+        calls = []
+
+        def fake_fetch():
+            calls.append(True)
+            return pd.DataFrame({"trade_date": MOCK_TRADE_DATES})
+
+        monkeypatch.setattr(trade_date_mod.ak, "tool_trade_date_hist_sina", fake_fetch)
+        assert is_trade_date(date(2026, 8, 3))
+        assert not is_trade_date(date(2026, 8, 8))
+        assert get_latest_trade_date(datetime(2026, 8, 8, 10, 0)) == date(2026, 8, 7)
+        assert len(calls) == 1
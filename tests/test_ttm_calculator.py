@@ -12,6 +12,7 @@ import pytest
 import analysis.processors.ttm_calculator as ttm_mod
 import storage.file_store.parquet_store as parquet_store_mod
 from analysis.processors.ttm_calculator import TTMCalculator
+from storage.file_store.date_columns import date_columns_to_keys
 
 INCOME_CATEGORY = "financial_statements/type=income"
 CASHFLOW_CATEGORY = "financial_statements/type=cashflow"
@@ -90,7 +91,7 @@ def _write_cashflow(warehouse: Path, symbol: str, rows):
 def _read_result(warehouse: Path, symbol: str) -> pd.DataFrame:
     path = warehouse / "financial/ttm" / f"symbol={symbol}" / "data.parquet"
     assert path.exists(), f"TTM 结果文件未生成: {path}"
-    return pd.read_parquet(path)
+    return date_columns_to_keys(pd.read_parquet(path), "financial/ttm")
 
 
 class TestNormalizePubDate:
@@ -354,3 +355,41 @@ class TestGetExistingReportDates:
     def test_empty_warehouse(self, isolated_warehouse):
         calc = TTMCalculator()
         assert calc.get_existing_report_dates() == set()
+
+
+def test_calculation_holds_source_and_ttm_locks(isolated_warehouse, monkeypatch):
+    """读取来源分区到写回 TTM 期间持有分区锁, 并发写入须等待计算完成"""
+    import threading
+
+    from storage.file_store.partition_lock import partition_lock
+
+    _write_income(isolated_warehouse, "000001", FULL_REPORTS)
+    calc = TTMCalculator()
+    loading = threading.Event()
+    resume = threading.Event()
+    load_data = calc._load_data
+
+    def slow_load(category, symbol):
+        loading.set()
+        resume.wait(5)
+        return load_data(category, symbol)
+
+    monkeypatch.setattr(calc, "_load_data", slow_load)
+    worker = threading.Thread(target=calc.calculate_for_symbol, args=("000001",))
+    worker.start()
+    assert loading.wait(5)
+
+    acquired = threading.Event()
+
+    def writer():
+        with partition_lock(isolated_warehouse, INCOME_CATEGORY, "000001"):
+            acquired.set()
+
+    competing = threading.Thread(target=writer)
+    competing.start()
+    assert not acquired.wait(0.3)
+    resume.set()
+    worker.join(5)
+    competing.join(5)
+    assert acquired.is_set()
+    assert not _read_result(isolated_warehouse, "000001").empty
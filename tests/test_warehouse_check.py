@@ -0,0 +1,113 @@
+"""单元测试: storage/database/warehouse_check.py 数据仓库完整性巡检 (tmp 数据仓库隔离)"""
+
+import os
+import time
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import storage.database.view_base as view_base_mod
+import storage.database.warehouse_check as check_mod
+from storage.database.warehouse_check import check_warehouse, write_report
+
+KLINE_SCHEMA = {"date": "DATE", "close": "DOUBLE", "adj_factor": "DOUBLE"}
+TRADE_DAYS = [date(2024, 1, day) for day in (2, 3, 4, 5, 8, 9)]
+
+
+@pytest.fixture(autouse=True)
+def cached_schema(monkeypatch):
+    schemas = {
+        "daily_kline": KLINE_SCHEMA,
+        "share_capital": {"change_date": "DATE", "total_shares": "DOUBLE"},
+    }
+    monkeypatch.setattr(check_mod, "load_schema", schemas.get)
+    monkeypatch.setattr(view_base_mod, "ensure_schema", schemas.get)
+
+
+def _write(warehouse, category, symbol, frame, name="data.parquet"):
+    partition_dir = warehouse / category / f"symbol={symbol}"
+    partition_dir.mkdir(parents=True, exist_ok=True)
+    frame.to_parquet(partition_dir / name, index=False)
+    return partition_dir
+
+
+def _kline(days, adj_factors):
+    return pd.DataFrame(
+        {"date": days, "close": 10.0, "adj_factor": adj_factors}
+    ).astype({"adj_factor": float})
+
+
+def _issues(report, dataset):
+    return {
+        (issue["symbol"], issue["check"]): issue
+        for issue in report["datasets"][dataset]["issues"]
+    }
+
+
+def test_reports_kline_integrity_issues(tmp_path):
+    (tmp_path / "metadata").mkdir()
+    pd.DataFrame({"trade_date": TRADE_DAYS}).to_parquet(
+        tmp_path / "metadata" / "trade_calendar.parquet", index=False
+    )
+    _write(tmp_path, "daily_kline", "000001", _kline(TRADE_DAYS, 1.0))
+    # 重复日期 + 乱序 + 复权因子下降 + 缺少 1 月 5 日 + 周末行
+    days = [
+        date(2024, 1, 2),
+        date(2024, 1, 4),
+        date(2024, 1, 3),
+        date(2024, 1, 4),
+        date(2024, 1, 6),
+        date(2024, 1, 8),
+    ]
+    _write(tmp_path, "daily_kline", "000002", _kline(days, [2, 2, 2, 2, 2, 1.5]))
+    partition_dir = _write(tmp_path, "daily_kline", "000003", _kline(TRADE_DAYS, 1.0))
+    (partition_dir / "broken.parquet").write_bytes(b"not parquet")
+    stale = partition_dir / ".tmp_deadbeef.parquet"
+    stale.write_bytes(b"")
+    old = time.time() - 2 * check_mod.STALE_TEMP_SECONDS
+    os.utime(stale, (old, old))
+    # 刚写入的临时文件可能属于进行中的写入
+    (partition_dir / ".backup_cafe.parquet").write_bytes(b"")
+
+    report = check_warehouse(["daily_kline"], tmp_path, workers=2)
+    issues = _issues(report, "daily_kline")
+
+    assert not any(symbol == "000001" for symbol, _ in issues)
+    assert issues[("000002", "duplicate_dates")]["count"] == 1
+    assert "2024-01-04" in issues[("000002", "duplicate_dates")]["detail"]
+    assert issues[("000002", "unsorted_dates")]["count"] == 1
+    assert issues[("000002", "adj_factor_discontinuity")]["detail"] == "2024-01-08"
+    assert issues[("000002", "non_trade_dates")]["detail"] == "2024-01-06"
+    assert issues[("000002", "missing_trade_days")]["count"] == 1
+    assert issues[("000003", "unreadable_file")]["severity"] == "error"
+    leftover = issues[("000003", "leftover_temp_files")]
+    assert (leftover["count"], leftover["detail"]) == (1, stale.name)
+    assert report["datasets"]["daily_kline"]["files"] == 3
+    assert report["summary"]["errors"] == 3
+
+
+def test_reports_schema_drift_and_pending_journal(tmp_path):
+    frame = pd.DataFrame({"change_date": [date(2024, 1, 2)], "total_shares": [1.0]})
+    _write(tmp_path, "share_capital", "000001", frame)
+    _write(
+        tmp_path,
+        "share_capital",
+        "000002",
+        frame.assign(float_shares=2.0, total_shares="1e8"),
+    )
+    (tmp_path / "_journal").mkdir()
+    (tmp_path / "_journal" / "commit-0.json").write_text(
+        '{"entries": []}', encoding="utf-8"
+    )
+
+    report = check_warehouse(["share_capital"], tmp_path, workers=1)
+    issues = _issues(report, "share_capital")
+
+    assert list(issues) == [("000002", "schema_drift")]
+    assert issues[("000002", "schema_drift")]["count"] == 1
+    assert "float_shares" in issues[("000002", "schema_drift")]["detail"]
+    assert report["issues"][0]["check"] == "pending_journal"
+
+    path = write_report(report, tmp_path / "report.json")
+    assert '"schema_drift"' in path.read_text(encoding="utf-8")
@@ -0,0 +1,183 @@
+"""单元测试: storage/database/warehouse_compaction.py 按年分桶压实与视图增量读取"""
+
+import os
+from datetime import date
+
+import duckdb
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import storage.database.view_base as view_base_mod
+from storage.database.views.market.daily_kline import DailyKlineView
+from storage.database.warehouse_compaction import (
+    compact_dataset,
+    get_compacted_dir,
+    get_dataset_delta,
+    load_compaction_state,
+)
+from storage.file_store.parquet_store import ParquetStore
+
+
+@pytest.fixture(autouse=True)
+def kline_schema(monkeypatch):
+    monkeypatch.setattr(
+        view_base_mod,
+        "ensure_schema",
+        lambda dataset: {"date": "DATE", "close": "DOUBLE"},
+    )
+
+
+def _write_kline(warehouse, symbol, rows):
+    path = warehouse / "daily_kline" / f"symbol={symbol}" / "data.parquet"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(rows, columns=["date", "close"]).to_parquet(path, index=False)
+    # 保证重写后 mtime 可区分
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    return path
+
+
+def _query_view(warehouse):
+    conn = duckdb.connect()
+    try:
+        conn.execute(DailyKlineView().get_sql(str(warehouse)))
+        return conn.execute(
+            "SELECT symbol, date, close FROM daily_kline ORDER BY symbol, date"
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def test_compaction_buckets_by_year_sorted_by_symbol_and_date(tmp_path):
+    _write_kline(
+        tmp_path, "000002", [(date(2024, 1, 2), 2.0), (date(2023, 12, 29), 1.5)]
+    )
+    _write_kline(tmp_path, "000001", [(date(2024, 1, 3), 1.0)])
+
+    assert compact_dataset("daily_kline", tmp_path, row_group_size=1) == 2
+
+    bucket = get_compacted_dir("daily_kline", tmp_path) / "year=2024" / "data.parquet"
+    table = pq.read_table(bucket)
+    assert table.column("symbol").to_pylist() == ["000001", "000002"]
+    state = load_compaction_state("daily_kline", tmp_path)
+    assert state["row_group_size"] == 1
+    assert state["symbols"]["000002"]["years"] == [2023, 2024]
+    # 无增量时视图只读取压实副本
+    view_sql = DailyKlineView().get_sql(str(tmp_path))
+    assert "compacted/daily_kline/year=*/data.parquet" in view_sql
+    assert "UNION ALL BY NAME" not in view_sql
+    assert _query_view(tmp_path) == [
+        ("000001", date(2024, 1, 3), 1.0),
+        ("000002", date(2023, 12, 29), 1.5),
+        ("000002", date(2024, 1, 2), 2.0),
+    ]
+    # 重复执行无增量, 不重写任何桶
+    assert compact_dataset("daily_kline", tmp_path) == 0
+
+
+def test_view_reads_per_symbol_delta_until_recompacted(tmp_path):
+    _write_kline(tmp_path, "000001", [(date(2023, 6, 1), 1.0)])
+    _write_kline(tmp_path, "000002", [(date(2023, 6, 1), 2.0)])
+    for symbol in ("000003", "000004"):
+        _write_kline(tmp_path, symbol, [(date(2023, 6, 1), 3.0)])
+    compact_dataset("daily_kline", tmp_path)
+
+    _write_kline(tmp_path, "000001", [(date(2023, 6, 1), 1.1), (date(2024, 6, 3), 1.2)])
+    (tmp_path / "daily_kline" / "symbol=000002" / "data.parquet").unlink()
+
+    delta = get_dataset_delta("daily_kline", tmp_path)
+    assert delta.excluded_symbols == ["000001", "000002"]
+    assert [path.parent.name for path in delta.delta_files] == ["symbol=000001"]
+    expected = [
+        ("000001", date(2023, 6, 1), 1.1),
+        ("000001", date(2024, 6, 3), 1.2),
+        ("000003", date(2023, 6, 1), 3.0),
+        ("000004", date(2023, 6, 1), 3.0),
+    ]
+    assert _query_view(tmp_path) == expected
+
+    # 只重写增量股票涉及的 2023 与 2024 两个年份桶
+    assert compact_dataset("daily_kline", tmp_path) == 2
+    assert get_dataset_delta("daily_kline", tmp_path).delta_files == []
+    assert _query_view(tmp_path) == expected
+
+
+def test_view_applies_append_deltas_last_write_wins(tmp_path):
+    store = ParquetStore(tmp_path)
+    for symbol in ("000001", "000002", "000003"):
+        _write_kline(tmp_path, symbol, [(date(2024, 1, 2), 1.0)])
+    compact_dataset("daily_kline", tmp_path)
+
+    rows = pd.DataFrame({"date": [date(2024, 1, 2), date(2024, 1, 3)], "close": 2.0})
+    store.append_partition(rows, "daily_kline", "000001")
+    store.append_partition(rows.iloc[1:].assign(close=3.0), "daily_kline", "000001")
+
+    delta = get_dataset_delta("daily_kline", tmp_path)
+    assert delta.excluded_symbols == ["000001"]
+    assert delta.delta_symbol_count == 1
+    expected = [
+        ("000001", date(2024, 1, 2), 2.0),
+        ("000001", date(2024, 1, 3), 3.0),
+        ("000002", date(2024, 1, 2), 1.0),
+        ("000003", date(2024, 1, 2), 1.0),
+    ]
+    assert _query_view(tmp_path) == expected
+
+    # 压实前先合并增量文件, 之后视图只读压实副本
+    compact_dataset("daily_kline", tmp_path)
+    assert store.list_deltas("daily_kline", "000001") == []
+    assert get_dataset_delta("daily_kline", tmp_path).delta_files == []
+    assert _query_view(tmp_path) == expected
+
+
+def test_registered_view_survives_delta_merge_and_recompaction(tmp_path):
+    """视图以 glob 引用年份桶与增量分区: 合并删除增量文件、重新压实后仍可查询"""
+    store = ParquetStore(tmp_path)
+    for symbol in ("000001", "000002", "000003"):
+        _write_kline(tmp_path, symbol, [(date(2024, 1, 2), 1.0)])
+    compact_dataset("daily_kline", tmp_path)
+    store.append_partition(
+        pd.DataFrame({"date": [date(2024, 1, 3)], "close": [2.0]}),
+        "daily_kline",
+        "000001",
+    )
+    expected = [
+        ("000001", date(2024, 1, 2), 1.0),
+        ("000001", date(2024, 1, 3), 2.0),
+        ("000002", date(2024, 1, 2), 1.0),
+        ("000003", date(2024, 1, 2), 1.0),
+    ]
+
+    conn = duckdb.connect()
+    try:
+        conn.execute(DailyKlineView().get_sql(str(tmp_path)))
+        query = "SELECT symbol, date, close FROM daily_kline ORDER BY symbol, date"
+        assert conn.execute(query).fetchall() == expected
+
+        assert store.merge_deltas("daily_kline", "000001") == 1
+        assert conn.execute(query).fetchall() == expected
+
+        # 新年份桶与移出增量的股票: 注册时的增量集合已过期, 但引用仍有效
+        _write_kline(tmp_path, "000002", [(date(2025, 1, 2), 3.0)])
+        compact_dataset("daily_kline", tmp_path)
+        assert conn.execute(query).fetchall()
+    finally:
+        conn.close()
+    assert _query_view(tmp_path) == [
+        *expected[:2],
+        ("000002", date(2025, 1, 2), 3.0),
+        expected[3],
+    ]
+
+
+def test_uncompacted_view_dedupes_append_deltas(tmp_path):
+    store = ParquetStore(tmp_path)
+    _write_kline(tmp_path, "000001", [(date(2024, 1, 2), 1.0)])
+    store.append_partition(
+        pd.DataFrame({"date": [date(2024, 1, 2)], "close": [1.5]}),
+        "daily_kline",
+        "000001",
+    )
+
+    assert _query_view(tmp_path) == [("000001", date(2024, 1, 2), 1.5)]
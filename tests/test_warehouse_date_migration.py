@@ -0,0 +1,91 @@
+"""单元测试: 财务数据集日期列的一次性 DATE 迁移 (tmp 数据仓库隔离)"""
+
+from datetime import date
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from storage.database.warehouse_date_migration import (
+    is_date_migration_done,
+    migrate_warehouse_dates,
+    needs_date_migration,
+)
+
+INCOME_CATEGORY = "financial_statements/type=income"
+
+
+def _write(warehouse, category, symbol, df):
+    path = warehouse / category / f"symbol={symbol}" / "data.parquet"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(path, index=False)
+    return path
+
+
+def test_migration_rewrites_string_dates_once(tmp_path):
+    income = _write(
+        tmp_path,
+        INCOME_CATEGORY,
+        "000001",
+        pd.DataFrame(
+            {
+                "report_date": ["20240930", "20240630"],
+                "公告日期": ["2024-10-30 00:00:00", "20240830"],
+                "数据可用日期": ["20241031", ""],
+                "更新日期": ["2024-11-01", "2024-09-01"],
+                "营业总收入": [1.0, 2.0],
+            }
+        ),
+    )
+    ttm = _write(
+        tmp_path,
+        "financial/ttm",
+        "000001",
+        pd.DataFrame(
+            {"report_date": ["20240930"], "pub_date": ["20241030"], "x": [1.0]}
+        ),
+    )
+
+    assert not is_date_migration_done(tmp_path)
+    assert migrate_warehouse_dates(tmp_path) == {
+        "fin_ttm": 1,
+        "fin_income_statement": 1,
+    }
+
+    schema = pq.read_schema(income)
+    for column in ("report_date", "公告日期", "数据可用日期"):
+        assert schema.field(column).type == pa.date32()
+    # 非日期口径的元数据列保持原样
+    assert pa.types.is_string(
+        schema.field("更新日期").type
+    ) or pa.types.is_large_string(schema.field("更新日期").type)
+    # 重写后按报告期升序落盘
+    result = pd.read_parquet(income)
+    assert result["公告日期"].tolist() == [date(2024, 8, 30), date(2024, 10, 30)]
+    assert pd.isna(result["数据可用日期"].iloc[0])
+    assert result["营业总收入"].tolist() == [2.0, 1.0]
+    assert not needs_date_migration(ttm, "financial/ttm")
+
+    assert is_date_migration_done(tmp_path)
+
+    # 已迁移分区不再重写
+    assert migrate_warehouse_dates(tmp_path) == {}
+
+
+def test_startup_check_migrates_only_without_marker(tmp_path, monkeypatch):
+    """启动检查: 缺少完成标记时自动迁移, 标记存在后不再读取分区"""
+    import main as main_mod
+    import storage.database.warehouse_date_migration as migration_mod
+
+    monkeypatch.setattr(migration_mod, "WAREHOUSE_DIR", str(tmp_path))
+    migrations = []
+    monkeypatch.setattr(
+        main_mod, "migrate_warehouse_dates", lambda: migrations.append(1)
+    )
+
+    main_mod.ensure_warehouse_dates_migrated()
+    assert migrations == [1]
+
+    migration_mod._write_migration_marker(tmp_path)
+    main_mod.ensure_warehouse_dates_migrated()
+    assert migrations == [1]
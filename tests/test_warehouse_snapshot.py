@@ -0,0 +1,133 @@
+"""单元测试: storage/database/warehouse_snapshot.py 数据仓库硬链接快照 (tmp 数据仓库隔离)"""
+
+import fcntl
+import os
+from datetime import date
+
+import duckdb
+import pandas as pd
+import pytest
+
+import storage.database.view_base as view_base_mod
+import storage.database.warehouse_snapshot as snapshot_mod
+from storage.database.views.market.daily_kline import DailyKlineView
+from storage.database.warehouse_snapshot import (
+    SNAPSHOT_DIR,
+    collect_snapshots,
+    get_current_generation,
+    pin_snapshot,
+    publish_snapshot,
+)
+from storage.file_store.parquet_store import ParquetStore
+
+
+@pytest.fixture(autouse=True)
+def kline_schema(monkeypatch):
+    monkeypatch.setattr(
+        view_base_mod,
+        "ensure_schema",
+        lambda dataset: {"date": "DATE", "close": "DOUBLE"},
+    )
+
+
+def _save_kline(store, close):
+    store.save_partition(
+        pd.DataFrame({"date": [date(2024, 1, 2)], "close": [close]}),
+        "daily_kline",
+        "000001",
+    )
+
+
+def _query_closes(warehouse):
+    conn = duckdb.connect()
+    try:
+        conn.execute(DailyKlineView().get_sql(str(warehouse)))
+        rows = conn.execute("SELECT close FROM daily_kline").fetchall()
+        return [row[0] for row in rows]
+    finally:
+        conn.close()
+
+
+def test_pinned_snapshot_is_unaffected_by_later_writes(tmp_path):
+    store = ParquetStore(tmp_path)
+    assert pin_snapshot(tmp_path) is None
+
+    _save_kline(store, 1.0)
+    assert publish_snapshot(tmp_path) == 1
+    snapshot = pin_snapshot(tmp_path)
+    assert snapshot.generation == 1
+
+    # 同步覆盖写入与追加增量都不影响已钉住的快照
+    _save_kline(store, 2.0)
+    store.append_partition(
+        pd.DataFrame({"date": [date(2024, 1, 3)], "close": [3.0]}),
+        "daily_kline",
+        "000001",
+    )
+    assert _query_closes(snapshot.path) == [1.0]
+    assert sorted(_query_closes(tmp_path)) == [2.0, 3.0]
+    snapshot.release()
+
+
+def test_collects_generations_without_live_pins(tmp_path):
+    _save_kline(ParquetStore(tmp_path), 1.0)
+    publish_snapshot(tmp_path)
+    pinned = pin_snapshot(tmp_path)
+    publish_snapshot(tmp_path)
+    assert get_current_generation(tmp_path) == 2
+
+    root = tmp_path / SNAPSHOT_DIR
+    # 第 1 代仍被钉住, 保留
+    assert (root / "gen-000001").exists()
+
+    pinned.release()
+    assert publish_snapshot(tmp_path) == 3
+    assert sorted(path.name for path in root.glob("gen-*")) == ["gen-000003"]
+    # 未持锁的引用 (读者已退出) 不阻止回收, 即使其 pid 恰好被存活进程复用
+    stale = root / "gen-000003" / "_pins" / f"{os.getpid()}-dead"
+    stale.touch()
+    publish_snapshot(tmp_path)
+    assert collect_snapshots(tmp_path) == 0
+    assert sorted(path.name for path in root.glob("gen-*")) == ["gen-000004"]
+
+
+def test_pin_losing_race_to_collector_leaves_no_stale_pin(tmp_path, monkeypatch):
+    """钉住时代目录被回收方改名, 撤销的引用不得残留在回收站中"""
+    _save_kline(ParquetStore(tmp_path), 1.0)
+    publish_snapshot(tmp_path)
+    root = tmp_path / SNAPSHOT_DIR
+    trash_dir = root / ".trash-gen-000001-test"
+
+    is_published = snapshot_mod._is_published
+
+    def renamed_by_collector(generation_dir):
+        os.rename(generation_dir, trash_dir)
+        return False
+
+    monkeypatch.setattr(snapshot_mod, "_is_published", renamed_by_collector)
+    with pytest.raises(RuntimeError):
+        pin_snapshot(tmp_path)
+    assert list((trash_dir / "_pins").iterdir()) == []
+
+    # 回收方放回后该代照常可回收
+    monkeypatch.setattr(snapshot_mod, "_is_published", is_published)
+    os.rename(trash_dir, root / "gen-000001")
+    publish_snapshot(tmp_path)
+    assert sorted(path.name for path in root.glob("gen-*")) == ["gen-000002"]
+
+
+def test_collector_keeps_in_progress_build_and_removes_aborted_one(tmp_path):
+    root = tmp_path / SNAPSHOT_DIR
+    in_progress = root / f".building-{os.getpid()}-live"
+    aborted = root / f".building-{os.getpid()}-dead"
+    in_progress.mkdir(parents=True)
+    aborted.mkdir()
+    building_fd = os.open(in_progress, os.O_RDONLY)
+    fcntl.flock(building_fd, fcntl.LOCK_EX)
+    try:
+        collect_snapshots(tmp_path)
+    finally:
+        os.close(building_fd)
+
+    assert in_progress.exists()
+    assert not aborted.exists()
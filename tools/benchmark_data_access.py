@@ -0,0 +1,111 @@
+"""回测数据加载路径的峰值内存基准
+
+对比两种 DuckDB -> Python 结果传递方式:
+- legacy: ``.df()`` 物化后再 ``pd.to_datetime`` 并在 pandas 中派生 ``open_hfq``
+- arrow:  日期与 ``open_hfq`` 在 SQL 中完成, 以 Arrow 表交付 ArrowDtype 帧
+
+每种方式在独立子进程中运行, 以 ``ru_maxrss`` 的增量衡量峰值内存, 数据为内存中
+合成的行情表, 不读取真实数据仓库。
+
+运行方式:
+    uv run tools/benchmark_data_access.py --symbols 5000 --days 1200
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+SETUP_SQL = """
+CREATE TABLE market AS
+SELECT
+    DATE '2020-01-01' + CAST(d AS INTEGER) AS date,
+    lpad(CAST(s AS VARCHAR), 6, '0') AS symbol,
+    10.0 + (s % 50) + d * 0.01 AS raw_close,
+    (10.0 + (s % 50) + d * 0.01) * 1.5 AS close_hfq,
+    10.0 + (s % 50) + d * 0.01 - 0.05 AS open,
+    15.0 + (s % 30) AS pe_ttm,
+    1.0 + (s % 7) * 0.1 AS pb
+FROM range({symbols}) AS sym(s), range({days}) AS day(d)
+"""
+
+
+def _peak_rss_mb() -> float:
+    # Linux 上 ru_maxrss 单位为 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_mode(mode: str, symbols: int, days: int) -> dict:
+    import duckdb
+    import pandas as pd
+
+    from storage.database.arrow_result import fetch_arrow_frame
+
+    conn = duckdb.connect(":memory:")
+    conn.execute(SETUP_SQL.format(symbols=symbols, days=days))
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+    if mode == "legacy":
+        frame = conn.execute(
+            "SELECT date, symbol, raw_close, close_hfq, pe_ttm, pb, open "
+            "FROM market ORDER BY date, symbol"
+        ).df()
+        frame["date"] = pd.to_datetime(frame["date"])
+        frame["open_hfq"] = frame["open"] * frame["close_hfq"] / frame["raw_close"]
+    else:
+        frame = fetch_arrow_frame(
+            conn,
+            "SELECT CAST(date AS TIMESTAMP) AS date, symbol, raw_close, close_hfq, "
+            "pe_ttm, pb, open, open * close_hfq / NULLIF(raw_close, 0) AS open_hfq "
+            "FROM market ORDER BY date, symbol",
+        )
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": mode,
+        "rows": len(frame),
+        "seconds": round(elapsed, 3),
+        "peak_rss_delta_mb": round(_peak_rss_mb() - baseline, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回测数据加载峰值内存基准")
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=1000)
+    parser.add_argument("--mode", choices=["legacy", "arrow"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(_run_mode(args.mode, args.symbols, args.days)))
+        return
+
+    for mode in ("legacy", "arrow"):
+        output = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--mode",
+                mode,
+                "--symbols",
+                str(args.symbols),
+                "--days",
+                str(args.days),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{result['mode']:>6}: {result['rows']} 行, 耗时 {result['seconds']}s, "
+            f"峰值内存增量 {result['peak_rss_delta_mb']} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""分区布局对短窗口日期查询的行组裁剪基准
+
+对比两种逐股分区布局:
+- legacy: pandas ``to_parquet`` 默认布局 (整只股票一个行组, 写入顺序即采集顺序)
+- sorted: ``write_partition_file`` 布局 (按日期排序, 行组有界, 带统计与 page index)
+
+两种布局分别写入临时目录, 以 DuckDB 执行 ``WHERE date BETWEEN ? AND ?`` 的窗口
+查询, 报告查询耗时以及与窗口相交 (无法依据 min/max 统计跳过) 的行组占比。
+数据为合成的日线行情, 不读取真实数据仓库。
+
+运行方式:
+    uv run tools/benchmark_date_pruning.py --symbols 1000 --days 6000 --window 20
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+CATEGORY = "daily_kline"
+PRICE_COLUMNS = ("open", "high", "low", "close", "amount", "turnover", "adj_factor")
+
+
+def _make_frame(symbol: int, dates):
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(symbol)
+    days = len(dates)
+    frame = pd.DataFrame(
+        {
+            "date": dates,
+            **{column: rng.normal(10, 1, days) for column in PRICE_COLUMNS},
+            "volume": rng.integers(1_000, 1_000_000, days),
+        }
+    )
+    # 采集器多次补数后分区内的行序并不保证有序
+    return frame.sample(frac=1.0, random_state=symbol, ignore_index=True)
+
+
+def _write_layout(base_dir: Path, layout: str, symbols: int, days: int) -> None:
+    import pandas as pd
+
+    from storage.file_store.parquet_layout import write_partition_file
+
+    dates = pd.bdate_range(end="2024-12-31", periods=days).date
+    for symbol in range(symbols):
+        partition_dir = base_dir / CATEGORY / f"symbol={symbol:06d}"
+        partition_dir.mkdir(parents=True, exist_ok=True)
+        frame = _make_frame(symbol, dates)
+        path = partition_dir / "data.parquet"
+        if layout == "legacy":
+            frame.to_parquet(path, engine="pyarrow", compression="snappy", index=False)
+        else:
+            write_partition_file(frame, CATEGORY, path)
+
+
+def _overlapping_row_groups(base_dir: Path, start: date, end: date) -> tuple[int, int]:
+    import pyarrow.parquet as pq
+
+    overlapping = total = 0
+    for path in base_dir.glob(f"{CATEGORY}/symbol=*/data.parquet"):
+        metadata = pq.ParquetFile(path).metadata
+        index = metadata.schema.names.index("date")
+        for row_group in range(metadata.num_row_groups):
+            stats = metadata.row_group(row_group).column(index).statistics
+            total += 1
+            if stats is None or not (stats.max < start or stats.min > end):
+                overlapping += 1
+    return overlapping, total
+
+
+def _query(base_dir: Path, start: date, end: date, repeat: int) -> tuple[int, float]:
+    import duckdb
+
+    conn = duckdb.connect(":memory:")
+    sql = (
+        "SELECT count(*), avg(close), avg(amount), avg(adj_factor) "
+        "FROM read_parquet(?, hive_partitioning=true) "
+        "WHERE date BETWEEN ? AND ?"
+    )
+    glob = str(base_dir / CATEGORY / "*" / "*.parquet")
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = conn.execute(sql, [glob, start, end]).fetchone()[0]
+        timings.append(time.perf_counter() - started)
+    conn.close()
+    return rows, min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分区布局日期窗口裁剪基准")
+    parser.add_argument("--symbols", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=6000)
+    parser.add_argument("--window", type=int, default=20, help="查询窗口 (自然日)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    end = date(2024, 12, 31)
+    start = end - timedelta(days=args.window)
+    for layout in ("legacy", "sorted"):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            base_dir = Path(tmp_dir)
+            _write_layout(base_dir, layout, args.symbols, args.days)
+            overlapping, total = _overlapping_row_groups(base_dir, start, end)
+            rows, seconds = _query(base_dir, start, end, args.repeat)
+        print(
+            f"{layout:>6}: 命中 {rows} 行, 耗时 {seconds:.3f}s, "
+            f"需解码行组 {overlapping}/{total} ({overlapping / total:.1%})"
+        )
+
+
+if __name__ == "__main__":
+    main()
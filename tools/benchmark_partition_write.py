@@ -0,0 +1,153 @@
+"""财务报表逐股写入路径的延迟与峰值内存基准
+
+对比两种写入方式:
+- legacy: 逐列 ``astype(str)`` / ``pd.to_numeric`` 清洗, 再经 pandas ``to_parquet`` 写出
+- arrow:  按声明 schema 一次性转换为 Arrow 表 (``to_declared_table``), ``pyarrow.parquet`` 直接写出
+
+每种方式在独立子进程中运行, 以 ``ru_maxrss`` 的增量衡量峰值内存。数据为内存中合成的
+利润表 (数值列混有采集接口常见的文本空值), 写入临时目录, 不读写真实数据仓库。
+
+运行方式:
+    uv run tools/benchmark_partition_write.py --symbols 200 --reports 80 --columns 120
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+DATASET = "fin_income_statement"
+CATEGORY = "financial_statements/type=income"
+
+
+def _peak_rss_mb() -> float:
+    # Linux 上 ru_maxrss 单位为 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _make_frame(symbol: str, reports: int, columns: int):
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(int(symbol))
+    quarters = pd.period_range(end="2024Q4", periods=reports, freq="Q")
+    data = {
+        "symbol": symbol,
+        "report_date": [q.end_time.strftime("%Y%m%d") for q in quarters],
+        "公告日期": [
+            (q.end_time + pd.Timedelta(days=30)).strftime("%Y-%m-%d") for q in quarters
+        ],
+        "数据源": "sina",
+        "币种": "CNY",
+        "类型": "合并期末",
+    }
+    for index in range(columns):
+        values = rng.normal(1e8, 1e7, reports)
+        if index % 4 == 0:
+            # 采集接口返回的文本列: 数字字符串与 "--" / None 混杂
+            text = values.astype(str).astype(object)
+            text[::7] = "--"
+            text[1::11] = None
+            data[f"指标{index}"] = text
+        else:
+            data[f"指标{index}"] = values
+    return pd.DataFrame(data)
+
+
+def _legacy_write(df, path: Path):
+    import pandas as pd
+
+    from storage.database.financial_store import FINANCIAL_META_COLUMNS
+    from storage.file_store.date_columns import coerce_date_columns
+
+    df = df.copy()
+    for col in df.columns:
+        if col in FINANCIAL_META_COLUMNS:
+            df[col] = (
+                df[col].astype(str).replace(["nan", "None", "NaT", "<NA>", "nan "], "")
+            )
+        else:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    cols_to_save = [c for c in df.columns if c != "symbol"]
+    coerce_date_columns(df[cols_to_save], CATEGORY).to_parquet(
+        path, engine="pyarrow", compression="snappy", index=False
+    )
+
+
+def _arrow_write(df, path: Path):
+    import pyarrow.parquet as pq
+
+    from storage.database.declared_schema import to_declared_table
+    from storage.database.financial_store import FINANCIAL_META_COLUMNS
+
+    table = to_declared_table(df, DATASET, CATEGORY, FINANCIAL_META_COLUMNS)
+    pq.write_table(table, path, compression="snappy")
+
+
+def _run_mode(mode: str, symbols: int, reports: int, columns: int) -> dict:
+    write = _legacy_write if mode == "legacy" else _arrow_write
+    frames = [_make_frame(f"{i:06d}", reports, columns) for i in range(symbols)]
+    baseline = _peak_rss_mb()
+    latencies = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for index, frame in enumerate(frames):
+            started = time.perf_counter()
+            write(frame, Path(tmp_dir) / f"{index}.parquet")
+            latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return {
+        "mode": mode,
+        "symbols": symbols,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+        "peak_rss_delta_mb": round(_peak_rss_mb() - baseline, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="财务报表逐股写入基准")
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--reports", type=int, default=80)
+    parser.add_argument("--columns", type=int, default=120)
+    parser.add_argument("--mode", choices=["legacy", "arrow"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(
+            json.dumps(_run_mode(args.mode, args.symbols, args.reports, args.columns))
+        )
+        return
+
+    for mode in ("legacy", "arrow"):
+        output = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--mode",
+                mode,
+                "--symbols",
+                str(args.symbols),
+                "--reports",
+                str(args.reports),
+                "--columns",
+                str(args.columns),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{result['mode']:>6}: {result['symbols']} 只, 平均 {result['mean_ms']}ms, "
+            f"p95 {result['p95_ms']}ms, 峰值内存增量 {result['peak_rss_delta_mb']} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
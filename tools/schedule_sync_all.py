@@ -6,8 +6,8 @@
 3. 前一天 (today-1) 非交易日 -> 退出 (零同步请求)
 4. 前一天是交易日且已记录 sync-all 成功 (last_sync_date >= 前一天) -> 退出
 5. 执行 sync-all 流水线; 未全部成功时整体重试, 重试次数与间隔可配置
-   (增量机制自愈: 重跑只补失败部分, 成功部分自动跳过/续传)
-6. 全部成功 -> 记录成功 (sync_status 表, 日期=前一天数据日);
+   (以数据日为任务队列批次: 重跑跳过候选发现, 只续跑各环节未完成的逐股任务)
+6. 全部成功 -> 发布数据仓库快照, 记录成功 (sync_status 表, 日期=前一天数据日);
    失败/中止/异常 -> 不记录, 次日补跑
 
 由 launchd 以项目 venv 的 python 绝对路径启动, 故本脚本自行把项目根加入 sys.path。
@@ -36,7 +36,10 @@ from storage.database.sync_status import (  # noqa: E402
     record_sync_success,
 )
 from utils.logger import logger  # noqa: E402
-from utils.requests_protection import install_requests_protection  # noqa: E402
+from utils.requests_protection import (  # noqa: E402
+    install_requests_protection,
+    log_http_pool_stats,
+)
 from utils.trade_date import (  # noqa: E402
     TradeCalendarUnavailableError,
     is_trade_date,
@@ -73,15 +76,19 @@ def run_sync_all_with_retry() -> int:
         logger.info(f"前一天 {prev_day} 已记录 sync-all 成功 ({last}), 本轮跳过")
         return 0
 
+    sync_main.ensure_warehouse_dates_migrated()
     max_attempts = SYNC_ALL_MAX_RETRIES + 1
     for attempt in range(1, max_attempts + 1):
         logger.info(f">>> 定时 sync-all 第 {attempt}/{max_attempts} 次尝试 <<<")
         try:
-            status = sync_main.sync_all_data_flow()
+            # 以数据日为任务队列批次: 重试只续跑各环节未完成的逐股任务
+            status = sync_main.sync_all_data_flow(task_batch=prev_day.isoformat())
         except Exception:
             logger.exception("sync-all 流水线异常中止 (视为未成功)")
             status = None
         if status == sync_main.SYNC_ALL_SUCCESS:
+            # 发布快照供研究/回测钉住读取 (失败不影响同步结果)
+            sync_main.publish_warehouse_snapshot()
             # 记录数据日 (前一天): 保证下一个交易日定时判定时 last < 新 prev_day,
             # 每日数据零延迟入库; 同日重复触发时 last == prev_day 正常跳过
             status_write_ok, _ = _execute_sync_status_with_retry(
@@ -142,4 +149,5 @@ if __name__ == "__main__":
     try:
         sys.exit(main())
     finally:
+        log_http_pool_stats()
         db_manager.close_all()
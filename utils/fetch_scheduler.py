@@ -0,0 +1,248 @@
+"""按数据源限速的并发抓取调度器
+
+同步环节按股票逐个抓取, 过去每只股票之后固定 ``time.sleep`` 一段随机时间, 请求
+延迟与限速等待串行叠加。调度器把逐股任务交给有界线程池执行, 节奏由各数据源独立
+的令牌桶控制:
+
+- 任务完成后按实际发出的请求数扣减令牌 (跳过的股票不扣), 余额为负时下一个任务
+  派发前等待补足; 等待期间其他数据源的任务照常执行, 请求延迟与限速等待相互重叠。
+- 任务失败 (重试耗尽) 时该数据源速率减半, 之后每次成功逐步恢复到基准速率。
+- 全局熔断器: 任一任务抛出 ``SinaBlockedError`` 立即熔断, 所有环节停止派发新任务,
+  等待中的任务取消, 在途任务结束后由各环节重新抛出该异常。
+
+多个环节共享同一个调度器实例时, 访问同一数据源的环节共享令牌桶与并发上限, 访问
+不同数据源的环节可以在各自线程中同时运行。
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from config.settings import SYNC_FETCH_WORKERS
+from utils.logger import logger
+from utils.requests_protection import SinaBlockedError
+
+SOURCE_SINA = "sina"
+SOURCE_EASTMONEY = "eastmoney"
+SOURCE_XUEQIU = "xueqiu"
+SOURCE_CNINFO = "cninfo"
+
+# 失败后速率乘以该系数, 最低降到基准速率的 MIN_RATE_RATIO
+BACKOFF_FACTOR = 0.5
+MIN_RATE_RATIO = 0.125
+# 每次成功恢复基准速率的该比例
+RECOVERY_STEP = 0.1
+# 等待时长的随机抖动比例, 避免请求间隔过于规整
+JITTER_RATIO = 0.25
+# 单次等待的切片上限 (秒), 熔断后等待中的派发线程最迟在该时长内退出
+WAIT_SLICE_SECONDS = 1.0
+
+
+@dataclass(frozen=True)
+class SourceLimit:
+    """数据源限速: 每秒请求数、可累积的突发请求数、同时在途的任务数"""
+
+    rate: float
+    burst: float = 1.0
+    concurrency: int = 1
+
+
+# akshare 的新浪/巨潮接口用 py_mini_racer (V8) 解码, V8 并发使用会崩溃
+# (见 sync_stock_metadata), 因此这两个数据源的任务同一时刻只在途一个。
+SOURCE_LIMITS = {
+    SOURCE_SINA: SourceLimit(rate=1.2, burst=4.0, concurrency=1),
+    SOURCE_EASTMONEY: SourceLimit(rate=2.0, burst=4.0, concurrency=4),
+    SOURCE_XUEQIU: SourceLimit(rate=2.0, burst=2.0, concurrency=2),
+    SOURCE_CNINFO: SourceLimit(rate=1.0, burst=1.0, concurrency=1),
+}
+
+
+class TokenBucket:
+    """可透支的令牌桶: 任务完成后按实际请求数扣减, 派发前等待余额非负"""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def charge(self, cost: float) -> None:
+        """扣减令牌 (允许透支)"""
+        if cost <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens -= cost
+
+    def wait_seconds(self) -> float:
+        """余额补足到非负所需的等待时长"""
+        with self._lock:
+            self._refill()
+            return max(0.0, -self._tokens / self.rate)
+
+    def backoff(self) -> None:
+        with self._lock:
+            self._refill()
+            self.rate = max(self.base_rate * MIN_RATE_RATIO, self.rate * BACKOFF_FACTOR)
+
+    def recover(self) -> None:
+        with self._lock:
+            self._refill()
+            self.rate = min(self.base_rate, self.rate + self.base_rate * RECOVERY_STEP)
+
+
+class CircuitBreaker:
+    """全局熔断器: 记录第一个致命异常, 熔断后所有派发线程停止"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self.error: BaseException | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._event.is_set()
+
+    def trip(self, error: BaseException) -> None:
+        with self._lock:
+            if self.error is None:
+                self.error = error
+                logger.error(f"抓取调度器熔断, 停止全部抓取任务: {error}")
+        self._event.set()
+
+
+@dataclass
+class TaskOutcome:
+    """单个任务的结果; error 非空表示任务失败"""
+
+    item: Any
+    result: Any = None
+    error: BaseException | None = None
+
+
+class FetchScheduler:
+    """有界线程池 + 数据源令牌桶 + 全局熔断的逐股任务调度器"""
+
+    def __init__(
+        self,
+        max_workers: int = SYNC_FETCH_WORKERS,
+        limits: dict[str, SourceLimit] | None = None,
+        fatal_exceptions: tuple[type[BaseException], ...] = (SinaBlockedError,),
+    ):
+        self.limits = {**SOURCE_LIMITS, **(limits or {})}
+        self.fatal_exceptions = fatal_exceptions
+        self.breaker = CircuitBreaker()
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="fetch"
+        )
+        self._buckets: dict[str, TokenBucket] = {}
+        self._slots: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> FetchScheduler:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def _source(self, source: str) -> tuple[TokenBucket, threading.BoundedSemaphore]:
+        with self._lock:
+            if source not in self._buckets:
+                limit = self.limits.get(source)
+                if limit is None:
+                    raise ValueError(f"未配置限速的数据源: {source}")
+                self._buckets[source] = TokenBucket(limit.rate, limit.burst)
+                self._slots[source] = threading.BoundedSemaphore(limit.concurrency)
+            return self._buckets[source], self._slots[source]
+
+    def get_bucket(self, source: str) -> TokenBucket:
+        return self._source(source)[0]
+
+    def _wait_for_tokens(self, bucket: TokenBucket) -> bool:
+        """等待令牌余额非负, 返回是否可以继续派发 (熔断时为 False)"""
+        remaining = bucket.wait_seconds()
+        if remaining > 0:
+            remaining *= 1 + random.uniform(0, JITTER_RATIO)
+        while remaining > 0 and not self.breaker.is_open:
+            step = min(remaining, WAIT_SLICE_SECONDS)
+            time.sleep(step)
+            remaining -= step
+        return not self.breaker.is_open
+
+    def _execute(
+        self,
+        bucket: TokenBucket,
+        slot: threading.BoundedSemaphore,
+        func: Callable[[Any], Any],
+        item: Any,
+        cost: float | Callable[[Any], float],
+    ) -> TaskOutcome:
+        try:
+            if self.breaker.is_open:
+                raise self.breaker.error
+            try:
+                result = func(item)
+            except self.fatal_exceptions as e:
+                self.breaker.trip(e)
+                raise
+            except Exception as e:
+                # 失败前已发出请求 (重试耗尽), 按满额扣减并降速
+                bucket.charge(cost if not callable(cost) else 1.0)
+                bucket.backoff()
+                return TaskOutcome(item, error=e)
+            bucket.charge(cost(result) if callable(cost) else cost)
+            bucket.recover()
+            return TaskOutcome(item, result=result)
+        finally:
+            slot.release()
+
+    def run(
+        self,
+        source: str,
+        items: Iterable[Any],
+        func: Callable[[Any], Any],
+        cost: float | Callable[[Any], float] = 1.0,
+    ) -> list[TaskOutcome]:
+        """按数据源限速并发执行 func(item), 按输入顺序返回结果
+
+        :param source: 数据源 (决定令牌桶与并发上限)
+        :param cost: 每个任务发出的请求数, 或根据任务返回值计算请求数的函数
+        :raises SinaBlockedError: 熔断 (本环节或共享调度器的其他环节触发)
+        """
+        bucket, slot = self._source(source)
+        futures: list[Future] = []
+        for item in items:
+            # 先占用在途名额再等待令牌, 使等待时长计入前一个任务完成后的扣减
+            slot.acquire()
+            if not self._wait_for_tokens(bucket):
+                slot.release()
+                break
+            futures.append(
+                self._pool.submit(self._execute, bucket, slot, func, item, cost)
+            )
+
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append(future.result())
+            except self.fatal_exceptions:
+                pass
+        if self.breaker.is_open:
+            raise self.breaker.error
+        return outcomes
@@ -5,16 +5,25 @@
 新浪接口请求注入伪装头 (随机 UA/Referer)、周期性冷却，并识别 IP 风控
 (HTTP 456 / 拦截页) 抛出 SinaBlockedError 实现快速止损。
 
-- 仅对白名单中的新浪域名生效，不影响东财/雪球等其他数据源请求。
+同时替换 `requests.api.request` (``requests.get``/``post`` 等模块级函数的
+入口): 原实现每次调用新建 Session, 对同一主机的每个请求都重新建立 TCP/TLS 连接;
+替换后按主机复用带连接池的 Session (keep-alive), 连接复用情况见
+``get_http_pool_stats``。
+
+- 仅对白名单中的新浪域名注入伪装头/风控止损，不影响东财/雪球等其他数据源请求。
 - 需在同步流程启动前调用 `install_requests_protection()` 安装。
 """
 
 import random
+import threading
 import time
+from http.cookiejar import DefaultCookiePolicy
 from urllib.parse import urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
 
+from config.settings import SYNC_FETCH_WORKERS
 from utils.logger import logger
 
 
@@ -72,8 +81,14 @@ SINA_BROWSER_HEADERS_POOL = [
 _COOL_DOWN_INTERVAL = 50
 _COOL_DOWN_SECONDS = 10
 _sina_request_count = 0
+_count_lock = threading.Lock()
 _installed = False
 
+# 每个主机的连接池保留的 keep-alive 连接数: 覆盖抓取线程池的全部并发
+HTTP_POOL_MAXSIZE = SYNC_FETCH_WORKERS + 2
+_host_sessions: dict[str, requests.Session] = {}
+_host_sessions_lock = threading.Lock()
+
 
 def _is_sina_url(url: str) -> bool:
     host = urlparse(url).hostname or ""
@@ -91,6 +106,61 @@ def _is_sina_blocked_page(resp) -> bool:
     return "拒绝访问" in body or "封禁" in body
 
 
+def _new_pooled_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_MAXSIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # 与模块级 requests.get 一致: 不在请求之间携带 Cookie
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+
+def _host_session(url: str) -> requests.Session:
+    parsed = urlparse(url)
+    key = f"{parsed.scheme}://{parsed.netloc}"
+    with _host_sessions_lock:
+        session = _host_sessions.get(key)
+        if session is None:
+            session = _host_sessions[key] = _new_pooled_session()
+        return session
+
+
+def pooled_request(method, url, **kwargs):
+    """``requests.api.request`` 的替代实现: 经该主机共享的连接池 Session 发出请求"""
+    return _host_session(url).request(method=method, url=url, **kwargs)
+
+
+def get_http_pool_stats() -> dict[str, dict[str, int]]:
+    """按主机统计连接池的请求数与新建连接数 (两者之差即复用的连接次数)"""
+    with _host_sessions_lock:
+        sessions = dict(_host_sessions)
+    stats = {}
+    for key, session in sessions.items():
+        requests_count = connections = 0
+        # http/https 共用同一个适配器, 去重后统计
+        for adapter in {id(a): a for a in session.adapters.values()}.values():
+            pools = adapter.poolmanager.pools
+            for pool_key in pools.keys():
+                pool = pools.get(pool_key)
+                if pool is not None:
+                    requests_count += pool.num_requests
+                    connections += pool.num_connections
+        if requests_count:
+            stats[key] = {"requests": requests_count, "connections": connections}
+    return stats
+
+
+def log_http_pool_stats() -> None:
+    """记录各主机的连接复用情况"""
+    for host, stat in sorted(get_http_pool_stats().items()):
+        reused = stat["requests"] - stat["connections"]
+        logger.info(
+            f"HTTP 连接池 {host}: 请求 {stat['requests']} 次, "
+            f"新建连接 {stat['connections']} 个, 复用 {reused} 次"
+        )
+
+
 def install_requests_protection() -> None:
     """为 akshare 内部所有新浪请求安装伪装/冷却/风控止损层 (幂等)。"""
     global _installed
@@ -104,10 +174,13 @@ def install_requests_protection() -> None:
         global _sina_request_count
         if _is_sina_url(url):
             # 周期性冷却
-            _sina_request_count += 1
-            if _sina_request_count % _COOL_DOWN_INTERVAL == 0:
+            # 并发抓取时计数须原子递增, 否则可能跳过冷却点
+            with _count_lock:
+                _sina_request_count += 1
+                request_count = _sina_request_count
+            if request_count % _COOL_DOWN_INTERVAL == 0:
                 logger.info(
-                    f"新浪接口已达 {_sina_request_count} 次请求，冷却 {_COOL_DOWN_SECONDS}s..."
+                    f"新浪接口已达 {request_count} 次请求，冷却 {_COOL_DOWN_SECONDS}s..."
                 )
                 time.sleep(_COOL_DOWN_SECONDS)
 
@@ -126,4 +199,6 @@ def install_requests_protection() -> None:
         return resp
 
     requests.sessions.Session.request = protected_request
-    logger.info("已安装新浪数据源请求保护层 (伪装头/冷却/IP 风控止损)")
+    # requests.get/post 等经 requests.api.request 发出, 改为按主机复用连接池
+    requests.api.request = pooled_request
+    logger.info("已安装新浪数据源请求保护层 (伪装头/冷却/IP 风控止损/连接池)")
@@ -0,0 +1,106 @@
+"""全市场清单接口的磁盘响应缓存 (按接口设置有效期)
+
+披露计划、股票/ETF 列表、退市清单都是全市场级别的分页或大表接口, 一次 sync-all
+会在多个环节重复调用 (指标与报表环节各拉取一遍四个报告期的披露计划), 定时调度
+整体重试时又全部重来。这些清单日内变化很小, 因此把接口原始返回的 DataFrame
+按 (接口, 参数) 缓存到 ``RESPONSE_CACHE_DIR``, 有效期内直接复用:
+
+- 有效期按文件修改时间判定, 各接口见 ``ENDPOINT_TTLS``;
+- 只缓存非空结果, 接口异常或返回空表时不写缓存, 下次照常请求;
+- 同一个键的并发调用 (并行环节) 只有一个线程真正请求, 其余等待后复用;
+- 写入经临时文件 + ``os.replace`` 原子替换, 进程中断不会留下半个缓存文件。
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from pathlib import Path
+
+import pandas as pd
+
+from config.settings import RESPONSE_CACHE_DIR
+from utils.logger import logger
+
+ENDPOINT_DISCLOSURE_PLANS = "disclosure_plans"
+ENDPOINT_STOCK_LIST = "stock_list"
+ENDPOINT_ETF_LIST = "etf_list"
+ENDPOINT_DELISTED_STOCKS = "delisted_stocks"
+
+# 各接口缓存有效期 (秒): 清单类接口均日内复用
+ENDPOINT_TTLS = {
+    ENDPOINT_DISCLOSURE_PLANS: 12 * 3600,
+    ENDPOINT_STOCK_LIST: 12 * 3600,
+    ENDPOINT_ETF_LIST: 12 * 3600,
+    ENDPOINT_DELISTED_STOCKS: 12 * 3600,
+}
+
+_key_locks: dict[str, threading.Lock] = {}
+_key_locks_guard = threading.Lock()
+
+
+def _cache_path(endpoint: str, key: str) -> Path:
+    safe_key = re.sub(r"[^\w.-]", "_", key) or "default"
+    return Path(RESPONSE_CACHE_DIR) / endpoint / f"{safe_key}.pkl"
+
+
+def _key_lock(path: Path) -> threading.Lock:
+    with _key_locks_guard:
+        return _key_locks.setdefault(str(path), threading.Lock())
+
+
+def _read_fresh(path: Path, ttl: float) -> pd.DataFrame | None:
+    try:
+        age = time.time() - path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+    if age > ttl:
+        return None
+    try:
+        return pd.read_pickle(path)
+    except Exception:
+        logger.warning(f"响应缓存损坏, 重新请求: {path}", exc_info=True)
+        return None
+
+
+def _write(path: Path, df: pd.DataFrame) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".tmp_{uuid.uuid4().hex}{path.suffix}")
+    try:
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def cached_frame(
+    endpoint: str,
+    key: str,
+    fetch: Callable[[], pd.DataFrame],
+    ttl: float | None = None,
+) -> pd.DataFrame:
+    """返回有效期内的缓存结果, 否则调用 ``fetch`` 请求并缓存非空结果
+
+    :param endpoint: 接口名 (决定缓存子目录与默认有效期)
+    :param key: 接口参数 (如报告期与市场)
+    :param ttl: 覆盖 ``ENDPOINT_TTLS`` 中的有效期 (秒)
+    """
+    if ttl is None:
+        ttl = ENDPOINT_TTLS[endpoint]
+    path = _cache_path(endpoint, key)
+    with _key_lock(path):
+        cached = _read_fresh(path, ttl)
+        if cached is not None:
+            logger.info(f"复用响应缓存: {endpoint}/{key} ({len(cached)} 行)")
+            return cached.copy()
+        df = fetch()
+        if df is not None and not df.empty:
+            try:
+                _write(path, df)
+            except OSError:
+                logger.warning(f"响应缓存写入失败: {path}", exc_info=True)
+        return df
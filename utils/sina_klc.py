@@ -3,8 +3,13 @@
 绕过 akshare stock_zh_a_daily 的 StockService.getAmountBySymbol 缺陷 (CDR/退市股
 返回 null 导致 JSONDecodeError), 直接调用新浪底层接口。全静态方法, 无状态,
 K 线采集、退市股重建、元数据补全等场景可任意复用。
+
+klc 数据经 ``hk_js_decode`` (V8) 解密, 解码上下文由进程内共享的上下文池复用,
+不再逐股新建 ``MiniRacer`` 并重新 eval 解码脚本。
 """
 
+import queue
+import threading
 from ast import literal_eval
 from datetime import datetime
 
@@ -20,6 +25,47 @@ _USER_AGENT = (
 
 _SINA_EXTRA_COLS = ["prevclose", "postVol", "postAmt"]
 
+# 同时借出的解码上下文上限 (新浪源任务同一时刻只在途一个, 见 fetch_scheduler)
+KLC_DECODER_POOL_SIZE = 2
+
+
+class KlcDecoderPool:
+    """预热 ``hk_js_decode`` 的 V8 上下文池
+
+    退市股全量重建与 CDR 兜底逐股解码, 过去 V8 上下文启动与解码脚本 eval 占主要
+    耗时。池中上下文只 eval 一次解码脚本, 借出期间独占使用, 用完归还复用; 解码
+    抛异常的上下文直接丢弃, 下次按需新建。V8 构造非线程安全 (见
+    sync_stock_metadata), 新建上下文在锁内串行。
+    """
+
+    def __init__(self, size: int = KLC_DECODER_POOL_SIZE):
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._create_lock = threading.Lock()
+
+    def _new_context(self):
+        import py_mini_racer
+        from akshare.stock.cons import hk_js_decode
+
+        with self._create_lock:
+            context = py_mini_racer.MiniRacer()
+            context.eval(hk_js_decode)
+        return context
+
+    def decode(self, raw_str: str) -> list[dict]:
+        """解密 klc_kl.js 载荷, 返回原始 dict list (无数据时为 [])"""
+        with self._slots:
+            try:
+                context = self._idle.get_nowait()
+            except queue.Empty:
+                context = self._new_context()
+            result = context.call("d", raw_str)
+            self._idle.put(context)
+        return result or []
+
+
+_klc_decoders = KlcDecoderPool()
+
 
 class SinaKlcFetcher:
     """Sina klc_kl.js 数据获取器 (静态方法, 任意场景可调用)"""
@@ -31,25 +77,16 @@ class SinaKlcFetcher:
         :param sina_symbol: 新浪格式代码 (如 sh600519 / bj920305)
         :return: [{date, open, high, low, close, volume, amount, ...}, ...] 或 []
         """
-        from unittest.mock import patch
-
-        import py_mini_racer
         import requests
-        from akshare.stock.cons import hk_js_decode, zh_sina_a_stock_hist_url
-
-        original_get = requests.get
-
-        def patched_get(*args, **kwargs):
-            if "headers" not in kwargs or not kwargs["headers"]:
-                kwargs["headers"] = {"User-Agent": _USER_AGENT}
-            return original_get(*args, **kwargs)
-
-        with patch("requests.get", side_effect=patched_get):
-            r = requests.get(zh_sina_a_stock_hist_url.format(sina_symbol))
-            js_code = py_mini_racer.MiniRacer()
-            js_code.eval(hk_js_decode)
-            raw_str = r.text.split("=")[1].split(";")[0].replace('"', "")
-            return js_code.call("d", raw_str) or []
+        from akshare.stock.cons import zh_sina_a_stock_hist_url
+
+        r = requests.get(
+            zh_sina_a_stock_hist_url.format(sina_symbol),
+            headers={"User-Agent": _USER_AGENT},
+            timeout=10,
+        )
+        raw_str = r.text.split("=")[1].split(";")[0].replace('"', "")
+        return _klc_decoders.decode(raw_str)
 
     @staticmethod
     def fetch_hfq(sina_symbol: str) -> pd.DataFrame | None:
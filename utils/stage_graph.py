@@ -0,0 +1,85 @@
+"""同步环节的依赖图执行器
+
+每个环节声明自己依赖的上游环节, 依赖全部完成后立即在独立线程中启动, 互不依赖的
+分支并行运行 (各环节内部的逐股抓取仍由共享的 ``FetchScheduler`` 按数据源限速)。
+
+任一环节抛出异常后不再启动新环节, 调用 ``on_error`` (通常用于熔断共享调度器, 让
+运行中的环节尽快停止派发), 等待运行中的环节结束后重新抛出第一个异常。
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+from utils.logger import logger
+
+
+@dataclass(frozen=True)
+class Stage:
+    """一个同步环节: 返回 (processed, failed)"""
+
+    name: str
+    run: Callable[[], tuple[int, int]]
+    depends_on: tuple[str, ...] = ()
+
+
+def _validate(stages: list[Stage]) -> None:
+    names = [stage.name for stage in stages]
+    if len(set(names)) != len(names):
+        raise ValueError(f"环节名称重复: {names}")
+    for stage in stages:
+        unknown = set(stage.depends_on) - set(names)
+        if unknown:
+            raise ValueError(f"环节 {stage.name} 依赖未定义的环节: {sorted(unknown)}")
+    # 按声明顺序反复剥离已满足依赖的环节, 剥离不动即存在环
+    done: set[str] = set()
+    remaining = list(stages)
+    while remaining:
+        ready = [s for s in remaining if set(s.depends_on) <= done]
+        if not ready:
+            raise ValueError(f"环节依赖存在环: {[s.name for s in remaining]}")
+        done.update(s.name for s in ready)
+        remaining = [s for s in remaining if s.name not in done]
+
+
+def run_stage_graph(
+    stages: list[Stage],
+    on_error: Callable[[BaseException], None] | None = None,
+) -> dict[str, tuple[int, int]]:
+    """按依赖关系并行执行环节, 返回 {环节名: (processed, failed)} (按声明顺序)"""
+    _validate(stages)
+    results: dict[str, tuple[int, int]] = {}
+    pending = list(stages)
+    running: dict[Future, Stage] = {}
+    first_error: BaseException | None = None
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, len(stages)), thread_name_prefix="stage"
+    ) as pool:
+        while pending or running:
+            if first_error is None:
+                for stage in [s for s in pending if set(s.depends_on) <= set(results)]:
+                    pending.remove(stage)
+                    logger.info(f"流水线环节 {stage.name} 开始")
+                    running[pool.submit(stage.run)] = stage
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage = running.pop(future)
+                try:
+                    results[stage.name] = future.result()
+                except BaseException as e:
+                    if first_error is None:
+                        first_error = e
+                        logger.error(f"流水线环节 {stage.name} 异常, 停止启动后续环节")
+                        if on_error is not None:
+                            on_error(e)
+                    continue
+                logger.info(f"流水线环节 {stage.name} 完成")
+
+    if first_error is not None:
+        raise first_error
+    return {stage.name: results[stage.name] for stage in stages}
@@ -4,6 +4,7 @@ from functools import lru_cache
 from pathlib import Path
 
 import akshare as ak
+import numpy as np
 import pandas as pd
 
 from config.settings import WAREHOUSE_DIR
@@ -16,6 +17,101 @@ class TradeCalendarUnavailableError(RuntimeError):
     """交易日历无法获取且没有可用缓存。"""
 
 
+def _to_day(value) -> np.datetime64:
+    """把 date/datetime/Timestamp/字符串统一转换为 datetime64[D]"""
+    return pd.Timestamp(value).to_datetime64().astype("datetime64[D]")
+
+
+class TradeCalendar:
+    """基于有序 datetime64[D] 数组的交易日历
+
+    所有查询均通过 ``np.searchsorted`` 二分完成 (O(log n)), 不在调用时重建集合或
+    过滤列表。既可包装交易所日历 (见 ``get_trade_calendar``), 也可包装回测行情
+    中实际出现的交易日序列。
+    """
+
+    def __init__(self, dates):
+        values = pd.to_datetime(pd.Index(dates)).dropna()
+        self._dates = np.unique(values.to_numpy().astype("datetime64[D]"))
+        self._dates.setflags(write=False)
+
+    @property
+    def dates(self) -> np.ndarray:
+        """只读的有序交易日数组 (datetime64[D])"""
+        return self._dates
+
+    def __len__(self) -> int:
+        return len(self._dates)
+
+    def __contains__(self, value) -> bool:
+        return self.is_trade_date(value)
+
+    def is_trade_date(self, value) -> bool:
+        day = _to_day(value)
+        idx = np.searchsorted(self._dates, day, side="left")
+        return bool(idx < len(self._dates) and self._dates[idx] == day)
+
+    def latest_on_or_before(self, value) -> date | None:
+        """返回不晚于指定日期的最近交易日, 不存在时返回 None"""
+        idx = np.searchsorted(self._dates, _to_day(value), side="right") - 1
+        return self._at(idx)
+
+    def next_trade_date(self, value) -> date | None:
+        """返回严格晚于指定日期的下一个交易日, 不存在时返回 None"""
+        idx = np.searchsorted(self._dates, _to_day(value), side="right")
+        return self._at(idx)
+
+    def next_trade_dates(self, values) -> np.ndarray:
+        """向量化版 next_trade_date, 越界位置为 NaT (datetime64[D])"""
+        days = pd.to_datetime(pd.Index(values)).to_numpy().astype("datetime64[D]")
+        idx = np.searchsorted(self._dates, days, side="right")
+        result = np.full(len(days), np.datetime64("NaT"), dtype="datetime64[D]")
+        valid = idx < len(self._dates)
+        result[valid] = self._dates[idx[valid]]
+        return result
+
+    def shift(self, value, n: int) -> date | None:
+        """按交易日平移
+
+        n > 0 返回指定日期之后第 n 个交易日, n < 0 返回之前第 |n| 个交易日,
+        n == 0 时指定日期本身须为交易日。越界时返回 None。
+        """
+        day = _to_day(value)
+        if n == 0:
+            return day.astype(object) if self.is_trade_date(day) else None
+        if n > 0:
+            idx = np.searchsorted(self._dates, day, side="right") + n - 1
+        else:
+            idx = np.searchsorted(self._dates, day, side="left") + n
+        return self._at(idx)
+
+    def range(self, start=None, end=None) -> np.ndarray:
+        """返回 [start, end] 闭区间内的交易日切片 (零拷贝视图)"""
+        lo = 0 if start is None else np.searchsorted(self._dates, _to_day(start))
+        hi = (
+            len(self._dates)
+            if end is None
+            else np.searchsorted(self._dates, _to_day(end), side="right")
+        )
+        return self._dates[lo:hi]
+
+    def month_ends(self, start=None, end=None) -> np.ndarray:
+        """返回区间内每个月最后一个交易日; 日历末月以其最后一个日期为准"""
+        dates = self.range(start, end)
+        if len(dates) == 0:
+            return dates
+        months = dates.astype("datetime64[M]")
+        is_last = np.empty(len(dates), dtype=bool)
+        is_last[:-1] = months[1:] != months[:-1]
+        is_last[-1] = True
+        return dates[is_last]
+
+    def _at(self, idx) -> date | None:
+        if idx < 0 or idx >= len(self._dates):
+            return None
+        return self._dates[idx].astype(object)
+
+
 @lru_cache(maxsize=1)
 def _get_all_trade_dates() -> list[date]:
     """获取所有交易日历列表（带缓存）"""
@@ -73,6 +169,12 @@ def _get_all_trade_dates() -> list[date]:
             raise TradeCalendarUnavailableError("交易日历同步失败") from e
 
 
+@lru_cache(maxsize=1)
+def get_trade_calendar() -> TradeCalendar:
+    """获取进程内共享的交易所交易日历 (只加载一次)"""
+    return TradeCalendar(_get_all_trade_dates())
+
+
 def is_trade_date(d: date | None = None) -> bool:
     """判断指定日期 (默认今天) 是否为 A 股交易日
 
@@ -81,7 +183,7 @@ def is_trade_date(d: date | None = None) -> bool:
     if d is None:
         d = date.today()
     try:
-        return d in set(_get_all_trade_dates())
+        return get_trade_calendar().is_trade_date(d)
     except TradeCalendarUnavailableError:
         raise
     except Exception as e:
@@ -99,25 +201,21 @@ def get_latest_trade_date(ref_date: datetime = None) -> date:
         ref_date = datetime.now()
 
     try:
-        trade_dates = _get_all_trade_dates()
-
-        # 过滤掉大于参考日期的部分
-        past_trade_dates = [d for d in trade_dates if d <= ref_date.date()]
+        calendar = get_trade_calendar()
+        latest = calendar.latest_on_or_before(ref_date.date())
 
-        if not past_trade_dates:
+        if latest is None:
             raise TradeCalendarUnavailableError(
                 f"交易日历中没有早于 {ref_date.date()} 的交易日"
             )
 
-        latest = past_trade_dates[-1]
-
         # 特殊逻辑：如果是今天，但尚未收盘 (15:30)，则返回上一个交易日
         if latest == ref_date.date() and (
             ref_date.hour < 15 or (ref_date.hour == 15 and ref_date.minute < 30)
         ):
-            # 取倒数第二个
-            if len(past_trade_dates) >= 2:
-                return past_trade_dates[-2]
+            previous = calendar.shift(latest, -1)
+            if previous is not None:
+                return previous
 
         return latest
 